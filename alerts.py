@@ -0,0 +1,282 @@
+"""
+Silnik alertow progowych (POST /alert).
+
+Regula dotyczy jednego pola jednej tabeli pomiarowej, np. temperatury
+w weather_control powyzej 30 stopni. Regula ma:
+- histereze: alert aktywny (powyzej progu) gasnie dopiero, gdy wartosc
+  spadnie ponizej threshold - hysteresis (dla op "<" odpowiednio powyzej
+  threshold + hysteresis), wiec wartosc drgajaca wokol progu nie generuje
+  serii alertow,
+- minimalny czas trwania: alert wlacza sie dopiero, gdy warunek jest
+  spelniony nieprzerwanie przez min_duration sekund (czas pomiarow).
+
+Reguly sa indeksowane po (tabela, pole), a metoda evaluate (sluchacz
+IngestQueue) sprawdza kazdy zapisany pomiar tylko z regulami jego pola,
+bez zapytan do bazy. Zmiany stanu zapisywane sa w tabeli alerts
+i wysylane przez Socket.IO (zdarzenie alert).
+"""
+import threading
+
+from database import TABLE_COLUMNS, epoch_seconds
+from rollups import ROLLUP_FIELDS
+
+# Obslugiwane operatory: powyzej lub ponizej progu
+OPERATORS = (">", "<")
+
+# Stany reguly
+OK, PENDING, ACTIVE = "ok", "pending", "active"
+
+# Domyslna liczba zdarzen zwracanych przez recent()
+RECENT_LIMIT = 50
+
+INSERT_ALERT_SQL = """INSERT INTO alerts (timestamp, rule_id, source, field, value,
+                                          threshold, state, message)
+                      VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
+
+
+class Rule:
+    """Regula progowa wraz z biezacym stanem."""
+
+    __slots__ = ("id", "name", "table", "field", "op", "threshold", "hysteresis",
+                 "min_duration", "state", "since")
+
+    def __init__(self, rule_id, name, table, field, op, threshold, hysteresis=0.0,
+                 min_duration=0.0):
+        self.id = rule_id
+        self.name = name
+        self.table = table
+        self.field = field
+        self.op = op
+        self.threshold = threshold
+        self.hysteresis = hysteresis
+        self.min_duration = min_duration
+        self.state = OK
+        self.since = None
+
+    def as_dict(self):
+        """Zwraca regule w postaci slownika (JSON)."""
+        return {"id": self.id, "name": self.name, "table": self.table,
+                "field": self.field, "op": self.op, "threshold": self.threshold,
+                "hysteresis": self.hysteresis, "min_duration": self.min_duration,
+                "state": self.state}
+
+
+def validate_rule(data):
+    """
+    Sprawdza definicje reguly przeslana przez klienta.
+    :return: Slownik argumentow dla AlertEngine.add_rule.
+    :raises ValueError: Przy nieznanej tabeli, polu, operatorze lub wartosci.
+    """
+
+    if not isinstance(data, dict):
+        raise ValueError("regula musi byc obiektem JSON")
+    table = data.get("table", "weather_control")
+    field = data.get("field")
+    if table not in ROLLUP_FIELDS:
+        raise ValueError(f"nieznana tabela: {table}")
+    if field not in ROLLUP_FIELDS[table]:
+        raise ValueError(f"nieznane pole: {field}")
+    op = data.get("op", ">")
+    if op not in OPERATORS:
+        raise ValueError(f"nieznany operator: {op}")
+    try:
+        threshold = float(data["threshold"])
+        hysteresis = float(data.get("hysteresis", 0))
+        min_duration = float(data.get("min_duration", 0))
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError("threshold, hysteresis i min_duration musza byc liczbami") from e
+    if hysteresis < 0 or min_duration < 0:
+        raise ValueError("hysteresis i min_duration nie moga byc ujemne")
+    return {"name": data.get("name"), "table": table, "field": field, "op": op,
+            "threshold": threshold, "hysteresis": hysteresis, "min_duration": min_duration}
+
+
+def parse_alert_request(data):
+    """
+    Zamienia tresc POST /alert na liste regul do zapisania.
+    Obslugiwane postacie:
+    - {"rules": [regula, ...]} lub pojedyncza regula {"table", "field", "threshold", ...},
+    - dotychczasowa {"temperature": X, "humidity": Y}: reguly "powyzej progu"
+      dla weather_control o nazwach temperature i humidity (zastepowane
+      przy kolejnym ustawieniu).
+    :raises ValueError: Przy niepoprawnej tresci.
+    """
+
+    if not isinstance(data, dict):
+        raise ValueError("oczekiwano obiektu JSON")
+    if "rules" in data:
+        if not isinstance(data["rules"], list):
+            raise ValueError("rules musi byc lista")
+        return [validate_rule(rule) for rule in data["rules"]]
+    if "field" in data:
+        return [validate_rule(data)]
+    return [validate_rule({"name": field, "table": "weather_control", "field": field,
+                           "threshold": data[field]})
+            for field in ("temperature", "humidity") if data.get(field) is not None]
+
+
+class AlertEngine:
+    """
+    Reguly alertow zapisane w tabeli alert_rules i ich ocena na biezaco.
+    :param db: Pula polaczen (Database).
+    :param emit: Funkcja emit(nazwa_zdarzenia, dane) wysylajaca zdarzenie
+                 Socket.IO; None wylacza powiadomienia.
+    """
+
+    def __init__(self, db, emit=None):
+        self.db = db
+        self.emit = emit
+        self._lock = threading.Lock()
+        self._rules = {}
+        # (tabela) -> lista (indeks kolumny w wierszu, lista regul)
+        self._index = {}
+        self._stats = {"evaluated": 0, "triggered": 0, "resolved": 0}
+
+    def load(self):
+        """Wczytuje reguly z bazy danych (po init_db)."""
+        rows = self.db.query("""SELECT id, name, source, field, op, threshold,
+                             hysteresis, min_duration FROM alert_rules ORDER BY id""")
+        with self._lock:
+            self._rules = {row[0]: Rule(*row) for row in rows}
+            self._rebuild()
+
+    def add_rule(self, table, field, threshold, op=">", hysteresis=0.0, min_duration=0.0,
+                 name=None):
+        """
+        Zapisuje regule; regula o tej samej nazwie jest zastepowana.
+        :return: Slownik z zapisana regula.
+        """
+
+        with self.db.connection() as conn:
+            with conn:
+                if name is not None:
+                    conn.execute("DELETE FROM alert_rules WHERE name = ?", (name,))
+                rule_id = conn.execute("""INSERT INTO alert_rules
+                                       (name, source, field, op, threshold,
+                                        hysteresis, min_duration)
+                                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                                       (name, table, field, op, threshold,
+                                        hysteresis, min_duration)).lastrowid
+        rule = Rule(rule_id, name, table, field, op, threshold, hysteresis, min_duration)
+        with self._lock:
+            for old in [old for old in self._rules.values()
+                        if name is not None and old.name == name]:
+                del self._rules[old.id]
+            self._rules[rule_id] = rule
+            self._rebuild()
+        return rule.as_dict()
+
+    def remove_rule(self, rule_id):
+        """Usuwa regule. :return: True, jesli regula istniala."""
+        self.db.execute("DELETE FROM alert_rules WHERE id = ?", (rule_id,))
+        with self._lock:
+            removed = self._rules.pop(rule_id, None) is not None
+            self._rebuild()
+        return removed
+
+    def rules(self):
+        """Zwraca liste regul wraz ze stanem."""
+        with self._lock:
+            return [rule.as_dict() for rule in self._rules.values()]
+
+    def recent(self, limit=RECENT_LIMIT):
+        """Zwraca ostatnie zdarzenia alertow, od najnowszych."""
+        rows = self.db.query("""SELECT id, timestamp, rule_id, source, field, value,
+                             threshold, state, message FROM alerts
+                             ORDER BY timestamp DESC, id DESC LIMIT ?""", (limit,))
+        keys = ("id", "timestamp", "rule_id", "table", "field", "value",
+                "threshold", "state", "message")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def stats(self):
+        """Zwraca liczniki oceny regul."""
+        with self._lock:
+            return dict(self._stats, rules=len(self._rules))
+
+    def _rebuild(self):
+        """Odbudowuje indeks regul po (tabela, pole); wywolywane pod blokada."""
+        by_field = {}
+        for rule in self._rules.values():
+            by_field.setdefault((rule.table, rule.field), []).append(rule)
+        index = {}
+        for (table, field), rules in by_field.items():
+            column = TABLE_COLUMNS[table].index(field) + 1
+            index.setdefault(table, []).append((column, rules))
+        self._index = index
+
+    def evaluate(self, table, rows):
+        """
+        Ocenia zapisane wiersze (id, timestamp, ...) z regulami ich pol
+        (sluchacz IngestQueue). Koszt: liczba regul pola na pomiar.
+        """
+
+        events = []
+        with self._lock:
+            fields = self._index.get(table)
+            if not fields:
+                return
+            evaluated = 0
+            for row in rows:
+                moment = None
+                for column, rules in fields:
+                    value = row[column]
+                    if value is None:
+                        continue
+                    evaluated += len(rules)
+                    for rule in rules:
+                        if rule.op == ">":
+                            breached = value > rule.threshold
+                            cleared = value < rule.threshold - rule.hysteresis
+                        else:
+                            breached = value < rule.threshold
+                            cleared = value > rule.threshold + rule.hysteresis
+
+                        if rule.state == ACTIVE:
+                            if cleared:
+                                rule.state = OK
+                                events.append(self._event(rule, row, value, "resolved"))
+                            continue
+                        if not breached:
+                            rule.state = OK
+                            continue
+                        if rule.min_duration > 0:
+                            if moment is None:
+                                moment = epoch_seconds(row[1])
+                            if rule.state == OK:
+                                rule.state = PENDING
+                                rule.since = moment
+                            if moment - rule.since < rule.min_duration:
+                                continue
+                        rule.state = ACTIVE
+                        events.append(self._event(rule, row, value, "triggered"))
+            self._stats["evaluated"] += evaluated
+            for event in events:
+                self._stats[event["state"]] += 1
+
+        if events:
+            self._publish(events)
+
+    @staticmethod
+    def _event(rule, row, value, state):
+        """Tworzy opis zdarzenia zmiany stanu reguly."""
+        label = rule.name or f"{rule.table}.{rule.field}"
+        if state == "triggered":
+            message = f"{label}: {rule.field}={value} {rule.op} {rule.threshold}"
+        else:
+            message = f"{label}: {rule.field}={value} - powrot do normy"
+        return {"timestamp": row[1], "rule_id": rule.id, "table": rule.table,
+                "field": rule.field, "value": value, "threshold": rule.threshold,
+                "state": state, "message": message}
+
+    def _publish(self, events):
+        """Zapisuje zdarzenia w tabeli alerts i wysyla je przez Socket.IO."""
+        try:
+            self.db.executemany(INSERT_ALERT_SQL,
+                                [(e["timestamp"], e["rule_id"], e["table"], e["field"],
+                                  e["value"], e["threshold"], e["state"], e["message"])
+                                 for e in events])
+        except Exception as e:  # pylint: disable=broad-except
+            print(f"Blad zapisu alertow: {e}")
+        if self.emit is not None:
+            for event in events:
+                self.emit("alert", event)
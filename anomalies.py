@@ -0,0 +1,356 @@
+"""
+Wykrywanie anomalii w strumieniu pomiarow (sonda pH dryfuje, czujnik PM
+sie zawiesil itp.).
+
+Dla kazdego pola liczbowego kazdej tabeli (ROLLUP_FIELDS) dzialaja trzy
+detektory, aktualizowane przyrostowo przy kazdym zapisanym pomiarze
+(sluchacz IngestQueue) ze stala pamiecia na czujnik:
+- zscore: odporny z-score wzgledem okna ostatnich WINDOW pomiarow
+  |x - mediana| / (1.4826 * MAD); gdy MAD = 0, uzywane jest odchylenie
+  standardowe okna. Anomalia, gdy wynik przekracza Z_THRESHOLD,
+- flatline: FLATLINE_COUNT kolejnych identycznych wartosci (zgloszenie
+  raz na serie),
+- rate: zmiana szybsza niz MAX_RATE[pole] jednostek na sekunde (czas
+  pomiarow).
+Anomalie zapisywane sa w tabeli anomalies i wysylane przez Socket.IO
+(zdarzenie anomaly).
+
+Ta sama logika w wersji wektorowej (NumPy) sluzy do testow wstecznych
+na istniejacej bazie:
+    python anomalies.py replay [--db measurements.db] [--table nazwa] [--save]
+"""
+import argparse
+from bisect import bisect_left, insort
+from collections import Counter, deque
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+from database import TABLE_COLUMNS, Database, epoch_seconds, init_db
+from rollups import ROLLUP_FIELDS
+
+# Liczba poprzednich pomiarow, wzgledem ktorych liczony jest z-score
+WINDOW = 60
+
+# Prog odpornego z-score (Iglewicz i Hoaglin)
+Z_THRESHOLD = 3.5
+
+# Stala skalujaca MAD do odchylenia standardowego rozkladu normalnego
+MAD_SCALE = 1.4826
+
+# Liczba kolejnych identycznych wartosci uznawana za zawieszony czujnik
+FLATLINE_COUNT = 30
+
+# Maksymalna wiarygodna szybkosc zmian (jednostki na sekunde) dla pol
+MAX_RATE = {
+    "temperature": 2.0,
+    "humidity": 5.0,
+    "pm25": 20.0,
+    "pm10": 30.0,
+    "ph": 0.25,
+    "current_ph": 0.25,
+}
+
+# Domyslna liczba anomalii zwracanych przez recent()
+RECENT_LIMIT = 50
+
+# Liczba okien przetwarzanych naraz w trybie wektorowym (ogranicza pamiec)
+REPLAY_CHUNK = 100000
+
+INSERT_ANOMALY_SQL = """INSERT INTO anomalies (timestamp, source, field, value,
+                                               detector, score, message)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)"""
+
+
+def _event(table, field, timestamp, value, detector, score):
+    """Tworzy opis anomalii."""
+    if detector == "zscore":
+        message = f"{table}.{field}: wartosc {value} odstaje od okna (z={score:.1f})"
+    elif detector == "flatline":
+        message = f"{table}.{field}: {int(score)} identycznych odczytow ({value})"
+    else:
+        message = f"{table}.{field}: zmiana {score:.2f} na sekunde ({value})"
+    return {"timestamp": timestamp, "table": table, "field": field, "value": value,
+            "detector": detector, "score": score, "message": message}
+
+
+def robust_score(window, value):
+    """
+    Zwraca odporny z-score wartosci wzgledem posortowanej listy window.
+    Mediana jest odczytywana z posortowanego okna, a MAD wyznaczana selekcja
+    liniowa (np.partition) zamiast sortowania odchylen, wiec koszt pomiaru to
+    O(window). Gdy MAD = 0, uzywa odchylenia standardowego; dla stalego okna
+    zwraca 0.
+    """
+
+    size = len(window)
+    half = size // 2
+    median = window[half] if size % 2 else (window[half - 1] + window[half]) / 2
+    deviations = np.abs(np.array(window, dtype=float) - median)
+    if size % 2:
+        mad = float(np.partition(deviations, half)[half])
+    else:
+        middle = np.partition(deviations, (half - 1, half))
+        mad = float(middle[half - 1] + middle[half]) / 2
+    if mad > 0:
+        return abs(value - median) / (MAD_SCALE * mad)
+    mean = sum(window) / size
+    std = math.sqrt(sum((v - mean) ** 2 for v in window) / size)
+    return abs(value - mean) / std if std > 0 else 0.0
+
+
+class _FieldState:
+    """Stan detektorow jednego pola: okno, poprzedni pomiar i dlugosc serii."""
+
+    __slots__ = ("recent", "ordered", "last", "last_moment", "run")
+
+    def __init__(self, window):
+        self.recent = deque(maxlen=window)  # kolejnosc naplywu
+        self.ordered = []                   # te same wartosci posortowane
+        self.last = None
+        self.last_moment = None
+        self.run = 0
+
+
+class AnomalyDetector:
+    """
+    Detektory anomalii wszystkich pol liczbowych; metoda update ma
+    sygnature sluchacza IngestQueue.
+    :param db: Pula polaczen (Database) do zapisu anomalii; None wylacza zapis.
+    :param emit: Funkcja emit(nazwa_zdarzenia, dane) wysylajaca zdarzenie
+                 Socket.IO; None wylacza powiadomienia.
+    """
+
+    def __init__(self, db=None, emit=None, window=WINDOW, z_threshold=Z_THRESHOLD,
+                 flatline_count=FLATLINE_COUNT, max_rate=None):
+        self.db = db
+        self.emit = emit
+        self.window = window
+        self.z_threshold = z_threshold
+        self.flatline_count = flatline_count
+        self.max_rate = MAX_RATE if max_rate is None else max_rate
+        self._lock = threading.Lock()
+        self._states = {table: {field: _FieldState(window) for field in fields}
+                        for table, fields in ROLLUP_FIELDS.items()}
+        # Indeks pola w wierszu (id, timestamp, ...) tabeli
+        self._indexes = {table: [(field, TABLE_COLUMNS[table].index(field) + 1)
+                                 for field in fields]
+                         for table, fields in ROLLUP_FIELDS.items()}
+        self._stats = Counter(checked=0)
+
+    def update(self, table, rows, publish=True):
+        """
+        Przepuszcza zapisane wiersze (id, timestamp, ...) przez detektory.
+        :param publish: False tylko aktualizuje stan (rozgrzewka).
+        :return: Lista wykrytych anomalii.
+        """
+
+        if table not in self._states:
+            return []
+        states = self._states[table]
+        indexes = self._indexes[table]
+        events = []
+        with self._lock:
+            for row in rows:
+                timestamp = row[1]
+                moment = None
+                for field, index in indexes:
+                    value = row[index]
+                    if value is None:
+                        continue
+                    if moment is None:
+                        moment = epoch_seconds(timestamp)
+                    events.extend(self._check(table, field, states[field],
+                                              timestamp, moment, value))
+            if publish:
+                self._stats["checked"] += len(rows)
+                self._stats.update(event["detector"] for event in events)
+
+        if publish and events:
+            self._publish(events)
+        return events
+
+    def _check(self, table, field, state, timestamp, moment, value):
+        """Ocenia jeden pomiar pola i dopisuje go do stanu detektorow."""
+        found = []
+        recent, ordered = state.recent, state.ordered
+        if len(recent) == self.window:
+            score = robust_score(ordered, value)
+            if score > self.z_threshold:
+                found.append(_event(table, field, timestamp, value, "zscore", score))
+
+        if state.last is not None:
+            limit = self.max_rate.get(field)
+            elapsed = moment - state.last_moment
+            if limit is not None and elapsed > 0:
+                rate = abs(value - state.last) / elapsed
+                if rate > limit:
+                    found.append(_event(table, field, timestamp, value, "rate", rate))
+        state.run = state.run + 1 if value == state.last else 1
+        if state.run == self.flatline_count:
+            found.append(_event(table, field, timestamp, value, "flatline", state.run))
+
+        if len(recent) == self.window:
+            del ordered[bisect_left(ordered, recent[0])]
+        recent.append(value)
+        insort(ordered, value)
+        state.last = value
+        state.last_moment = moment
+        return found
+
+    def warm(self, db):
+        """Odtwarza stan detektorow z ostatnich pomiarow w bazie (bez zgloszen)."""
+        count = max(self.window, self.flatline_count) + 1
+        for table in self._states:
+            rows = db.query(f"SELECT * FROM {table} ORDER BY timestamp DESC, id DESC LIMIT ?",
+                            (count,))
+            self.update(table, rows[::-1], publish=False)
+
+    def recent(self, limit=RECENT_LIMIT):
+        """Zwraca ostatnie anomalie z bazy, od najnowszych."""
+        rows = self.db.query("""SELECT id, timestamp, source, field, value, detector,
+                             score, message FROM anomalies
+                             ORDER BY timestamp DESC, id DESC LIMIT ?""", (limit,))
+        keys = ("id", "timestamp", "table", "field", "value", "detector", "score", "message")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def stats(self):
+        """Zwraca liczbe ocenionych wierszy i anomalii wg detektora."""
+        with self._lock:
+            return dict(self._stats)
+
+    def _publish(self, events):
+        """Zapisuje anomalie w tabeli anomalies i wysyla je przez Socket.IO."""
+        if self.db is not None:
+            try:
+                save_anomalies(self.db, events)
+            except Exception as e:  # pylint: disable=broad-except
+                print(f"Blad zapisu anomalii: {e}")
+        if self.emit is not None:
+            for event in events:
+                self.emit("anomaly", event)
+
+
+def save_anomalies(db, events):
+    """Zapisuje liste anomalii w tabeli anomalies."""
+    db.executemany(INSERT_ANOMALY_SQL,
+                   [(e["timestamp"], e["table"], e["field"], e["value"],
+                     e["detector"], e["score"], e["message"]) for e in events])
+
+
+def detect_series(values, moments, field, window=WINDOW, z_threshold=Z_THRESHOLD,
+                  flatline_count=FLATLINE_COUNT, max_rate=None):
+    """
+    Wektorowa wersja detektorow dla jednego pola (bez wartosci pustych).
+    :param values: Tablica wartosci w kolejnosci czasu.
+    :param moments: Tablica czasow pomiarow w sekundach.
+    :return: Lista (indeks pomiaru, detektor, wynik).
+    """
+
+    max_rate = MAX_RATE if max_rate is None else max_rate
+    found = []
+    size = len(values)
+
+    # zscore: okno window poprzednich wartosci, przetwarzane porcjami
+    if size > window:
+        windows = np.lib.stride_tricks.sliding_window_view(values[:-1], window)
+        for start in range(0, len(windows), REPLAY_CHUNK):
+            chunk = windows[start:start + REPLAY_CHUNK]
+            current = values[window + start:window + start + len(chunk)]
+            median = np.median(chunk, axis=1)
+            mad = np.median(np.abs(chunk - median[:, None]), axis=1)
+            mean = chunk.mean(axis=1)
+            std = chunk.std(axis=1)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                scores = np.where(mad > 0, np.abs(current - median) / (MAD_SCALE * mad),
+                                  np.where(std > 0, np.abs(current - mean) / std, 0.0))
+            for i in np.flatnonzero(scores > z_threshold):
+                found.append((window + start + i, "zscore", float(scores[i])))
+
+    if size > 1:
+        # rate: zmiana miedzy kolejnymi pomiarami na sekunde
+        limit = max_rate.get(field)
+        if limit is not None:
+            elapsed = np.diff(moments)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                rates = np.abs(np.diff(values)) / elapsed
+            for i in np.flatnonzero((elapsed > 0) & (rates > limit)):
+                found.append((i + 1, "rate", float(rates[i])))
+
+        # flatline: dlugosc serii identycznych wartosci konczacej sie na pomiarze
+        positions = np.arange(size)
+        starts = np.where(np.r_[True, values[1:] != values[:-1]], positions, 0)
+        runs = positions - np.maximum.accumulate(starts) + 1
+        for i in np.flatnonzero(runs == flatline_count):
+            found.append((i, "flatline", float(flatline_count)))
+
+    return found
+
+
+def replay(db, tables=None, **options):
+    """
+    Uruchamia detektory wektorowo na pomiarach z bazy (test wsteczny).
+    :param options: Parametry detect_series (window, z_threshold, ...).
+    :return: Lista anomalii w kolejnosci czasu.
+    """
+
+    events = []
+    for table in tables or ROLLUP_FIELDS:
+        fields = ROLLUP_FIELDS[table]
+        rows = db.query(f"SELECT timestamp, {', '.join(fields)} FROM {table} "
+                        f"ORDER BY timestamp, id")
+        if not rows:
+            continue
+        stamps = np.array([row[0] for row in rows])
+        moments = np.array([epoch_seconds(stamp) for stamp in stamps])
+        data = np.array([row[1:] for row in rows], dtype=object)
+        for column, field in enumerate(fields):
+            raw = data[:, column]
+            present = np.flatnonzero(np.not_equal(raw, None))
+            values = raw[present].astype(float)
+            for i, detector, score in detect_series(values, moments[present], field,
+                                                    **options):
+                index = present[i]
+                events.append(_event(table, field, str(stamps[index]),
+                                     float(values[i]), detector, score))
+    events.sort(key=lambda event: event["timestamp"])
+    return events
+
+
+def main():
+    """Wiersz polecen: python anomalies.py replay [--db sciezka] [--table nazwa] [--save]."""
+    parser = argparse.ArgumentParser(description="Wykrywanie anomalii - test wsteczny")
+    parser.add_argument("command", choices=["replay"])
+    parser.add_argument("--db", default=os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "measurements.db"))
+    parser.add_argument("--table", action="append", choices=list(ROLLUP_FIELDS))
+    parser.add_argument("--window", type=int, default=WINDOW)
+    parser.add_argument("--z", type=float, default=Z_THRESHOLD)
+    parser.add_argument("--flatline", type=int, default=FLATLINE_COUNT)
+    parser.add_argument("--show", type=int, default=20, help="liczba wypisanych anomalii")
+    parser.add_argument("--save", action="store_true", help="zapisz anomalie w tabeli anomalies")
+    args = parser.parse_args()
+
+    init_db(args.db)
+    db = Database(args.db)
+    start = time.perf_counter()
+    events = replay(db, args.table, window=args.window, z_threshold=args.z,
+                    flatline_count=args.flatline)
+    elapsed = time.perf_counter() - start
+    for event in events[:args.show]:
+        print(f"{event['timestamp']}  {event['detector']:8}  {event['message']}")
+    counts = Counter((e["table"], e["field"], e["detector"]) for e in events)
+    for (table, field, detector), count in sorted(counts.items()):
+        print(f"{table}.{field} {detector}: {count}")
+    print(f"Anomalie: {len(events)}  Czas: {elapsed:.2f} s")
+    if args.save and events:
+        save_anomalies(db, events)
+        print("Zapisano w tabeli anomalies")
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,187 +1,198 @@
 """
 Moduł aplikacji obsługującej Raspberry Pi z wykorzystaniem Flask i SocketIO.
 """
-from threading import Lock # Lock do synchronizacji dostepu do zasobow
 from datetime import datetime
-import sqlite3
 import threading
+import atexit
 import random
 import os
 import time
 import cv2
-from flask import Flask, jsonify, request, render_template, Response
+from flask import (Flask, abort, jsonify, request, render_template, Response, send_file,
+                   url_for)
 from flask_socketio import SocketIO, emit
+from alerts import AlertEngine, parse_alert_request
+from anomalies import AnomalyDetector
+from camera import MotionDetector, MotionEvents, draw_boxes, load_motion_config, mjpeg_part
+from cameras import CameraRegistry, load_camera_config
+from clips import CLIP_OPTIONS, ClipRecorder, record_frames
+from config import load_options
+from database import Database, fetch_page, init_db, parse_limit
+from export import EXPORT_FORMATS, open_export
+from ingest import IngestQueue, parse_batch
+from latest import LatestReadings
+from motion_catalog import MotionCatalog, event_file
+from motion_pool import POOL_OPTIONS, MotionPool
+from online_stats import OnlineStats
+from photos import PhotoWriter
+from query import run_query
+from response_cache import ResponseCache, etag_matches
+from retention import RETENTION_OPTIONS, RetentionEngine
+from rollups import history, update_rollups
+from thumbnails import (CACHE_CONTROL, MOSAIC_CACHE_CONTROL, THUMB_DIR, ThumbnailPool,
+                        file_etag)
 
 # Konfiguracja Flask i SocketIO
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'secret!'
 socketio = SocketIO(app)
 
-# Global variable to store the last frame
-camera_lock = Lock()
-LAST_FRAME = None
+# Zdjecia z fotopulapki zapisywane w tle (kodowanie, zapis, fsync partiami)
+photo_writer = PhotoWriter()
+# Miniatury zdjec tworzone w tle zaraz po zapisie zdjecia (galeria zdarzen)
+thumbnails = ThumbnailPool()
+photo_writer.add_listener(thumbnails.submit)
 
 base_dir = os.path.dirname(os.path.abspath(__file__))
 db_path = os.path.join(base_dir, "measurements.db")
+# Katalog zdjec i klipow kamery glownej (pozostale kamery w podkatalogach z ich id)
+photo_root = "/home/raspi/Desktop/ProjektZaliczeniowy/Projekt/phototrap"
+# Kamery z cameras.json (bez pliku jedna kamera USB 0), kazda z wlasnym odczytem,
+# FrameBus i JpegCache; opcje wykrywania ruchu z motion.json i opcji kamery
+cameras = CameraRegistry(load_camera_config(os.path.join(base_dir, "cameras.json")),
+                         load_motion_config(os.path.join(base_dir, "motion.json")))
+# Klipy zdarzen ruchu z nagraniem przed i po zdarzeniu; limity pamieci z clips.json
+# (na kazda kamere)
+clip_options = load_options(os.path.join(base_dir, "clips.json"), CLIP_OPTIONS)
+for camera in cameras:
+    camera.recorder = ClipRecorder(**clip_options)
+# Kamera glowna: /video_feed, /latest_frame i zdjecia w katalogu phototrap
+frame_bus = cameras.primary.bus
+jpeg_cache = cameras.primary.jpeg
+clip_recorder = cameras.primary.recorder
+# Analiza ruchu w procesach roboczych (motion_pool.json, np. {"workers": 3}); bez pliku
+# kazda kamera analizuje klatki we wlasnym watku
+pool_options = load_options(os.path.join(base_dir, "motion_pool.json"), POOL_OPTIONS)
+motion_pool = MotionPool(**pool_options) if pool_options.get("workers") else None
+
+# Wspolna pula polaczen z baza danych
+db = Database(db_path)
+
+# Kolejka zapisu pomiarow partiami (jeden watek zapisujacy)
+ingest = IngestQueue(db_path)
+# Agregaty minutowe/godzinowe/dzienne aktualizowane razem z zapisem partii
+ingest.add_batch_hook(update_rollups)
+
+# Najnowsze pomiary w pamieci dla dashboardow, uzupelniane po kazdej partii
+latest = LatestReadings(db)
+ingest.add_listener(latest.extend)
+# Zserializowane odpowiedzi JSON z ETag; uniewazniane po zapisie nowych pomiarow
+responses = ResponseCache(latest)
+ingest.add_listener(responses.invalidate)
+# Statystyki biezace (Welford, EWMA, min/max 1h/24h) aktualizowane przy zapisie
+online_stats = OnlineStats()
+ingest.add_listener(online_stats.update)
+# Alerty progowe oceniane przy kazdym zapisanym pomiarze
+alert_engine = AlertEngine(db, emit=socketio.emit)
+ingest.add_listener(alert_engine.evaluate)
+# Wykrywanie anomalii (skoki, zawieszone czujniki, zbyt szybkie zmiany)
+anomaly_detector = AnomalyDetector(db, emit=socketio.emit)
+ingest.add_listener(anomaly_detector.update)
+
+# Usuwanie przeterminowanych danych i zmniejszanie pliku bazy; dni przechowywania
+# tabel z retention.json
+retention_policies = load_options(os.path.join(base_dir, "retention.json"), RETENTION_OPTIONS)
+retention = RetentionEngine(db_path, retention_policies)
+# Katalog zdarzen ruchu (tabela motion_events) dla galerii /events
+motion_catalog = MotionCatalog(db)
+
+def generate_frames(camera):
+    """
+    Generuje strumien wideo z najnowszych klatek kamery. Czeka na nowa
+    klatke w FrameBus kamery (bez aktywnego czekania) i wysyla kazda
+    co najwyzej raz.
+    """
 
-def init_db(db_path):
-    """Inicjalizacja bazy danych."""
-
-    print(f"db_path: {os.path.abspath(db_path)}")
-
-    if not os.path.exists(db_path):
-        print("Baza danych nie istnieje. Tworze nowa...")
-
-    try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-
-        # Tworzenie tabeli dla weather control
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS weather_control (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                temperature REAL,
-                humidity REAL
-            )
-        """)
-
-        # Tworzenie tabeli dla air control
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS air_control (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                pm25 REAL,
-                pm10 REAL,
-                temperature REAL,
-                humidity REAL,
-                air_quality TEXT
-            )
-        """)
-
-        # Tworzenie tabeli dla water control
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS water_control (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                ph REAL,
-                adjustment TEXT,
-                current_ph REAL,
-                temperature REAL
-            )
-        """)
-
-        conn.commit()
-        conn.close()
-        print(f"Baza danych zostala zainicjalizowana. w folderze {db_path}")  # Dodano ten komunikat
-    except ValueError as e:
-        print(f"Wystapil blad podczas inicjalizacji bazy danych: {e}")
-
-
-def capture_camera():
-    """Obsluguje kamere, odczytujac klatki i zapisujac je do globalnej zmiennej."""
-    global LAST_FRAME
-    try:
-        camera = cv2.VideoCapture(0)
-
-        if not camera.isOpened():
-            raise RuntimeError("Nie mozna uzyskac dostepu do kamery.")
-
+    with camera.bus.subscribe() as frames:
+        last_seq = 0
         while True:
-            success, frame = camera.read()
-            if not success:
+            item = frames.get()
+            if item is None:
                 break
-
-            with camera_lock:
-                LAST_FRAME = frame.copy()  # Aktualizuj globalna klatke
-
-            # Dodaj opoznienie, aby uniknac przeciazenia CPU
-            time.sleep(0.05)
-    except RuntimeError:
-        print("\n\n\033[91m" + 20 * "-" + " Nie wykryto kamery " + 20 * "-" + "\033[0m\n\n")
-    finally:
-        if "camera" in locals() and camera.isOpened():
-            camera.release()
-
-
-def generate_frames():
-    """Generuje strumien wideo z najnowszych klatek."""
-    global LAST_FRAME
-    while True:
-        with camera_lock:
-            if LAST_FRAME is None:
-                continue
-            _, buffer = cv2.imencode('.jpg', LAST_FRAME)
-            frame = buffer.tobytes()
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+            item[1].release()
+            seq, jpeg = camera.jpeg.get()
+            if seq > last_seq:
+                last_seq = seq
+                yield mjpeg_part(jpeg)
 
 
-def detect_motion():
-    """Wykrywa ruch na podstawie najnowszych klatek,
-    zapisuje zdjecie i rysuje kwadrat wokol wykrytego ruchu."""
-    global LAST_FRAME
-    prev_frame_gray = None
+def detect_motion(camera):
+    """Wykrywa ruch na podstawie najnowszych klatek kamery, zapisuje zdjecie
+    z zaznaczonym ruchem i zglasza poczatek i koniec zdarzen ruchu."""
+    recorder = camera.recorder
 
-    # Sciezka do folderu "phototrap"
-    photo_dir = "/home/raspi/Desktop/ProjektZaliczeniowy/Projekt/phototrap"
+    # Sciezka do folderu "phototrap"; pozostale kamery w podkatalogach z ich id
+    photo_dir = photo_root
+    if camera is not cameras.primary:
+        photo_dir = os.path.join(photo_dir, camera.id)
 
     # Jezli "phototrap" nie jest katalogiem, utworz go
     if not os.path.isdir(photo_dir):
         print(f"Tworzenie katalogu {photo_dir}")
         os.makedirs(photo_dir)
 
-    while True:
-        with camera_lock:
-            if LAST_FRAME is None:
+    # Zdarzenia ruchu: analiza kazdej klatki, powiadomienia nie czesciej niz co 10 s
+    events = MotionEvents()
+
+    def handle(boxes, area, frame):
+        """Obsluguje wynik analizy klatki (w watku kamery lub watku wynikow puli)."""
+        notices = events.update(boxes, area)
+        if any(kind != "end" for kind, _ in notices):
+            # Prostokaty rysowane na kopii - klatka w buforze jest tylko do odczytu
+            frame = draw_boxes(frame, boxes)
+
+        for kind, event in notices:
+            if kind == "end":
+                # Klip konczy sie po nagraniu post_roll sekund
+                recorder.finish()
+                motion_catalog.record(kind, event, camera=camera.id)
+                if event["notified"]:
+                    print(f"Koniec ruchu ({camera.id}): {event['start']} - {event['end']}")
+                    socketio.emit('motion', dict(event, status='motion_ended',
+                                                 camera=camera.id))
                 continue
-            frame = LAST_FRAME.copy()
-
-        # Przetwarzanie klatki
-        gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        gray_frame = cv2.GaussianBlur(gray_frame, (21, 21), 0)
-
-        if prev_frame_gray is None:
-            prev_frame_gray = gray_frame
-            continue
 
-        # Analiza roznic miedzy klatkami
-        frame_delta = cv2.absdiff(prev_frame_gray, gray_frame)
-        _, thresh = cv2.threshold(frame_delta, 25, 255, cv2.THRESH_BINARY)
-        thresh = cv2.dilate(thresh, None, iterations=2)
-
-        # Znajdz kontury
-        contours, _ = cv2.findContours(thresh.copy(),
-                                       cv2.RETR_EXTERNAL,
-                                       cv2.CHAIN_APPROX_SIMPLE)
-        motion_detected = False
-
-        for contour in contours:
-            if cv2.contourArea(contour) > 25000:  # Jezli kontur jest wystarczajaco duzy
-                motion_detected = True
+            print(f"Ruch wykryty! ({camera.id})")
+            timestamp = datetime.now().strftime("%d-%m-%Y_%H:%M:%S")
 
-                # Rysowanie prostokata wokol konturu
-                (x, y, w, h) = cv2.boundingRect(contour)
-                cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+            # Klip od klatek sprzed ruchu; kolejne powiadomienia przedluzaja ten sam klip
+            clip_name = os.path.join(photo_dir, f"clip_{timestamp}.avi")
+            if recorder.trigger(clip_name):
+                print(f"Nagrywanie klipu {clip_name}")
 
-        if motion_detected:
-            print("Ruch wykryty!")
-            socketio.emit('motion', {'status': 'motion_detected'})
+            # Przeslij zdarzenie o wykryciu ruchu do klientow
+            socketio.emit('motion', dict(event, status='motion_detected', camera=camera.id))
 
             # Zapisz zdjecie
-            timestamp = datetime.now().strftime("%d-%m-%Y_%H:%M:%S")
-            filename = f"picture_{timestamp}.jpg"
-
             filename = os.path.join(photo_dir, f"picture_{timestamp}.jpg")
-            cv2.imwrite(filename, frame)
-
-            print(f"Zdjecie zapisane jako {filename}")
-
-            # Czekaj 10 sekund przed nastepnym zapisem
-            time.sleep(10)
-
-        prev_frame_gray = gray_frame
-        time.sleep(0.1)  # Unikaj przeciazenia CPU
+            # Zapis w tle; przy pelnej kolejce zdjecie jest pomijane
+            if photo_writer.put(filename, frame):
+                print(f"Zdjecie zapisywane jako {filename}")
+            else:
+                print(f"Pominieto zdjecie {filename} (pelna kolejka zapisu)")
+                filename = None
+            motion_catalog.record(kind, event, photo=filename, clip=recorder.current(),
+                                  camera=camera.id)
+
+    # Opcje wykrywania (rozdzielczosc analizy, maski obszarow, prog pola) kamery
+    if motion_pool is not None:
+        # Analiza w procesach roboczych; wynik trafia do handle w kolejnosci klatek
+        motion_pool.open(camera.id, handle, camera.motion)
+    else:
+        detector = MotionDetector(**camera.motion)
+
+    # Tylko najnowsza klatka: analiza nie zaleglych klatek, zadna dwa razy
+    frames = camera.bus.subscribe()
+    while True:
+        item = frames.get()
+        if item is None:
+            break
+        with item[1] as frame:
+            if motion_pool is not None:
+                # Kopia do pamieci wspoldzielonej puli; zajete sloty - klatka pominieta
+                motion_pool.submit(camera.id, frame)
+            else:
+                handle(detector.detect(frame), detector.motion_area, frame)
 
 
 
@@ -207,12 +218,7 @@ def measurements_page():
     Wyrenderowany szablon z danymi pomiarów.
     """
 
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("""SELECT * FROM weather_control
-                   ORDER BY timestamp DESC LIMIT 10""")
-    measurements = cursor.fetchall()
-    conn.close()
+    measurements = latest.latest("weather_control", 10)
     # Przekaz dane pomiarow do szablonu
     return render_template('measurements.html', measurements=measurements)
 
@@ -220,61 +226,342 @@ def measurements_page():
 @app.route('/history_page')
 def history_page():
     """
-    Pobiera historyczne pomiary pogody z bazy danych i renderuje je w szablonie.
+    Pobiera strone historycznych pomiarow pogody z bazy danych
+    (od najnowszych) i renderuje je w szablonie.
+    Parametry zapytania:
+    before - id lub znacznik czasu, od ktorego zaczyna sie strona,
+    limit - liczba pomiarow na stronie.
     Zwraca:
     Wyrenderowany szablon z historycznymi pomiarami pogody.
     """
 
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM weather_control ORDER BY timestamp")
-    measurements = cursor.fetchall()
-    conn.close()
+    try:
+        limit = parse_limit(request.args.get("limit"))
+        measurements, next_before = fetch_page(db, "weather_control",
+                                               request.args.get("before"), limit)
+    except ValueError as e:
+        return f"Niepoprawne parametry: {e}", 400
     # Przekaz dane pomiarow do szablonu
-    return render_template('measurements.html', measurements=measurements)
+    return render_template('measurements.html', measurements=measurements,
+                           next_before=next_before, limit=limit)
+
+
+def cached_json(key, table, build):
+    """
+    Zwraca odpowiedz JSON z naglowkiem ETag (id najnowszego pomiaru tabeli).
+    Gdy If-None-Match pasuje, zwraca 304 bez odczytu wierszy i serializacji.
+    :param key: Klucz odpowiedzi w cache.
+    :param table: Tabela, od ktorej zalezy odpowiedz.
+    :param build: Funkcja zwracajaca dane do serializacji.
+    """
+
+    etag, not_modified = responses.check(key, table, request.headers.get("If-None-Match"))
+    if not_modified:
+        return Response(status=304, headers={"ETag": etag})
+    etag, body = responses.get(key, table, lambda: app.json.dumps(build()).encode())
+    return Response(body, mimetype="application/json",
+                    headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def weather_data():
+    """Ostatnie 10 wpisow z tabeli weather_control jako lista slownikow."""
+    return [
+        {"id": row[0], "timestamp": row[1], "temperature": row[2], "humidity": row[3]}
+        for row in latest.latest("weather_control", 10)
+    ]
+
+
+def air_data():
+    """Ostatnie 10 wpisow z tabeli air_control jako lista slownikow."""
+    return [
+        {
+            "id": row[0],
+            "timestamp": row[1],
+            "pm25": row[2],
+            "pm10": row[3],
+            "temperature": row[4],
+            "humidity": row[5],
+            "air_quality": row[6],
+        }
+        for row in latest.latest("air_control", 10)
+    ]
+
+
+def water_data():
+    """Ostatnie 10 wpisow z tabeli water_control jako lista slownikow."""
+    return [
+        {
+            "id": row[0],
+            "timestamp": row[1],
+            "ph": row[2],
+            "adjustment": row[3],
+            "current_ph": row[4],
+            "temperature": row[5],
+        }
+        for row in latest.latest("water_control", 10)
+    ]
 
 
 # Endpointy REST API
 @app.route('/measurements', methods=['GET'])
 def get_measurements():
     """Zwraca ostatnie pomiary z bazy danych."""
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM measurements ORDER BY timestamp DESC LIMIT 10")
-    rows = cursor.fetchall()
-    conn.close()
-    measurements = [
-        {"id": row[0], "timestamp": row[1], "temperature": row[2], "humidity": row[3]}
-        for row in rows
-    ]
-    return jsonify(measurements)
+    return cached_json("measurements", "weather_control", weather_data)
 
 @app.route('/history', methods=['GET'])
 def get_history():
-    """Zwraca wszystkie pomiary."""
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM measurements")
-    rows = cursor.fetchall()
-    conn.close()
-    measurements = [
-        {"id": row[0], "timestamp": row[1], "temperature": row[2], "humidity": row[3]}
-        for row in rows
-    ]
-    return jsonify(measurements)
+    """
+    Zwraca strone historii pomiarow od najnowszych.
+    Parametry zapytania:
+    table (domyslnie weather_control), before (id lub znacznik czasu), limit,
+    from / to (zakres czasu) oraz resolution: raw, minute, hour, day
+    lub auto (rozdzielczosc dobierana do zakresu czasu).
+    Kursor nastepnej strony przekazywany jest w naglowku Link.
+    """
+    args = request.args
+    try:
+        limit = parse_limit(args.get("limit"))
+        measurements, next_before = history(db,
+                                            args.get("table", "weather_control"),
+                                            args.get("resolution", "raw"),
+                                            args.get("before"),
+                                            args.get("from"),
+                                            args.get("to"),
+                                            limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    response = jsonify(measurements)
+    if next_before is not None:
+        next_url = url_for('get_history', **dict(args.items(), before=next_before))
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return response
+
+
+@app.route('/query', methods=['GET'])
+def get_query():
+    """
+    Zwraca agregaty pomiarow w zakresie czasu, w przedzialach.
+    Parametry zapytania:
+    table - tabela pomiarowa,
+    fields - pola oddzielone przecinkami (domyslnie wszystkie liczbowe),
+    from, to - zakres czasu [from, to),
+    bucket - all, minute, hour lub day,
+    agg - agregaty oddzielone przecinkami: count, min, max, sum, avg,
+          stddev, median, pNN (np. p95).
+    """
+
+    fields = request.args.get("fields")
+    aggregates = request.args.get("agg")
+    try:
+        results = run_query(db, request.args.get("table", "weather_control"),
+                            fields.split(",") if fields else None,
+                            request.args.get("from"), request.args.get("to"),
+                            request.args.get("bucket", "all"),
+                            aggregates.split(",") if aggregates else None)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(results)
+
+
+@app.route('/stats', methods=['GET'])
+def get_stats():
+    """
+    Zwraca biezace statystyki pomiarow z pamieci (bez zapytan do bazy):
+    liczbe, srednia, wariancje, EWMA oraz min/max z ostatniej godziny i doby.
+    Parametr zapytania table ogranicza wynik do jednej tabeli.
+    """
+
+    try:
+        return jsonify(online_stats.snapshot(request.args.get("table")))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@app.route('/export/<table>', methods=['GET'])
+def export_table(table):
+    """
+    Strumieniowy eksport calej tabeli (lub zakresu from/to) w formacie
+    NDJSON albo CSV (parametr format). Odpowiedz wysylana jest porcjami,
+    bez wczytywania wszystkich wierszy do pamieci.
+    """
+    fmt = request.args.get("format", "ndjson")
+    try:
+        chunks = open_export(db_path, table, fmt,
+                             request.args.get("from"), request.args.get("to"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return Response(chunks, mimetype=EXPORT_FORMATS[fmt], headers={
+        "Content-Disposition": f"attachment; filename={table}.{fmt}"})
+
+
+@app.route('/ingest', methods=['POST'])
+def bulk_ingest():
+    """
+    Przyjmuje partie pomiarow z wezla czujnikow (tablica JSON lub NDJSON)
+    i zapisuje ja w jednej transakcji.
+    Parametry zapytania:
+    table - tabela pomiarowa (weather_control, air_control, water_control),
+    batch - opcjonalny identyfikator partii, odsylany w potwierdzeniu.
+    Zwraca:
+    Potwierdzenie z liczba zapisanych wierszy i zakresem ich id.
+    """
+
+    table = request.args.get("table")
+    try:
+        rows = parse_batch(table, request.get_data())
+        first_id, last_id = ingest.write_batch(table, rows)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except (RuntimeError, TimeoutError) as e:
+        return jsonify({"error": str(e)}), 503
+    return jsonify({"table": table, "batch": request.args.get("batch"),
+                    "accepted": len(rows), "first_id": first_id, "last_id": last_id})
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Zwraca liczniki kolejki zapisu i retencji danych."""
+    return jsonify({"ingest": ingest.stats(), "retention": retention.stats(),
+                    "responses": responses.stats(), "alerts": alert_engine.stats(),
+                    "anomalies": anomaly_detector.stats(),
+                    "camera": {"frames": frame_bus.stats(), "jpeg": jpeg_cache.stats(),
+                               "photos": photo_writer.stats(),
+                               "clips": clip_recorder.stats(),
+                               "thumbnails": thumbnails.stats(),
+                               "cameras": cameras.stats(),
+                               "motion_pool": motion_pool.stats() if motion_pool else None}})
 
 
 @app.route('/alert', methods=['POST'])
 def set_alert():
-    """Ustawienie progu alertu dla temperatury lub wilgotnosci."""
-    data = request.json
-    threshold_temp = data.get("temperature", None)
-    threshold_hum = data.get("humidity", None)
-    if threshold_temp is not None:
-        print(f"Ustawiono prog alertu dla temperatury: {threshold_temp}C")
-    if threshold_hum is not None:
-        print(f"Ustawiono prog alertu dla wilgotnosci: {threshold_hum}%")
-    return jsonify({"message": "Alert ustawiony!"}), 200
+    """
+    Ustawienie regul alertow progowych.
+    Przyjmuje dotychczasowa postac {"temperature": X, "humidity": Y}
+    (alert powyzej progu) albo regule/liste regul z polami table, field,
+    op, threshold, hysteresis, min_duration i name (modul alerts).
+    """
+
+    try:
+        rules = parse_alert_request(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    saved = [alert_engine.add_rule(**rule) for rule in rules]
+    for rule in saved:
+        print(f"Ustawiono prog alertu: {rule['table']}.{rule['field']} "
+              f"{rule['op']} {rule['threshold']}")
+    return jsonify({"message": "Alert ustawiony!", "rules": saved}), 200
+
+
+@app.route('/alert/<int:rule_id>', methods=['DELETE'])
+def delete_alert(rule_id):
+    """Usuwa regule alertu o podanym id."""
+    if not alert_engine.remove_rule(rule_id):
+        return jsonify({"error": "nie ma takiej reguly"}), 404
+    return jsonify({"message": "Alert usuniety!"})
+
+
+@app.route('/alerts', methods=['GET'])
+def get_alerts():
+    """Zwraca reguly alertow z ich stanem oraz ostatnie zdarzenia alertow."""
+    try:
+        limit = parse_limit(request.args.get("limit"), default=50)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"rules": alert_engine.rules(), "alerts": alert_engine.recent(limit)})
+
+
+@app.route('/anomalies', methods=['GET'])
+def get_anomalies():
+    """Zwraca ostatnie anomalie wykryte w pomiarach."""
+    try:
+        limit = parse_limit(request.args.get("limit"), default=50)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"anomalies": anomaly_detector.recent(limit)})
+
+
+@app.route('/events', methods=['GET'])
+def get_events():
+    """
+    Zwraca strone zdarzen ruchu od najnowszych.
+    Parametry zapytania: before (id zdarzenia), limit, from / to (zakres
+    czasu poczatku zdarzenia). Kursor nastepnej strony przekazywany jest
+    w naglowku Link.
+    """
+    args = request.args
+    try:
+        limit = parse_limit(args.get("limit"), default=50)
+        events, next_before = motion_catalog.page(args.get("before"), limit,
+                                                  args.get("from"), args.get("to"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    response = jsonify({"events": events})
+    if next_before is not None:
+        next_url = url_for('get_events', **dict(args.items(), before=next_before))
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return response
+
+
+@app.route('/events_page')
+def events_page():
+    """
+    Renderuje galerie zdarzen ruchu (szablon events.html) z tymi samymi
+    parametrami co /events.
+    """
+
+    args = request.args
+    try:
+        limit = parse_limit(args.get("limit"), default=20)
+        events, next_before = motion_catalog.page(args.get("before"), limit,
+                                                  args.get("from"), args.get("to"))
+    except ValueError as e:
+        return f"Niepoprawne parametry: {e}", 400
+    return render_template('events.html', events=events, next_before=next_before,
+                           limit=limit, start=args.get("from"), end=args.get("to"))
+
+
+def send_cached_file(path, cache_control):
+    """Wysyla plik z naglowkami ETag i Cache-Control lub 304, gdy klient ma aktualna kopie."""
+    etag = file_etag(path)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        return Response(status=304, headers=headers)
+    response = send_file(path, conditional=False, etag=False)
+    response.headers.update(headers)
+    return response
+
+
+@app.route('/events/mosaic/<day>')
+def get_events_mosaic(day):
+    """Zwraca mozaike miniatur zdarzen ruchu z danego dnia (RRRR-MM-DD, UTC)."""
+    try:
+        photos = motion_catalog.day_photos(day)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not photos:
+        abort(404)
+    # Jedno miejsce mozaiki dnia niezaleznie od kamery, ktora zapisala ostatnie zdjecie
+    path = os.path.join(photo_root, THUMB_DIR, f"mosaic_{day}.jpg")
+    return send_cached_file(thumbnails.mosaic(photos, path), MOSAIC_CACHE_CONTROL)
+
+
+@app.route('/events/<int:event_id>/<kind>')
+def get_event_file(event_id, kind):
+    """
+    Zwraca pierwsze zdjecie (kind=photo), jego miniature (kind=thumb) lub klip
+    (kind=clip) zdarzenia ruchu.
+    """
+
+    event = motion_catalog.get(event_id)
+    path = event_file(event, "photo" if kind == "thumb" else kind) if event is not None else None
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    if kind == "thumb":
+        try:
+            return send_cached_file(thumbnails.get(path), CACHE_CONTROL)
+        except (OSError, ValueError, cv2.error):
+            abort(404)
+    return send_file(path)
 
 
 # Obsluga WebSocket
@@ -301,21 +588,49 @@ def door_bell_page():
     :return: Szablon strony 'camera.html'.
     """
 
-    return render_template('camera.html')
+    return render_template('camera.html', cameras=[camera.id for camera in cameras])
+
+
+def find_camera(camera_id):
+    """Zwraca kamere o podanym id (None - kamera glowna) lub konczy zadanie kodem 404."""
+    camera = cameras.primary if camera_id is None else cameras.get(camera_id)
+    if camera is None:
+        abort(404)
+    return camera
+
+
+@app.route('/cameras')
+def get_cameras():
+    """Zwraca liste kamer z ich stanem i adresem podgladu."""
+    return jsonify({"cameras": [{"id": camera.id, "state": camera.state,
+                                 "feed": url_for('video_feed', camera_id=camera.id)}
+                                for camera in cameras]})
 
 
 @app.route('/video_feed')
-def video_feed():
+@app.route('/video_feed/<camera_id>')
+def video_feed(camera_id=None):
     """
     Funkcja zwraca strumień wideo w formacie
     multipart/x-mixed-replace; boundary=frame.
     Wykorzystuje funkcję generate_frames() do
     generowania kolejnych klatek wideo.
+    Bez camera_id strumien pochodzi z kamery glownej.
     """
 
-    return Response(generate_frames(),
+    return Response(generate_frames(find_camera(camera_id)),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
 
+
+@app.route('/latest_frame')
+@app.route('/latest_frame/<camera_id>')
+def get_latest_frame(camera_id=None):
+    """Zwraca najnowsza klatke jako obraz JPG (zakodowany raz dla wszystkich)."""
+    seq, jpeg = find_camera(camera_id).jpeg.get()
+    if jpeg is None:
+        return jsonify({"message": "No frame available"})
+    return Response(jpeg, mimetype='image/jpeg', headers={"X-Frame-Seq": str(seq)})
+
 @app.route('/aquarium')
 def ph_measurements_page():
     """
@@ -323,15 +638,8 @@ def ph_measurements_page():
     :return: Szablon HTML strony z pomiarami pH.
     """
 
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("""
-                   SELECT id, timestamp, temperature, ph, adjustment
-                   FROM water_control
-                   ORDER BY timestamp DESC LIMIT 20
-                   """)
-    measurements = cursor.fetchall()
-    conn.close()
+    measurements = latest.latest("water_control", 20,
+                                 ("id", "timestamp", "temperature", "ph", "adjustment"))
     return render_template('aquarium.html',measurements=measurements)
 
 @app.route('/air_quality')
@@ -342,16 +650,9 @@ def air_quality_page():
     :rtype: str
     """
 
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("""
-                   SELECT id, timestamp, temperature,
-                   pm25, pm10, humidity, air_quality 
-                   FROM air_control 
-                   ORDER BY timestamp DESC LIMIT 20
-                   """)
-    measurements = cursor.fetchall()
-    conn.close()
+    measurements = latest.latest("air_control", 20,
+                                 ("id", "timestamp", "temperature",
+                                  "pm25", "pm10", "humidity", "air_quality"))
     return render_template('air_quality.html',
                            measurements=measurements)
 
@@ -361,59 +662,17 @@ def air_quality_page():
 @app.route('/weather', methods=['GET'])
 def get_weather_data():
     """Zwraca ostatnie 10 wpisów z tabeli weather_control."""
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM weather_control ORDER BY timestamp DESC LIMIT 10")
-    rows = cursor.fetchall()
-    conn.close()
-    data = [
-        {"id": row[0], "timestamp": row[1], "temperature": row[2], "humidity": row[3]}
-        for row in rows
-    ]
-    return jsonify(data)
+    return cached_json("weather", "weather_control", weather_data)
 
 @app.route('/air', methods=['GET'])
 def get_air_quality_data():
     """Zwraca ostatnie 10 wpisów z tabeli air_control."""
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM air_control ORDER BY timestamp DESC LIMIT 10")
-    rows = cursor.fetchall()
-    conn.close()
-    data = [
-        {
-            "id": row[0],
-            "timestamp": row[1],
-            "pm25": row[2],
-            "pm10": row[3],
-            "temperature": row[4],
-            "humidity": row[5],
-            "air_quality": row[6],
-        }
-        for row in rows
-    ]
-    return jsonify(data)
+    return cached_json("air", "air_control", air_data)
 
 @app.route('/water', methods=['GET'])
 def get_water_data():
     """Zwraca ostatnie 10 wpisów z tabeli water_control."""
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM water_control ORDER BY timestamp DESC LIMIT 10")
-    rows = cursor.fetchall()
-    conn.close()
-    data = [
-        {
-            "id": row[0],
-            "timestamp": row[1],
-            "ph": row[2],
-            "adjustment": row[3],
-            "current_ph": row[4],
-            "temperature": row[5],
-        }
-        for row in rows
-    ]
-    return jsonify(data)
+    return cached_json("water", "water_control", water_data)
 
 ### FUNKCJE SYMULUJACE ###
 
@@ -434,15 +693,8 @@ def simulate_sensor():
         humidity = round(random.uniform(40.0, 60.0), 1)
         print(f"Symulacja: Temp={temperature}C, Wilgotnosc={humidity}%")
 
-        # Zapis danych do bazy
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute("""INSERT INTO weather_control
-                       (temperature, humidity)
-                       VALUES (?, ?)""",
-                       (temperature, humidity))
-        conn.commit()
-        conn.close()
+        # Zapis danych do bazy (przez kolejke zapisu)
+        ingest.put("weather_control", {"temperature": temperature, "humidity": humidity})
 
         # Wysylanie danych przez WebSocket
         socketio.emit('measurement', {'temperature': temperature, 'humidity': humidity})
@@ -468,7 +720,7 @@ def simulate_ph_control():
     - None
     Wymagane moduły:
     - random
-    - sqlite3
+    - ingest
     - time
     """
 
@@ -493,17 +745,12 @@ def simulate_ph_control():
 
         print(f"Symulacja Akwarium: Temp={temperature}C, pH={current_ph} ({adjustment_action})")
 
-        # Zapis danych do bazy
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute(
-            """INSERT INTO water_control
-            (temperature, ph, adjustment)
-            VALUES (?, ?, ?)""",
-            (temperature, current_ph, adjustment_action)
-        )
-        conn.commit()
-        conn.close()
+        # Zapis danych do bazy (przez kolejke zapisu)
+        ingest.put("water_control", {
+            "temperature": temperature,
+            "ph": current_ph,
+            "adjustment": adjustment_action,
+        })
 
         # Odczyt co 10 sekund
         time.sleep(10)
@@ -540,17 +787,14 @@ def simulate_air_quality():
               Temp={temperature}C, Wilgotnosc={humidity}%,
               Jakosc={air_quality}""")
 
-        # Zapis danych do bazy
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute(
-            """INSERT INTO air_control
-            (pm25, pm10, temperature, humidity, air_quality)
-            VALUES (?, ?, ?, ?, ?)""",
-            (pm25, pm10, temperature, humidity, air_quality)
-        )
-        conn.commit()
-        conn.close()
+        # Zapis danych do bazy (przez kolejke zapisu)
+        ingest.put("air_control", {
+            "pm25": pm25,
+            "pm10": pm10,
+            "temperature": temperature,
+            "humidity": humidity,
+            "air_quality": air_quality,
+        })
 
         # Odczyt co 10 sekund
         time.sleep(10)
@@ -559,6 +803,28 @@ def simulate_air_quality():
 # Uruchomienie serwera Flask i symulacji sensora
 if __name__ == '__main__':
     init_db(db_path)
+    latest.warm()
+    online_stats.warm(db)
+    alert_engine.load()
+    anomaly_detector.warm(db)
+
+    # Watek zapisujacy pomiary; przy zamknieciu zapisuje zawartosc kolejki
+    ingest.start()
+    atexit.register(ingest.stop)
+
+    # Watek retencji danych (co godzine)
+    retention.start()
+
+    # Watki zapisu zdjec; przy zamknieciu zapisuja zdjecia pozostale w kolejce
+    photo_writer.start()
+    atexit.register(photo_writer.stop)
+    # Watki zapisu klipow kamer; przy zamknieciu zapisuja nagrywane klipy
+    for camera in cameras:
+        camera.recorder.start()
+        atexit.register(camera.recorder.stop)
+    # Watki miniatur z obnizonym priorytetem
+    thumbnails.start()
+    atexit.register(thumbnails.stop)
 
     # ### WATKI SYMULUJACE ###
 
@@ -580,15 +846,18 @@ if __name__ == '__main__':
 
     ### KONIEC WATKOW SYMULUJACYCH ###
 
-    # Watek obslugujacy kamere
-    camera_thread = threading.Thread(target=capture_camera)
-    camera_thread.daemon = True
-    camera_thread.start()
-
-    # Wątek do detekcji ruchu
-    motion_thread = threading.Thread(target=detect_motion)
-    motion_thread.daemon = True
-    motion_thread.start()
+    # Procesy analizy ruchu; zatrzymywane po kamerach, przed zapisem zdjec i klipow
+    if motion_pool is not None:
+        motion_pool.start()
+        atexit.register(motion_pool.stop)
+
+    # Dla kazdej kamery: watek odczytu, detekcji ruchu i bufora klipow;
+    # przy zamknieciu kamery sa zatrzymywane przed zapisem klipow
+    for camera in cameras:
+        camera.start()
+        camera.spawn("motion", detect_motion, camera)
+        camera.spawn("clips", record_frames, camera.bus, camera.jpeg, camera.recorder)
+    atexit.register(cameras.stop)
 
     # Uruchoemnie serwera Flask
     socketio.run(app, host='0.0.0.0', port=5000)
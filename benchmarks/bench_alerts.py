@@ -0,0 +1,99 @@
+"""
+Benchmark silnika alertow: przepustowosc oceny regul przy zapisie partii.
+
+Tworzy podana liczbe regul rozlozonych na wszystkie pola liczbowe tabel,
+a nastepnie przepuszcza przez AlertEngine.evaluate pomiary w partiach
+(tak jak robi to sluchacz kolejki zapisu). Wypisuje liczbe pomiarow
+i ocen regul na sekunde oraz liczbe zapisanych zdarzen.
+
+Progi wiekszosci regul leza poza zakresem generowanych wartosci (jak
+w praktyce: alert to rzadkosc), a tylko czesc --fire regul ma prog
+wewnatrz zakresu, wiec mierzona jest glownie sama ocena regul, a nie
+zapis zdarzen do tabeli alerts.
+
+Uzycie:
+    python benchmarks/bench_alerts.py [--rules 5000] [--rows 100000] [--batch 500]
+                                         [--fire 0.001]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from alerts import AlertEngine
+from database import Database, init_db
+from rollups import ROLLUP_FIELDS
+
+
+# Zakresy wartosci generowanych pomiarow air_control
+RANGES = {"pm25": (0, 150), "pm10": (0, 200), "temperature": (15, 30), "humidity": (30, 70)}
+
+
+def make_rules(engine, count, fire):
+    """
+    Dodaje count losowych regul na wszystkie pola liczbowe tabel.
+    Ulamek fire regul pol air_control ma prog wewnatrz zakresu wartosci.
+    """
+
+    fields = [(table, field) for table, names in ROLLUP_FIELDS.items() for field in names]
+    for i in range(count):
+        table, field = fields[i % len(fields)]
+        low, high = RANGES.get(field, (0, 100))
+        op = random.choice("<>")
+        if random.random() < fire:
+            threshold = random.uniform(low, high)
+        elif op == ">":
+            threshold = high + random.uniform(1, 50)
+        else:
+            threshold = low - random.uniform(1, 50)
+        engine.add_rule(table, field, threshold, op=op, hysteresis=random.uniform(0, 5),
+                        min_duration=random.choice((0, 0, 30, 300)))
+
+
+def make_rows(count):
+    """Tworzy wiersze air_control (id, timestamp, pm25, pm10, temp, hum, jakosc)."""
+    return [(i + 1, f"2025-01-01 {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}",
+             *(random.uniform(*RANGES[field]) for field in RANGES), "Dobra")
+            for i in range(count)]
+
+
+def main():
+    """Przygotowuje tymczasowa baze, reguly i mierzy ocene partii."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rules", type=int, default=5000)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--fire", type=float, default=0.001,
+                        help="ulamek regul z progiem w zakresie wartosci")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_alerts_")
+    try:
+        db_path = os.path.join(workdir, "alerts.db")
+        init_db(db_path)
+        db = Database(db_path)
+        engine = AlertEngine(db)
+        make_rules(engine, args.rules, args.fire)
+        rows = make_rows(args.rows)
+
+        start = time.perf_counter()
+        for i in range(0, len(rows), args.batch):
+            engine.evaluate("air_control", rows[i:i + args.batch])
+        elapsed = time.perf_counter() - start
+
+        stats = engine.stats()
+        print(f"reguly={args.rules}  pomiary/s={args.rows / elapsed:10.0f}  "
+              f"oceny regul/s={stats['evaluated'] / elapsed:12.0f}  "
+              f"zdarzenia={stats['triggered'] + stats['resolved']}")
+        db.close()
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
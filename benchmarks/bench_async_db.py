@@ -0,0 +1,121 @@
+"""
+Benchmark dostepu do bazy w aplikacji FastAPI: zapytanie wykonywane
+bezposrednio w petli zdarzen (dotychczasowy wzorzec) kontra DbExecutor.
+
+Podczas gdy kilku klientow w petli wysyla duze zapytanie historii,
+pozostali wysylaja male zapytania (strona historii z 10 pomiarami).
+Wypisuje mediane i 99. percentyl opoznienia malych zapytan, liczonego od
+planowanego momentu wyslania (z czasem oczekiwania na zablokowana petle).
+
+Uzycie:
+    python benchmarks/bench_async_db.py [--rows 300000] [--seconds 5]
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import Database, DbExecutor, fetch_page, init_db
+
+LARGE_SQL = """SELECT substr(timestamp, 1, 13), AVG(temperature), MIN(humidity), MAX(humidity)
+               FROM weather_control GROUP BY substr(timestamp, 1, 13)"""
+
+# Odstep miedzy malymi zapytaniami jednego klienta (s)
+INTERVAL = 0.02
+
+
+def make_app(db, db_executor):
+    """Tworzy aplikacje z malym i duzym zapytaniem; db_executor=None -> w petli."""
+    app = FastAPI()
+
+    async def call(func, *args):
+        if db_executor is None:
+            return func(*args)
+        return await db_executor.run(func, *args)
+
+    @app.get("/small")
+    async def small():
+        rows, _ = await call(fetch_page, db, "weather_control", None, 10)
+        return rows
+
+    @app.get("/large")
+    async def large():
+        return await call(db.query, LARGE_SQL)
+
+    return app
+
+
+async def run(app, seconds, small_clients, large_clients):
+    """Uruchamia klientow i zwraca posortowane opoznienia malych zapytan w ms."""
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    deadline = time.perf_counter() + seconds
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def small_client():
+            # Zadania w stalym rytmie; opoznienie liczone od planowanego
+            # momentu wyslania, wiec obejmuje tez czas czekania na petle
+            planned = time.perf_counter()
+            while planned < deadline:
+                await asyncio.sleep(max(0.0, planned - time.perf_counter()))
+                await client.get("/small")
+                latencies.append((time.perf_counter() - planned) * 1000)
+                planned = max(planned + INTERVAL, time.perf_counter())
+
+        async def large_client():
+            while time.perf_counter() < deadline:
+                await client.get("/large")
+                await asyncio.sleep(INTERVAL)
+
+        await asyncio.gather(*[small_client() for _ in range(small_clients)],
+                             *[large_client() for _ in range(large_clients)])
+    return sorted(latencies)
+
+
+def report(name, latencies):
+    """Wypisuje wynik jednego wariantu."""
+    p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)]
+    print(f"{name:<6} male zapytania={len(latencies):6d}  "
+          f"p50={statistics.median(latencies):8.2f} ms  p99={p99:8.2f} ms")
+
+
+def main():
+    """Przygotowuje tymczasowa baze i porownuje oba warianty."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=300000)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--small", type=int, default=8)
+    parser.add_argument("--large", type=int, default=1)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_async_db_")
+    try:
+        db_path = os.path.join(workdir, "async.db")
+        init_db(db_path)
+        db = Database(db_path)
+        db.executemany("""INSERT INTO weather_control (timestamp, temperature, humidity)
+                       VALUES (datetime('2025-01-01', '+' || ? || ' seconds'), 21.5, 48.0)""",
+                       ((i * 10,) for i in range(args.rows)))
+
+        report("przed", asyncio.run(run(make_app(db, None), args.seconds,
+                                        args.small, args.large)))
+        db_executor = DbExecutor(db.pool_size)
+        report("po", asyncio.run(run(make_app(db, db_executor), args.seconds,
+                                     args.small, args.large)))
+        db_executor.shutdown()
+        db.close()
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark wielu kamer: jeden watek obslugujacy kamery po kolei kontra
+CameraRegistry (wlasny watek odczytu i analizy dla kazdej kamery).
+
+Kamery to pliki wideo z ruchomym prostokatem odtwarzane w petli. Kamera 0
+jest wolna (--slow s na klatke, jak zawieszajacy sie strumien RTSP), pozostale
+daja klatke co --delay s. Dla kazdej kamery wypisuje liczbe
+przeanalizowanych klatek na sekunde (MotionDetector) i, dla CameraRegistry,
+czas CPU jej watkow. Wariant "przed" czyta i analizuje kamery w jednej
+petli, wiec wolna kamera spowalnia wszystkie.
+
+Uzycie:
+    python benchmarks/bench_cameras.py [--cameras 4] [--seconds 5] [--slow 0.5]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from camera import MotionDetector
+from cameras import CameraRegistry
+
+
+def write_video(path, frames=50, size=(640, 480)):
+    """Zapisuje plik wideo MJPG z prostokatem przesuwajacym sie po klatce."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, size)
+    for i in range(frames):
+        frame = np.zeros((size[1], size[0], 3), np.uint8)
+        x = i * (size[0] - 160) // frames
+        cv2.rectangle(frame, (x, 120), (x + 160, 360), (255, 255, 255), -1)
+        writer.write(frame)
+    writer.release()
+
+
+def run_sequential(videos, delays, seconds):
+    """Jeden watek: dla kazdej kamery po kolei odczyt klatki i analiza."""
+    captures = [cv2.VideoCapture(video) for video in videos]
+    detectors = [MotionDetector() for _ in videos]
+    analysed = [0] * len(videos)
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for i, capture in enumerate(captures):
+            # Odczyt czeka, az kamera da nowa klatke
+            time.sleep(delays[i])
+            success, frame = capture.read()
+            if not success:
+                capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                continue
+            detectors[i].detect(frame)
+            analysed[i] += 1
+    for capture in captures:
+        capture.release()
+    return analysed, None
+
+
+def analyse(camera, analysed, index):
+    """Watek analizy kamery: najnowsza klatka z FrameBus do MotionDetector."""
+    detector = MotionDetector(**camera.motion)
+    with camera.bus.subscribe() as frames:
+        while True:
+            item = frames.get()
+            if item is None:
+                break
+            with item[1] as frame:
+                detector.detect(frame)
+            analysed[index] += 1
+
+
+def run_registry(videos, delays, seconds):
+    """CameraRegistry: kazda kamera z wlasnym watkiem odczytu i analizy."""
+    registry = CameraRegistry([{"id": str(i), "source": video, "delay": delays[i]}
+                               for i, video in enumerate(videos)])
+    analysed = [0] * len(videos)
+    for i, camera in enumerate(registry):
+        camera.spawn("motion", analyse, camera, analysed, i)
+    registry.start()
+    time.sleep(seconds)
+    stats = registry.stats()
+    registry.stop(timeout=5)
+    return analysed, stats
+
+
+def main():
+    """Porownuje obsluge kamer w jednym watku i w CameraRegistry."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cameras", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--delay", type=float, default=0.05,
+                        help="odstep klatek zwyklej kamery (s)")
+    parser.add_argument("--slow", type=float, default=0.5,
+                        help="odstep klatek wolnej kamery 0 (s)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_cameras_")
+    try:
+        videos = []
+        for i in range(args.cameras):
+            videos.append(os.path.join(workdir, f"kamera_{i}.avi"))
+            write_video(videos[-1])
+        delays = [args.slow] + [args.delay] * (args.cameras - 1)
+        print(f"cpu={os.cpu_count()}  kamery={args.cameras}  "
+              f"wolna kamera 0: {args.slow} s/klatke, pozostale: {args.delay} s/klatke")
+        for name, run in (("przed", run_sequential), ("po", run_registry)):
+            analysed, stats = run(videos, delays, args.seconds)
+            for i, count in enumerate(analysed):
+                line = f"{name:6} kamera {i}: {count / args.seconds:6.1f} kl./s"
+                if stats is not None:
+                    cpu = sum(stats[str(i)]["cpu_s"].values())
+                    line += f"  cpu={cpu:5.2f} s ({stats[str(i)]['cpu_percent']:5.1f}%)"
+                print(line)
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark pamieci bufora klipow: surowe klatki kontra bajty JPEG (ClipRecorder).
+
+Symuluje kamere z zadana czestotliwoscia przez --seconds sekund bufora
+pre_roll i mierzy (tracemalloc) pamiec zajmowana przez bufor: "przed" -
+deque kopii klatek NumPy, "po" - ClipRecorder z bajtami JPEG z JpegCache.
+Wypisuje tez czas dodania klatki do bufora (w watku kamery/nagrywania).
+
+Uzycie:
+    python benchmarks/bench_clips.py [--seconds 5] [--fps 20] [--noise 8]
+"""
+import argparse
+from collections import deque
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from camera import FrameBus, JpegCache
+from clips import ClipRecorder
+
+
+def make_frames(count, noise):
+    """Tworzy klatki 640x480 z gradientem, prostokatem i szumem czujnika."""
+    gradient = np.tile(np.linspace(40, 200, 640, dtype=np.uint8), (480, 1))
+    base = cv2.merge([gradient, gradient, gradient])
+    frames = []
+    for i in range(count):
+        frame = base.copy()
+        cv2.rectangle(frame, (50 + i * 5 % 400, 100), (150 + i * 5 % 400, 250), (30, 30, 220), -1)
+        frame = cv2.add(frame, np.random.randint(0, noise + 1, frame.shape, dtype=np.uint8))
+        frames.append(frame)
+    return frames
+
+
+def main():
+    """Porownuje pamiec bufora surowych klatek z buforem JPEG."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--fps", type=float, default=20.0)
+    parser.add_argument("--noise", type=int, default=8, help="amplituda szumu klatek")
+    args = parser.parse_args()
+
+    count = int(args.seconds * args.fps)
+    frames = make_frames(16, args.noise)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    raw = deque(maxlen=count)
+    start = time.perf_counter()
+    for i in range(count):
+        raw.append(frames[i % len(frames)].copy())
+    elapsed = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0] - before
+    print(f"przed  klatki={len(raw):4}  pamiec={memory / 2 ** 20:7.1f} MB  "
+          f"dodanie={elapsed / count * 1000:6.3f} ms/kl.")
+    del raw
+
+    bus = FrameBus()
+    cache = JpegCache(bus)
+    recorder = ClipRecorder(pre_roll=args.seconds)
+    before = tracemalloc.get_traced_memory()[0]
+    elapsed = 0.0
+    for i in range(count):
+        bus.publish(frames[i % len(frames)])
+        start = time.perf_counter()
+        recorder.add(cache.get()[1], now=i / args.fps)
+        elapsed += time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0] - before
+    stats = recorder.stats()
+    print(f"po     klatki={stats['buffered_frames']:4}  pamiec={memory / 2 ** 20:7.1f} MB  "
+          f"dodanie={elapsed / count * 1000:6.3f} ms/kl. (JPEG z cache kodowany raz, "
+          f"wspolnie z podgladem)")
+    tracemalloc.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark warstwy bazy danych: polaczenie otwierane przy kazdym zapytaniu
+(dotychczasowy wzorzec) kontra pula dlugo zyjacych polaczen w trybie WAL.
+
+Mierzy liczbe zapytan na sekunde dla zapytania uzywanego przez /weather
+przy kilku watkach czytajacych oraz opoznienie zapisu pojedynczego pomiaru,
+gdy w tym samym czasie dzialaja czytelnicy.
+
+Uzycie:
+    python benchmarks/bench_db.py [--readers 4] [--seconds 5]
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import Database, init_db
+
+SOURCE_DB = os.path.join(os.path.dirname(__file__), '..', 'measurements.db')
+
+READ_SQL = "SELECT * FROM weather_control ORDER BY timestamp DESC LIMIT 10"
+WRITE_SQL = """INSERT INTO weather_control
+               (temperature, humidity)
+               VALUES (?, ?)"""
+
+
+def legacy_read(db_path):
+    """Odczyt tak jak w trasach sprzed zmiany: connect / execute / close."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute(READ_SQL)
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+
+def legacy_write(db_path):
+    """Zapis tak jak w symulatorach sprzed zmiany: connect / commit / close."""
+    conn = sqlite3.connect(db_path, timeout=30)
+    cursor = conn.cursor()
+    cursor.execute(WRITE_SQL, (22.5, 45.0))
+    conn.commit()
+    conn.close()
+
+
+def run(read, write, readers, seconds):
+    """
+    Uruchamia watki czytajace oraz jeden watek zapisujacy (co 10 ms).
+    :return: (zapytania na sekunde, lista opoznien zapisu w ms).
+    """
+
+    stop = threading.Event()
+    counts = [0] * readers
+    latencies = []
+
+    def reader(index):
+        while not stop.is_set():
+            read()
+            counts[index] += 1
+
+    def writer():
+        while not stop.is_set():
+            start = time.perf_counter()
+            write()
+            latencies.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads.append(threading.Thread(target=writer))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / seconds, latencies
+
+
+def report(name, rps, latencies):
+    """Wypisuje wynik jednego przebiegu."""
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0.0
+    print(f"{name:<10} {rps:>10.0f} req/s   "
+          f"zapis p50={statistics.median(latencies):.2f} ms p99={p99:.2f} ms "
+          f"(n={len(latencies)})")
+
+
+def main():
+    """Przygotowuje kopie bazy i uruchamia oba warianty."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_db_")
+    try:
+        legacy_path = os.path.join(workdir, "legacy.db")
+        pooled_path = os.path.join(workdir, "pooled.db")
+        shutil.copy(SOURCE_DB, legacy_path)
+        shutil.copy(SOURCE_DB, pooled_path)
+
+        # Baza "przed" w domyslnym trybie dziennika rollback
+        conn = sqlite3.connect(legacy_path)
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.close()
+        init_db(pooled_path)
+
+        rps, latencies = run(lambda: legacy_read(legacy_path),
+                             lambda: legacy_write(legacy_path),
+                             args.readers, args.seconds)
+        report("przed", rps, latencies)
+
+        db = Database(pooled_path, pool_size=args.readers + 1)
+        rps, latencies = run(lambda: db.query(READ_SQL),
+                             lambda: db.execute(WRITE_SQL, (22.5, 45.0)),
+                             args.readers, args.seconds)
+        db.close()
+        report("po", rps, latencies)
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
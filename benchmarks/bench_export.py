@@ -0,0 +1,83 @@
+"""
+Benchmark eksportu historii: fetchall() + json (dotychczasowy /history)
+kontra strumieniowy eksport NDJSON z fetchmany (modul export).
+
+Mierzy czas do pierwszego bajtu, calkowity czas i szczytowe zuzycie
+pamieci (tracemalloc) dla tabeli z podana liczba wierszy.
+
+Uzycie:
+    python benchmarks/bench_export.py [--rows 1000000]
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import init_db
+from export import open_export
+
+
+def fill(db_path, rows):
+    """Wypelnia tabele weather_control podana liczba pomiarow."""
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.executemany("""INSERT INTO weather_control (timestamp, temperature, humidity)
+                         VALUES (datetime('2025-01-01', '+' || ? || ' seconds'), 21.5, 48.0)""",
+                         ((i,) for i in range(rows)))
+    conn.close()
+
+
+def legacy_export(db_path):
+    """Odczyt calej tabeli do listy slownikow i serializacja jak w /history."""
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT * FROM weather_control").fetchall()
+    conn.close()
+    data = [{"id": r[0], "timestamp": r[1], "temperature": r[2], "humidity": r[3]}
+            for r in rows]
+    yield json.dumps(data).encode()
+
+
+def measure(name, chunks):
+    """Zuzywa generator i wypisuje czas do pierwszego bajtu, czas i pamiec."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    first = None
+    total = 0
+    for chunk in chunks:
+        if first is None:
+            first = time.perf_counter() - start
+        total += len(chunk)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<10} pierwszy bajt={first * 1000:8.1f} ms  "
+          f"calosc={elapsed:6.2f} s  szczyt pamieci={peak / 2**20:7.1f} MiB  "
+          f"({total / 2**20:.0f} MiB danych)")
+
+
+def main():
+    """Przygotowuje tymczasowa baze i porownuje oba warianty."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_export_")
+    try:
+        db_path = os.path.join(workdir, "export.db")
+        init_db(db_path)
+        fill(db_path, args.rows)
+        measure("przed", legacy_export(db_path))
+        measure("po", open_export(db_path, "weather_control", "ndjson"))
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark odbioru klatek: aktywne czekanie na LAST_FRAME pod camera_lock
+kontra FrameBus (czekanie na zmiennej warunkowej).
+
+Dwa scenariusze: brak kamery (zadnych klatek) oraz kamera 20 kl./s.
+Podana liczba odbiorcow (jak generate_frames i detect_motion) czyta klatki.
+Wypisuje zuzycie CPU procesu oraz liczbe klatek odebranych, w tym
+powtorzonych (ta sama klatka przetworzona ponownie).
+
+Uzycie:
+    python benchmarks/bench_frame_bus.py [--consumers 3] [--seconds 2] [--fps 20]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from camera import FrameBus
+
+
+class Polling:
+    """Dotychczasowy sposob: globalna klatka i petla z camera_lock."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.frame = None
+        self.seq = 0
+
+    def publish(self, frame):
+        """Ustawia klatke (jak capture_camera)."""
+        with self.lock:
+            self.frame = frame.copy()
+            self.seq += 1
+
+    def consume(self, stop, counts):
+        """Petla odbiorcy jak w generate_frames."""
+        while not stop.is_set():
+            with self.lock:
+                if self.frame is None:
+                    continue
+                seq = self.seq
+            counts.append(seq)
+
+
+class Bus:
+    """FrameBus z odbiorca LATEST_ONLY."""
+
+    def __init__(self):
+        self.bus = FrameBus()
+        self.publish = self.bus.publish
+
+    def consume(self, stop, counts):
+        """Petla odbiorcy czekajacego na nowa klatke."""
+        with self.bus.subscribe() as frames:
+            while not stop.is_set():
+                item = frames.get(timeout=0.1)
+                if item is not None:
+                    counts.append(item[0])
+
+
+def run(source, consumers, seconds, fps):
+    """
+    Uruchamia odbiorcow i (gdy fps > 0) watek kamery.
+    :return: (CPU procesu w %, klatki odebrane, w tym powtorzone).
+    """
+
+    stop = threading.Event()
+    counts = [[] for _ in range(consumers)]
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    def camera():
+        while not stop.is_set():
+            source.publish(frame)
+            time.sleep(1 / fps)
+
+    threads = [threading.Thread(target=source.consume, args=(stop, c)) for c in counts]
+    if fps > 0:
+        threads.append(threading.Thread(target=camera))
+    cpu = time.process_time()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    cpu = (time.process_time() - cpu) / seconds * 100
+    received = sum(len(c) for c in counts)
+    repeated = sum(len(c) - len(set(c)) for c in counts)
+    return cpu, received, repeated
+
+
+def main():
+    """Porownuje odbior klatek bez kamery i z kamera."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--consumers", type=int, default=3)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--fps", type=float, default=20.0)
+    args = parser.parse_args()
+
+    for label, fps in (("brak kamery", 0), (f"kamera {args.fps:g} kl./s", args.fps)):
+        for name, source in (("przed", Polling()), ("po", Bus())):
+            cpu, received, repeated = run(source, args.consumers, args.seconds, fps)
+            print(f"{label:18} {name:6} CPU={cpu:6.1f}%  odebrane={received:9}  "
+                  f"powtorzone={repeated:9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Benchmark przydzialow pamieci w potoku kamery: kopie klatek i nowe tablice
+na kazdym etapie (dotychczasowy capture_camera + detect_motion) kontra
+FrameRing (odczyt wprost do slotu) i MotionDetector (bufory przydzielone raz).
+
+Oba warianty przetwarzaja te same klatki z pliku wideo wygenerowanego
+w katalogu tymczasowym. Dla kazdej klatki mierzony jest szczyt pamieci
+przydzielonej ponad stan poczatkowy (tracemalloc, obejmuje tablice NumPy
+i OpenCV). Wypisuje MB przydzielane na klatke, MB/s przy 20 kl./s, liczbe
+odsmiecan GC i czas przetwarzania klatki.
+
+Uzycie:
+    python benchmarks/bench_frame_ring.py [--frames 200] [--width 640] [--height 480]
+"""
+import argparse
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from camera import FrameBus, FrameRing, MotionDetector
+
+
+def make_clip(path, frames, width, height):
+    """Zapisuje klip z poruszajacym sie prostokatem na tle z szumem."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 20, (width, height))
+    rng = np.random.default_rng(0)
+    for i in range(frames):
+        frame = rng.integers(0, 40, (height, width, 3), dtype=np.uint8)
+        x = (i * 7) % (width - 100)
+        frame[100:200, x:x + 100] = 255
+        writer.write(frame)
+    writer.release()
+
+
+def before(camera):
+    """Dotychczasowy potok: kopie klatek i nowe tablice w kazdym kroku."""
+    state = {"prev": None}
+
+    def step():
+        success, frame = camera.read()
+        if not success:
+            return False
+        last_frame = frame.copy()            # capture_camera
+        frame = last_frame.copy()            # detect_motion
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        gray = cv2.GaussianBlur(gray, (21, 21), 0)
+        if state["prev"] is not None:
+            delta = cv2.absdiff(state["prev"], gray)
+            _, thresh = cv2.threshold(delta, 25, 255, cv2.THRESH_BINARY)
+            thresh = cv2.dilate(thresh, None, iterations=2)
+            contours, _ = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL,
+                                           cv2.CHAIN_APPROX_SIMPLE)
+            any(cv2.contourArea(c) > 25000 for c in contours)
+        state["prev"] = gray
+        return True
+
+    return step
+
+
+def after(camera):
+    """Nowy potok: odczyt do FrameRing, FrameBus i MotionDetector z buforami."""
+    success, first = camera.read()
+    ring = FrameRing(first.shape)
+    bus = FrameBus()
+    frames = bus.subscribe()
+    detector = MotionDetector()
+
+    def step():
+        slot, target = ring.claim()
+        success, _ = camera.read(target)
+        if not success:
+            ring.release(slot)
+            return False
+        frame = ring.commit(slot)
+        bus.publish(frame)
+        frame.release()
+        _, received = frames.get()
+        with received as image:
+            detector.detect(image)
+        return True
+
+    return step if success else None
+
+
+def measure(step):
+    """
+    Wykonuje krok potoku dla wszystkich klatek.
+    :return: (MB na klatke, liczba odsmiecan GC, ms na klatke, liczba klatek).
+    """
+
+    gc.collect()
+    collections = sum(stat["collections"] for stat in gc.get_stats())
+    tracemalloc.start()
+    allocated, count, elapsed = 0, 0, 0.0
+    while True:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        if not step():
+            break
+        elapsed += time.perf_counter() - start
+        allocated += tracemalloc.get_traced_memory()[1] - base
+        count += 1
+    tracemalloc.stop()
+    collections = sum(stat["collections"] for stat in gc.get_stats()) - collections
+    return allocated / count / 2 ** 20, collections, elapsed / count * 1000, count
+
+
+def main():
+    """Porownuje oba potoki na tym samym klipie."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_ring_")
+    try:
+        path = os.path.join(workdir, "clip.avi")
+        make_clip(path, args.frames, args.width, args.height)
+        for name, pipeline in (("przed", before), ("po", after)):
+            camera = cv2.VideoCapture(path)
+            per_frame, collections, ms, count = measure(pipeline(camera))
+            camera.release()
+            print(f"{name:6} klatki={count}  przydzielone={per_frame:6.2f} MB/klatke  "
+                  f"({per_frame * 20:6.1f} MB/s przy 20 kl./s)  GC={collections:4}  "
+                  f"czas={ms:6.2f} ms/klatke")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
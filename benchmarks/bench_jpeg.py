@@ -0,0 +1,127 @@
+"""
+Benchmark kodowania JPEG dla klientow /video_feed: kazdy klient koduje
+klatke sam (pod camera_lock) kontra JpegCache (jedno kodowanie na klatke).
+
+Watek "kamery" publikuje syntetyczne klatki z zadana czestotliwoscia,
+a podana liczba klientow pobiera kazda nowa klatke. Wypisuje liczbe
+kodowan, zuzycie CPU procesu na sekunde oraz najdluzszy czas, przez jaki
+watek kamery czekal na camera_lock.
+
+Uzycie:
+    python benchmarks/bench_jpeg.py [--viewers 1 2 5 10] [--seconds 3] [--fps 20]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from camera import FrameBus, JpegCache
+
+
+class PerClient:
+    """Dotychczasowy sposob: kazdy klient koduje klatke pod camera_lock."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.frame = None
+        self.seq = 0
+        self.encoded = 0
+
+    def publish(self, frame):
+        """Ustawia nowa klatke (jak capture_camera)."""
+        with self.lock:
+            self.frame = frame
+            self.seq += 1
+
+    def get(self):
+        """Koduje biezaca klatke (jak generate_frames)."""
+        with self.lock:
+            _, buffer = cv2.imencode('.jpg', self.frame)
+            self.encoded += 1
+            return self.seq, buffer.tobytes()
+
+
+class CachedSource:
+    """Klatki w FrameBus kodowane raz przez JpegCache."""
+
+    def __init__(self):
+        self.bus = FrameBus()
+        self.cache = JpegCache(self.bus)
+        self.publish = self.bus.publish
+        self.get = self.cache.get
+
+    @property
+    def seq(self):
+        """Numer ostatniej opublikowanej klatki."""
+        return self.bus.latest()[0]
+
+    @property
+    def encoded(self):
+        """Liczba kodowan JPEG."""
+        return self.cache.stats()["encoded"]
+
+
+def run(source, viewers, seconds, fps):
+    """
+    Uruchamia watek kamery i klientow.
+    :return: (liczba kodowan, CPU procesu na sekunde, max czekanie kamery w ms).
+    """
+
+    frames = [np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8) for _ in range(4)]
+    source.publish(frames[0])
+    stop = threading.Event()
+    waits = []
+
+    def camera():
+        i = 0
+        while not stop.is_set():
+            start = time.perf_counter()
+            source.publish(frames[i % len(frames)])
+            waits.append(time.perf_counter() - start)
+            i += 1
+            time.sleep(1 / fps)
+
+    def viewer():
+        last = 0
+        while not stop.is_set():
+            if source.seq == last:
+                time.sleep(0.005)
+                continue
+            last, _ = source.get()
+
+    threads = [threading.Thread(target=camera)] + [threading.Thread(target=viewer)
+                                                   for _ in range(viewers)]
+    cpu = time.process_time()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    cpu = (time.process_time() - cpu) / seconds
+    return source.encoded, cpu, max(waits) * 1000
+
+
+def main():
+    """Porownuje kodowanie na klienta z JpegCache dla roznych liczb klientow."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--viewers", type=int, nargs="+", default=[1, 2, 5, 10])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--fps", type=float, default=20.0)
+    args = parser.parse_args()
+
+    for viewers in args.viewers:
+        for name, source in (("przed", PerClient()), ("po", CachedSource())):
+            encoded, cpu, wait = run(source, viewers, args.seconds, args.fps)
+            print(f"{name:6} klienci={viewers:3}  kodowania/s={encoded / args.seconds:7.1f}  "
+                  f"CPU={cpu * 100:5.1f}%  max czekanie kamery={wait:6.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
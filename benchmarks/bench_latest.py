@@ -0,0 +1,105 @@
+"""
+Benchmark odczytu najnowszych pomiarow dla dashboardow: zapytanie SQL
+(ORDER BY timestamp DESC LIMIT 10) kontra bufor w pamieci (modul latest).
+
+Kilku klientow (watkow) odpytuje w petli dane jak /weather, a w tle kolejka
+zapisu dopisuje pomiar co 10 ms. Wypisuje liczbe odczytow na sekunde oraz
+mediane i 99. percentyl opoznienia odczytu.
+
+Uzycie:
+    python benchmarks/bench_latest.py [--clients 8] [--seconds 5]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import Database, init_db
+from ingest import IngestQueue
+from latest import LatestReadings
+
+READ_SQL = "SELECT * FROM weather_control ORDER BY timestamp DESC LIMIT 10"
+
+
+def run(read, clients, seconds, ingest):
+    """
+    Uruchamia klientow czytajacych i dopisuje pomiary przez kolejke.
+    :return: (odczyty na sekunde, lista opoznien odczytu w ms).
+    """
+
+    stop = threading.Event()
+    latencies = [[] for _ in range(clients)]
+
+    def client(samples):
+        while not stop.is_set():
+            start = time.perf_counter()
+            read()
+            samples.append((time.perf_counter() - start) * 1000)
+
+    def writer():
+        while not stop.is_set():
+            ingest.put("weather_control", {"temperature": 21.5, "humidity": 48.0})
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=client, args=(samples,)) for samples in latencies]
+    threads.append(threading.Thread(target=writer))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    merged = sorted(sample for samples in latencies for sample in samples)
+    return len(merged) / seconds, merged
+
+
+def report(name, rate, latencies):
+    """Wypisuje wynik jednego wariantu."""
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{name:<6} odczyty/s={rate:10.0f}  "
+          f"p50={statistics.median(latencies):7.3f} ms  p99={p99:7.3f} ms")
+
+
+def main():
+    """Przygotowuje tymczasowa baze i porownuje oba warianty."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_latest_")
+    try:
+        db_path = os.path.join(workdir, "latest.db")
+        init_db(db_path)
+        db = Database(db_path)
+        db.executemany("""INSERT INTO weather_control (timestamp, temperature, humidity)
+                       VALUES (datetime('2025-01-01', '+' || ? || ' seconds'), 21.5, 48.0)""",
+                       ((i,) for i in range(args.rows)))
+        latest = LatestReadings(db)
+        latest.warm()
+        ingest = IngestQueue(db_path, flush_interval=0.05)
+        ingest.add_listener(latest.extend)
+        ingest.start()
+
+        rate, latencies = run(lambda: db.query(READ_SQL), args.clients, args.seconds, ingest)
+        report("przed", rate, latencies)
+        rate, latencies = run(lambda: latest.latest("weather_control", 10),
+                              args.clients, args.seconds, ingest)
+        report("po", rate, latencies)
+
+        ingest.stop()
+        db.close()
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
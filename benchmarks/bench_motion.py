@@ -0,0 +1,123 @@
+"""
+Benchmark wykrywania ruchu: dotychczasowy detect_motion (pelna
+rozdzielczosc, nowe tablice w kazdym kroku) kontra MotionDetector
+przy pelnej rozdzielczosci, pomniejszeniu do 320/160 px i pomijaniu klatek.
+
+Klatki klipu sa wczytywane do pamieci przed pomiarem, wiec mierzony
+jest tylko czas CPU analizy (time.thread_time). Dla kazdego wariantu
+wypisuje ms CPU na klatke, przyspieszenie i zgodnosc klatek z ruchem
+z wariantem dotychczasowym. Bez --clip generowany jest klip syntetyczny
+(obiekt przesuwany skokowo na tle z szumem).
+
+Uzycie:
+    python benchmarks/bench_motion.py [--clip nagranie.avi] [--frames 300]
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from camera import MotionDetector
+
+
+def synthetic_clip(frames):
+    """Tworzy klatki 640x480: ruch w co drugiej serii 20 klatek (skoki o 120 px)."""
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 60, (480, 640, 3), dtype=np.uint8)
+    clip = []
+    for i in range(frames):
+        frame = background.copy()
+        if (i // 20) % 2:
+            x = 20 + (i % 4) * 120
+            frame[220:460, x:x + 240] = 220
+        frame += rng.integers(0, 4, frame.shape, dtype=np.uint8)
+        clip.append(frame)
+    return clip
+
+
+def load_clip(path, frames):
+    """Wczytuje do frames klatek z pliku wideo."""
+    camera = cv2.VideoCapture(path)
+    clip = []
+    while len(clip) < frames:
+        success, frame = camera.read()
+        if not success:
+            break
+        clip.append(frame)
+    camera.release()
+    return clip
+
+
+def original(clip):
+    """Dotychczasowy algorytm detect_motion. :return: Lista flag ruchu."""
+    flags = []
+    prev = None
+    for frame in clip:
+        frame = frame.copy()
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        gray = cv2.GaussianBlur(gray, (21, 21), 0)
+        if prev is None:
+            prev = gray
+            flags.append(False)
+            continue
+        delta = cv2.absdiff(prev, gray)
+        _, thresh = cv2.threshold(delta, 25, 255, cv2.THRESH_BINARY)
+        thresh = cv2.dilate(thresh, None, iterations=2)
+        contours, _ = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL,
+                                       cv2.CHAIN_APPROX_SIMPLE)
+        flags.append(any(cv2.contourArea(c) > 25000 for c in contours))
+        prev = gray
+    return flags
+
+
+def pipeline(**options):
+    """Zwraca funkcje analizy klipu przez MotionDetector z podanymi opcjami."""
+    def run(clip):
+        detector = MotionDetector(**options)
+        flags = []
+        last = False
+        for frame in clip:
+            boxes = detector.detect(frame)
+            # Klatka pominieta dziedziczy wynik ostatniej analizowanej
+            last = last if boxes is None else bool(boxes)
+            flags.append(last)
+        return flags
+    return run
+
+
+def main():
+    """Porownuje warianty analizy na tym samym klipie."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clip", help="plik wideo (domyslnie klip syntetyczny)")
+    parser.add_argument("--frames", type=int, default=300)
+    args = parser.parse_args()
+
+    clip = load_clip(args.clip, args.frames) if args.clip else synthetic_clip(args.frames)
+    cv2.setNumThreads(1)
+    variants = [
+        ("przed (pelna rozdzielczosc)", original),
+        ("MotionDetector 640 px", pipeline(width=None)),
+        ("MotionDetector 320 px", pipeline(width=320)),
+        ("MotionDetector 160 px", pipeline(width=160)),
+        ("MotionDetector 320 px skip=2", pipeline(width=320, skip=2)),
+    ]
+    reference = None
+    baseline = None
+    for name, run in variants:
+        start = time.thread_time()
+        flags = run(clip)
+        cpu = (time.thread_time() - start) / len(clip) * 1000
+        if reference is None:
+            reference, baseline = flags, cpu
+        agreement = sum(a == b for a, b in zip(flags, reference)) / len(flags) * 100
+        print(f"{name:30} CPU={cpu:6.2f} ms/klatke  x{baseline / cpu:4.1f}  "
+              f"klatki z ruchem={sum(flags):4}  zgodnosc={agreement:5.1f}%")
+
+
+if __name__ == '__main__':
+    main()
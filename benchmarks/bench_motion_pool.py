@@ -0,0 +1,109 @@
+"""
+Benchmark analizy ruchu: MotionDetector w watku (dotychczasowe detect_motion)
+kontra MotionPool z 1-4 procesami roboczymi.
+
+Klatki z prostokatem przesuwajacym sie po obrazie sa przygotowane w pamieci,
+wiec mierzona jest tylko analiza (i, dla puli, kopia klatki do pamieci
+wspoldzielonej). Wariant "przed" analizuje klatki w jednym watku, tak jak
+detect_motion bez motion_pool.json; wariant "po" przekazuje je do puli tak
+szybko, jak zwalniaja sie sloty. Wypisuje liczbe przeanalizowanych klatek na
+sekunde, czas CPU procesow roboczych na klatke i udzial trafien (poprzednia
+klatka przygotowana w tym samym procesie). Przyspieszenie zalezy od liczby
+rdzeni (na Raspberry Pi 5 - 4).
+
+Uzycie:
+    python benchmarks/bench_motion_pool.py [--seconds 5] [--size 1280x720] [--width 640]
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from camera import MotionDetector
+from motion_pool import MotionPool
+
+
+def make_frames(size, count=50):
+    """Klatki BGR z prostokatem przesuwajacym sie po obrazie."""
+    frames = []
+    for i in range(count):
+        frame = np.zeros((size[1], size[0], 3), np.uint8)
+        x = i * (size[0] - size[0] // 4) // count
+        cv2.rectangle(frame, (x, size[1] // 4), (x + size[0] // 4, size[1] * 3 // 4),
+                      (255, 255, 255), -1)
+        frames.append(frame)
+    return frames
+
+
+def run_thread(frames, options, seconds):
+    """Analiza w jednym watku. :return: (klatki, czas CPU na klatke w ms, trafienia)."""
+    detector = MotionDetector(**options)
+    analysed = 0
+    cpu = time.thread_time()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        detector.detect(frames[analysed % len(frames)])
+        analysed += 1
+    return analysed, (time.thread_time() - cpu) * 1000 / max(analysed, 1), None
+
+
+def run_pool(frames, options, seconds, workers):
+    """Analiza w MotionPool; przy zajetych slotach proba jest powtarzana."""
+    pool = MotionPool(workers=workers, slots=2 * workers + 2)
+    pool.start()
+    try:
+        pool.open("bench", lambda boxes, area, frame: None, options)
+        # Rozgrzewka: procesy uruchomione i dolaczone do pamieci wspoldzielonej
+        pool.submit("bench", frames[0])
+        while not pool.stats()["streams"]["bench"]["analysed"]:
+            time.sleep(0.01)
+        before = pool.stats()["streams"]["bench"]
+        submitted = 1
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            if pool.submit("bench", frames[submitted % len(frames)]):
+                submitted += 1
+            else:
+                time.sleep(0.0002)
+        after = pool.stats()["streams"]["bench"]
+    finally:
+        pool.stop()
+    analysed = after["analysed"] - before["analysed"]
+    cpu = (after["cpu_s"] - before["cpu_s"]) * 1000 / max(analysed, 1)
+    hits = after["hits"] - before["hits"]
+    return analysed, cpu, hits / max(hits + after["misses"] - before["misses"], 1)
+
+
+def main():
+    """Porownuje analize ruchu w watku i w puli procesow."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--size", default="1280x720", help="rozmiar klatki (SZERxWYS)")
+    parser.add_argument("--width", type=int, default=640, help="szerokosc analizy")
+    parser.add_argument("--workers", type=int, default=4, help="najwieksza liczba procesow")
+    args = parser.parse_args()
+
+    size = tuple(int(value) for value in args.size.split("x"))
+    frames = make_frames(size)
+    options = {"width": args.width}
+    print(f"cpu={os.cpu_count()}  klatka={size[0]}x{size[1]}  analiza={args.width} px")
+    runs = [("przed", "watek", lambda: run_thread(frames, options, args.seconds))]
+    for workers in range(1, args.workers + 1):
+        runs.append(("po", f"procesy={workers}",
+                     lambda workers=workers: run_pool(frames, options, args.seconds, workers)))
+    for name, label, run in runs:
+        analysed, cpu, hits = run()
+        line = (f"{name:6} {label:11} {analysed / args.seconds:7.1f} kl./s  "
+                f"cpu={cpu:6.2f} ms/kl.")
+        if hits is not None:
+            line += f"  trafienia={hits * 100:5.1f}%"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
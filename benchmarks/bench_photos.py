@@ -0,0 +1,100 @@
+"""
+Benchmark zapisu zdjec z fotopulapki: cv2.imwrite w watku wykrywania ruchu
+kontra PhotoWriter (kodowanie, zapis i fsync partiami w tle).
+
+Symulowana petla wykrywania ruchu zapisuje zdjecie co --every klatek.
+Wypisuje najdluzsze i srednie zatrzymanie petli przy zapisie zdjecia,
+liczbe zapisanych i odrzuconych zdjec oraz (dla PhotoWriter) srednie
+opoznienie zapisu. Wariant "przed" wykonuje fsync po kazdym zdjeciu, tak
+jak trzeba by to zrobic, zeby zdjecie przetrwalo zanik zasilania.
+Katalog --dir powinien lezec na docelowym nosniku (karta SD).
+
+Uzycie:
+    python benchmarks/bench_photos.py [--photos 200] [--every 1] [--dir /tmp]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from photos import PhotoWriter
+
+
+def save_sync(path, frame):
+    """Dotychczasowy sposob: cv2.imwrite i fsync w watku wykrywania ruchu."""
+    cv2.imwrite(path, frame)
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    return True
+
+
+def run(save, frames, photos, every, workdir):
+    """
+    Symuluje petle wykrywania ruchu zapisujaca zdjecia.
+    :return: Lista czasow zatrzymania petli przy zapisie zdjecia (s).
+    """
+
+    stalls = []
+    for i in range(photos * every):
+        frame = frames[i % len(frames)]
+        # Analiza klatki (jak MotionDetector na pomniejszonej kopii)
+        cv2.GaussianBlur(cv2.cvtColor(cv2.resize(frame, (320, 240)), cv2.COLOR_BGR2GRAY),
+                         (11, 11), 0)
+        if i % every == 0:
+            start = time.perf_counter()
+            save(os.path.join(workdir, f"picture_{i}.jpg"), frame.copy())
+            stalls.append(time.perf_counter() - start)
+    return stalls
+
+
+def main():
+    """Porownuje zapis zdjec w petli wykrywania ruchu z zapisem w tle."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--photos", type=int, default=200)
+    parser.add_argument("--every", type=int, default=1,
+                        help="zdjecie co tyle klatek analizy")
+    parser.add_argument("--dir", default=None, help="katalog na pliki testowe")
+    args = parser.parse_args()
+
+    frames = [np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8) for _ in range(4)]
+    for name in ("przed", "po"):
+        workdir = tempfile.mkdtemp(prefix="bench_photos_", dir=args.dir)
+        try:
+            writer = None
+            if name == "przed":
+                save = save_sync
+            else:
+                writer = PhotoWriter()
+                writer.start()
+                save = writer.put
+            start = time.perf_counter()
+            stalls = run(save, frames, args.photos, args.every, workdir)
+            loop = time.perf_counter() - start
+            if writer is not None:
+                writer.stop()
+            written = len([f for f in os.listdir(workdir) if f.endswith(".jpg")])
+            line = (f"{name:6} petla={loop:6.2f} s  zatrzymanie max={max(stalls) * 1000:7.2f} ms  "
+                    f"srednio={statistics.mean(stalls) * 1000:6.2f} ms  zapisane={written:4}")
+            if writer is not None:
+                stats = writer.stats()
+                line += (f"  odrzucone={stats['dropped']:4}  "
+                         f"opoznienie zapisu={stats['avg_latency_ms']:7.2f} ms  "
+                         f"fsync={stats['syncs']}")
+            print(line)
+        finally:
+            shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
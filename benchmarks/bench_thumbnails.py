@@ -0,0 +1,79 @@
+"""
+Benchmark tworzenia miniatur zdjec z fotopulapki: pelny odczyt i zmniejszenie
+kontra dekodowanie JPEG w zmniejszonej skali (read_reduced).
+
+Wariant "przed" odczytuje cale zdjecie (cv2.imread) i zmniejsza je do
+szerokosci miniatury, tak jak przegladarka musialaby pobrac i zmniejszyc
+pelne zdjecie w galerii. Wariant "po" to make_thumbnail z modulu
+thumbnails. Wypisuje sredni czas jednej miniatury i rozmiar plikow
+(zdjecie i miniatura), czyli ile danych galeria przesyla na jedno zdarzenie.
+
+Uzycie:
+    python benchmarks/bench_thumbnails.py [--photos 50] [--width 1920] [--dir /tmp]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from thumbnails import THUMB_QUALITY, THUMB_WIDTH, make_thumbnail, thumb_path
+
+
+def thumbnail_full(photo):
+    """Dotychczasowy sposob: odczyt calego zdjecia i zmniejszenie do THUMB_WIDTH."""
+    image = cv2.imread(photo)
+    height = round(image.shape[0] * THUMB_WIDTH / image.shape[1])
+    image = cv2.resize(image, (THUMB_WIDTH, height), interpolation=cv2.INTER_AREA)
+    path = thumb_path(photo)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    cv2.imwrite(path, image, [cv2.IMWRITE_JPEG_QUALITY, THUMB_QUALITY])
+    return path
+
+
+def main():
+    """Porownuje tworzenie miniatur z pelnego zdjecia i w zmniejszonej skali."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--photos", type=int, default=50)
+    parser.add_argument("--width", type=int, default=1920, help="szerokosc zdjec")
+    parser.add_argument("--dir", default=None, help="katalog na pliki testowe")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_thumbnails_", dir=args.dir)
+    try:
+        height = args.width * 3 // 4
+        # Zdjecie z gradientem i szumem, zeby JPEG mial realistyczny rozmiar
+        gradient = np.linspace(0, 200, args.width, dtype=np.uint8)
+        base = np.dstack([np.tile(gradient, (height, 1))] * 3)
+        photos = []
+        for i in range(args.photos):
+            noise = np.random.randint(0, 40, (height, args.width, 3), dtype=np.uint8)
+            photo = os.path.join(workdir, f"picture_{i}.jpg")
+            cv2.imwrite(photo, cv2.add(base, noise))
+            photos.append(photo)
+
+        photo_bytes = statistics.mean(os.path.getsize(photo) for photo in photos)
+        for name, make in (("przed", thumbnail_full), ("po", make_thumbnail)):
+            times = []
+            for photo in photos:
+                start = time.perf_counter()
+                path = make(photo)
+                times.append(time.perf_counter() - start)
+            thumb_bytes = statistics.mean(os.path.getsize(thumb_path(p)) for p in photos)
+            shape = cv2.imread(path).shape
+            print(f"{name:6} miniatura={statistics.mean(times) * 1000:7.2f} ms  "
+                  f"max={max(times) * 1000:7.2f} ms  rozmiar={shape[1]}x{shape[0]}  "
+                  f"zdjecie={photo_bytes / 1024:7.1f} KiB  miniatura={thumb_bytes / 1024:5.1f} KiB")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Test obciazeniowy POST /ingest: kilku klientow (jak wezly ESP32) wysyla
+partie pomiarow do dzialajacego serwera i mierzy przepustowosc zapisu.
+
+Cel: co najmniej 10000 wierszy/s na Raspberry Pi 5.
+
+Uzycie (serwer uruchomiony lokalnie, np. python app.py):
+    python benchmarks/load_ingest.py [--url http://127.0.0.1:5000]
+        [--clients 4] [--batch 1000] [--seconds 10] [--format ndjson]
+"""
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+
+import requests
+
+
+def make_body(batch, fmt):
+    """Tworzy partie pomiarow pogody w formacie NDJSON lub tablicy JSON."""
+    now = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+    records = [{"timestamp": now,
+                "temperature": round(random.uniform(18, 30), 1),
+                "humidity": round(random.uniform(40, 70), 1)}
+               for _ in range(batch)]
+    if fmt == "json":
+        return json.dumps(records), "application/json"
+    return "\n".join(json.dumps(record) for record in records), "application/x-ndjson"
+
+
+def main():
+    """Uruchamia klientow i wypisuje liczbe wierszy na sekunde."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--table", default="weather_control")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--format", choices=("ndjson", "json"), default="ndjson")
+    args = parser.parse_args()
+
+    body, content_type = make_body(args.batch, args.format)
+    stop = threading.Event()
+    lock = threading.Lock()
+    rows = [0]
+    errors = [0]
+    latencies = []
+
+    def client(number):
+        session = requests.Session()
+        sent = 0
+        while not stop.is_set():
+            start = time.perf_counter()
+            response = session.post(f"{args.url}/ingest",
+                                    params={"table": args.table,
+                                            "batch": f"{number}-{sent}"},
+                                    data=body, headers={"Content-Type": content_type})
+            elapsed = (time.perf_counter() - start) * 1000
+            sent += 1
+            with lock:
+                latencies.append(elapsed)
+                if response.status_code == 200:
+                    rows[0] += response.json()["accepted"]
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(args.clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"wiersze={rows[0]}  bledy={errors[0]}  "
+          f"wiersze/s={rows[0] / elapsed:10.0f}  partii={len(latencies)}")
+    if latencies:
+        p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)]
+        print(f"czas partii p50={statistics.median(latencies):7.1f} ms  p99={p99:7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
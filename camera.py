@@ -0,0 +1,645 @@
+"""
+Wspolne elementy obslugi kamery dla aplikacji Flask i FastAPI.
+
+FrameBus rozsyla klatki z kamery (z numerami sekwencyjnymi) do
+subskrybentow. Kazdy subskrybent czeka na nowa klatke na zmiennej
+warunkowej, zamiast sprawdzac w petli wspolna zmienna, i ma wlasna
+polityke kolejki:
+- LATEST_ONLY: tylko najnowsza nieodebrana klatka (podglad, analiza ruchu),
+- DROP_OLDEST: ograniczona kolejka, przy przepelnieniu usuwana najstarsza.
+Zadna klatka nie jest odebrana przez subskrybenta dwa razy, a bez kamery
+subskrybenci spia.
+
+Klatki z kamery trafiaja do FrameRing - tablicy NumPy z N slotami
+przydzielonej raz; VideoCapture.read zapisuje klatke wprost do wolnego
+slotu. Odbiorcy dostaja FrameRef z widokiem tylko do odczytu i licznikiem
+odwolan: slot nie zostanie nadpisany, dopoki ktos (kolejka subskrybenta,
+ostatnia klatka FrameBus, odbiorca w trakcie przetwarzania) go uzywa.
+Odbiorca zwalnia klatke przez release() lub blok with.
+
+MotionDetector wykrywa ruch na pomniejszonej kopii klatki w skali
+szarosci (domyslnie 320 px szerokosci), z opcjonalnymi maskami obszarow
+(roi/exclude), progiem pola jako ulamkiem klatki i pomijaniem klatek.
+Wszystkie obrazy posrednie trzymane sa w buforach przydzielonych raz.
+
+JpegCache koduje kazda nowa klatke do JPEG co najwyzej raz. Pierwszy
+klient, ktory poprosi o nowa klatke, koduje ja, a pozostali klienci
+(/video_feed, /latest_frame) dostaja te same bajty z numerem sekwencyjnym,
+wiec koszt kodowania nie rosnie z liczba ogladajacych.
+"""
+from collections import deque
+from datetime import datetime, timezone
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from config import load_options
+from database import TIMESTAMP_FORMAT
+
+# Jakosc JPEG strumienia wideo
+JPEG_QUALITY = 80
+
+# Polityki kolejki subskrybenta FrameBus
+LATEST_ONLY = "latest"
+DROP_OLDEST = "drop_oldest"
+
+# Domyslna dlugosc kolejki subskrybenta DROP_OLDEST
+QUEUE_SIZE = 8
+
+# Liczba slotow bufora klatek kamery
+RING_SLOTS = 8
+
+# Szerokosc obrazu, na ktorym wykrywany jest ruch (klatka jest pomniejszana)
+MOTION_WIDTH = 320
+
+# Minimalne pole konturu uznawane za ruch jako ulamek pola klatki
+# (dawne 25000 pikseli dla klatki 640x480)
+MOTION_MIN_AREA = 0.08
+
+# Stany zdarzenia ruchu
+IDLE, ACTIVE, COOLDOWN = "idle", "active", "cooldown"
+
+# Czas bez ruchu (s), po ktorym zdarzenie ruchu sie konczy
+MOTION_COOLDOWN = 5.0
+
+# Minimalny odstep (s) miedzy powiadomieniami o ruchu (emit i zdjecie)
+MOTION_NOTIFY_INTERVAL = 10.0
+
+# Opcje MotionDetector dozwolone w pliku konfiguracji (motion.json)
+MOTION_OPTIONS = ("width", "min_area", "blur", "threshold", "dilate", "roi", "exclude", "skip")
+
+
+def mjpeg_part(jpeg):
+    """Zwraca fragment strumienia multipart/x-mixed-replace z jedna klatka."""
+    return b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n'
+
+
+class FrameRef:
+    """
+    Klatka tylko do odczytu z licznikiem odwolan do slotu FrameRing.
+    Dla klatki spoza bufora (ring=None) retain/release nic nie robia.
+    """
+
+    __slots__ = ("array", "ring", "slot")
+
+    def __init__(self, array, ring=None, slot=None):
+        self.array = array
+        self.ring = ring
+        self.slot = slot
+
+    def retain(self):
+        """Zwieksza licznik odwolan. :return: self."""
+        if self.ring is not None:
+            self.ring.retain(self.slot)
+        return self
+
+    def release(self):
+        """Zmniejsza licznik odwolan; slot z zerem moze byc nadpisany."""
+        if self.ring is not None:
+            self.ring.release(self.slot)
+
+    def __enter__(self):
+        return self.array
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class FrameRing:
+    """
+    Bufor slots klatek o stalym ksztalcie przydzielony raz.
+    :param shape: Ksztalt klatki, np. (480, 640, 3).
+    """
+
+    def __init__(self, shape, slots=RING_SLOTS, dtype=np.uint8):
+        self.frames = np.empty((slots,) + tuple(shape), dtype=dtype)
+        self.shape = tuple(shape)
+        self._views = []
+        for slot in range(slots):
+            view = self.frames[slot].view()
+            view.flags.writeable = False
+            self._views.append(view)
+        self._refs = [0] * slots
+        self._next = 0
+        self._lock = threading.Lock()
+        self._stats = {"claimed": 0, "full": 0}
+
+    def claim(self):
+        """
+        Rezerwuje wolny slot do zapisu (kolejno, pomijajac uzywane).
+        :return: (slot, zapisywalna tablica) lub None, gdy wszystkie sloty sa zajete.
+        """
+
+        with self._lock:
+            slots = len(self._refs)
+            for offset in range(slots):
+                slot = (self._next + offset) % slots
+                if self._refs[slot] == 0:
+                    self._refs[slot] = 1
+                    self._next = (slot + 1) % slots
+                    self._stats["claimed"] += 1
+                    return slot, self.frames[slot]
+            self._stats["full"] += 1
+            return None
+
+    def commit(self, slot):
+        """Zwraca FrameRef zapisanego slotu; odwolanie z claim przechodzi na niego."""
+        return FrameRef(self._views[slot], self, slot)
+
+    def retain(self, slot):
+        """Zwieksza licznik odwolan slotu."""
+        with self._lock:
+            self._refs[slot] += 1
+
+    def release(self, slot):
+        """Zmniejsza licznik odwolan slotu."""
+        with self._lock:
+            if self._refs[slot] <= 0:
+                raise RuntimeError(f"slot {slot} zwolniony wiecej razy niz pobrany")
+            self._refs[slot] -= 1
+
+    def stats(self):
+        """Zwraca liczbe slotow, uzywanych slotow i licznikow rezerwacji."""
+        with self._lock:
+            return dict(self._stats, slots=len(self._refs),
+                        in_use=sum(1 for refs in self._refs if refs))
+
+
+def capture_loop(camera, bus, slots=RING_SLOTS, delay=0.05, stop=None, on_frame=None):
+    """
+    Czyta klatki z camera (cv2.VideoCapture) wprost do FrameRing i publikuje
+    je w bus, dopoki odczyt sie udaje. Gdy wszystkie sloty sa zajete,
+    klatka jest pomijana (grab bez dekodowania).
+    :param stop: Opcjonalny threading.Event konczacy petle.
+    :param on_frame: Opcjonalna funkcja bez argumentow wywolywana po publikacji
+                     kazdej klatki (w watku odczytu).
+    :return: Uzyty FrameRing lub None, gdy nie odczytano zadnej klatki.
+    """
+
+    success, first = camera.read()
+    if not success:
+        return None
+    ring = FrameRing(first.shape, slots, first.dtype)
+    slot, target = ring.claim()
+    target[...] = first
+    while True:
+        frame = ring.commit(slot)
+        bus.publish(frame)
+        frame.release()
+        if on_frame is not None:
+            on_frame()
+
+        # Dodaj opoznienie, aby uniknac przeciazenia CPU
+        if stop is not None and stop.wait(delay):
+            return ring
+        if stop is None:
+            time.sleep(delay)
+        claimed = ring.claim()
+        while claimed is None:
+            if not camera.grab():
+                return ring
+            time.sleep(delay)
+            claimed = ring.claim()
+        slot, target = claimed
+        success, _ = camera.read(target)
+        if not success:
+            ring.release(slot)
+            return ring
+
+
+class Subscription:
+    """
+    Kolejka klatek jednego odbiorcy FrameBus.
+    :param policy: LATEST_ONLY lub DROP_OLDEST.
+    :param size: Dlugosc kolejki dla DROP_OLDEST.
+    """
+
+    def __init__(self, bus, policy=LATEST_ONLY, size=QUEUE_SIZE):
+        if policy not in (LATEST_ONLY, DROP_OLDEST):
+            raise ValueError(f"nieznana polityka: {policy}")
+        self.bus = bus
+        self.policy = policy
+        self._items = deque(maxlen=1 if policy == LATEST_ONLY else size)
+        self._cond = threading.Condition()
+        self.closed = False
+        self.received = 0
+        self.dropped = 0
+
+    def push(self, seq, frame):
+        """Dodaje klatke (FrameRef z wlasnym odwolaniem) - wywolywane przez FrameBus."""
+        with self._cond:
+            if self.closed:
+                frame.release()
+                return
+            if len(self._items) == self._items.maxlen:
+                self._items.popleft()[1].release()
+                self.dropped += 1
+            self._items.append((seq, frame))
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """
+        Czeka na nastepna nieodebrana klatke.
+        :return: (numer sekwencyjny, FrameRef) lub None po timeout/zamknieciu;
+                 odbiorca zwalnia klatke przez release() lub blok with.
+        """
+
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self.closed, timeout):
+                return None
+            if not self._items:
+                return None
+            self.received += 1
+            return self._items.popleft()
+
+    def close(self):
+        """Wypisuje odbiorce z FrameBus i budzi czekajacy watek."""
+        self.bus.unsubscribe(self)
+        with self._cond:
+            self.closed = True
+            while self._items:
+                self._items.popleft()[1].release()
+            self._cond.notify_all()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FrameBus:
+    """Rozsylanie klatek kamery do subskrybentow z numerami sekwencyjnymi."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._seq = 0
+        self._frame = None
+
+    def publish(self, frame):
+        """
+        Publikuje klatke (FrameRef lub tablice, ktora nie bedzie modyfikowana).
+        Wywolujacy zachowuje swoje odwolanie do FrameRef i sam je zwalnia.
+        :return: Numer sekwencyjny klatki.
+        """
+
+        if not isinstance(frame, FrameRef):
+            frame = FrameRef(frame)
+        with self._lock:
+            self._seq += 1
+            previous, self._frame = self._frame, frame.retain()
+            seq, subscribers = self._seq, list(self._subscribers)
+        if previous is not None:
+            previous.release()
+        for subscriber in subscribers:
+            subscriber.push(seq, frame.retain())
+        return seq
+
+    def latest(self):
+        """
+        Zwraca (numer sekwencyjny, FrameRef) ostatniej klatki lub (0, None).
+        Odbiorca zwalnia klatke przez release() lub blok with.
+        """
+
+        with self._lock:
+            if self._frame is None:
+                return 0, None
+            return self._seq, self._frame.retain()
+
+    def subscribe(self, policy=LATEST_ONLY, size=QUEUE_SIZE):
+        """Tworzy odbiorce klatek publikowanych od teraz."""
+        subscription = Subscription(self, policy, size)
+        with self._lock:
+            self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Usuwa odbiorce (wywolywane przez Subscription.close)."""
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def close(self):
+        """Zamyka wszystkich odbiorcow (np. przy zatrzymaniu kamery)."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.close()
+
+    def stats(self):
+        """Zwraca numer ostatniej klatki i liczniki subskrybentow."""
+        with self._lock:
+            return {"seq": self._seq,
+                    "subscribers": [{"policy": s.policy, "received": s.received,
+                                     "dropped": s.dropped} for s in self._subscribers]}
+
+
+class JpegCache:
+    """
+    Zakodowana postac JPEG ostatniej klatki FrameBus.
+    :param bus: Zrodlo klatek (FrameBus).
+    :param quality: Jakosc kodowania JPEG (0-100).
+    """
+
+    def __init__(self, bus, quality=JPEG_QUALITY):
+        self.bus = bus
+        self.params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        self._lock = threading.Lock()
+        self._encode_lock = threading.Lock()
+        self._jpeg = None
+        self._jpeg_seq = 0
+        self._stats = {"encoded": 0, "served": 0, "cpu_s": 0.0}
+
+    def get(self):
+        """
+        Zwraca (numer sekwencyjny, bajty JPEG) ostatniej klatki lub (0, None).
+        Klatka jest kodowana tylko przy pierwszym odczycie.
+        """
+
+        seq, frame = self.bus.latest()
+        if frame is None:
+            return 0, None
+        with frame:
+            return self._encode(seq, frame.array)
+
+    def _encode(self, seq, image):
+        """Zwraca JPEG klatki seq, kodujac ja, jesli jeszcze nie zostala."""
+        with self._lock:
+            if self._jpeg_seq == seq:
+                self._stats["served"] += 1
+                return seq, self._jpeg
+
+        with self._encode_lock:
+            # Inny klient mogl zakodowac te (lub nowsza) klatke w miedzyczasie
+            if self._jpeg_seq < seq:
+                # Czas CPU kodowania w watku klienta (koszt kamery w /metrics)
+                start = time.thread_time()
+                success, buffer = cv2.imencode('.jpg', image, self.params)
+                if success:
+                    with self._lock:
+                        self._jpeg, self._jpeg_seq = buffer.tobytes(), seq
+                        self._stats["encoded"] += 1
+                        self._stats["cpu_s"] += time.thread_time() - start
+            with self._lock:
+                self._stats["served"] += 1
+                return self._jpeg_seq, self._jpeg
+
+    def stats(self):
+        """Zwraca liczbe zakodowanych klatek, odpowiedzi i czas CPU kodowania (s)."""
+        with self._lock:
+            return dict(self._stats)
+
+
+class MotionDetector:
+    """
+    Wykrywanie ruchu przez roznice kolejnych klatek (skala szarosci,
+    rozmycie, prog, dylatacja, kontury) na pomniejszonej kopii klatki.
+    Prostokaty ruchu sa przeskalowywane do rozmiaru oryginalnej klatki.
+    Wszystkie obrazy posrednie sa zapisywane w buforach przydzielonych
+    przy pierwszej klatce.
+    :param width: Szerokosc obrazu analizy w pikselach (None - bez pomniejszania).
+    :param min_area: Minimalne pole konturu jako ulamek pola klatki.
+    :param blur: Rozmiar jadra rozmycia dla klatki 640 px (skalowany z width).
+    :param threshold: Prog roznicy jasnosci (0-255).
+    :param dilate: Liczba iteracji dylatacji dla klatki 640 px.
+    :param roi: Lista wielokatow [(x, y), ...] we wspolrzednych 0-1, w ktorych
+                szukany jest ruch (None - cala klatka).
+    :param exclude: Lista wielokatow wykluczonych z analizy (np. drzewo, ulica).
+    :param skip: Analizuj co skip-ta klatke (1 - kazda).
+    """
+
+    def __init__(self, width=MOTION_WIDTH, min_area=MOTION_MIN_AREA, blur=21, threshold=25,
+                 dilate=2, roi=None, exclude=None, skip=1):
+        if not 0 < min_area < 1:
+            raise ValueError("min_area musi byc ulamkiem pola klatki (0-1)")
+        if skip < 1:
+            raise ValueError("skip musi byc >= 1")
+        self.width = width
+        self.min_area = min_area
+        self.blur = blur
+        self.threshold = threshold
+        self.dilate = dilate
+        self.roi = roi
+        self.exclude = exclude
+        self.skip = skip
+        # Suma pol konturow ruchu ostatniej analizowanej klatki (ulamek klatki)
+        self.motion_area = 0.0
+        self._frames = 0
+        self._shape = None
+        self._scale = 1.0
+        self._interpolation = cv2.INTER_AREA
+        self._small = None
+        self._gray = None
+        self._blurred = None
+        self._current = 0
+        self._delta = None
+        self._mask = None
+        self._roi_mask = None
+        self._dilated = None
+        self._kernel = None
+        self._iterations = dilate
+        self._min_pixels = 0
+        self._primed = False
+
+    def _allocate(self, shape):
+        """Przydziela bufory i maske dla klatek o danym rozmiarze (wysokosc, szerokosc)."""
+        self._shape = shape
+        height, width = shape
+        if self.width and width > self.width:
+            self._scale = self.width / width
+            size = (max(1, round(height * self._scale)), self.width)
+            self._small = np.empty(size + (3,), np.uint8)
+            # INTER_AREA jest szybkie tylko przy zmniejszeniu do 2 razy
+            self._interpolation = cv2.INTER_AREA if self._scale >= 0.5 else cv2.INTER_LINEAR
+        else:
+            self._scale = 1.0
+            size = shape
+            self._small = None
+        self._gray = np.empty(size, np.uint8)
+        self._blurred = (np.empty(size, np.uint8), np.empty(size, np.uint8))
+        self._delta = np.empty(size, np.uint8)
+        self._mask = np.empty(size, np.uint8)
+        self._dilated = np.empty(size, np.uint8)
+
+        # Parametry dobrane dla klatki 640 px skalowane do rozmiaru analizy
+        factor = size[1] / 640
+        kernel = max(3, round(self.blur * factor) | 1)
+        self._kernel = (kernel, kernel)
+        self._iterations = max(1, round(self.dilate * factor))
+        self._min_pixels = self.min_area * size[0] * size[1]
+        self._roi_mask = self._polygon_mask(size)
+        self._primed = False
+
+    def _polygon_mask(self, size):
+        """Zwraca maske 0/255 z obszarow roi bez exclude lub None (cala klatka)."""
+        if not self.roi and not self.exclude:
+            return None
+        height, width = size
+
+        def points(polygon):
+            return np.array([(x * width, y * height) for x, y in polygon], np.int32)
+
+        mask = np.zeros(size, np.uint8)
+        if self.roi:
+            cv2.fillPoly(mask, [points(polygon) for polygon in self.roi], 255)
+        else:
+            mask[:] = 255
+        if self.exclude:
+            cv2.fillPoly(mask, [points(polygon) for polygon in self.exclude], 0)
+        return mask
+
+    def detect(self, frame):
+        """
+        Porownuje klatke BGR z poprzednio analizowana.
+        :return: Lista prostokatow (x, y, w, h) ruchu we wspolrzednych klatki;
+                 dla pierwszej klatki lista pusta, dla pominietej (skip) None.
+        """
+
+        self._frames += 1
+        if (self._frames - 1) % self.skip:
+            return None
+        if frame.shape[:2] != self._shape:
+            self._allocate(frame.shape[:2])
+        previous = self._blurred[self._current]
+        self._current = 1 - self._current
+        current = self.prepare(frame, self._blurred[self._current])
+        if not self._primed:
+            self._primed = True
+            return []
+        return self.compare(previous, current)
+
+    def prepare(self, frame, out=None):
+        """
+        Pomniejsza klatke BGR, zamienia na skale szarosci i rozmywa (pierwszy
+        etap analizy, niezalezny od poprzedniej klatki).
+        :param out: Bufor wyniku; nowy, gdy None lub o innym rozmiarze.
+        :return: Obraz do porownania przez compare.
+        """
+
+        if frame.shape[:2] != self._shape:
+            self._allocate(frame.shape[:2])
+        source = frame
+        if self._small is not None:
+            cv2.resize(frame, (self._small.shape[1], self._small.shape[0]), dst=self._small,
+                       interpolation=self._interpolation)
+            source = self._small
+        cv2.cvtColor(source, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        if out is None or out.shape != self._gray.shape:
+            out = np.empty_like(self._gray)
+        cv2.GaussianBlur(self._gray, self._kernel, 0, dst=out)
+        return out
+
+    def compare(self, previous, current):
+        """
+        Porownuje dwa obrazy z prepare (drugi etap analizy) i ustawia motion_area.
+        :return: Lista prostokatow (x, y, w, h) ruchu we wspolrzednych klatki.
+        """
+
+        cv2.absdiff(previous, current, dst=self._delta)
+        cv2.threshold(self._delta, self.threshold, 255, cv2.THRESH_BINARY, dst=self._mask)
+        if self._roi_mask is not None:
+            cv2.bitwise_and(self._mask, self._roi_mask, dst=self._mask)
+        cv2.dilate(self._mask, None, dst=self._dilated, iterations=self._iterations)
+        contours, _ = cv2.findContours(self._dilated, cv2.RETR_EXTERNAL,
+                                       cv2.CHAIN_APPROX_SIMPLE)
+
+        boxes = []
+        total = 0.0
+        height, width = self._shape
+        for contour in contours:
+            area = cv2.contourArea(contour)
+            if area > self._min_pixels:
+                total += area
+                x, y, w, h = cv2.boundingRect(contour)
+                x0, y0 = int(x / self._scale), int(y / self._scale)
+                x1 = min(width, int(np.ceil((x + w) / self._scale)))
+                y1 = min(height, int(np.ceil((y + h) / self._scale)))
+                boxes.append((x0, y0, x1 - x0, y1 - y0))
+        self.motion_area = total / (self._dilated.shape[0] * self._dilated.shape[1])
+        return boxes
+
+
+def _format_time(moment):
+    """Zamienia sekundy od epoki na znacznik czasu UTC jak w bazie."""
+    return datetime.fromtimestamp(moment, timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+
+class MotionEvents:
+    """
+    Maszyna stanow zdarzen ruchu: idle -> active (ruch) -> cooldown (brak
+    ruchu) -> idle po cooldown sekundach bez ruchu; ruch w cooldown wraca
+    do active w ramach tego samego zdarzenia.
+    :param cooldown: Czas bez ruchu konczacy zdarzenie (s).
+    :param notify_interval: Minimalny odstep miedzy powiadomieniami (s).
+    """
+
+    def __init__(self, cooldown=MOTION_COOLDOWN, notify_interval=MOTION_NOTIFY_INTERVAL):
+        self.cooldown = cooldown
+        self.notify_interval = notify_interval
+        self.state = IDLE
+        self.event = None
+        self._count = 0
+        self._last_motion = None
+        self._last_notify = None
+
+    def update(self, boxes, area, now=None):
+        """
+        Uwzglednia wynik analizy klatki.
+        :param boxes: Prostokaty ruchu z MotionDetector.detect (None - klatka pominieta).
+        :param area: Pole ruchu jako ulamek klatki (MotionDetector.motion_area).
+        :param now: Chwila klatki w sekundach od epoki (domyslnie teraz).
+        :return: Lista (rodzaj, zdarzenie), gdzie rodzaj to "start" lub
+                 "update" (ruch trwa; nie czesciej niz notify_interval) albo
+                 "end" (zawsze; zdarzenie["notified"] mowi, czy bylo zgloszone).
+        """
+
+        if boxes is None:
+            return []
+        now = time.time() if now is None else now
+        notices = []
+        if boxes:
+            if self.state == IDLE:
+                self._count += 1
+                self.event = {"id": self._count, "start": _format_time(now), "end": None,
+                              "peak_area": 0.0, "boxes": [], "frames": 0, "notified": False}
+            self.state = ACTIVE
+            self._last_motion = now
+            self.event["frames"] += 1
+            if area >= self.event["peak_area"]:
+                self.event["peak_area"] = area
+                self.event["boxes"] = [list(box) for box in boxes]
+            if self._last_notify is None or now - self._last_notify >= self.notify_interval:
+                self._last_notify = now
+                notices.append(("update" if self.event["notified"] else "start",
+                                dict(self.event)))
+                self.event["notified"] = True
+        elif self.state == ACTIVE:
+            self.state = COOLDOWN
+        if self.state == COOLDOWN and now - self._last_motion >= self.cooldown:
+            self.state = IDLE
+            self.event["end"] = _format_time(self._last_motion)
+            notices.append(("end", dict(self.event)))
+            self.event = None
+        return notices
+
+
+def load_motion_config(path):
+    """
+    Wczytuje opcje MotionDetector z pliku JSON, np.
+    {"width": 320, "min_area": 0.05, "exclude": [[[0.6, 0], [1, 0], [1, 0.5]]]}.
+    :return: Slownik opcji (pusty, gdy plik nie istnieje).
+    :raises ValueError: Przy nieznanej opcji.
+    """
+
+    return load_options(path, MOTION_OPTIONS)
+
+
+def draw_boxes(frame, boxes):
+    """Zwraca kopie klatki z zielonymi prostokatami wokol wykrytego ruchu."""
+    annotated = frame.copy()
+    for (x, y, w, h) in boxes:
+        cv2.rectangle(annotated, (x, y), (x + w, y + h), (0, 255, 0), 2)
+    return annotated
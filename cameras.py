@@ -0,0 +1,304 @@
+"""
+Rejestr kamer: wiele zrodel obrazu, kazde z wlasnym potokiem.
+
+Kamery opisuje plik cameras.json (lista obiektow), np.
+    [{"id": "drzwi", "source": 0},
+     {"id": "ogrod", "source": "rtsp://192.168.1.20/stream", "motion": {"min_area": 0.05}},
+     {"id": "test", "source": "nagranie.avi", "delay": 0.1}]
+source to indeks kamery USB, plik wideo lub adres strumienia (wszystko,
+co otwiera cv2.VideoCapture). Bez pliku dziala jedna kamera "0" (USB 0),
+tak jak dotychczas. Pierwsza kamera na liscie jest kamera glowna
+(/video_feed, /latest_frame, zdjecia w katalogu phototrap).
+
+Kazda kamera ma wlasny watek odczytu, FrameRing, FrameBus, JpegCache
+i watki odbiorcow (wykrywanie ruchu, bufor klipow) uruchamiane przez
+spawn. Kamery nie dziela zadnej blokady ani kolejki: wolna kamera lub
+wolna analiza jednej kamery traci tylko wlasne klatki (subskrypcje
+LATEST_ONLY), a zawieszony odczyt blokuje tylko wlasny watek. Po bledzie
+lub koncu strumienia zrodlo jest otwierane ponownie (plik wideo odtwarzany
+jest w petli), a po nieudanym otwarciu - po retry sekundach.
+
+Czas CPU kamery to suma czasow jej watkow (zegar CPU watku odczytywany
+z zewnatrz przez time.pthread_getcpuclockid, a po zakonczeniu watku jego
+ostatni time.thread_time()) i kodowania JPEG dla klientow.
+Watek odczytu co SAMPLE_INTERVAL sekund zapisuje probke (czas, numer
+klatki, czas CPU); stats() podaje czas calkowity oraz udzial procentowy
+i liczbe klatek na sekunde z ostatnich STATS_WINDOW sekund, niezaleznie od
+tego, kto i jak czesto wywoluje stats().
+"""
+from collections import deque
+import json
+import os
+import re
+import threading
+import time
+
+import cv2
+
+from camera import (JPEG_QUALITY, MOTION_OPTIONS, RING_SLOTS, FrameBus, JpegCache,
+                    capture_loop)
+
+# Opcje kamery dozwolone w pliku konfiguracji (cameras.json)
+CAMERA_OPTIONS = ("id", "source", "motion", "delay", "retry", "slots", "quality")
+
+# Konfiguracja bez pliku cameras.json: jedna kamera USB 0
+DEFAULT_CAMERAS = [{"id": "0", "source": 0}]
+
+# Id kamery (czesc adresu /video_feed/<id> i nazwy podkatalogu zdjec)
+CAMERA_ID_RE = re.compile(r"[A-Za-z0-9_-]{1,32}")
+
+# Opoznienie miedzy klatkami (s) i czas do ponownego otwarcia zrodla po bledzie (s)
+CAPTURE_DELAY = 0.05
+RETRY_DELAY = 5.0
+
+# Probki do liczby klatek na sekunde i udzialu CPU: odstep i dlugosc okna (s)
+SAMPLE_INTERVAL = 1.0
+STATS_WINDOW = 10.0
+
+# Stany kamery
+STOPPED, CONNECTING, RUNNING, FAILED = "stopped", "connecting", "running", "failed"
+
+
+def parse_source(source):
+    """Zwraca indeks kamery USB (liczba lub napis z cyframi) albo sciezke / adres."""
+    if isinstance(source, bool) or not isinstance(source, (int, str)) or source == "":
+        raise ValueError(f"niepoprawne zrodlo kamery: {source!r}")
+    if isinstance(source, str) and source.isdigit():
+        return int(source)
+    return source
+
+
+def load_camera_config(path):
+    """
+    Wczytuje liste kamer z pliku JSON.
+    :return: Lista slownikow opcji kamer (DEFAULT_CAMERAS, gdy plik nie istnieje).
+    :raises ValueError: Przy nieznanej opcji, niepoprawnym lub powtorzonym id.
+    """
+
+    if not os.path.exists(path):
+        return [dict(camera) for camera in DEFAULT_CAMERAS]
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    if not isinstance(config, list) or not config:
+        raise ValueError(f"{os.path.basename(path)}: oczekiwano niepustej listy kamer")
+    seen = set()
+    for camera in config:
+        unknown = set(camera) - set(CAMERA_OPTIONS)
+        if unknown:
+            raise ValueError(f"nieznane opcje w {os.path.basename(path)}: "
+                             f"{', '.join(sorted(unknown))}")
+        camera_id = str(camera.get("id", ""))
+        if not CAMERA_ID_RE.fullmatch(camera_id) or camera_id in seen:
+            raise ValueError(f"niepoprawne lub powtorzone id kamery: {camera_id!r}")
+        seen.add(camera_id)
+        unknown = set(camera.get("motion", {})) - set(MOTION_OPTIONS)
+        if unknown:
+            raise ValueError(f"nieznane opcje wykrywania ruchu kamery {camera_id}: "
+                             f"{', '.join(sorted(unknown))}")
+    return config
+
+
+def thread_cpu(thread):
+    """Zwraca czas CPU watku w sekundach lub None (watek zakonczony, brak zegara)."""
+    if thread.ident is None or not thread.is_alive():
+        return None
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(thread.ident))
+    except (AttributeError, OSError):
+        return None
+
+
+class Camera:
+    """
+    Jedno zrodlo obrazu z wlasnym watkiem odczytu, FrameBus i JpegCache.
+    Atrybut recorder (ClipRecorder kamery) ustawia aplikacja.
+    :param camera_id: Id kamery.
+    :param source: Indeks kamery USB, plik wideo lub adres strumienia.
+    :param motion: Opcje MotionDetector tej kamery.
+    :param delay: Opoznienie miedzy klatkami (s).
+    :param retry: Czas do ponownego otwarcia zrodla po nieudanym otwarciu (s).
+    :param slots: Liczba slotow FrameRing.
+    :param quality: Jakosc JPEG podgladu.
+    """
+
+    def __init__(self, camera_id, source, motion=None, delay=CAPTURE_DELAY, retry=RETRY_DELAY,
+                 slots=RING_SLOTS, quality=JPEG_QUALITY):
+        self.id = camera_id
+        self.source = parse_source(source)
+        self.motion = dict(motion or {})
+        self.delay = delay
+        self.retry = retry
+        self.slots = slots
+        self.bus = FrameBus()
+        self.jpeg = JpegCache(self.bus, quality)
+        self.recorder = None
+        self.state = STOPPED
+        self._threads = {}
+        self._cpu = {}
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {"opened": 0, "failed": 0}
+        self._samples = deque([(time.monotonic(), 0, 0.0)],
+                              maxlen=int(STATS_WINDOW / SAMPLE_INTERVAL) + 1)
+
+    def start(self):
+        """Uruchamia watek odczytu kamery."""
+        self._stop.clear()
+        self._sample(force=True)
+        self.spawn("capture", self.capture)
+
+    def spawn(self, name, target, *args):
+        """
+        Uruchamia watek kamery (np. wykrywanie ruchu); jego czas CPU wlicza
+        sie do czasu kamery.
+        """
+
+        thread = threading.Thread(target=self._run, args=(name, target) + args,
+                                  name=f"{name}-{self.id}")
+        thread.daemon = True
+        with self._lock:
+            self._threads[name] = thread
+        thread.start()
+        return thread
+
+    def capture(self):
+        """Petla watku odczytu: otwiera zrodlo i publikuje klatki do zatrzymania kamery."""
+        reported = False
+        while not self._stop.is_set():
+            self.state = CONNECTING
+            camera = cv2.VideoCapture(self.source)
+            ring = None
+            try:
+                if camera.isOpened():
+                    self._count("opened")
+                    self.state = RUNNING
+                    # Klatki czytane wprost do bufora przydzielonego raz (bez kopii)
+                    ring = capture_loop(camera, self.bus, self.slots, self.delay, self._stop,
+                                        self._sample)
+            finally:
+                camera.release()
+            if ring is not None:
+                reported = False
+                continue
+            self.state = FAILED
+            self._count("failed")
+            if not reported:
+                reported = True
+                print(f"\n\033[91m{20 * '-'} Nie wykryto kamery {self.id} {20 * '-'}\033[0m\n")
+            self._stop.wait(self.retry)
+        self.state = STOPPED
+
+    def stop(self, timeout=None):
+        """Zatrzymuje odczyt i zamyka odbiorcow klatek (konczy watki odbiorcow)."""
+        self._stop.set()
+        with self._lock:
+            capture = self._threads.get("capture")
+        if capture is not None and capture is not threading.current_thread():
+            capture.join(timeout)
+        self.bus.close()
+
+    def stats(self):
+        """
+        Zwraca stan kamery, czas CPU watkow i kodowania JPEG (s), udzial CPU
+        (%) i klatki na sekunde z ostatnich STATS_WINDOW sekund oraz liczniki
+        FrameBus.
+        """
+
+        cpu = self._cpu_times()
+        jpeg = self.jpeg.stats()
+        cpu["jpeg"] = jpeg["cpu_s"]
+        bus = self.bus.stats()
+
+        now = time.monotonic()
+        total = sum(cpu.values())
+        with self._lock:
+            counters = dict(self._stats)
+            # Najstarsza probka z okna; bez nowych klatek (brak probek) - najnowsza
+            first_time, first_seq, first_total = next(
+                (sample for sample in self._samples if now - sample[0] <= STATS_WINDOW),
+                self._samples[-1])
+        interval = max(now - first_time, 1e-9)
+        return dict(counters, id=self.id, state=self.state, frames=bus["seq"],
+                    fps=round((bus["seq"] - first_seq) / interval, 2),
+                    cpu_s={name: round(value, 3) for name, value in cpu.items()},
+                    cpu_percent=round((total - first_total) / interval * 100, 1),
+                    subscribers=bus["subscribers"], jpeg=jpeg)
+
+    def _cpu_times(self):
+        """Zwraca czas CPU watkow kamery (s), odczytujac zegary dzialajacych watkow."""
+        with self._lock:
+            for name, thread in self._threads.items():
+                cpu = thread_cpu(thread)
+                if cpu is not None:
+                    self._cpu[name] = cpu
+            return dict(self._cpu)
+
+    def _sample(self, force=False):
+        """Zapisuje probke do stats() najwyzej co SAMPLE_INTERVAL s (watek odczytu)."""
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._samples[-1][0] < SAMPLE_INTERVAL:
+                return
+        total = sum(self._cpu_times().values()) + self.jpeg.stats()["cpu_s"]
+        sample = (now, self.bus.stats()["seq"], total)
+        with self._lock:
+            self._samples.append(sample)
+
+    def _run(self, name, target, *args):
+        """Wykonuje watek kamery i zapisuje jego czas CPU po zakonczeniu."""
+        try:
+            target(*args)
+        finally:
+            with self._lock:
+                self._cpu[name] = time.thread_time()
+
+    def _count(self, name, value=1):
+        """Zwieksza licznik o podana wartosc."""
+        with self._lock:
+            self._stats[name] += value
+
+
+class CameraRegistry:
+    """
+    Kamery aplikacji w kolejnosci z konfiguracji; pierwsza jest kamera glowna.
+    :param config: Lista opcji kamer (load_camera_config).
+    :param motion: Wspolne opcje MotionDetector (motion.json), nadpisywane
+                   przez opcje "motion" kamery.
+    """
+
+    def __init__(self, config, motion=None):
+        self._cameras = {}
+        for options in config:
+            options = dict(options)
+            camera_id = str(options.pop("id"))
+            options["motion"] = dict(motion or {}, **options.get("motion", {}))
+            self._cameras[camera_id] = Camera(camera_id, **options)
+
+    @property
+    def primary(self):
+        """Kamera glowna (pierwsza w konfiguracji)."""
+        return next(iter(self._cameras.values()))
+
+    def get(self, camera_id):
+        """Zwraca kamere o podanym id lub None."""
+        return self._cameras.get(camera_id)
+
+    def __iter__(self):
+        return iter(list(self._cameras.values()))
+
+    def __len__(self):
+        return len(self._cameras)
+
+    def start(self):
+        """Uruchamia watki odczytu wszystkich kamer."""
+        for camera in self:
+            camera.start()
+
+    def stop(self, timeout=None):
+        """Zatrzymuje wszystkie kamery."""
+        for camera in self:
+            camera.stop(timeout)
+
+    def stats(self):
+        """Zwraca statystyki kamer wedlug id."""
+        return {camera.id: camera.stats() for camera in self}
@@ -0,0 +1,290 @@
+"""
+Nagrywanie klipow wideo zdarzen ruchu z czasem przed i po zdarzeniu.
+
+ClipRecorder trzyma w pamieci ostatnie pre_roll sekund klatek jako bajty
+JPEG (te same, ktore JpegCache koduje dla podgladu, wiec nagrywanie nie
+dodaje kodowania). Bufor jest ograniczony czasem i liczba bajtow
+(buffer_bytes), a przy przekroczeniu usuwane sa najstarsze klatki.
+
+Gdy detect_motion zglasza ruch (trigger), klip zaczyna sie od klatek
+z bufora i rosnie o kolejne klatki; po koncu zdarzenia (finish) nagrywane
+jest jeszcze post_roll sekund. Nowy ruch w tym czasie przedluza ten sam
+klip. Klip dluzszy niz max_seconds lub wiekszy niz clip_bytes jest
+zamykany wczesniej.
+
+Zamkniety klip trafia do ograniczonej kolejki (queue_size klipow), a watek
+zapisujacy dekoduje klatki i zapisuje je przez cv2.VideoWriter, wiec odczyt
+kamery i wykrywanie ruchu nigdy nie czekaja na kodowanie wideo. Przy pelnej
+kolejce klip jest odrzucany (licznik dropped).
+
+Gorna granica pamieci (bajty JPEG, bez narzutu obiektow):
+buffer_bytes + clip_bytes * (queue_size + 2) - bufor, nagrywany klip,
+klipy w kolejce i klip zapisywany przez watek. Klatki wspolne dla bufora
+i klipu nie sa kopiowane.
+"""
+from collections import deque
+import os
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# Domyslny czas nagrania przed i po zdarzeniu (s)
+PRE_ROLL = 5.0
+POST_ROLL = 5.0
+
+# Limity pamieci bufora i jednego klipu (bajty JPEG)
+BUFFER_BYTES = 16 * 1024 * 1024
+CLIP_BYTES = 48 * 1024 * 1024
+
+# Maksymalna dlugosc klipu (s) i liczba klipow czekajacych na zapis
+MAX_CLIP_SECONDS = 120.0
+CLIP_QUEUE_SIZE = 2
+
+# Kodek klipow (Motion JPEG w kontenerze AVI jest dostepny na kazdym Pi)
+CLIP_CODEC = "MJPG"
+
+# Liczba klatek na sekunde, gdy nie da sie jej wyznaczyc z czasow klatek
+CLIP_FPS = 10.0
+
+# Opcje ClipRecorder dozwolone w pliku konfiguracji (clips.json)
+CLIP_OPTIONS = ("pre_roll", "post_roll", "buffer_bytes", "clip_bytes", "max_seconds",
+                "queue_size")
+
+# Znacznik konca pracy watku zapisujacego
+_STOP = object()
+
+
+class _Clip:
+    """Nagrywany klip: sciezka, klatki (czas, JPEG) i chwila zakonczenia."""
+
+    __slots__ = ("path", "frames", "bytes", "stop_at")
+
+    def __init__(self, path, frames):
+        self.path = path
+        self.frames = list(frames)
+        self.bytes = sum(len(jpeg) for _, jpeg in self.frames)
+        self.stop_at = None
+
+
+class ClipRecorder:
+    """
+    Bufor ostatnich klatek i nagrywanie klipow zdarzen ruchu.
+    :param pre_roll: Czas nagrania przed zdarzeniem (s).
+    :param post_roll: Czas nagrania po koncu zdarzenia (s).
+    :param buffer_bytes: Limit bajtow JPEG w buforze pre_roll.
+    :param clip_bytes: Limit bajtow JPEG jednego klipu.
+    :param max_seconds: Maksymalna dlugosc klipu (s).
+    :param queue_size: Maksymalna liczba klipow czekajacych na zapis.
+    """
+
+    def __init__(self, pre_roll=PRE_ROLL, post_roll=POST_ROLL, buffer_bytes=BUFFER_BYTES,
+                 clip_bytes=CLIP_BYTES, max_seconds=MAX_CLIP_SECONDS,
+                 queue_size=CLIP_QUEUE_SIZE):
+        self.pre_roll = pre_roll
+        self.post_roll = post_roll
+        self.buffer_bytes = buffer_bytes
+        self.clip_bytes = clip_bytes
+        self.max_seconds = max_seconds
+        self._frames = deque()
+        self._bytes = 0
+        self._clip = None
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._closed = False
+        self._listeners = []
+        self._stats = {"frames": 0, "clips": 0, "written": 0, "dropped": 0, "failed": 0,
+                       "cut": 0, "last_write_ms": 0.0}
+
+    def add_listener(self, callback):
+        """
+        Rejestruje funkcje wywolywana po zapisaniu kazdego klipu (w watku
+        zapisujacym). Funkcja dostaje sciezke pliku i liczbe klatek.
+        """
+
+        self._listeners.append(callback)
+
+    def start(self):
+        """Uruchamia watek zapisujacy klipy."""
+        self._thread = threading.Thread(target=self._run, name="clip-writer")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def add(self, jpeg, now=None):
+        """
+        Dodaje klatke JPEG do bufora i do nagrywanego klipu.
+        :param now: Chwila klatki w sekundach (domyslnie time.monotonic()).
+        """
+
+        now = time.monotonic() if now is None else now
+        finished = None
+        with self._lock:
+            self._stats["frames"] += 1
+            self._frames.append((now, jpeg))
+            self._bytes += len(jpeg)
+            while self._frames and (self._bytes > self.buffer_bytes
+                                    or now - self._frames[0][0] > self.pre_roll):
+                self._bytes -= len(self._frames.popleft()[1])
+
+            clip = self._clip
+            if clip is not None:
+                if clip.stop_at is not None and now > clip.stop_at:
+                    finished, self._clip = clip, None
+                else:
+                    clip.frames.append((now, jpeg))
+                    clip.bytes += len(jpeg)
+                    if (clip.bytes >= self.clip_bytes
+                            or now - clip.frames[0][0] >= self.max_seconds):
+                        self._stats["cut"] += 1
+                        finished, self._clip = clip, None
+        if finished is not None:
+            self._submit(finished)
+
+    def trigger(self, path):
+        """
+        Zaczyna klip (od klatek z bufora) zapisywany pod path albo przedluza
+        nagrywany klip, jesli jest w trakcie post_roll.
+        :return: True, jesli zaczeto nowy klip.
+        """
+
+        with self._lock:
+            if self._clip is not None:
+                self._clip.stop_at = None
+                return False
+            self._clip = _Clip(path, self._frames)
+            self._stats["clips"] += 1
+            return True
+
+    def current(self):
+        """Zwraca sciezke nagrywanego klipu lub None."""
+        with self._lock:
+            return self._clip.path if self._clip is not None else None
+
+    def finish(self, now=None):
+        """Konczy nagrywany klip po post_roll sekundach od teraz."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._clip is not None:
+                self._clip.stop_at = now + self.post_roll
+
+    def stop(self, timeout=None):
+        """Zamyka nagrywany klip, zapisuje klipy z kolejki i czeka na watek."""
+        if self._closed:
+            return
+        with self._lock:
+            clip, self._clip = self._clip, None
+        if clip is not None:
+            self._submit(clip)
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        else:
+            # Bez watku zapisujacego klipy zapisywane sa w watku wywolujacym
+            while True:
+                try:
+                    self._write(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+    def stats(self):
+        """Zwraca liczniki, stan bufora i nagrywanego klipu oraz glebokosc kolejki."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["buffered_frames"] = len(self._frames)
+            stats["buffered_bytes"] = self._bytes
+            stats["recording"] = self._clip is not None
+            stats["recording_bytes"] = self._clip.bytes if self._clip is not None else 0
+        stats["depth"] = self._queue.qsize()
+        return stats
+
+    def _submit(self, clip):
+        """Przekazuje zamkniety klip do zapisu; przy pelnej kolejce go odrzuca."""
+        if self._closed:
+            self._count("dropped")
+            return
+        try:
+            self._queue.put_nowait(clip)
+        except queue.Full:
+            print(f"Pominieto klip {clip.path} (pelna kolejka zapisu)")
+            self._count("dropped")
+
+    def _count(self, name, value=1):
+        """Zwieksza licznik o podana wartosc."""
+        with self._lock:
+            self._stats[name] += value
+
+    def _run(self):
+        """Petla watku zapisujacego klipy."""
+        while True:
+            clip = self._queue.get()
+            if clip is _STOP:
+                break
+            self._write(clip)
+
+    def _write(self, clip):
+        """Dekoduje klatki klipu i zapisuje je przez cv2.VideoWriter."""
+        if not clip.frames:
+            return
+        start = time.perf_counter()
+        root, ext = os.path.splitext(clip.path)
+        temporary = f"{root}.part{ext}"
+        duration = clip.frames[-1][0] - clip.frames[0][0]
+        fps = (len(clip.frames) - 1) / duration if duration > 0 else CLIP_FPS
+        writer = None
+        try:
+            for _, jpeg in clip.frames:
+                frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+                if frame is None:
+                    continue
+                if writer is None:
+                    height, width = frame.shape[:2]
+                    writer = cv2.VideoWriter(temporary, cv2.VideoWriter_fourcc(*CLIP_CODEC),
+                                             fps, (width, height))
+                    if not writer.isOpened():
+                        raise OSError(f"nie mozna otworzyc {temporary} do zapisu")
+                writer.write(frame)
+            if writer is None:
+                raise ValueError("klip bez poprawnych klatek")
+            writer.release()
+            writer = None
+            os.replace(temporary, clip.path)
+        except (OSError, ValueError, cv2.error) as e:
+            print(f"Blad zapisu klipu {clip.path}: {e}")
+            if writer is not None:
+                writer.release()
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            self._count("failed")
+            return
+
+        with self._lock:
+            self._stats["written"] += 1
+            self._stats["last_write_ms"] = (time.perf_counter() - start) * 1000
+        for callback in self._listeners:
+            try:
+                callback(clip.path, len(clip.frames))
+            except Exception as e:  # pylint: disable=broad-except
+                print(f"Blad sluchacza zapisu klipow: {e}")
+
+
+def record_frames(bus, cache, recorder):
+    """
+    Przekazuje kazda nowa klatke z bus do recorder jako JPEG z cache
+    (JpegCache), dopoki bus nie zostanie zamkniety.
+    """
+
+    with bus.subscribe() as frames:
+        last_seq = 0
+        while True:
+            item = frames.get()
+            if item is None:
+                break
+            item[1].release()
+            seq, jpeg = cache.get()
+            if seq > last_seq:
+                last_seq = seq
+                recorder.add(jpeg)
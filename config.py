@@ -0,0 +1,29 @@
+"""
+Wczytywanie opcji podsystemow z plikow JSON obok aplikacji.
+
+Kazdy podsystem ma opcjonalny plik konfiguracji (motion.json, clips.json,
+motion_pool.json, retention.json) z obiektem JSON, ktorego klucze musza
+nalezec do listy opcji podsystemu (np. clips.CLIP_OPTIONS). Brak pliku
+oznacza ustawienia domyslne.
+"""
+import json
+import os
+
+
+def load_options(path, options):
+    """
+    Wczytuje opcje podsystemu z pliku JSON, np. {"workers": 3}.
+    :param options: Dozwolone opcje (np. clips.CLIP_OPTIONS dla clips.json).
+    :return: Slownik opcji (pusty, gdy plik nie istnieje).
+    :raises ValueError: Przy nieznanej opcji.
+    """
+
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    unknown = set(config) - set(options)
+    if unknown:
+        raise ValueError(f"nieznane opcje w {os.path.basename(path)}: "
+                         f"{', '.join(sorted(unknown))}")
+    return config
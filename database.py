@@ -0,0 +1,453 @@
+"""
+Wspolna warstwa dostepu do bazy danych SQLite dla aplikacji Flask i FastAPI.
+
+Zamiast otwierac nowe polaczenie przy kazdym zapytaniu, modul utrzymuje
+niewielka pule dlugo zyjacych polaczen. Kazde polaczenie pracuje w trybie
+WAL (czytelnicy nie blokuja zapisujacych), ma ustawione pragmy synchronous,
+cache_size i busy_timeout oraz wlasny cache przygotowanych zapytan
+(sqlite3 ponownie wykorzystuje skompilowane zapytanie o identycznym tekscie).
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import asyncio
+import functools
+import os
+import queue
+import sqlite3
+import threading
+
+# Liczba skompilowanych zapytan trzymanych w pamieci kazdego polaczenia
+STATEMENT_CACHE_SIZE = 128
+
+# Domyslna liczba polaczen w puli
+POOL_SIZE = 4
+
+# Maksymalna liczba operacji czekajacych na watek DbExecutor
+MAX_PENDING = 64
+
+# Pragmy ustawiane na kazdym nowym polaczeniu
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    # W trybie WAL synchronous=NORMAL jest bezpieczne przy awarii aplikacji,
+    # a fsync wykonywany jest tylko przy checkpoincie
+    "PRAGMA synchronous=NORMAL",
+    # Ujemna wartosc oznacza rozmiar w KiB (tu ok. 8 MB na polaczenie)
+    "PRAGMA cache_size=-8000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+# Format znacznika czasu zgodny z CURRENT_TIMESTAMP w SQLite (UTC)
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Kolumny tabel pomiarowych (bez id) w kolejnosci zgodnej ze schematem
+TABLE_COLUMNS = {
+    "weather_control": ("timestamp", "temperature", "humidity"),
+    "air_control": ("timestamp", "pm25", "pm10", "temperature", "humidity", "air_quality"),
+    "water_control": ("timestamp", "ph", "adjustment", "current_ph", "temperature"),
+}
+
+# Gorna granica zakresu czasu; kolumna timestamp (DATETIME) ma powinowactwo
+# NUMERIC, wiec granica nie moze byc napisem zamienialnym na liczbe
+MAX_TIMESTAMP = "9999-12-31 23:59:59"
+
+# Domyslny i maksymalny rozmiar strony historii
+PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+
+def utc_timestamp():
+    """Zwraca biezacy czas UTC w formacie kolumny timestamp."""
+    return datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+
+def epoch_seconds(timestamp):
+    """Zamienia znacznik czasu UTC z kolumny timestamp na sekundy od epoki."""
+    return datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc).timestamp()
+
+
+def parse_timestamp(value):
+    """
+    Sprawdza i normalizuje znacznik czasu podany przez klienta.
+    Akceptuje format 'RRRR-MM-DD GG:MM:SS', 'RRRR-MM-DDTGG:MM:SS' lub sama date.
+    :raises ValueError: Jesli wartosc nie jest poprawnym znacznikiem czasu.
+    """
+
+    value = value.strip().replace("T", " ")
+    try:
+        return datetime.strptime(value, TIMESTAMP_FORMAT).strftime(TIMESTAMP_FORMAT)
+    except ValueError:
+        return datetime.strptime(value, "%Y-%m-%d").strftime(TIMESTAMP_FORMAT)
+
+
+def parse_limit(value, default=PAGE_LIMIT, maximum=MAX_PAGE_LIMIT):
+    """
+    Zamienia parametr limit na liczbe z zakresu 1..maximum.
+    :raises ValueError: Jesli wartosc nie jest dodatnia liczba calkowita.
+    """
+
+    if value is None or value == "":
+        return default
+    limit = int(value)
+    if limit < 1:
+        raise ValueError("limit musi byc dodatni")
+    return min(limit, maximum)
+
+
+def fetch_page(db, table, before=None, limit=PAGE_LIMIT, start=None):
+    """
+    Zwraca strone wierszy tabeli od najnowszych (stronicowanie kluczem).
+    Koszt nie zalezy od rozmiaru tabeli: zapytanie schodzi po indeksie
+    timestamp od miejsca wskazanego przez kursor i czyta tylko limit wierszy.
+    :param db: Obiekt Database.
+    :param table: Nazwa tabeli pomiarowej.
+    :param before: Kursor - id wiersza (zwracane sa starsze wiersze)
+                   lub znacznik czasu (zwracane sa wiersze sprzed tej chwili).
+    :param limit: Maksymalna liczba wierszy.
+    :param start: Opcjonalny najwczesniejszy znacznik czasu (wlacznie).
+    :return: (wiersze, kursor nastepnej strony lub None).
+    :raises ValueError: Jesli tabela lub kursor sa niepoprawne.
+    """
+
+    if table not in TABLE_COLUMNS:
+        raise ValueError(f"nieznana tabela: {table}")
+
+    # Pusty napis jest mniejszy od kazdego znacznika czasu
+    start = "" if start is None or start == "" else parse_timestamp(start)
+
+    if before is None or before == "":
+        rows = db.query(f"""SELECT * FROM {table}
+                        WHERE timestamp >= ?
+                        ORDER BY timestamp DESC, id DESC LIMIT ?""", (start, limit))
+    elif str(before).isdigit():
+        rows = db.query(f"""SELECT * FROM {table}
+                        WHERE (timestamp, id) <
+                              (SELECT timestamp, id FROM {table} WHERE id = ?)
+                        AND timestamp >= ?
+                        ORDER BY timestamp DESC, id DESC LIMIT ?""",
+                        (int(before), start, limit))
+    else:
+        rows = db.query(f"""SELECT * FROM {table}
+                        WHERE timestamp < ? AND timestamp >= ?
+                        ORDER BY timestamp DESC, id DESC LIMIT ?""",
+                        (parse_timestamp(before), start, limit))
+
+    next_before = rows[-1][0] if len(rows) == limit else None
+    return rows, next_before
+
+
+def connect(db_path):
+    """
+    Otwiera nowe polaczenie z baza danych i ustawia pragmy wydajnosciowe.
+    Polaczenie moze byc uzywane przez rozne watki (nigdy jednoczesnie).
+    :param db_path: Sciezka do pliku bazy danych.
+    :return: Obiekt sqlite3.Connection.
+    """
+
+    conn = sqlite3.connect(db_path,
+                           timeout=5.0,
+                           check_same_thread=False,
+                           cached_statements=STATEMENT_CACHE_SIZE)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class Database:
+    """
+    Pula dlugo zyjacych polaczen z baza danych SQLite.
+    Polaczenia tworzone sa leniwie (maksymalnie pool_size) i zwracane
+    do puli po uzyciu. Watek, ktory nie dostanie wolnego polaczenia,
+    czeka az inny watek je zwolni.
+    """
+
+    def __init__(self, db_path, pool_size=POOL_SIZE):
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self._pool = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        """Pobiera wolne polaczenie z puli lub tworzy nowe."""
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.pool_size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            try:
+                return connect(self.db_path)
+            except sqlite3.Error:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._pool.get()
+
+    @contextmanager
+    def connection(self):
+        """
+        Udostepnia polaczenie z puli na czas bloku with.
+        Niezatwierdzona transakcja jest wycofywana przed zwrotem do puli.
+        """
+
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._pool.put(conn)
+
+    def query(self, sql, params=()):
+        """Wykonuje zapytanie SELECT i zwraca wszystkie wiersze."""
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def query_one(self, sql, params=()):
+        """Wykonuje zapytanie SELECT i zwraca pierwszy wiersz lub None."""
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    def execute(self, sql, params=()):
+        """
+        Wykonuje pojedyncze zapytanie modyfikujace w osobnej transakcji.
+        :return: Identyfikator ostatnio wstawionego wiersza.
+        """
+
+        with self.connection() as conn:
+            with conn:
+                return conn.execute(sql, params).lastrowid
+
+    def executemany(self, sql, rows):
+        """
+        Wykonuje zapytanie dla wielu zestawow parametrow w jednej transakcji.
+        :return: Liczba zmienionych wierszy.
+        """
+
+        with self.connection() as conn:
+            with conn:
+                return conn.executemany(sql, rows).rowcount
+
+    def close(self):
+        """Zamyka wszystkie polaczenia znajdujace sie w puli."""
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+class DbExecutor:
+    """
+    Wykonuje blokujace operacje na bazie poza petla zdarzen asyncio (FastAPI).
+    Liczba watkow odpowiada rozmiarowi puli polaczen, wiec zaden watek nie
+    czeka na polaczenie, a wolne zapytanie zajmuje tylko jeden watek zamiast
+    calej petli. Semafor ogranicza liczbe oczekujacych operacji: kolejne
+    korutyny czekaja (bez blokowania petli) zamiast rozbudowywac kolejke.
+    """
+
+    def __init__(self, workers=POOL_SIZE, max_pending=MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db")
+        self._semaphore = None
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "running": 0, "max_running": 0}
+
+    async def run(self, func, *args, **kwargs):
+        """Wywoluje func(*args, **kwargs) w watku puli i zwraca wynik."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.workers + self.max_pending)
+        loop = asyncio.get_running_loop()
+        async with self._semaphore:
+            return await loop.run_in_executor(
+                self._executor, functools.partial(self._call, func, *args, **kwargs))
+
+    def _call(self, func, *args, **kwargs):
+        """Wykonuje operacje w watku puli i aktualizuje liczniki."""
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["running"] += 1
+            self._stats["max_running"] = max(self._stats["max_running"],
+                                             self._stats["running"])
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._stats["running"] -= 1
+
+    def stats(self):
+        """Zwraca kopie licznikow."""
+        with self._lock:
+            return dict(self._stats)
+
+    def shutdown(self):
+        """Czeka na zakonczenie operacji i zamyka watki."""
+        self._executor.shutdown(wait=True)
+
+
+def init_db(db_path):
+    """Inicjalizacja bazy danych."""
+
+    print(f"db_path: {os.path.abspath(db_path)}")
+
+    if not os.path.exists(db_path):
+        print("Baza danych nie istnieje. Tworze nowa...")
+
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        # auto_vacuum=INCREMENTAL pozwala zmniejszac plik po usunieciu danych
+        # (modul retention). Istniejaca baze trzeba jednorazowo przebudowac.
+        if cursor.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            cursor.execute("VACUUM")
+
+        # Tryb WAL jest zapisywany w pliku bazy i obowiazuje dla wszystkich polaczen
+        cursor.execute("PRAGMA journal_mode=WAL")
+
+        # Tworzenie tabeli dla weather control
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS weather_control (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                temperature REAL,
+                humidity REAL
+            )
+        """)
+
+        # Tworzenie tabeli dla air control
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS air_control (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                pm25 REAL,
+                pm10 REAL,
+                temperature REAL,
+                humidity REAL,
+                air_quality TEXT
+            )
+        """)
+
+        # Tworzenie tabeli dla water control
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS water_control (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                ph REAL,
+                adjustment TEXT,
+                current_ph REAL,
+                temperature REAL
+            )
+        """)
+
+        # Agregaty min/max/suma/liczba pomiarow w przedzialach minuta/godzina/dzien
+        # (utrzymywane przyrostowo przez modul rollups)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS rollups (
+                source TEXT NOT NULL,
+                resolution TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                field TEXT NOT NULL,
+                value_count INTEGER NOT NULL,
+                value_sum REAL NOT NULL,
+                value_min REAL,
+                value_max REAL,
+                PRIMARY KEY (source, resolution, bucket, field)
+            ) WITHOUT ROWID
+        """)
+
+        # Reguly alertow progowych (modul alerts)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS alert_rules (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT UNIQUE,
+                source TEXT NOT NULL,
+                field TEXT NOT NULL,
+                op TEXT NOT NULL,
+                threshold REAL NOT NULL,
+                hysteresis REAL NOT NULL DEFAULT 0,
+                min_duration REAL NOT NULL DEFAULT 0,
+                created DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        # Zdarzenia alertow: wlaczenie (triggered) i wylaczenie (resolved)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS alerts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME NOT NULL,
+                rule_id INTEGER,
+                source TEXT NOT NULL,
+                field TEXT NOT NULL,
+                value REAL,
+                threshold REAL,
+                state TEXT NOT NULL,
+                message TEXT
+            )
+        """)
+        cursor.execute("""CREATE INDEX IF NOT EXISTS idx_alerts_timestamp
+                       ON alerts (timestamp)""")
+
+        # Anomalie wykryte w strumieniu pomiarow (modul anomalies)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS anomalies (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME NOT NULL,
+                source TEXT NOT NULL,
+                field TEXT NOT NULL,
+                value REAL,
+                detector TEXT NOT NULL,
+                score REAL,
+                message TEXT
+            )
+        """)
+        cursor.execute("""CREATE INDEX IF NOT EXISTS idx_anomalies_timestamp
+                       ON anomalies (timestamp)""")
+
+        # Zdarzenia ruchu z kamery (modul motion_catalog); timestamp to poczatek
+        # zdarzenia, boxes i photos to listy JSON
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS motion_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME NOT NULL,
+                end_time DATETIME,
+                peak_area REAL,
+                boxes TEXT,
+                frames INTEGER,
+                photos TEXT,
+                clip TEXT,
+                source TEXT NOT NULL,
+                camera TEXT
+            )
+        """)
+        # Kolumna camera (modul cameras) dodawana jednorazowo w starszych bazach
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(motion_events)")]
+        if "camera" not in columns:
+            cursor.execute("ALTER TABLE motion_events ADD COLUMN camera TEXT")
+        cursor.execute("""CREATE INDEX IF NOT EXISTS idx_motion_events_timestamp
+                       ON motion_events (timestamp)""")
+
+        # Indeksy po znaczniku czasu dla sortowania i stronicowania historii
+        for table in TABLE_COLUMNS:
+            cursor.execute(f"""CREATE INDEX IF NOT EXISTS idx_{table}_timestamp
+                           ON {table} (timestamp)""")
+
+        conn.commit()
+        conn.close()
+        print(f"Baza danych zostala zainicjalizowana. w folderze {db_path}")
+    except sqlite3.Error as e:
+        print(f"Wystapil blad podczas inicjalizacji bazy danych: {e}")
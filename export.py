@@ -0,0 +1,76 @@
+"""
+Strumieniowy eksport pomiarow w formacie NDJSON lub CSV.
+
+Wiersze czytane sa z kursora porcjami (fetchmany) i od razu zamieniane na
+fragmenty odpowiedzi, wiec zuzycie pamieci nie zalezy od rozmiaru tabeli,
+a pierwszy bajt trafia do klienta zaraz po odczytaniu pierwszej porcji.
+Eksport korzysta z osobnego polaczenia, zamykanego po zakonczeniu lub
+przerwaniu transmisji przez klienta.
+"""
+import csv
+import io
+import json
+
+from database import MAX_TIMESTAMP, TABLE_COLUMNS, connect, parse_timestamp
+
+# Format -> typ MIME odpowiedzi
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Liczba wierszy pobieranych z kursora w jednej porcji
+FETCH_SIZE = 1000
+
+
+def open_export(db_path, table, fmt="ndjson", start=None, end=None, fetch_size=FETCH_SIZE):
+    """
+    Sprawdza parametry eksportu i zwraca generator fragmentow odpowiedzi.
+    Walidacja odbywa sie od razu, zeby trasa mogla zwrocic blad 400
+    zanim zacznie wysylac strumien.
+    :param table: Nazwa tabeli pomiarowej.
+    :param fmt: ndjson lub csv.
+    :param start: Poczatek zakresu czasu (wlacznie), opcjonalnie.
+    :param end: Koniec zakresu czasu (wylacznie), opcjonalnie.
+    :return: Generator obiektow bytes.
+    :raises ValueError: Przy nieznanej tabeli, formacie lub znaczniku czasu.
+    """
+
+    if table not in TABLE_COLUMNS:
+        raise ValueError(f"nieznana tabela: {table}")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"nieznany format: {fmt}")
+    start = "" if start is None or start == "" else parse_timestamp(start)
+    end = MAX_TIMESTAMP if end is None or end == "" else parse_timestamp(end)
+    return _stream(db_path, table, fmt, start, end, fetch_size)
+
+
+def _stream(db_path, table, fmt, start, end, fetch_size):
+    """Generator fragmentow eksportu; czyta kursor porcjami po fetch_size."""
+    columns = ("id",) + TABLE_COLUMNS[table]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+
+    if fmt == "csv":
+        writer.writerow(columns)
+        yield buffer.getvalue().encode()
+
+    conn = connect(db_path)
+    try:
+        cursor = conn.execute(f"""SELECT * FROM {table}
+                              WHERE timestamp >= ? AND timestamp < ?
+                              ORDER BY timestamp, id""", (start, end))
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            if fmt == "csv":
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(rows)
+                chunk = buffer.getvalue()
+            else:
+                chunk = "".join(json.dumps(dict(zip(columns, row))) + "\n" for row in rows)
+            yield chunk.encode()
+    finally:
+        conn.close()
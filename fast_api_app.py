@@ -1,32 +1,104 @@
 """ Fast Api version of the project """
+import asyncio
+import json
 import os
 from datetime import datetime
 
-import sqlite3
 import threading
-from threading import Lock
 import time
 import random
 import cv2
 import socketio
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse, StreamingResponse
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import (FileResponse, HTMLResponse, JSONResponse, Response,
+                               StreamingResponse)
 from fastapi.templating import Jinja2Templates
 from starlette.requests import Request
 from fastapi.staticfiles import StaticFiles
+from alerts import AlertEngine, parse_alert_request
+from anomalies import AnomalyDetector
+from camera import MotionDetector, MotionEvents, draw_boxes, load_motion_config, mjpeg_part
+from cameras import CameraRegistry, load_camera_config
+from clips import CLIP_OPTIONS, ClipRecorder, record_frames
+from config import load_options
+from database import Database, DbExecutor, fetch_page, init_db, parse_limit
+from export import EXPORT_FORMATS, open_export
+from ingest import IngestQueue, parse_batch
+from latest import LatestReadings
+from motion_catalog import MotionCatalog, event_file
+from motion_pool import POOL_OPTIONS, MotionPool
+from online_stats import OnlineStats
+from photos import PhotoWriter
+from query import run_query
+from response_cache import ResponseCache, etag_matches
+from retention import RETENTION_OPTIONS, RetentionEngine
+from rollups import history, update_rollups
+from thumbnails import (CACHE_CONTROL, MOSAIC_CACHE_CONTROL, THUMB_DIR, ThumbnailPool,
+                        file_etag)
 
 # Konfiguracja FastAPI
 app=FastAPI()
 sio=socketio.AsyncServer(async_mode='asgi')
 app.add_route("/socket.io/", socketio.ASGIApp(sio))
 
-# Global variable to store the last frame
-camera_lock=Lock()
-LAST_FRAME=None
+# Zdjecia z fotopulapki zapisywane w tle (kodowanie, zapis, fsync partiami)
+photo_writer=PhotoWriter()
+# Miniatury zdjec tworzone w tle zaraz po zapisie zdjecia (galeria zdarzen)
+thumbnails=ThumbnailPool()
+photo_writer.add_listener(thumbnails.submit)
 
 # Konfiguracja bazy danych
 base_dir=os.path.dirname(os.path.abspath(__file__))
 db_path=os.path.join(base_dir, "measurements.db")
+# Katalog zdjec i klipow kamery glownej (pozostale kamery w podkatalogach z ich id)
+photo_root="/home/raspi/Desktop/ProjektZaliczeniowy/Projekt/phototrap/fast_api"
+# Kamery z cameras.json (bez pliku jedna kamera USB 0), kazda z wlasnym odczytem,
+# FrameBus i JpegCache; opcje wykrywania ruchu z motion.json i opcji kamery
+cameras=CameraRegistry(load_camera_config(os.path.join(base_dir, "cameras.json")),
+                       load_motion_config(os.path.join(base_dir, "motion.json")))
+# Klipy zdarzen ruchu z nagraniem przed i po zdarzeniu; limity pamieci z clips.json
+# (na kazda kamere)
+clip_options=load_options(os.path.join(base_dir, "clips.json"), CLIP_OPTIONS)
+for camera in cameras:
+    camera.recorder=ClipRecorder(**clip_options)
+# Kamera glowna: /video_feed, /latest_frame i zdjecia w katalogu phototrap/fast_api
+frame_bus=cameras.primary.bus
+jpeg_cache=cameras.primary.jpeg
+clip_recorder=cameras.primary.recorder
+# Analiza ruchu w procesach roboczych (motion_pool.json, np. {"workers": 3}); bez pliku
+# kazda kamera analizuje klatki we wlasnym watku
+pool_options=load_options(os.path.join(base_dir, "motion_pool.json"), POOL_OPTIONS)
+motion_pool=MotionPool(**pool_options) if pool_options.get("workers") else None
+db=Database(db_path)
+# Zapytania do bazy wykonywane sa w watkach poza petla zdarzen
+db_executor=DbExecutor(db.pool_size)
+ingest=IngestQueue(db_path)
+ingest.add_batch_hook(update_rollups)
+latest=LatestReadings(db)
+ingest.add_listener(latest.extend)
+responses=ResponseCache(latest)
+ingest.add_listener(responses.invalidate)
+online_stats=OnlineStats()
+ingest.add_listener(online_stats.update)
+
+def emit_threadsafe(event, data):
+    """
+    Wysyla zdarzenie Socket.IO z dowolnego watku (np. watku zapisu) przez
+    petle zdarzen serwera (app.state.loop, ustawiana przy starcie).
+    """
+    loop=getattr(app.state, "loop", None)
+    if loop is not None:
+        asyncio.run_coroutine_threadsafe(sio.emit(event, data), loop)
+
+alert_engine=AlertEngine(db, emit=emit_threadsafe)
+ingest.add_listener(alert_engine.evaluate)
+anomaly_detector=AnomalyDetector(db, emit=emit_threadsafe)
+ingest.add_listener(anomaly_detector.update)
+# Usuwanie przeterminowanych danych; dni przechowywania tabel z retention.json
+retention_policies=load_options(os.path.join(base_dir, "retention.json"), RETENTION_OPTIONS)
+retention=RetentionEngine(db_path, retention_policies)
+# Katalog zdarzen ruchu (tabela motion_events) dla galerii /events
+motion_catalog=MotionCatalog(db)
 
 templates=Jinja2Templates(
     directory="/home/raspi/Desktop/ProjektZaliczeniowy/Projekt/templates")
@@ -35,156 +107,103 @@ app.mount("/static", StaticFiles(
     name="static")
 
 
-# Inicjalizacja bazy danych
-def init_db(db_path):
-    """Inicjalizacja bazy danych."""
-    if not os.path.exists(db_path):
-        print("Baza danych nie istnieje. Tworze nowa...")
-
-    try:
-        conn=sqlite3.connect(db_path)
-        cursor=conn.cursor()
-
-        # Tworzenie tabeli dla weather control
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS weather_control (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                temperature REAL,
-                humidity REAL
-            )
-        """)
-
-        # Tworzenie tabeli dla air control
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS air_control (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                pm25 REAL,
-                pm10 REAL,
-                temperature REAL,
-                humidity REAL,
-                air_quality TEXT
-            )
-        """)
-
-        # Tworzenie tabeli dla water control
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS water_control (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                ph REAL,
-                adjustment TEXT,
-                current_ph REAL,
-                temperature REAL
-            )
-        """)
-
-        conn.commit()
-        conn.close()
-    except ValueError as e:
-        print(f"Wystapil blad podczas inicjalizacji bazy danych: {e}")
-
 # Kamerka - generowanie klatek
-def capture_camera():
-    """Obsluguje kamere, odczytujac klatki i zapisujac je do globalnej zmiennej."""
-    global LAST_FRAME
-    try:
-        camera=cv2.VideoCapture(0)
-
-        if not camera.isOpened():
-            raise RuntimeError("Nie mozna uzyskac dostepu do kamery.")
+def generate_frames(camera):
+    """
+    Generuje strumien wideo z najnowszych klatek kamery. Czeka na nowa
+    klatke w FrameBus kamery (bez aktywnego czekania) i wysyla kazda
+    co najwyzej raz.
+    """
 
+    with camera.bus.subscribe() as frames:
+        last_seq=0
         while True:
-            success, frame=camera.read()
-            if not success:
+            item=frames.get()
+            if item is None:
                 break
-
-            with camera_lock:
-                LAST_FRAME=frame.copy()  # Aktualizuj globalna klatke
-
-            # Dodaj opoznienie, aby uniknac przeciazenia CPU
-            time.sleep(0.05)
-    except RuntimeError:
-        print("\n\n\033[91m" + 20 * "-" + " Nie wykryto kamery " + 20 * "-" + "\033[0m\n\n")
-    finally:
-        if "camera" in locals() and camera.isOpened():
-            camera.release()
-
-def generate_frames():
-    """Generuje strumien wideo z najnowszych klatek."""
-    global LAST_FRAME
-    while True:
-        with camera_lock:
-            if LAST_FRAME is None:
-                continue
-            _, buffer=cv2.imencode('.jpg', LAST_FRAME)
-            frame=buffer.tobytes()
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-
-def detect_motion():
-    """Wykrywa ruch na podstawie najnowszych klatek,
-    zapisuje zdjecie i rysuje kwadrat wokol wykrytego ruchu."""
-    global LAST_FRAME
-    prev_frame_gray=None
-
-    photo_dir="/home/raspi/Desktop/ProjektZaliczeniowy/Projekt/phototrap/fast_api"
+            item[1].release()
+            seq, jpeg=camera.jpeg.get()
+            if seq > last_seq:
+                last_seq=seq
+                yield mjpeg_part(jpeg)
+
+def detect_motion(camera):
+    """Wykrywa ruch na podstawie najnowszych klatek kamery, zapisuje zdjecie
+    z zaznaczonym ruchem i zglasza poczatek i koniec zdarzen ruchu."""
+    recorder=camera.recorder
+
+    # Pozostale kamery zapisuja zdjecia w podkatalogach z ich id
+    photo_dir=photo_root
+    if camera is not cameras.primary:
+        photo_dir=os.path.join(photo_dir, camera.id)
 
     # Upewnij sie, ze folder istnieje
     if not os.path.isdir(photo_dir):
         print(f"Tworzenie katalogu {photo_dir}")
         os.makedirs(photo_dir)
 
-    while True:
-        with camera_lock:
-            if LAST_FRAME is None:
+    # Zdarzenia ruchu: analiza kazdej klatki, powiadomienia nie czesciej niz co 10 s
+    events=MotionEvents()
+
+    def handle(boxes, area, frame):
+        """Obsluguje wynik analizy klatki (w watku kamery lub watku wynikow puli)."""
+        notices=events.update(boxes, area)
+        if any(kind != "end" for kind, _ in notices):
+            # Prostokaty rysowane na kopii - klatka w buforze jest tylko do odczytu
+            frame=draw_boxes(frame, boxes)
+
+        for kind, event in notices:
+            if kind == "end":
+                # Klip konczy sie po nagraniu post_roll sekund
+                recorder.finish()
+                motion_catalog.record(kind, event, camera=camera.id)
+                if event["notified"]:
+                    print(f"Koniec ruchu ({camera.id}): {event['start']} - {event['end']}")
+                    emit_threadsafe('motion', dict(event, status='motion_ended',
+                                                   camera=camera.id))
                 continue
-            frame=LAST_FRAME.copy()
-
-        # Przetwarzanie klatki
-        gray_frame=cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        gray_frame=cv2.GaussianBlur(gray_frame, (21, 21), 0)
-
-        if prev_frame_gray is None:
-            prev_frame_gray=gray_frame
-            continue
-
-        # Analiza roznic miedzy klatkami
-        frame_delta=cv2.absdiff(prev_frame_gray, gray_frame)
-        _, thresh=cv2.threshold(frame_delta, 25, 255, cv2.THRESH_BINARY)
-        thresh=cv2.dilate(thresh, None, iterations=2)
-
-        # Znajdz kontury
-        contours, _=cv2.findContours(thresh.copy(),
-                                       cv2.RETR_EXTERNAL,
-                                       cv2.CHAIN_APPROX_SIMPLE)
-        motion_detected=False
 
-        for contour in contours:
-            if cv2.contourArea(contour) > 25000:
-                motion_detected=True
+            print(f"Ruch wykryty! ({camera.id})")
+            timestamp=datetime.now().strftime("%d-%m-%Y_%H:%M:%S")
 
-                # Rysowanie prostokata wokol konturu
-                (x, y, w, h)=cv2.boundingRect(contour)
-                cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+            # Klip od klatek sprzed ruchu; kolejne powiadomienia przedluzaja ten sam klip
+            clip_name=os.path.join(photo_dir, f"clip_{timestamp}.avi")
+            if recorder.trigger(clip_name):
+                print(f"Nagrywanie klipu {clip_name}")
 
-        if motion_detected:
-            print("Ruch wykryty!")
             # Przeslij zdarzenie o wykryciu ruchu do klientow
-            sio.emit('motion', {'status': 'motion_detected'})
+            emit_threadsafe('motion', dict(event, status='motion_detected', camera=camera.id))
 
             # Zapisz zdjecie
-            timestamp=datetime.now().strftime("%d-%m-%Y_%H:%M:%S")
             filename=os.path.join(photo_dir, f"picture_{timestamp}.jpg")
-            cv2.imwrite(filename, frame)
-            print(f"Zdjecie zapisane jako {filename}")
-
-            # Czekaj 10 sekund przed nastepnym zapisem
-            time.sleep(10)
-
-        prev_frame_gray=gray_frame
-        time.sleep(0.1)  # Unikaj przeciazenia CPU
+            # Zapis w tle; przy pelnej kolejce zdjecie jest pomijane
+            if photo_writer.put(filename, frame):
+                print(f"Zdjecie zapisywane jako {filename}")
+            else:
+                print(f"Pominieto zdjecie {filename} (pelna kolejka zapisu)")
+                filename=None
+            motion_catalog.record(kind, event, photo=filename, clip=recorder.current(),
+                                  camera=camera.id)
+
+    # Opcje wykrywania (rozdzielczosc analizy, maski obszarow, prog pola) kamery
+    if motion_pool is not None:
+        # Analiza w procesach roboczych; wynik trafia do handle w kolejnosci klatek
+        motion_pool.open(camera.id, handle, camera.motion)
+    else:
+        detector=MotionDetector(**camera.motion)
+
+    # Tylko najnowsza klatka: analiza nie zaleglych klatek, zadna dwa razy
+    frames=camera.bus.subscribe()
+    while True:
+        item=frames.get()
+        if item is None:
+            break
+        with item[1] as frame:
+            if motion_pool is not None:
+                # Kopia do pamieci wspoldzielonej puli; zajete sloty - klatka pominieta
+                motion_pool.submit(camera.id, frame)
+            else:
+                handle(detector.detect(frame), detector.motion_area, frame)
 
 @sio.event
 async def connect(sid):
@@ -220,7 +239,23 @@ def startup_event():
     Uruchamia funkcję wykrywania ruchu i kamery w tle.
     """
 
+    # Petla zdarzen serwera dla emisji z innych watkow (emit_threadsafe)
+    app.state.loop=asyncio.get_running_loop()
+
     init_db(db_path)
+    latest.warm()
+    online_stats.warm(db)
+    alert_engine.load()
+    anomaly_detector.warm(db)
+
+    # Watek zapisujacy pomiary partiami oraz watek retencji danych
+    ingest.start()
+    retention.start()
+    # Watki zapisu zdjec i klipow z fotopulapki oraz watki miniatur
+    photo_writer.start()
+    for camera in cameras:
+        camera.recorder.start()
+    thumbnails.start()
 
     # Watki do symulacji danych
     sensor_thread=threading.Thread(target=simulate_ph_control)
@@ -235,19 +270,35 @@ def startup_event():
     sensor_thread.daemon=True
     sensor_thread.start()
 
-    # Watek do obslugi kamery
-    camera_thread=threading.Thread(target=capture_camera)
-    camera_thread.daemon=True
-    camera_thread.start()
+    # Procesy analizy ruchu (przed watkami kamer, ktore do nich przekazuja klatki)
+    if motion_pool is not None:
+        motion_pool.start()
 
-    # Uruchom funkcje wykrywania ruchu i kamery w tle
-    thread_camera=threading.Thread(target=capture_camera)
-    thread_camera.daemon=True
-    thread_camera.start()
+    # Dla kazdej kamery jeden watek odczytu (wczesniej kamera byla otwierana
+    # przez dwa watki naraz), watek detekcji ruchu i watek bufora klipow
+    for camera in cameras:
+        camera.start()
+        camera.spawn("motion", detect_motion, camera)
+        camera.spawn("clips", record_frames, camera.bus, camera.jpeg, camera.recorder)
 
-    thread_motion=threading.Thread(target=detect_motion)
-    thread_motion.daemon=True
-    thread_motion.start()
+@app.on_event("shutdown")
+def shutdown_event():
+    """
+    Zatrzymuje kamery, zapisuje pomiary, zdjecia i klipy pozostale w kolejkach
+    zapisu, zatrzymuje retencje i zamyka polaczenia z baza.
+    """
+
+    cameras.stop()
+    if motion_pool is not None:
+        motion_pool.stop()
+    retention.stop()
+    ingest.stop()
+    photo_writer.stop()
+    for camera in cameras:
+        camera.recorder.stop()
+    thumbnails.stop()
+    db_executor.shutdown()
+    db.close()
 
 # Strona glowna
 @app.get("/", response_class=HTMLResponse)
@@ -273,43 +324,243 @@ async def measurements_page(request: Request):
     - TemplateResponse: Obiekt odpowiedzi HTTP zawierający szablon HTML z pomiarami.
     """
 
-    conn=sqlite3.connect(db_path)
-    cursor=conn.cursor()
-    cursor.execute("SELECT * FROM weather_control ORDER BY timestamp DESC LIMIT 10")
-    measurements=cursor.fetchall()
-    conn.close()
+    measurements=latest.latest("weather_control", 10)
     return templates.TemplateResponse("measurements.html",
                                       {"request": request,
                                        "measurements": measurements})
 
 # Strona z historia
 @app.get("/history_page", response_class=HTMLResponse)
-async def history_page(request: Request):
+async def history_page(request: Request, before: str=None, limit: str=None):
     """
     Funkcja obsługująca stronę historii pomiarów.
     Parametry:
     - request (Request): Obiekt żądania HTTP.
+    - before (str): Id lub znacznik czasu, od którego zaczyna się strona.
+    - limit (str): Liczba pomiarów na stronie.
     Zwracane wartości:
     - templates.TemplateResponse: Obiekt odpowiedzi HTTP
     zawierający szablon HTML "measurements.html" wraz z danymi pomiarów.
     Wyjątki:
-    - Brak.
+    - HTTPException (400): Niepoprawny kursor lub limit.
     Opis:
     Ta funkcja obsługuje żądanie HTTP dotyczące strony historii
-    pomiarów. Łączy się z bazą danych, pobiera wszystkie pomiary
-    z tabeli "weather_control" posortowane według znacznika czasowego,
-    zamyka połączenie z bazą danych, a następnie zwraca odpowiedź HTTP
+    pomiarów. W wątku DbExecutor (poza pętlą zdarzeń) pobiera jedną stronę
+    pomiarów z tabeli "weather_control" (od najnowszych, stronicowanie kluczem),
+    a następnie zwraca odpowiedź HTTP
     zawierającą szablon HTML "measurements.html" wraz z danymi pomiarów.
     """
 
-    conn=sqlite3.connect(db_path)
-    cursor=conn.cursor()
-    cursor.execute("SELECT * FROM weather_control ORDER BY timestamp")
-    measurements=cursor.fetchall()
-    conn.close()
+    try:
+        limit=parse_limit(limit)
+        measurements, next_before=await db_executor.run(fetch_page, db, "weather_control",
+                                                        before, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
     return templates.TemplateResponse("measurements.html",
                                       {"request": request,
-                                       "measurements": measurements})
+                                       "measurements": measurements,
+                                       "next_before": next_before,
+                                       "limit": limit})
+
+# Historia pomiarow w formacie JSON
+@app.get("/history")
+async def get_history(request: Request, table: str="weather_control",
+                      resolution: str="raw", before: str=None, limit: str=None):
+    """
+    Zwraca strone historii pomiarow od najnowszych.
+    Kursor nastepnej strony przekazywany jest w naglowku Link.
+    :param table: Tabela pomiarowa (domyslnie weather_control).
+    :param resolution: raw, minute, hour, day lub auto (dobor wg zakresu from/to).
+    :param before: Id lub znacznik czasu, od ktorego zaczyna sie strona.
+    :param limit: Liczba pomiarow na stronie.
+    Parametry from i to (zakres czasu) odczytywane sa z adresu zapytania.
+    """
+    try:
+        limit=parse_limit(limit)
+        measurements, next_before=await db_executor.run(history, db, table, resolution,
+                                                        before,
+                                                        request.query_params.get("from"),
+                                                        request.query_params.get("to"),
+                                                        limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    headers={}
+    if next_before is not None:
+        next_url=request.url.include_query_params(before=next_before)
+        headers["Link"]=f'<{next_url.path}?{next_url.query}>; rel="next"'
+    return JSONResponse(measurements, headers=headers)
+
+# Reguly i zdarzenia alertow
+@app.post("/alert")
+async def set_alert(request: Request):
+    """
+    Ustawienie regul alertow progowych.
+    Przyjmuje postac {"temperature": X, "humidity": Y} (alert powyzej progu)
+    albo regule/liste regul z polami table, field, op, threshold,
+    hysteresis, min_duration i name (modul alerts).
+    """
+    try:
+        data=await request.json()
+    except ValueError:
+        data=None
+    try:
+        rules=parse_alert_request(data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    saved=[]
+    for rule in rules:
+        saved.append(await db_executor.run(alert_engine.add_rule, **rule))
+    return {"message": "Alert ustawiony!", "rules": saved}
+
+@app.delete("/alert/{rule_id}")
+async def delete_alert(rule_id: int):
+    """Usuwa regule alertu o podanym id."""
+    if not await db_executor.run(alert_engine.remove_rule, rule_id):
+        raise HTTPException(status_code=404, detail="nie ma takiej reguly")
+    return {"message": "Alert usuniety!"}
+
+@app.get("/alerts")
+async def get_alerts(limit: str=None):
+    """Zwraca reguly alertow z ich stanem oraz ostatnie zdarzenia alertow."""
+    try:
+        limit=parse_limit(limit, default=50)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return {"rules": alert_engine.rules(),
+            "alerts": await db_executor.run(alert_engine.recent, limit)}
+
+@app.get("/anomalies")
+async def get_anomalies(limit: str=None):
+    """Zwraca ostatnie anomalie wykryte w pomiarach."""
+    try:
+        limit=parse_limit(limit, default=50)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return {"anomalies": await db_executor.run(anomaly_detector.recent, limit)}
+
+# Statystyki biezace z pamieci
+@app.get("/stats")
+async def get_stats(table: str=None):
+    """
+    Zwraca biezace statystyki pomiarow z pamieci (bez zapytan do bazy):
+    liczbe, srednia, wariancje, EWMA oraz min/max z ostatniej godziny i doby.
+    :param table: Opcjonalnie jedna tabela pomiarowa.
+    """
+    try:
+        return online_stats.snapshot(table)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+# Agregaty pomiarow w zakresie czasu
+@app.get("/query")
+async def get_query(request: Request, table: str="weather_control", fields: str=None,
+                    bucket: str="all", agg: str=None):
+    """
+    Zwraca agregaty pomiarow w zakresie czasu, w przedzialach.
+    :param table: Tabela pomiarowa.
+    :param fields: Pola oddzielone przecinkami (domyslnie wszystkie liczbowe).
+    :param bucket: all, minute, hour lub day.
+    :param agg: Agregaty oddzielone przecinkami: count, min, max, sum, avg,
+                stddev, median, pNN (np. p95).
+    Parametry from i to (zakres czasu) odczytywane sa z adresu zapytania.
+    """
+    try:
+        return await db_executor.run(run_query, db, table,
+                                     fields.split(",") if fields else None,
+                                     request.query_params.get("from"),
+                                     request.query_params.get("to"),
+                                     bucket, agg.split(",") if agg else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+# Katalog zdarzen ruchu
+@app.get("/events")
+async def get_events(request: Request, before: str=None, limit: str=None):
+    """
+    Zwraca strone zdarzen ruchu od najnowszych.
+    Kursor nastepnej strony przekazywany jest w naglowku Link.
+    :param before: Id zdarzenia, od ktorego zaczyna sie strona.
+    :param limit: Liczba zdarzen na stronie.
+    Parametry from i to (zakres czasu poczatku zdarzenia) odczytywane sa z adresu zapytania.
+    """
+    try:
+        limit=parse_limit(limit, default=50)
+        events, next_before=await db_executor.run(motion_catalog.page, before, limit,
+                                                  request.query_params.get("from"),
+                                                  request.query_params.get("to"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    headers={}
+    if next_before is not None:
+        next_url=request.url.include_query_params(before=next_before)
+        headers["Link"]=f'<{next_url.path}?{next_url.query}>; rel="next"'
+    return JSONResponse({"events": events}, headers=headers)
+
+@app.get("/events_page", response_class=HTMLResponse)
+async def events_page(request: Request, before: str=None, limit: str=None):
+    """
+    Galeria zdarzen ruchu (szablon events.html) z tymi samymi parametrami co /events.
+    :param request: Obiekt zadania HTTP.
+    :return: Szablon HTML strony ze zdarzeniami.
+    """
+    start=request.query_params.get("from")
+    end=request.query_params.get("to")
+    try:
+        limit=parse_limit(limit, default=20)
+        events, next_before=await db_executor.run(motion_catalog.page, before, limit,
+                                                  start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return templates.TemplateResponse("events.html",
+                                      {"request": request,
+                                       "events": events,
+                                       "next_before": next_before,
+                                       "limit": limit,
+                                       "start": start,
+                                       "end": end})
+
+def cached_file(request, path, cache_control):
+    """Zwraca plik z naglowkami ETag i Cache-Control lub 304, gdy klient ma aktualna kopie."""
+    etag=file_etag(path)
+    headers={"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, headers=headers)
+
+@app.get("/events/mosaic/{day}")
+async def get_events_mosaic(request: Request, day: str):
+    """Zwraca mozaike miniatur zdarzen ruchu z danego dnia (RRRR-MM-DD, UTC)."""
+    try:
+        photos=await db_executor.run(motion_catalog.day_photos, day)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    if not photos:
+        raise HTTPException(status_code=404, detail="brak zdjec z tego dnia")
+    # Jedno miejsce mozaiki dnia niezaleznie od kamery, ktora zapisala ostatnie zdjecie
+    path=os.path.join(photo_root, THUMB_DIR, f"mosaic_{day}.jpg")
+    loop=asyncio.get_running_loop()
+    path=await loop.run_in_executor(None, thumbnails.mosaic, photos, path)
+    return cached_file(request, path, MOSAIC_CACHE_CONTROL)
+
+@app.get("/events/{event_id}/{kind}")
+async def get_event_file(request: Request, event_id: int, kind: str):
+    """
+    Zwraca pierwsze zdjecie (kind=photo), jego miniature (kind=thumb) lub klip
+    (kind=clip) zdarzenia ruchu.
+    """
+    event=await db_executor.run(motion_catalog.get, event_id)
+    path=event_file(event, "photo" if kind == "thumb" else kind) if event is not None else None
+    if path is None or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="nie ma takiego pliku")
+    if kind == "thumb":
+        loop=asyncio.get_running_loop()
+        try:
+            path=await loop.run_in_executor(None, thumbnails.get, path)
+        except (OSError, ValueError, cv2.error) as e:
+            raise HTTPException(status_code=404, detail="nie ma takiego pliku") from e
+        return cached_file(request, path, CACHE_CONTROL)
+    return FileResponse(path)
 
 # Strona z kamera
 @app.get("/door_bell_page", response_class=HTMLResponse)
@@ -322,7 +573,9 @@ async def door_bell_page(request: Request):
     - templates.TemplateResponse: Obiekt odpowiedzi HTTP z szablonem strony kamery.
     """
 
-    return templates.TemplateResponse("camera.html", {"request": request})
+    return templates.TemplateResponse("camera.html",
+                                      {"request": request,
+                                       "cameras": [camera.id for camera in cameras]})
 
 # Strona z aquarium
 @app.get("/aquarium", response_class=HTMLResponse)
@@ -332,15 +585,8 @@ async def ph_measurements_page(request: Request):
     :param request: Obiekt zadania HTTP.
     :return: Szablon HTML strony z pomiarami pH.
     """
-    conn=sqlite3.connect(db_path)
-    cursor=conn.cursor()
-    cursor.execute("""
-                   SELECT id, timestamp, temperature, ph, adjustment
-                   FROM water_control
-                   ORDER BY timestamp DESC LIMIT 20
-                   """)
-    measurements=cursor.fetchall()
-    conn.close()
+    measurements=latest.latest("water_control", 20,
+                               ("id", "timestamp", "temperature", "ph", "adjustment"))
 
     # Renderowanie szablonu HTML z pomiarami
     return templates.TemplateResponse("aquarium.html", {
@@ -355,16 +601,9 @@ async def air_quality_page(request: Request):
     :param request: Obiekt zadania HTTP.
     :return: Szablon HTML strony z pomiarami jakosci powietrza.
     """
-    conn=sqlite3.connect(db_path)
-    cursor=conn.cursor()
-    cursor.execute("""
-                   SELECT id, timestamp, temperature,
-                   pm25, pm10, humidity, air_quality 
-                   FROM air_control 
-                   ORDER BY timestamp DESC LIMIT 20
-                   """)
-    measurements=cursor.fetchall()
-    conn.close()
+    measurements=latest.latest("air_control", 20,
+                               ("id", "timestamp", "temperature",
+                                "pm25", "pm10", "humidity", "air_quality"))
 
     # Renderowanie szablonu HTML z pomiarami
     return templates.TemplateResponse("air_quality.html", {
@@ -372,21 +611,128 @@ async def air_quality_page(request: Request):
         "measurements": measurements
     })
 
+# Strumieniowy eksport tabeli
+@app.get("/export/{table}")
+async def export_table(request: Request, table: str,
+                       format: str="ndjson"):  # pylint: disable=redefined-builtin
+    """
+    Eksportuje tabele (lub zakres from/to) w formacie NDJSON albo CSV.
+    Wiersze wysylane sa porcjami przez StreamingResponse, bez fetchall().
+    :param table: Nazwa tabeli pomiarowej.
+    :param format: ndjson lub csv.
+    """
+    try:
+        chunks=open_export(db_path, table, format,
+                           request.query_params.get("from"),
+                           request.query_params.get("to"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return StreamingResponse(chunks, media_type=EXPORT_FORMATS[format], headers={
+        "Content-Disposition": f"attachment; filename={table}.{format}"})
+
+@app.post("/ingest")
+async def bulk_ingest(request: Request, table: str=None, batch: str=None):
+    """
+    Przyjmuje partie pomiarow z wezla czujnikow (tablica JSON lub NDJSON)
+    i zapisuje ja w jednej transakcji.
+    :param table: Tabela pomiarowa (weather_control, air_control, water_control).
+    :param batch: Opcjonalny identyfikator partii, odsylany w potwierdzeniu.
+    :return: Potwierdzenie z liczba zapisanych wierszy i zakresem ich id.
+    """
+    body=await request.body()
+    try:
+        rows=await db_executor.run(parse_batch, table, body)
+        first_id, last_id=await db_executor.run(ingest.write_batch, table, rows)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except (RuntimeError, TimeoutError) as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
+    return {"table": table, "batch": batch, "accepted": len(rows),
+            "first_id": first_id, "last_id": last_id}
+
+# Liczniki podsystemow
+@app.get("/metrics")
+async def get_metrics():
+    """Zwraca liczniki kolejki zapisu, retencji danych i cache odpowiedzi."""
+    return {"ingest": ingest.stats(), "retention": retention.stats(),
+            "responses": responses.stats(), "db": db_executor.stats(),
+            "alerts": alert_engine.stats(), "anomalies": anomaly_detector.stats(),
+            "camera": {"frames": frame_bus.stats(), "jpeg": jpeg_cache.stats(),
+                       "photos": photo_writer.stats(),
+                       "clips": clip_recorder.stats(),
+                       "thumbnails": thumbnails.stats(),
+                       "cameras": cameras.stats(),
+                       "motion_pool": motion_pool.stats() if motion_pool else None}}
+
+def cached_json(request, key, table, build):
+    """
+    Zwraca odpowiedz JSON z naglowkiem ETag (id najnowszego pomiaru tabeli).
+    Gdy If-None-Match pasuje, zwraca 304 bez odczytu wierszy i serializacji.
+    :param request: Obiekt zadania HTTP.
+    :param key: Klucz odpowiedzi w cache.
+    :param table: Tabela, od ktorej zalezy odpowiedz.
+    :param build: Funkcja zwracajaca dane do serializacji.
+    """
+    etag, not_modified=responses.check(key, table, request.headers.get("if-none-match"))
+    if not_modified:
+        return Response(status_code=304, headers={"ETag": etag})
+    etag, body=responses.get(key, table, lambda: json.dumps(build()).encode())
+    return Response(content=body, media_type="application/json",
+                    headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+@app.get("/weather")
+async def get_weather_data(request: Request):
+    """Zwraca ostatnie 10 wpisow z tabeli weather_control."""
+    return cached_json(request, "weather", "weather_control", lambda: [
+        {"id": row[0], "timestamp": row[1], "temperature": row[2], "humidity": row[3]}
+        for row in latest.latest("weather_control", 10)])
+
+@app.get("/air")
+async def get_air_quality_data(request: Request):
+    """Zwraca ostatnie 10 wpisow z tabeli air_control."""
+    return cached_json(request, "air", "air_control", lambda: [
+        {"id": row[0], "timestamp": row[1], "pm25": row[2], "pm10": row[3],
+         "temperature": row[4], "humidity": row[5], "air_quality": row[6]}
+        for row in latest.latest("air_control", 10)])
+
+@app.get("/water")
+async def get_water_data(request: Request):
+    """Zwraca ostatnie 10 wpisow z tabeli water_control."""
+    return cached_json(request, "water", "water_control", lambda: [
+        {"id": row[0], "timestamp": row[1], "ph": row[2], "adjustment": row[3],
+         "current_ph": row[4], "temperature": row[5]}
+        for row in latest.latest("water_control", 10)])
+
+def find_camera(camera_id):
+    """Zwraca kamere o podanym id (None - kamera glowna); nieznane id to blad 404."""
+    camera=cameras.primary if camera_id is None else cameras.get(camera_id)
+    if camera is None:
+        raise HTTPException(status_code=404, detail=f"nie ma kamery {camera_id}")
+    return camera
+
+@app.get("/cameras")
+async def get_cameras():
+    """Zwraca liste kamer z ich stanem i adresem podgladu."""
+    return {"cameras": [{"id": camera.id, "state": camera.state,
+                         "feed": f"/video_feed/{camera.id}"} for camera in cameras]}
+
 # Strumien wideo
 @app.get("/video_feed")
-async def video_feed():
-    """Zwraca strumien wideo z kamery."""
-    return StreamingResponse(generate_frames(),
+@app.get("/video_feed/{camera_id}")
+async def video_feed(camera_id: str=None):
+    """Zwraca strumien wideo z kamery (bez camera_id - z kamery glownej)."""
+    return StreamingResponse(generate_frames(find_camera(camera_id)),
                 media_type='multipart/x-mixed-replace; boundary=frame')
 
 @app.get("/latest_frame")
-async def get_latest_frame():
-    """Zwraca najnowsza klatke jako obraz JPG."""
-    with camera_lock:
-        if LAST_FRAME is not None:
-            _, encoded_img=cv2.imencode('.jpg', LAST_FRAME)
-            return {"image": encoded_img.tobytes()}
+@app.get("/latest_frame/{camera_id}")
+async def get_latest_frame(camera_id: str=None):
+    """Zwraca najnowsza klatke jako obraz JPG (zakodowany raz dla wszystkich)."""
+    seq, jpeg=find_camera(camera_id).jpeg.get()
+    if jpeg is None:
         return {"message": "No frame available"}
+    return Response(content=jpeg, media_type="image/jpeg",
+                    headers={"X-Frame-Seq": str(seq)})
 
 # Symulacja sensora
 def simulate_sensor():
@@ -395,14 +741,7 @@ def simulate_sensor():
         temperature=round(random.uniform(20.0, 30.0), 1)
         humidity=round(random.uniform(40.0, 60.0), 1)
         print(f"Symulacja: Temp={temperature}C, Wilgotnosc={humidity}%")
-        conn=sqlite3.connect(db_path)
-        cursor=conn.cursor()
-        cursor.execute("""INSERT INTO weather_control
-                       (temperature, humidity)
-                       VALUES (?, ?)""",
-                       (temperature, humidity))
-        conn.commit()
-        conn.close()
+        ingest.put("weather_control", {"temperature": temperature, "humidity": humidity})
         time.sleep(10)
 
 # Funkcja symulujaca kontrole pH
@@ -425,14 +764,9 @@ def simulate_ph_control():
               Temp={temperature}C,
               pH={current_ph}
               ({adjustment_action})""")
-        conn=sqlite3.connect(db_path)
-        cursor=conn.cursor()
-        cursor.execute("""INSERT INTO water_control
-                       (temperature, ph, adjustment)
-                       VALUES (?, ?, ?)""",
-                       (temperature, current_ph, adjustment_action))
-        conn.commit()
-        conn.close()
+        ingest.put("water_control", {"temperature": temperature,
+                                     "ph": current_ph,
+                                     "adjustment": adjustment_action})
         time.sleep(10)
 
 # Symulacja jakosci powietrza
@@ -450,14 +784,11 @@ def simulate_air_quality():
               Temp={temperature}C,
               Wilgotnosc={humidity}%,
               Jakosc={air_quality}""")
-        conn=sqlite3.connect(db_path)
-        cursor=conn.cursor()
-        cursor.execute("""INSERT INTO air_control
-                       (pm25, pm10, temperature, humidity, air_quality)
-                       VALUES (?, ?, ?, ?, ?)""",
-                       (pm25, pm10, temperature, humidity, air_quality))
-        conn.commit()
-        conn.close()
+        ingest.put("air_control", {"pm25": pm25,
+                                   "pm10": pm10,
+                                   "temperature": temperature,
+                                   "humidity": humidity,
+                                   "air_quality": air_quality})
         time.sleep(10)
 
 # Uruchomienie serwera FastAPI
@@ -0,0 +1,466 @@
+"""
+Podsystem zapisu pomiarow z buforowaniem (write-behind).
+
+Producenci (watki symulujace, w przyszlosci prawdziwe czujniki) wrzucaja
+odczyty do ograniczonej kolejki w pamieci. Jeden watek zapisujacy oproznia
+kolejke i zapisuje odczyty partiami przez executemany, w jednej transakcji
+na partie. Partia jest zapisywana, gdy osiagnie batch_size odczytow albo
+gdy od pierwszego odczytu w partii minie flush_interval sekund.
+
+Gorna granica utraty danych:
+- przy awarii procesu (kill -9, wyjatek w interpreterze) tracone sa odczyty,
+  ktore nie zostaly jeszcze zatwierdzone, czyli co najwyzej
+  maxsize + batch_size odczytow. Gdy kolejka nie jest przepelniona, oznacza
+  to odczyty z ostatnich flush_interval sekund (plus czas trwania zapisu);
+- przy zaniku zasilania dodatkowo moga zniknac transakcje zatwierdzone od
+  ostatniego checkpointu WAL (skutek PRAGMA synchronous=NORMAL w module
+  database). Jezli to nieakceptowalne, nalezy ustawic synchronous=FULL.
+Zatrzymanie przez stop() zapisuje wszystkie odczyty pozostale w kolejce.
+
+Gdy baza jest zablokowana dluzej niz busy_timeout polaczenia (np. przez
+"rollups.py backfill", porcje retencji lub vacuum), partia nie jest
+odrzucana: zapis jest ponawiany z rosnacym odstepem (retries w stats()).
+W tym czasie kolejka sie zapelnia, a nadmiarowe odczyty sa odrzucane jak
+przy kazdym przeciazeniu (dropped). Jako failed zliczane sa tylko wiersze,
+ktorych zapis zawiodl z innego powodu, oraz partie, ktorych nie udalo sie
+zapisac w RETRY_ON_STOP sekund po stop().
+
+Partie z wezlow czujnikow (POST /ingest) sprawdzane sa przez parse_batch()
+i zapisywane przez write_batch(): trafiaja do tego samego watku
+zapisujacego, ale jako jedna transakcja, na ktorej zatwierdzenie wywolujacy
+czeka, zeby odeslac potwierdzenie z zakresem nadanych identyfikatorow.
+"""
+from datetime import datetime
+import json
+import queue
+import re
+import sqlite3
+import threading
+import time
+
+from database import TABLE_COLUMNS, TIMESTAMP_FORMAT, connect, utc_timestamp
+
+# Domyslne parametry kolejki
+QUEUE_SIZE = 10000
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 1.0
+PUT_TIMEOUT = 0.5
+
+# Partie z wezlow czujnikow: maksymalna liczba wierszy i czas oczekiwania na zapis
+MAX_BATCH_ROWS = 10000
+WRITE_TIMEOUT = 10.0
+
+# Ponawianie zapisu przy zablokowanej bazie: pierwszy i najwiekszy odstep (s)
+# oraz jak dlugo ponawiac partie po stop()
+RETRY_DELAY = 0.5
+RETRY_MAX_DELAY = 5.0
+RETRY_ON_STOP = 10.0
+
+# Kolumny tekstowe; pozostale kolumny pomiarowe (poza timestamp) sa liczbowe
+TEXT_COLUMNS = {"air_quality", "adjustment"}
+
+_TIMESTAMP_RE = re.compile(r"\d{4}-\d\d-\d\d[ T]\d\d:\d\d:\d\d")
+
+# Znacznik konca pracy watku zapisujacego
+_STOP = object()
+
+
+def is_transient(error):
+    """Sprawdza, czy blad SQLite oznacza chwilowo zablokowana baze (warto ponowic)."""
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    message = str(error)
+    return "database is locked" in message or "database is busy" in message
+
+
+def insert_sql(table):
+    """Zwraca zapytanie INSERT dla wszystkich kolumn pomiarowych tabeli."""
+    columns = TABLE_COLUMNS[table]
+    placeholders = ", ".join("?" for _ in columns)
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+
+
+def parse_batch(table, body, max_rows=MAX_BATCH_ROWS):
+    """
+    Odczytuje i sprawdza partie pomiarow wyslana przez wezel czujnikow.
+    Tresc to tablica JSON obiektow albo NDJSON (jeden obiekt w linii).
+    Sprawdzenie jest tanie: znane kolumny, liczby w kolumnach liczbowych,
+    napisy w tekstowych i format znacznika czasu (bez parsowania daty).
+    Brakujacy timestamp uzupelniany jest biezacym czasem UTC.
+    :param table: Nazwa tabeli pomiarowej.
+    :param body: Tresc zadania (bytes lub str).
+    :return: Lista krotek w kolejnosci TABLE_COLUMNS[table].
+    :raises ValueError: Gdy tabela, format lub ktorys pomiar sa niepoprawne.
+    """
+
+    if table not in TABLE_COLUMNS:
+        raise ValueError(f"nieznana tabela: {table}")
+    if isinstance(body, bytes):
+        body = body.decode("utf-8")
+
+    text = body.lstrip()
+    try:
+        if text.startswith("["):
+            records = json.loads(text)
+        else:
+            records = [json.loads(line) for line in text.splitlines() if line.strip()]
+    except json.JSONDecodeError as e:
+        raise ValueError(f"niepoprawny JSON: {e}") from e
+    if not records:
+        raise ValueError("pusta partia")
+    if len(records) > max_rows:
+        raise ValueError(f"za duza partia: {len(records)} > {max_rows} wierszy")
+
+    columns = TABLE_COLUMNS[table]
+    allowed = set(columns)
+    numeric = [i for i, column in enumerate(columns)
+               if column != "timestamp" and column not in TEXT_COLUMNS]
+    text_columns = [i for i, column in enumerate(columns) if column in TEXT_COLUMNS]
+    now = utc_timestamp()
+
+    rows = []
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            raise ValueError(f"wiersz {index}: oczekiwano obiektu JSON")
+        if not allowed.issuperset(record):
+            raise ValueError(f"wiersz {index}: nieznane kolumny "
+                             f"{sorted(set(record) - allowed)}")
+        row = [record.get(column) for column in columns]
+        stamp = row[0]
+        if stamp is None:
+            row[0] = now
+        elif isinstance(stamp, str) and _TIMESTAMP_RE.fullmatch(stamp):
+            row[0] = stamp.replace("T", " ")
+            # Wyrazenie sprawdza tylko ksztalt; data musi tez istniec (miesiac,
+            # dzien, godzina), bo sluchacze parsuja ja w watku zapisujacym
+            try:
+                datetime.strptime(row[0], TIMESTAMP_FORMAT)
+            except ValueError as e:
+                raise ValueError(f"wiersz {index}: niepoprawny timestamp {stamp!r}") from e
+        else:
+            raise ValueError(f"wiersz {index}: niepoprawny timestamp {stamp!r}")
+        for i in numeric:
+            value = row[i]
+            if value is not None and type(value) not in (int, float):
+                raise ValueError(f"wiersz {index}: {columns[i]} musi byc liczba")
+        for i in text_columns:
+            if row[i] is not None and not isinstance(row[i], str):
+                raise ValueError(f"wiersz {index}: {columns[i]} musi byc napisem")
+        rows.append(tuple(row))
+    return rows
+
+
+class _Batch:
+    """Partia zlecona przez write_batch() wraz z wynikiem zapisu."""
+
+    __slots__ = ("table", "rows", "done", "result", "error")
+
+    def __init__(self, table, rows):
+        self.table = table
+        self.rows = rows
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class IngestQueue:
+    """
+    Ograniczona kolejka odczytow z jednym watkiem zapisujacym partiami.
+    Liczniki (stats()) pozwalaja obserwowac przeciazenie: blocked to liczba
+    odczytow, ktore musialy czekac na miejsce w kolejce, dropped to liczba
+    odczytow odrzuconych po PUT_TIMEOUT sekundach oczekiwania.
+    """
+
+    def __init__(self, db_path, maxsize=QUEUE_SIZE, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL, put_timeout=PUT_TIMEOUT,
+                 retry_delay=RETRY_DELAY):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.retry_delay = retry_delay
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._hooks = []
+        self._listeners = []
+        self._thread = None
+        self._closed = False
+        self._direct_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "enqueued": 0,
+            "written": 0,
+            "blocked": 0,
+            "dropped": 0,
+            "failed": 0,
+            "retries": 0,
+            "batches": 0,
+            "bulk_batches": 0,
+            "max_depth": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    def add_batch_hook(self, hook):
+        """
+        Rejestruje funkcje wywolywana wewnatrz transakcji zapisu partii.
+        Funkcja dostaje polaczenie, nazwe tabeli i zapisane wiersze; jej zmiany
+        sa zatwierdzane razem z partia, a blad wycofuje cala partie.
+        """
+
+        self._hooks.append(hook)
+
+    def add_listener(self, callback):
+        """
+        Rejestruje funkcje wywolywana po zatwierdzeniu kazdej partii.
+        Funkcja dostaje nazwe tabeli i liste wierszy w postaci
+        (id, timestamp, ...), takiej samej jak wynik SELECT * z tej tabeli.
+        """
+
+        self._listeners.append(callback)
+
+    def start(self):
+        """Uruchamia watek zapisujacy."""
+        self._thread = threading.Thread(target=self._run, name="ingest-writer")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def put(self, table, reading):
+        """
+        Dodaje odczyt do kolejki.
+        :param table: Nazwa tabeli pomiarowej.
+        :param reading: Slownik kolumna -> wartosc; brakujacy timestamp
+                        uzupelniany jest biezacym czasem UTC.
+        :return: True, jesli odczyt trafil do kolejki, False jesli odrzucono.
+        """
+
+        if self._closed:
+            self._count("dropped")
+            return False
+
+        columns = TABLE_COLUMNS[table]
+        if reading.get("timestamp") is None:
+            reading = dict(reading, timestamp=utc_timestamp())
+        item = (table, tuple(reading.get(column) for column in columns))
+
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self._count("blocked")
+            try:
+                self._queue.put(item, timeout=self.put_timeout)
+            except queue.Full:
+                self._count("dropped")
+                return False
+
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self._stats["enqueued"] += 1
+            if depth > self._stats["max_depth"]:
+                self._stats["max_depth"] = depth
+        return True
+
+    def write_batch(self, table, rows, timeout=WRITE_TIMEOUT):
+        """
+        Zapisuje partie wierszy w jednej transakcji (executemany) i czeka na
+        jej zatwierdzenie. Partia przechodzi przez watek zapisujacy, wiec
+        zachowuje kolejnosc wzgledem odczytow z put() i uruchamia te same
+        funkcje partii i sluchaczy. Gdy watek nie dziala, zapis odbywa sie
+        w watku wywolujacym.
+        :param rows: Krotki w kolejnosci TABLE_COLUMNS[table] (parse_batch).
+        :return: (pierwszy id, ostatni id) zapisanych wierszy.
+        :raises RuntimeError: Gdy kolejka jest zamknieta.
+        :raises TimeoutError: Gdy zapis nie zostal potwierdzony w timeout
+                              sekund (partia moze zostac zapisana pozniej).
+        """
+
+        if self._closed:
+            raise RuntimeError("kolejka zapisu jest zamknieta")
+        job = _Batch(table, rows)
+
+        if self._thread is None or not self._thread.is_alive():
+            with self._direct_lock:
+                conn = connect(self.db_path)
+                try:
+                    self._write(conn, job)
+                finally:
+                    conn.close()
+        else:
+            try:
+                self._queue.put(job, timeout=self.put_timeout)
+            except queue.Full as e:
+                self._count("dropped", len(rows))
+                raise TimeoutError("kolejka zapisu jest pelna") from e
+            if not job.done.wait(timeout):
+                raise TimeoutError("przekroczono czas oczekiwania na zapis partii")
+
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def stop(self, timeout=None):
+        """Zamyka kolejke, zapisuje pozostale odczyty i czeka na watek."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def stats(self):
+        """Zwraca kopie licznikow wraz z aktualna glebokoscia kolejki."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["depth"] = self._queue.qsize()
+        return stats
+
+    def _count(self, name, value=1):
+        """Zwieksza licznik o podana wartosc."""
+        with self._stats_lock:
+            self._stats[name] += value
+
+    def _run(self):
+        """Petla watku zapisujacego: zbiera partie i zapisuje je w transakcji."""
+        conn = connect(self.db_path)
+        batch = []
+        deadline = None
+        try:
+            while True:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if item is _STOP:
+                    break
+                if isinstance(item, _Batch):
+                    # Najpierw odczyty zebrane wczesniej, potem cala partia
+                    if batch:
+                        self._flush(conn, batch)
+                        batch = []
+                    deadline = None
+                    self._write(conn, item)
+                    continue
+                if item is not None:
+                    if not batch:
+                        deadline = time.monotonic() + self.flush_interval
+                    batch.append(item)
+                    if len(batch) < self.batch_size and time.monotonic() < deadline:
+                        continue
+
+                if batch:
+                    self._flush(conn, batch)
+                    batch = []
+                deadline = None
+
+            # Zapis wszystkiego, co zostalo w kolejce przed zatrzymaniem
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, _Batch):
+                    if batch:
+                        self._flush(conn, batch)
+                        batch = []
+                    self._write(conn, item)
+                elif item is not _STOP:
+                    batch.append(item)
+            if batch:
+                self._flush(conn, batch)
+        finally:
+            conn.close()
+
+    def _flush(self, conn, batch):
+        """Zapisuje partie odczytow w jednej transakcji i powiadamia sluchaczy."""
+        start = time.perf_counter()
+        by_table = {}
+        for table, values in batch:
+            by_table.setdefault(table, []).append(values)
+
+        try:
+            inserted = self._commit_retry(conn, by_table)
+        except Exception as e:  # pylint: disable=broad-except
+            print(f"Blad zapisu partii pomiarow: {e}")
+            self._count("failed", len(batch))
+            return
+
+        with self._stats_lock:
+            self._stats["written"] += len(batch)
+            self._stats["batches"] += 1
+            self._stats["last_flush_ms"] = (time.perf_counter() - start) * 1000
+        self._notify(inserted)
+
+    def _write(self, conn, job):
+        """Zapisuje partie z write_batch() i przekazuje wynik wywolujacemu."""
+        start = time.perf_counter()
+        try:
+            inserted = self._commit_retry(conn, {job.table: job.rows})
+        except Exception as e:  # pylint: disable=broad-except
+            self._count("failed", len(job.rows))
+            job.error = e
+            job.done.set()
+            return
+
+        rows = inserted[job.table]
+        job.result = (rows[0][0], rows[-1][0])
+        with self._stats_lock:
+            self._stats["written"] += len(rows)
+            self._stats["batches"] += 1
+            self._stats["bulk_batches"] += 1
+            self._stats["last_flush_ms"] = (time.perf_counter() - start) * 1000
+        job.done.set()
+        self._notify(inserted)
+
+    def _commit_retry(self, conn, by_table):
+        """
+        Zapisuje partie (_commit), ponawiajac ja z rosnacym odstepem, dopoki baza
+        jest zablokowana; po stop() najwyzej przez RETRY_ON_STOP sekund.
+        :raises Exception: Blad inny niz zablokowana baza lub koniec ponawiania.
+        """
+
+        delay = self.retry_delay
+        stopping_since = None
+        while True:
+            try:
+                return self._commit(conn, by_table)
+            except sqlite3.OperationalError as e:
+                if not is_transient(e):
+                    raise
+                if self._closed:
+                    stopping_since = stopping_since or time.monotonic()
+                    if time.monotonic() - stopping_since >= RETRY_ON_STOP:
+                        raise
+                self._count("retries")
+                print(f"Baza zablokowana, ponowny zapis partii za {delay:.1f} s: {e}")
+                time.sleep(delay)
+                delay = min(delay * 2, RETRY_MAX_DELAY)
+
+    def _commit(self, conn, by_table):
+        """
+        Zapisuje wiersze wszystkich tabel w jednej transakcji.
+        :return: Slownik tabela -> wiersze (id, timestamp, ...).
+        """
+
+        inserted = {}
+        with conn:
+            for table, rows in by_table.items():
+                conn.executemany(insert_sql(table), rows)
+                # Jedyny zapisujacy w transakcji: identyfikatory sa ciagle
+                last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                first_id = last_id - len(rows) + 1
+                inserted[table] = [(first_id + i,) + row for i, row in enumerate(rows)]
+                for hook in self._hooks:
+                    hook(conn, table, inserted[table])
+        return inserted
+
+    def _notify(self, inserted):
+        """Powiadamia sluchaczy o zatwierdzonych wierszach."""
+        for table, rows in inserted.items():
+            for listener in self._listeners:
+                try:
+                    listener(table, rows)
+                except Exception as e:  # pylint: disable=broad-except
+                    print(f"Blad sluchacza zapisu ({table}): {e}")
@@ -0,0 +1,166 @@
+"""
+Bufor cykliczny najnowszych pomiarow kazdej tabeli.
+
+Dashboardy (/weather, /air, /water, /measurements_page, /aquarium,
+/air_quality) pokazuja tylko kilkanascie ostatnich pomiarow, ktore zmieniaja
+sie co kilka sekund. Zamiast odpytywac SQLite przy kazdym zadaniu, endpointy
+czytaja je z bufora w pamieci. Bufor jest wypelniany przez kolejke zapisu
+(IngestQueue.add_listener) po zatwierdzeniu kazdej partii, a przy pierwszym
+uzyciu (lub przez warm()) laduje ostatnie wiersze z bazy.
+
+Kazda kolumna tabeli ma wlasna, wstepnie zaalokowana tablice NumPy: id jako
+int64, pomiary liczbowe jako float64 (None jako NaN), znacznik czasu i
+kolumny tekstowe jako tablice obiektow. Wiersze sa uporzadkowane jak w
+ORDER BY timestamp, id, wiec pomiar z wczesniejszym znacznikiem czasu
+(np. z /ingest) trafia na swoje miejsce, a nie na poczatek listy.
+"""
+import threading
+
+import numpy as np
+
+from database import TABLE_COLUMNS
+from ingest import TEXT_COLUMNS
+
+# Liczba pomiarow przechowywanych dla kazdej tabeli
+CAPACITY = 100
+
+
+class _Ring:
+    """Bufor o stalym rozmiarze na wstepnie zaalokowanych kolumnach NumPy."""
+
+    __slots__ = ("ids", "columns", "numeric", "head", "size", "last_id")
+
+    def __init__(self, table, capacity):
+        self.ids = np.zeros(capacity, np.int64)
+        self.columns = []
+        self.numeric = []
+        for column in TABLE_COLUMNS[table]:
+            numeric = column != "timestamp" and column not in TEXT_COLUMNS
+            self.columns.append(np.full(capacity, np.nan) if numeric
+                                else np.empty(capacity, object))
+            self.numeric.append(numeric)
+        self.head = 0  # indeks miejsca na kolejny wiersz
+        self.size = 0
+        self.last_id = 0  # najwiekszy id widziany przez bufor
+
+    def _order(self, count):
+        """Indeksy count najnowszych wierszy, od najnowszego."""
+        return (self.head - 1 - np.arange(count)) % len(self.ids)
+
+    def add(self, row):
+        """
+        Wstawia wiersz wedlug (timestamp, id), nadpisujac najstarszy po
+        zapelnieniu bufora. Wiersz starszy od wszystkich w pelnym buforze jest
+        pomijany.
+        """
+
+        capacity = len(self.ids)
+        stamp = row[1]
+        # Liczba wierszy nowszych od wstawianego (id rosnie, wiec przy rownym
+        # znaczniku czasu nowszy jest wstawiany wiersz)
+        newer = 0
+        if self.size and stamp < self.columns[0][(self.head - 1) % capacity]:
+            newer = int(np.count_nonzero(self.columns[0][self._order(self.size)] > stamp))
+            if newer == capacity:
+                return
+            # Nowsze wiersze przesuwaja sie o jedno miejsce w strone head
+            source = self._order(newer)
+            target = (source + 1) % capacity
+            self.ids[target] = self.ids[source]
+            for values in self.columns:
+                values[target] = values[source]
+        index = (self.head - newer) % capacity
+        self.ids[index] = row[0]
+        for values, numeric, value in zip(self.columns, self.numeric, row[1:]):
+            values[index] = np.nan if numeric and value is None else value
+        self.head = (self.head + 1) % capacity
+        if self.size < capacity:
+            self.size += 1
+
+    def newest(self, count):
+        """Zwraca do count najnowszych wierszy, od najnowszego."""
+        order = self._order(min(count, self.size))
+        columns = [self.ids[order].tolist()]
+        for values, numeric in zip(self.columns, self.numeric):
+            values = values[order]
+            if numeric:
+                # NaN oznacza brak pomiaru (NULL w bazie)
+                missing = np.isnan(values)
+                values = values.astype(object)
+                values[missing] = None
+            columns.append(values.tolist())
+        return list(zip(*columns))
+
+
+class LatestReadings:
+    """
+    Bufory najnowszych pomiarow dla wszystkich tabel pomiarowych.
+    Wiersze maja postac (id, timestamp, ...) jak wynik SELECT * z tabeli.
+    """
+
+    def __init__(self, db, capacity=CAPACITY):
+        self.db = db
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._rings = {table: _Ring(table, capacity) for table in TABLE_COLUMNS}
+        self._warmed = set()
+
+    def warm(self, tables=None):
+        """Laduje do buforow ostatnie wiersze z bazy danych."""
+        for table in tables or TABLE_COLUMNS:
+            with self._lock:
+                self._warm(table)
+
+    def _warm(self, table):
+        """Laduje bufor tabeli z bazy (wywolywane pod blokada)."""
+        rows = self.db.query(f"""SELECT * FROM {table}
+                             ORDER BY timestamp DESC, id DESC LIMIT ?""",
+                             (self.capacity,))
+        ring = _Ring(table, self.capacity)
+        for row in reversed(rows):
+            ring.add(row)
+        ring.last_id = max((row[0] for row in rows), default=0)
+        self._rings[table] = ring
+        self._warmed.add(table)
+
+    def extend(self, table, rows):
+        """
+        Dopisuje zapisane wiersze (sluchacz IngestQueue).
+        Wiersze juz obecne w buforze (np. wczytane przez warm()) sa pomijane,
+        a wiersze z wczesniejszym znacznikiem czasu sa wstawiane na swoje
+        miejsce.
+        """
+
+        with self._lock:
+            ring = self._rings[table]
+            for row in rows:
+                if row[0] > ring.last_id:
+                    ring.add(row)
+                    ring.last_id = row[0]
+
+    def latest(self, table, count=10, columns=None):
+        """
+        Zwraca najnowsze pomiary tabeli, od najnowszego.
+        :param table: Nazwa tabeli pomiarowej.
+        :param count: Liczba pomiarow (najwyzej capacity).
+        :param columns: Opcjonalna lista kolumn do zwrocenia (w tej kolejnosci).
+        :return: Lista krotek.
+        """
+
+        with self._lock:
+            if table not in self._warmed:
+                self._warm(table)
+            rows = self._rings[table].newest(count)
+
+        if columns is None:
+            return rows
+        all_columns = ("id",) + TABLE_COLUMNS[table]
+        indexes = [all_columns.index(column) for column in columns]
+        return [tuple(row[i] for i in indexes) for row in rows]
+
+    def last_id(self, table):
+        """Zwraca najwiekszy id pomiaru zapisanego w tabeli od wczytania bufora (0 gdy pusty)."""
+        with self._lock:
+            if table not in self._warmed:
+                self._warm(table)
+            return self._rings[table].last_id
@@ -0,0 +1,261 @@
+"""
+Katalog zdarzen ruchu w tabeli motion_events.
+
+Kazde zdarzenie ruchu (MotionEvents) to jeden wiersz: poczatek i koniec
+(UTC), najwieksze pole ruchu, prostokaty z tej chwili, liczba klatek
+z ruchem, zdjecia z fotopulapki (lista JSON), klip i id kamery. Zgloszone zdarzenie
+jest zapisywane juz przy poczatku (galeria pokazuje trwajace zdarzenia)
+i uzupelniane przy kolejnych powiadomieniach i na koncu; zdarzenie bez
+powiadomienia (ograniczenie czestotliwosci) zapisywane jest tylko na koncu.
+
+Tabela ma indeks po timestamp (poczatek zdarzenia), wiec strona galerii
+(stronicowanie kluczem, jak fetch_page) i filtr zakresu czasu nie zaleza
+od liczby zdarzen w katalogu. Sciezki zdjec i klipow sa zapisywane
+w chwili zgloszenia; plik moze nie powstac, jesli zostal odrzucony przez
+kolejke zapisu.
+
+Istniejace katalogi fotopulapki (pliki picture_%d-%m-%Y_%H:%M:%S.jpg
+i clip_%d-%m-%Y_%H:%M:%S.avi, czas lokalny) mozna zaindeksowac:
+    python motion_catalog.py import [--db measurements.db] [--dir phototrap]
+Pliki z podkatalogu phototrap/<id_kamery> sa przypisywane tej kamerze,
+a pliki bezposrednio w phototrap - kamerze glownej (pierwszej
+w cameras.json). Katalogi miniatur (thumbs) sa pomijane.
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+import json
+import os
+import re
+import threading
+import time
+
+from cameras import DEFAULT_CAMERAS, load_camera_config
+from database import (MAX_TIMESTAMP, PAGE_LIMIT, TIMESTAMP_FORMAT, Database, init_db,
+                      parse_timestamp)
+from thumbnails import THUMB_DIR
+
+# Nazwy plikow fotopulapki (czas lokalny z datetime.now())
+FILE_RE = re.compile(r"(picture|clip)_(\d\d-\d\d-\d{4}_\d\d:\d\d:\d\d)\.(jpg|avi)")
+FILE_TIME_FORMAT = "%d-%m-%Y_%H:%M:%S"
+
+# Kolumny zwracane przez zapytania katalogu i odpowiadajace im klucze
+COLUMNS = "id, timestamp, end_time, peak_area, boxes, frames, photos, clip, source, camera"
+KEYS = ("id", "start", "end", "peak_area", "boxes", "frames", "photos", "clip", "source",
+        "camera")
+
+INSERT_EVENT_SQL = """INSERT INTO motion_events (timestamp, end_time, peak_area, boxes,
+                                                 frames, photos, clip, source, camera)
+                      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+
+def _to_dict(row):
+    """Zamienia wiersz motion_events na slownik zdarzenia."""
+    event = dict(zip(KEYS, row))
+    event["boxes"] = json.loads(event["boxes"]) if event["boxes"] else []
+    event["photos"] = json.loads(event["photos"]) if event["photos"] else []
+    return event
+
+
+def event_file(event, kind):
+    """Zwraca sciezke pierwszego zdjecia (kind="photo") lub klipu (kind="clip") zdarzenia."""
+    if kind == "photo":
+        return event["photos"][0] if event["photos"] else None
+    if kind == "clip":
+        return event["clip"]
+    return None
+
+
+def file_time(name):
+    """
+    Odczytuje czas z nazwy pliku fotopulapki.
+    :return: (rodzaj "picture" lub "clip", znacznik czasu UTC) lub None.
+    """
+
+    match = FILE_RE.fullmatch(name)
+    if match is None:
+        return None
+    moment = datetime.strptime(match.group(2), FILE_TIME_FORMAT).astimezone(timezone.utc)
+    return match.group(1), moment.strftime(TIMESTAMP_FORMAT)
+
+
+class MotionCatalog:
+    """
+    Zapis i odczyt zdarzen ruchu w tabeli motion_events.
+    :param db: Obiekt Database.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind, event, photo=None, clip=None, camera=None):
+        """
+        Zapisuje powiadomienie MotionEvents.update.
+        :param kind: "start", "update" lub "end".
+        :param event: Slownik zdarzenia z MotionEvents.
+        :param photo: Sciezka zdjecia zapisanego przy tym powiadomieniu.
+        :param clip: Sciezka klipu nagrywanego w trakcie zdarzenia.
+        :param camera: Id kamery (kazda kamera ma wlasne MotionEvents i numeracje zdarzen).
+        :return: Id wiersza zdarzenia lub None przy bledzie zapisu.
+        """
+
+        with self._lock:
+            try:
+                key = (camera, event["id"])
+                row_id, photos = self._open.get(key, (None, []))
+                if photo is not None:
+                    photos = photos + [photo]
+                values = (event["end"], event["peak_area"], json.dumps(event["boxes"]),
+                          event["frames"], json.dumps(photos) if photos else None)
+                if row_id is None:
+                    row_id = self.db.execute(INSERT_EVENT_SQL,
+                                             (event["start"],) + values + (clip, "live", camera))
+                else:
+                    self.db.execute("""UPDATE motion_events SET end_time = ?, peak_area = ?,
+                                    boxes = ?, frames = ?, photos = ?,
+                                    clip = COALESCE(clip, ?) WHERE id = ?""",
+                                    values + (clip, row_id))
+            except Exception as e:  # pylint: disable=broad-except
+                print(f"Blad zapisu zdarzenia ruchu: {e}")
+                return None
+            if kind == "end":
+                self._open.pop(key, None)
+            else:
+                self._open[key] = (row_id, photos)
+            return row_id
+
+    def get(self, event_id):
+        """Zwraca zdarzenie o podanym id lub None."""
+        row = self.db.query_one(f"SELECT {COLUMNS} FROM motion_events WHERE id = ?",
+                                (event_id,))
+        return _to_dict(row) if row is not None else None
+
+    def day_photos(self, day):
+        """
+        Zwraca pierwsze zdjecia zdarzen, ktore zaczely sie danego dnia (UTC),
+        w kolejnosci czasu.
+        :param day: Data 'RRRR-MM-DD'.
+        :raises ValueError: Jesli data jest niepoprawna.
+        """
+
+        start = datetime.strptime(day, "%Y-%m-%d")
+        end = start + timedelta(days=1)
+        rows = self.db.query("""SELECT photos FROM motion_events
+                             WHERE timestamp >= ? AND timestamp < ? AND photos IS NOT NULL
+                             ORDER BY timestamp, id""",
+                             (start.strftime(TIMESTAMP_FORMAT), end.strftime(TIMESTAMP_FORMAT)))
+        return [json.loads(row[0])[0] for row in rows if row[0] != "[]"]
+
+    def page(self, before=None, limit=PAGE_LIMIT, start=None, end=None):
+        """
+        Zwraca strone zdarzen od najnowszych (stronicowanie kluczem po
+        indeksie timestamp).
+        :param before: Kursor - id zdarzenia (zwracane sa starsze zdarzenia).
+        :param start: Najwczesniejszy poczatek zdarzenia (wlacznie).
+        :param end: Najpozniejszy poczatek zdarzenia (wylacznie).
+        :return: (zdarzenia, kursor nastepnej strony lub None).
+        :raises ValueError: Jesli kursor lub zakres czasu sa niepoprawne.
+        """
+
+        start = "" if start is None or start == "" else parse_timestamp(start)
+        end = MAX_TIMESTAMP if end is None or end == "" else parse_timestamp(end)
+        if before is None or before == "":
+            rows = self.db.query(f"""SELECT {COLUMNS} FROM motion_events
+                                 WHERE timestamp >= ? AND timestamp < ?
+                                 ORDER BY timestamp DESC, id DESC LIMIT ?""",
+                                 (start, end, limit))
+        elif str(before).isdigit():
+            rows = self.db.query(f"""SELECT {COLUMNS} FROM motion_events
+                                 WHERE (timestamp, id) <
+                                       (SELECT timestamp, id FROM motion_events WHERE id = ?)
+                                 AND timestamp >= ? AND timestamp < ?
+                                 ORDER BY timestamp DESC, id DESC LIMIT ?""",
+                                 (int(before), start, end, limit))
+        else:
+            raise ValueError(f"niepoprawny kursor: {before}")
+        next_before = rows[-1][0] if len(rows) == limit else None
+        return [_to_dict(row) for row in rows], next_before
+
+
+def scan_directory(directory):
+    """
+    Zbiera zdarzenia z plikow fotopulapki w katalogu i podkatalogach (bez
+    katalogow miniatur). Kazde zdjecie to jedno zdarzenie; klip z tym samym
+    czasem w tym samym katalogu jest do niego dolaczany, klip bez zdjecia to
+    osobne zdarzenie.
+    :return: Lista (znacznik czasu UTC, sciezka zdjecia lub None, sciezka klipu lub None).
+    """
+
+    found = []
+    for root, directories, names in os.walk(directory):
+        # Miniatury maja te same nazwy co zdjecia; nie sa osobnymi zdarzeniami
+        directories[:] = [name for name in directories if name != THUMB_DIR]
+        events = {}
+        for name in names:
+            parsed = file_time(name)
+            if parsed is None:
+                continue
+            kind, timestamp = parsed
+            photo, clip = events.get(timestamp, (None, None))
+            if kind == "picture":
+                photo = os.path.join(root, name)
+            else:
+                clip = os.path.join(root, name)
+            events[timestamp] = (photo, clip)
+        found.extend((timestamp, photo, clip) for timestamp, (photo, clip) in events.items())
+    return sorted(found, key=lambda item: item[0])
+
+
+def import_directories(db, directories, primary=DEFAULT_CAMERAS[0]["id"]):
+    """
+    Indeksuje istniejace katalogi fotopulapki w jednej transakcji.
+    Pliki juz obecne w katalogu (zdjecie lub klip) sa pomijane.
+    :param primary: Id kamery glownej, do ktorej naleza pliki bezposrednio
+                    w katalogu; pliki z podkatalogu naleza do kamery o id
+                    rownym jego nazwie.
+    :return: Liczba dodanych zdarzen.
+    """
+
+    known = set()
+    for photos, clip in db.query("SELECT photos, clip FROM motion_events"):
+        known.update(json.loads(photos) if photos else [])
+        known.add(clip)
+    known.discard(None)
+
+    rows = []
+    for directory in directories:
+        for timestamp, photo, clip in scan_directory(directory):
+            if photo in known or clip in known:
+                continue
+            parts = os.path.relpath(photo or clip, directory).split(os.sep)
+            camera = parts[0] if len(parts) > 1 else primary
+            rows.append((timestamp, None, None, None, None,
+                         json.dumps([photo]) if photo else None, clip, "import", camera))
+    if rows:
+        db.executemany(INSERT_EVENT_SQL, rows)
+    return len(rows)
+
+
+def main():
+    """Wiersz polecen: python motion_catalog.py import [--db sciezka] [--dir katalog]."""
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Katalog zdarzen ruchu")
+    parser.add_argument("command", choices=["import"])
+    parser.add_argument("--db", default=os.path.join(base_dir, "measurements.db"))
+    parser.add_argument("--dir", action="append",
+                        help="katalog fotopulapki (domyslnie phototrap obok aplikacji)")
+    args = parser.parse_args()
+
+    init_db(args.db)
+    db = Database(args.db)
+    primary = load_camera_config(os.path.join(base_dir, "cameras.json"))[0]["id"]
+    start = time.perf_counter()
+    added = import_directories(db, args.dir or [os.path.join(base_dir, "phototrap")],
+                               str(primary))
+    print(f"Dodano {added} zdarzen w {time.perf_counter() - start:.2f} s")
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,392 @@
+"""
+Analiza ruchu w procesach roboczych (omija GIL i korzysta ze wszystkich rdzeni).
+
+Kazdy strumien (kamera) ma w pamieci wspoldzielonej (multiprocessing.
+shared_memory) pierscien slots slotow o rozmiarze klatki, tworzony przy
+pierwszej klatce. submit kopiuje klatke do wolnego slotu (jedna kopia
+pamieci), a do procesu roboczego trafia tylko krotka z numerami slotow -
+klatki nie sa serializowane (pickle). Proces odpowiada zwartym wynikiem:
+prostokaty ruchu, pole ruchu i flagi. Gdy nie ma wolnego slotu, klatka jest
+pomijana (licznik dropped), wiec wykrywanie ruchu nie zostaje w tyle.
+
+Obok kazdej klatki pierscien ma miejsce na wynik pierwszego etapu analizy
+(MotionDetector.prepare: pomniejszenie, skala szarosci, rozmycie) i numer
+klatki, dla ktorej jest gotowy. Proces najpierw przygotowuje swoja klatke
+i ja publikuje, a potem porownuje ja z poprzednia klatka strumienia: jesli
+inny proces zdazyl juz przygotowac poprzednia klatke, wynik jest brany
+z pierscienia (trafienie), w przeciwnym razie proces przygotowuje ja sam.
+Dzieki temu kolejne klatki jednego strumienia moga byc analizowane
+rownolegle bez podwajania pracy. Wyniki wracaja do watku zbierajacego, ktory
+ustawia je w kolejnosci klatek i przekazuje do watku strumienia; ten wywoluje
+funkcje strumienia razem z klatka (widok slotu tylko do odczytu, wazny
+w trakcie wywolania). Wolna obsluga wyniku jednej kamery (zapis zdjecia,
+klipu) nie opoznia wiec wynikow pozostalych.
+
+Procesy sa domyslnie uruchamiane przez forkserver z zaladowanym modulem
+motion_pool. Ani serwer, ani procesy robocze nie importuja modulu __main__
+(app.py tworzy przy imporcie kamery, baze danych i watki).
+
+Klatka o innym rozmiarze niz pierwsza klatka strumienia jest pomijana
+(licznik mismatched).
+"""
+import multiprocessing
+from multiprocessing import shared_memory
+import queue
+import sys
+import threading
+import time
+import types
+
+import cv2
+import numpy as np
+
+from camera import MotionDetector
+
+# Domyslna liczba procesow, slotow na strumien i sposob uruchamiania procesow
+POOL_WORKERS = 2
+POOL_SLOTS = 6
+POOL_START_METHOD = "forkserver"
+
+# Opcje MotionPool dozwolone w pliku konfiguracji (motion_pool.json)
+POOL_OPTIONS = ("workers", "slots", "start_method")
+
+# Rodzaje komunikatow do procesow roboczych
+_OPEN, _RING, _TASK = "open", "ring", "task"
+
+# Wyrownanie czesci pierscienia w pamieci wspoldzielonej (bajty)
+_ALIGN = 64
+
+
+def _ring_layout(slots, shape, dtype, prepared_shape):
+    """Zwraca przesuniecia czesci pierscienia (klatki, wyniki prepare, numery) i rozmiar."""
+    def aligned(size):
+        return -(-size // _ALIGN) * _ALIGN
+
+    frames = aligned(slots * int(np.prod(shape)) * np.dtype(dtype).itemsize)
+    prepared = aligned(slots * int(np.prod(prepared_shape)))
+    return (0, frames, frames + prepared), frames + prepared + slots * 8
+
+
+def _ring_views(buffer, slots, shape, dtype, prepared_shape):
+    """Zwraca tablice pierscienia: klatki, wyniki prepare i numery gotowych wynikow."""
+    offsets, _ = _ring_layout(slots, shape, dtype, prepared_shape)
+    return (np.ndarray((slots,) + shape, dtype, buffer, offsets[0]),
+            np.ndarray((slots,) + prepared_shape, np.uint8, buffer, offsets[1]),
+            np.ndarray(slots, np.int64, buffer, offsets[2]))
+
+
+def _worker(index, tasks, results, lock):
+    """Petla procesu roboczego: zadania z tasks, wyniki do results."""
+    # Rownoleglosc zapewniaja procesy; watki OpenCV tylko by z nimi konkurowaly
+    cv2.setNumThreads(1)
+    streams = {}
+    try:
+        while True:
+            message = tasks.get()
+            if message is None:
+                break
+            kind, stream = message[0], message[1]
+            if kind == _OPEN:
+                streams[stream] = {"detector": MotionDetector(**message[2]), "scratch": None}
+            elif kind == _RING:
+                # Proces roboczy korzysta z resource_tracker procesu glownego, wiec
+                # pamieci nie zwalnia; robi to MotionPool.stop (unlink)
+                memory = shared_memory.SharedMemory(name=message[2])
+                state = streams[stream]
+                state["memory"] = memory
+                state["ring"] = _ring_views(memory.buf, *message[3:])
+            else:
+                _, _, seq, slot, prev_seq, prev_slot = message
+                state = streams[stream]
+                detector = state["detector"]
+                frames, prepared, ready = state["ring"]
+                start = time.thread_time()
+                current = detector.prepare(frames[slot], prepared[slot])
+                # Blokada (semafor) porzadkuje zapis wyniku i numeru miedzy procesami
+                with lock:
+                    ready[slot] = seq
+                boxes, area, hit = [], 0.0, True
+                if prev_slot is not None:
+                    with lock:
+                        hit = ready[prev_slot] == prev_seq
+                    if hit:
+                        previous = prepared[prev_slot]
+                    else:
+                        previous = detector.prepare(frames[prev_slot], state["scratch"])
+                        state["scratch"] = previous
+                    boxes, area = detector.compare(previous, current), detector.motion_area
+                results.put((stream, seq, boxes, area, index, bool(hit),
+                             time.thread_time() - start))
+    finally:
+        for state in streams.values():
+            if "memory" in state:
+                state["ring"] = None
+                state["memory"].close()
+
+
+def _start_without_main(process):
+    """
+    Uruchamia proces bez importu modulu __main__ w procesie potomnym.
+    spawn i forkserver przekazuja procesowi sciezke uruchomionego skryptu
+    i importuja go tam jako __mp_main__; na czas start() __main__ jest
+    zastepowany pustym modulem, wiec sciezka nie jest przekazywana.
+    """
+
+    main = sys.modules["__main__"]
+    sys.modules["__main__"] = types.ModuleType("__main__")
+    try:
+        process.start()
+    finally:
+        sys.modules["__main__"] = main
+
+
+class _Stream:
+    """
+    Stan strumienia w procesie glownym: pierscien slotow, kolejnosc, liczniki
+    i kolejka wynikow dla watku strumienia.
+    """
+
+    def __init__(self, callback, detector, skip):
+        self.callback = callback
+        self.results = queue.Queue()
+        self.thread = None
+        self.detector = detector
+        self.skip = skip
+        self.memory = None
+        self.frames = None
+        self.views = []
+        self.refs = []
+        self.shape = None
+        self.seq = 0
+        self.last = None
+        self.received = 0
+        self.delivered = 0
+        self.tasks = {}
+        self.pending = {}
+        self.stats = {"submitted": 0, "analysed": 0, "dropped": 0, "mismatched": 0,
+                      "hits": 0, "misses": 0, "cpu_s": 0.0, "last_latency_ms": 0.0,
+                      "max_latency_ms": 0.0}
+
+
+class MotionPool:
+    """
+    Procesy robocze analizy ruchu z klatkami w pamieci wspoldzielonej.
+    :param workers: Liczba procesow.
+    :param slots: Liczba slotow pierscienia na strumien (klatki w analizie,
+                  poprzednia klatka i klatki czekajace na przekazanie wyniku).
+    :param start_method: Sposob uruchamiania procesow (multiprocessing).
+    """
+
+    def __init__(self, workers=POOL_WORKERS, slots=POOL_SLOTS, start_method=POOL_START_METHOD):
+        if workers < 1:
+            raise ValueError("workers musi byc >= 1")
+        if slots < 3:
+            raise ValueError("slots musi byc >= 3")
+        self.workers = workers
+        self.slots = slots
+        self.start_method = start_method
+        self._context = multiprocessing.get_context(start_method)
+        if start_method == "forkserver":
+            # Serwer laduje OpenCV i NumPy raz; procesy robocze sa z niego forkowane
+            self._context.set_forkserver_preload(["motion_pool"])
+        self._processes = []
+        self._tasks = []
+        self._results = None
+        self._ready_lock = None
+        self._collector = None
+        self._inflight = [0] * workers
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Uruchamia procesy robocze i watek zbierajacy wyniki."""
+        self._results = self._context.Queue()
+        self._ready_lock = self._context.Lock()
+        for index in range(self.workers):
+            tasks = self._context.Queue()
+            process = self._context.Process(target=_worker,
+                                            args=(index, tasks, self._results, self._ready_lock),
+                                            name=f"motion-{index}", daemon=True)
+            _start_without_main(process)
+            self._tasks.append(tasks)
+            self._processes.append(process)
+        self._collector = threading.Thread(target=self._collect, name="motion-results")
+        self._collector.daemon = True
+        self._collector.start()
+
+    def open(self, stream, callback, options=None):
+        """
+        Rejestruje strumien klatek.
+        :param stream: Id strumienia (np. id kamery).
+        :param callback: Funkcja wywolywana w kolejnosci klatek z (prostokaty,
+                         pole ruchu, klatka) - jak wynik MotionDetector.detect.
+        :param options: Opcje MotionDetector strumienia (skip obslugiwany przy submit).
+        """
+
+        options = dict(options or {})
+        skip = options.pop("skip", 1)
+        # Sprawdzenie opcji w procesie glownym (blad nie trafia do procesu roboczego);
+        # detektor wyznacza tez rozmiar wyniku prepare w pierscieniu
+        detector = MotionDetector(**options)
+        state = _Stream(callback, detector, skip)
+        state.thread = threading.Thread(target=self._deliver, args=(stream, state),
+                                        name=f"motion-results-{stream}")
+        state.thread.daemon = True
+        with self._lock:
+            previous = self._streams.get(stream)
+            self._streams[stream] = state
+            for tasks in self._tasks:
+                tasks.put((_OPEN, stream, options))
+        if previous is not None:
+            previous.results.put(None)
+        state.thread.start()
+
+    def submit(self, stream, frame):
+        """
+        Przekazuje klatke strumienia do analizy bez czekania na wynik.
+        :return: True, jesli klatka trafila do procesu roboczego.
+        """
+
+        with self._lock:
+            state = self._streams[stream]
+            state.received += 1
+            if (state.received - 1) % state.skip:
+                return False
+            if state.memory is None:
+                self._create_ring(stream, state, frame)
+            elif frame.shape != state.shape:
+                state.stats["mismatched"] += 1
+                return False
+            slot = self._claim(state)
+            if slot is None:
+                state.stats["dropped"] += 1
+                return False
+        # Kopia poza blokada: slot jest zarezerwowany, inne strumienie nie czekaja
+        state.frames[slot][...] = frame
+
+        with self._lock:
+            state.seq += 1
+            seq = state.seq
+            prev_seq, prev_slot = state.last if state.last is not None else (None, None)
+            # Slot klatki ma dwa odwolania: przekazanie wyniku (z _claim) i "ostatnia
+            # klatka strumienia"; to drugie przechodzi na nastepne zadanie jako
+            # poprzednia klatka i zwalnia je wynik tego zadania
+            state.refs[slot] += 1
+            state.last = (seq, slot)
+            # Najmniej zajety proces; poprzednia klatka moze byc w innym procesie
+            worker = min(range(self.workers), key=lambda index: self._inflight[index])
+            self._inflight[worker] += 1
+            state.tasks[seq] = (slot, prev_slot, worker, time.perf_counter())
+            state.stats["submitted"] += 1
+            self._tasks[worker].put((_TASK, stream, seq, slot, prev_seq, prev_slot))
+        return True
+
+    def stop(self, timeout=5.0):
+        """
+        Konczy procesy robocze, watek zbierajacy i watki strumieni oraz zwalnia
+        pamiec wspoldzielona.
+        """
+
+
+        for tasks in self._tasks:
+            tasks.put(None)
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join(timeout)
+        if self._collector is not None:
+            self._results.put(None)
+            self._collector.join(timeout)
+        with self._lock:
+            streams = list(self._streams.values())
+        for state in streams:
+            state.results.put(None)
+        for state in streams:
+            state.thread.join(timeout)
+        with self._lock:
+            for state in self._streams.values():
+                if state.memory is not None:
+                    state.frames, state.views = None, []
+                    state.memory.close()
+                    state.memory.unlink()
+                    state.memory = None
+        self._processes, self._tasks, self._collector = [], [], None
+
+    def stats(self):
+        """Zwraca liczniki strumieni i liczbe zadan w toku na proces."""
+        with self._lock:
+            streams = {}
+            for stream, state in self._streams.items():
+                depth = len(state.tasks) + len(state.pending) + state.results.qsize()
+                stats = dict(state.stats, depth=depth)
+                stats["cpu_s"] = round(stats["cpu_s"], 3)
+                for name in ("last_latency_ms", "max_latency_ms"):
+                    stats[name] = round(stats[name], 2)
+                streams[stream] = stats
+            return {"workers": self.workers,
+                    "alive": sum(1 for process in self._processes if process.is_alive()),
+                    "inflight": list(self._inflight), "streams": streams}
+
+    def _create_ring(self, stream, state, frame):
+        """Tworzy pierscien slotow strumienia w pamieci wspoldzielonej."""
+        state.shape = frame.shape
+        layout = (self.slots, frame.shape, frame.dtype.str,
+                  state.detector.prepare(frame).shape)
+        state.memory = shared_memory.SharedMemory(create=True, size=_ring_layout(*layout)[1])
+        state.frames = _ring_views(state.memory.buf, *layout)[0]
+        state.views = []
+        for slot in range(self.slots):
+            view = state.frames[slot].view()
+            view.flags.writeable = False
+            state.views.append(view)
+        state.refs = [0] * self.slots
+        for tasks in self._tasks:
+            tasks.put((_RING, stream, state.memory.name) + layout)
+
+    @staticmethod
+    def _claim(state):
+        """Rezerwuje wolny slot strumienia. :return: Numer slotu lub None."""
+        for slot, refs in enumerate(state.refs):
+            if refs == 0:
+                state.refs[slot] = 1
+                return slot
+        return None
+
+    def _collect(self):
+        """Petla watku zbierajacego: wyniki z procesow do watkow strumieni, w kolejnosci klatek."""
+        while True:
+            result = self._results.get()
+            if result is None:
+                break
+            stream, seq, boxes, area, worker, hit, cpu = result
+            with self._lock:
+                state = self._streams[stream]
+                slot, prev_slot, _, submitted = state.tasks.pop(seq)
+                self._inflight[worker] -= 1
+                if prev_slot is not None:
+                    state.refs[prev_slot] -= 1
+                state.stats["hits" if hit else "misses"] += 1
+                state.stats["cpu_s"] += cpu
+                state.pending[seq] = (boxes, area, slot, submitted)
+                while state.delivered + 1 in state.pending:
+                    state.delivered += 1
+                    state.results.put(state.pending.pop(state.delivered))
+
+    def _deliver(self, stream, state):
+        """Petla watku strumienia: wywoluje funkcje strumienia i zwalnia sloty klatek."""
+        while True:
+            result = state.results.get()
+            if result is None:
+                break
+            boxes, area, slot, submitted = result
+            try:
+                state.callback(boxes, area, state.views[slot])
+            except Exception as e:  # pylint: disable=broad-except
+                print(f"Blad obslugi wyniku analizy ruchu {stream}: {e}")
+            latency = (time.perf_counter() - submitted) * 1000
+            with self._lock:
+                state.refs[slot] -= 1
+                state.stats["analysed"] += 1
+                state.stats["last_latency_ms"] = latency
+                state.stats["max_latency_ms"] = max(state.stats["max_latency_ms"], latency)
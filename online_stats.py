@@ -0,0 +1,196 @@
+"""
+Statystyki pomiarow liczone na biezaco w pamieci (endpoint /stats).
+
+Kazdy zapisany pomiar (sluchacz IngestQueue, wiec zarowno symulatory, jak
+i partie z POST /ingest) aktualizuje dla kazdego pola liczbowego w czasie
+O(1) (zamortyzowanym dla okien):
+- liczbe pomiarow, srednia i wariancje (algorytm Welforda),
+- srednia wykladnicza (EWMA),
+- minimum i maksimum w oknach przesuwnych 1 h i 24 h (kolejki
+  monotoniczne: kazdy pomiar jest dodawany i usuwany co najwyzej raz).
+Odczyt statystyk nie wymaga zapytan do bazy.
+
+POST /ingest przyjmuje pomiary z dowolnym znacznikiem czasu. Pomiar
+spozniony (starszy niz najnowszy pomiar pola) wchodzi do liczby, sredniej
+i wariancji, ktore nie zaleza od kolejnosci. W oknach jest wstawiany na
+swoje miejsce w czasie (albo pomijany, gdy jest starszy niz okno). Nie
+zmienia EWMA ani ostatniego pomiaru; liczy go licznik late.
+"""
+from collections import deque
+from datetime import datetime, timedelta, timezone
+import math
+import operator
+import threading
+
+from database import TABLE_COLUMNS, TIMESTAMP_FORMAT, epoch_seconds
+from rollups import ROLLUP_FIELDS
+
+# Waga nowego pomiaru w sredniej wykladniczej
+EWMA_ALPHA = 0.1
+
+# Okna przesuwne: nazwa -> dlugosc w sekundach
+WINDOWS = {"1h": 3600, "24h": 86400}
+
+
+class _Window:
+    """Minimum i maksimum w oknie przesuwnym (kolejki monotoniczne)."""
+
+    __slots__ = ("span", "mins", "maxs")
+
+    def __init__(self, span):
+        self.span = span
+        self.mins = deque()  # (czas, wartosc) z rosnacymi wartosciami
+        self.maxs = deque()  # (czas, wartosc) z malejacymi wartosciami
+
+    def add(self, moment, value):
+        """
+        Dodaje pomiar, usuwajac te, ktore nie moga juz byc ekstremum. Pomiar
+        spozniony jest wstawiany na swoje miejsce w czasie, a starszy niz okno
+        (wzgledem najnowszego pomiaru) pomijany.
+        """
+
+        if self.mins and moment <= self.mins[-1][0] - self.span:
+            return
+        self._insert(self.mins, moment, value, operator.le)
+        self._insert(self.maxs, moment, value, operator.ge)
+        self.expire(moment)
+
+    @staticmethod
+    def _insert(queue, moment, value, dominates):
+        """
+        Wstawia pomiar do kolejki monotonicznej uporzadkowanej po czasie.
+        :param dominates: dominates(a, b) - wartosc a jest nie gorszym ekstremum niz b.
+        """
+
+        index = len(queue)
+        while index and queue[index - 1][0] > moment:
+            index -= 1
+        # Pozniejszy pomiar z nie gorsza wartoscia: ten nigdy nie bedzie ekstremum
+        if index < len(queue) and dominates(queue[index][1], value):
+            return
+        while index and dominates(value, queue[index - 1][1]):
+            del queue[index - 1]
+            index -= 1
+        queue.insert(index, (moment, value))
+
+    def expire(self, now):
+        """Usuwa pomiary starsze niz dlugosc okna."""
+        oldest = now - self.span
+        while self.mins and self.mins[0][0] <= oldest:
+            self.mins.popleft()
+        while self.maxs and self.maxs[0][0] <= oldest:
+            self.maxs.popleft()
+
+    def extremes(self):
+        """Zwraca (minimum, maksimum) lub (None, None) dla pustego okna."""
+        if not self.mins:
+            return None, None
+        return self.mins[0][1], self.maxs[0][1]
+
+
+class RunningStats:
+    """Statystyki jednego pola jednej tabeli."""
+
+    __slots__ = ("count", "mean", "m2", "ewma", "last", "last_timestamp", "newest", "late",
+                 "windows")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.ewma = None
+        self.last = None
+        self.last_timestamp = None
+        self.newest = None
+        self.late = 0
+        self.windows = {name: _Window(span) for name, span in WINDOWS.items()}
+
+    def add(self, timestamp, moment, value, alpha=EWMA_ALPHA):
+        """Aktualizuje statystyki o nowy pomiar (Welford + EWMA + okna)."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.newest is not None and moment < self.newest:
+            # Pomiar spozniony: EWMA i ostatni pomiar dotycza tylko nowszych
+            self.late += 1
+        else:
+            self.newest = moment
+            self.ewma = value if self.ewma is None else self.ewma + alpha * (value - self.ewma)
+            self.last = value
+            self.last_timestamp = timestamp
+        for window in self.windows.values():
+            window.add(moment, value)
+
+    def snapshot(self, now):
+        """Zwraca slownik statystyk; okna sa przycinane do chwili now."""
+        variance = self.m2 / (self.count - 1) if self.count > 1 else None
+        result = {
+            "count": self.count,
+            "mean": self.mean if self.count else None,
+            "variance": variance,
+            "stddev": math.sqrt(variance) if variance is not None else None,
+            "ewma": self.ewma,
+            "last": self.last,
+            "last_timestamp": self.last_timestamp,
+            "late": self.late,
+        }
+        for name, window in self.windows.items():
+            window.expire(now)
+            result[f"min_{name}"], result[f"max_{name}"] = window.extremes()
+        return result
+
+
+class OnlineStats:
+    """
+    Statystyki wszystkich pol liczbowych (ROLLUP_FIELDS) wszystkich tabel.
+    Metoda update ma sygnature sluchacza IngestQueue.
+    """
+
+    def __init__(self, alpha=EWMA_ALPHA):
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._stats = {table: {field: RunningStats() for field in fields}
+                       for table, fields in ROLLUP_FIELDS.items()}
+        # Indeks pola w wierszu (id, timestamp, ...) tabeli
+        self._indexes = {table: [(field, TABLE_COLUMNS[table].index(field) + 1)
+                                 for field in fields]
+                         for table, fields in ROLLUP_FIELDS.items()}
+
+    def update(self, table, rows):
+        """Aktualizuje statystyki o zapisane wiersze (id, timestamp, ...)."""
+        if table not in self._stats:
+            return
+        stats = self._stats[table]
+        indexes = self._indexes[table]
+        with self._lock:
+            for row in rows:
+                timestamp = row[1]
+                moment = epoch_seconds(timestamp)
+                for field, index in indexes:
+                    value = row[index]
+                    if value is not None:
+                        stats[field].add(timestamp, moment, value, self.alpha)
+
+    def warm(self, db, hours=24):
+        """Wypelnia statystyki pomiarami z ostatnich hours godzin z bazy."""
+        since = (datetime.now(timezone.utc) - timedelta(hours=hours)).strftime(TIMESTAMP_FORMAT)
+        for table in self._stats:
+            self.update(table, db.query(f"""SELECT * FROM {table} WHERE timestamp >= ?
+                                        ORDER BY timestamp, id""", (since,)))
+
+    def snapshot(self, table=None, now=None):
+        """
+        Zwraca statystyki {tabela: {pole: {...}}} (lub jednej tabeli).
+        :param now: Chwila (sekundy UTC) do przyciecia okien; domyslnie teraz.
+        :raises ValueError: Przy nieznanej tabeli.
+        """
+
+        if table is not None and table not in self._stats:
+            raise ValueError(f"nieznana tabela: {table}")
+        now = datetime.now(timezone.utc).timestamp() if now is None else now
+        tables = [table] if table is not None else list(self._stats)
+        with self._lock:
+            return {name: {field: stats.snapshot(now)
+                           for field, stats in self._stats[name].items()}
+                    for name in tables}
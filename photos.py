@@ -0,0 +1,246 @@
+"""
+Zapis zdjec z fotopulapki poza watkiem wykrywania ruchu.
+
+detect_motion przekazuje klatke (wlasna kopie, np. z draw_boxes) do
+PhotoWriter.put() i od razu wraca do analizy. Pula watkow zapisujacych
+koduje klatke do JPEG (cv2.imencode zwalnia GIL), zapisuje ja do pliku
+tymczasowego i przenosi pod docelowa nazwe, wiec czytelnicy katalogu
+nigdy nie widza niepelnego pliku.
+
+fsync wykonywany jest partiami: po sync_every zapisanych zdjeciach albo
+gdy od pierwszego niezsynchronizowanego zdjecia minie sync_interval
+sekund (oraz przy stop()). Na karcie SD jeden fsync partii kosztuje
+niewiele wiecej niz fsync jednego pliku.
+
+Gorna granica utraty zdjec:
+- przy przepelnionej kolejce (maxsize zdjec czeka na zapis) nowe zdjecie
+  jest odrzucane od razu, bez czekania - analiza ruchu nigdy nie jest
+  blokowana, a zachowane zostaja starsze zdjecia, w tym pierwsze zdjecie
+  zdarzenia. Odrzucenia liczy licznik dropped;
+- przy zaniku zasilania moga zniknac zdjecia zapisane od ostatniego
+  fsync, czyli co najwyzej sync_every zdjec lub zdjecia z ostatnich
+  sync_interval sekund.
+Zatrzymanie przez stop() zapisuje wszystkie zdjecia pozostale w kolejce.
+"""
+import os
+import queue
+import tempfile
+import threading
+import time
+
+import cv2
+
+# Domyslne parametry puli zapisu
+WORKERS = 2
+QUEUE_SIZE = 16
+SYNC_EVERY = 8
+SYNC_INTERVAL = 2.0
+
+# Jakosc JPEG zdjec (domyslna jakosc cv2.imwrite)
+PHOTO_QUALITY = 95
+
+# Znacznik konca pracy watku zapisujacego
+_STOP = object()
+
+
+def _fsync(path):
+    """Wymusza zapis pliku lub katalogu na nosnik."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class PhotoWriter:
+    """
+    Ograniczona kolejka zdjec z pula watkow kodujacych i zapisujacych.
+    Liczniki (stats()) pokazuja glebokosc kolejki, odrzucone zdjecia
+    i opoznienie zapisu (od put() do zapisania pliku).
+    :param workers: Liczba watkow zapisujacych.
+    :param maxsize: Maksymalna liczba zdjec czekajacych na zapis.
+    :param quality: Jakosc kodowania JPEG (0-100).
+    :param sync_every: Liczba zdjec, po ktorej wykonywany jest fsync partii.
+    :param sync_interval: Maksymalny czas (s) od zapisu zdjecia do fsync.
+    """
+
+    def __init__(self, workers=WORKERS, maxsize=QUEUE_SIZE, quality=PHOTO_QUALITY,
+                 sync_every=SYNC_EVERY, sync_interval=SYNC_INTERVAL):
+        self.workers = workers
+        self.params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._threads = []
+        self._closed = False
+        self._listeners = []
+        self._sync_lock = threading.Lock()
+        self._unsynced = []
+        self._sync_deadline = None
+        self._stats_lock = threading.Lock()
+        self._latency_total = 0.0
+        self._stats = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "failed": 0,
+            "syncs": 0,
+            "max_depth": 0,
+            "last_latency_ms": 0.0,
+            "max_latency_ms": 0.0,
+            "last_sync_ms": 0.0,
+        }
+
+    def add_listener(self, callback):
+        """
+        Rejestruje funkcje wywolywana po zapisaniu kazdego zdjecia
+        (w watku zapisujacym). Funkcja dostaje sciezke pliku.
+        """
+
+        self._listeners.append(callback)
+
+    def start(self):
+        """Uruchamia watki zapisujace."""
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"photo-writer-{i}")
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def put(self, path, frame):
+        """
+        Dodaje zdjecie do kolejki zapisu bez czekania.
+        :param path: Docelowa sciezka pliku JPEG (katalog musi istniec).
+        :param frame: Klatka BGR; nie moze byc pozniej modyfikowana
+                      (przekazywana jest wlasna kopia, np. z draw_boxes).
+        :return: True, jesli zdjecie trafilo do kolejki, False jesli odrzucono.
+        """
+
+        if self._closed:
+            self._count("dropped")
+            return False
+        try:
+            self._queue.put_nowait((path, frame, time.perf_counter()))
+        except queue.Full:
+            self._count("dropped")
+            return False
+
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self._stats["enqueued"] += 1
+            if depth > self._stats["max_depth"]:
+                self._stats["max_depth"] = depth
+        return True
+
+    def stop(self, timeout=None):
+        """Zamyka kolejke, zapisuje pozostale zdjecia, wykonuje fsync i czeka na watki."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join(timeout)
+        if not self._threads:
+            # Bez watkow zapisujacych zdjecia zapisywane sa w watku wywolujacym
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                self._write(*item)
+        self._sync()
+
+    def stats(self):
+        """Zwraca kopie licznikow wraz z aktualna glebokoscia kolejki i srednim opoznieniem."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+            written = stats["written"]
+            stats["avg_latency_ms"] = self._latency_total / written * 1000 if written else 0.0
+        stats["depth"] = self._queue.qsize()
+        with self._sync_lock:
+            stats["unsynced"] = len(self._unsynced)
+        return stats
+
+    def _count(self, name, value=1):
+        """Zwieksza licznik o podana wartosc."""
+        with self._stats_lock:
+            self._stats[name] += value
+
+    def _run(self):
+        """Petla watku zapisujacego: zapis zdjec i fsync partii po czasie."""
+        while True:
+            with self._sync_lock:
+                deadline = self._sync_deadline
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._sync()
+                continue
+            if item is _STOP:
+                break
+            self._write(*item)
+
+    def _write(self, path, frame, queued):
+        """Koduje i zapisuje jedno zdjecie, a po sync_every zdjeciach robi fsync partii."""
+        temporary = None
+        try:
+            success, buffer = cv2.imencode(".jpg", frame, self.params)
+            if not success:
+                raise ValueError("nie udalo sie zakodowac zdjecia")
+            # Wlasny plik tymczasowy dla kazdego zapisu: dwa watki puli moga
+            # zapisywac zdjecie o tej samej nazwie (ta sama sekunda)
+            directory, name = os.path.split(path)
+            descriptor, temporary = tempfile.mkstemp(suffix=".tmp", prefix=name, dir=directory)
+            with os.fdopen(descriptor, "wb") as f:
+                f.write(buffer)
+            os.replace(temporary, path)
+        except (OSError, ValueError, cv2.error) as e:
+            print(f"Blad zapisu zdjecia {path}: {e}")
+            if temporary is not None and os.path.exists(temporary):
+                os.remove(temporary)
+            self._count("failed")
+            return
+
+        latency = time.perf_counter() - queued
+        with self._stats_lock:
+            self._stats["written"] += 1
+            self._stats["last_latency_ms"] = latency * 1000
+            self._stats["max_latency_ms"] = max(self._stats["max_latency_ms"], latency * 1000)
+            self._latency_total += latency
+        with self._sync_lock:
+            if not self._unsynced:
+                self._sync_deadline = time.monotonic() + self.sync_interval
+            self._unsynced.append(path)
+            full = len(self._unsynced) >= self.sync_every
+        if full:
+            self._sync()
+        for callback in self._listeners:
+            try:
+                callback(path)
+            except Exception as e:  # pylint: disable=broad-except
+                print(f"Blad sluchacza zapisu zdjec: {e}")
+
+    def _sync(self):
+        """Wykonuje fsync zapisanych zdjec i ich katalogow (jedna partia)."""
+        with self._sync_lock:
+            paths, self._unsynced = self._unsynced, []
+            self._sync_deadline = None
+        if not paths:
+            return
+        start = time.perf_counter()
+        for path in paths:
+            try:
+                _fsync(path)
+            except OSError as e:
+                print(f"Blad fsync zdjecia {path}: {e}")
+        # Zmiana nazwy pliku jest trwala dopiero po fsync katalogu
+        for directory in {os.path.dirname(path) or "." for path in paths}:
+            try:
+                _fsync(directory)
+            except OSError as e:
+                print(f"Blad fsync katalogu {directory}: {e}")
+        with self._stats_lock:
+            self._stats["syncs"] += 1
+            self._stats["last_sync_ms"] = (time.perf_counter() - start) * 1000
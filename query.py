@@ -0,0 +1,202 @@
+"""
+Zapytania agregujace pomiary w zakresie czasu (endpoint /query).
+
+Przyklad: srednia i 95. percentyl PM2.5 co godzine w zadanym tygodniu
+    /query?table=air_control&fields=pm25&from=2025-01-06&to=2025-01-13
+           &bucket=hour&agg=avg,p95
+
+Proste agregaty (count, min, max, sum, avg, stddev) liczone sa w SQL jednym
+zapytaniem GROUP BY. Odchylenie standardowe liczone jest dwuprzebiegowo:
+srednia przedzialu (funkcja okna AVG OVER) i suma kwadratow odchylen od
+niej, bo wzor z sumy kwadratow traci dokladnosc, gdy srednia jest duza
+w porownaniu z rozrzutem. Percentyle wymagaja wartosci, wiec kolumny sa
+pobierane raz i liczone wektorowo w NumPy (nanpercentile dla calego
+przedzialu naraz), bez petli po wierszach w Pythonie.
+"""
+import math
+import warnings
+
+import numpy as np
+
+from database import MAX_TIMESTAMP, parse_timestamp
+from rollups import RESOLUTIONS, ROLLUP_FIELDS
+
+# Agregaty liczone w SQL
+SQL_AGGREGATES = ("count", "min", "max", "sum", "avg", "stddev")
+
+# Domyslne agregaty i przedzial
+DEFAULT_AGGREGATES = ("avg", "min", "max")
+DEFAULT_BUCKET = "all"
+
+# Maksymalna liczba wierszy pobieranych do liczenia percentyli
+MAX_ROWS = 1000000
+
+
+def parse_aggregates(names):
+    """
+    Sprawdza liste agregatow.
+    Percentyle zapisuje sie jako pNN (np. p50, p95, p99.9); median = p50.
+    :return: (agregaty SQL, slownik nazwa percentyla -> wartosc 0..100).
+    :raises ValueError: Przy nieznanym agregacie lub percentylu spoza zakresu.
+    """
+
+    simple = []
+    percentiles = {}
+    for name in names:
+        if name == "median":
+            percentiles[name] = 50.0
+        elif name in SQL_AGGREGATES:
+            if name not in simple:
+                simple.append(name)
+        elif name.startswith("p"):
+            try:
+                value = float(name[1:])
+            except ValueError as e:
+                raise ValueError(f"nieznany agregat: {name}") from e
+            if not 0 <= value <= 100 or math.isnan(value):
+                raise ValueError(f"percentyl spoza zakresu 0-100: {name}")
+            percentiles[name] = value
+        else:
+            raise ValueError(f"nieznany agregat: {name}")
+    return simple, percentiles
+
+
+def bucket_sql(bucket):
+    """Zwraca wyrazenie SQL wyznaczajace poczatek przedzialu pomiaru."""
+    if bucket == "all":
+        return "NULL"
+    if bucket not in RESOLUTIONS:
+        raise ValueError(f"nieznany przedzial: {bucket}")
+    length, suffix, _ = RESOLUTIONS[bucket]
+    return f"substr(timestamp, 1, {length}) || '{suffix}'"
+
+
+def run_query(db, table, fields=None, start=None, end=None, bucket=DEFAULT_BUCKET,
+              aggregates=DEFAULT_AGGREGATES, max_rows=MAX_ROWS):
+    """
+    Liczy agregaty pol tabeli w zakresie czasu [start, end), w przedzialach.
+    :param table: weather_control, air_control lub water_control.
+    :param fields: Lista pol liczbowych (domyslnie wszystkie z ROLLUP_FIELDS).
+    :param bucket: all (caly zakres), minute, hour lub day.
+    :param aggregates: Lista agregatow: count, min, max, sum, avg, stddev, pNN, median.
+    :return: Lista slownikow {"bucket": ..., pole: {agregat: wartosc}}
+             od najstarszego przedzialu.
+    :raises ValueError: Przy niepoprawnych parametrach lub zbyt duzym zakresie.
+    """
+
+    if table not in ROLLUP_FIELDS:
+        raise ValueError(f"nieznana tabela: {table}")
+    fields = list(fields or ROLLUP_FIELDS[table])
+    unknown = [field for field in fields if field not in ROLLUP_FIELDS[table]]
+    if unknown:
+        raise ValueError(f"nieznane pola: {', '.join(unknown)}")
+    simple, percentiles = parse_aggregates(aggregates or DEFAULT_AGGREGATES)
+    bucket_expr = bucket_sql(bucket)
+    start = "" if start is None or start == "" else parse_timestamp(start)
+    end = MAX_TIMESTAMP if end is None or end == "" else parse_timestamp(end)
+
+    results = {}
+    if simple:
+        for row in _fetch_simple(db, table, fields, bucket_expr, start, end,
+                                 "stddev" in simple):
+            entry = results.setdefault(row[0], {"bucket": row[0]})
+            for i, field in enumerate(fields):
+                count, low, high, total, squares = row[1 + 5 * i:6 + 5 * i]
+                entry[field] = _simple_stats(simple, count, low, high, total, squares)
+
+    if percentiles:
+        for label, values in _fetch_columns(db, table, fields, bucket_expr,
+                                            start, end, max_rows):
+            entry = results.setdefault(label, {"bucket": label})
+            # Wszystkie percentyle wszystkich pol jednym wywolaniem
+            # (przedzial bez wartosci pola daje NaN -> None)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                computed = np.nanpercentile(values, list(percentiles.values()), axis=0)
+            for i, field in enumerate(fields):
+                stats = entry.setdefault(field, {})
+                for j, name in enumerate(percentiles):
+                    value = float(computed[j, i])
+                    stats[name] = None if math.isnan(value) else value
+
+    return [results[label] for label in sorted(results, key=lambda b: b or "")]
+
+
+def _fetch_simple(db, table, fields, bucket_expr, start, end, deviations):
+    """
+    Liczy w SQL agregaty pol w zakresie, w przedzialach.
+    :param deviations: Czy liczyc sume kwadratow odchylen od sredniej
+                       przedzialu (drugi przebieg, potrzebny tylko do stddev).
+    :return: Wiersze (przedzial, a dla kazdego pola: COUNT, MIN, MAX, SUM,
+             suma kwadratow odchylen lub None).
+    """
+
+    columns = []
+    means = []
+    for i, field in enumerate(fields):
+        spread = "NULL"
+        if deviations:
+            means.append(f"AVG({field}) OVER (PARTITION BY {bucket_expr}) AS mean_{i}")
+            spread = f"SUM(({field} - mean_{i}) * ({field} - mean_{i}))"
+        columns += [f"COUNT({field})", f"MIN({field})", f"MAX({field})",
+                    f"SUM({field})", spread]
+    return db.query(f"""SELECT bucket, {', '.join(columns)}
+                    FROM (SELECT {bucket_expr} AS bucket, {', '.join(fields + means)}
+                          FROM {table}
+                          WHERE timestamp >= ? AND timestamp < ?)
+                    GROUP BY bucket ORDER BY bucket""", (start, end))
+
+
+def _simple_stats(names, count, low, high, total, squares):
+    """
+    Wylicza agregaty SQL jednego pola; stddev (proby) z sumy kwadratow
+    odchylen od sredniej przedzialu.
+    """
+
+    stats = {}
+    for name in names:
+        if name == "count":
+            stats[name] = count
+        elif name == "min":
+            stats[name] = low
+        elif name == "max":
+            stats[name] = high
+        elif name == "sum":
+            stats[name] = total
+        elif name == "avg":
+            stats[name] = total / count if count else None
+        elif name == "stddev":
+            if count and count > 1:
+                stats[name] = math.sqrt(squares / (count - 1))
+            else:
+                stats[name] = None
+    return stats
+
+
+def _fetch_columns(db, table, fields, bucket_expr, start, end, max_rows):
+    """
+    Pobiera wartosci pol w zakresie i dzieli je na przedzialy.
+    :return: Lista (poczatek przedzialu, macierz float [wiersze x pola]);
+             NULL w bazie staje sie NaN.
+    """
+
+    rows = db.query(f"""SELECT {bucket_expr} AS bucket, {', '.join(fields)}
+                    FROM {table}
+                    WHERE timestamp >= ? AND timestamp < ?
+                    ORDER BY timestamp LIMIT ?""", (start, end, max_rows + 1))
+    if not rows:
+        return []
+    if len(rows) > max_rows:
+        raise ValueError(f"zakres zawiera wiecej niz {max_rows} pomiarow")
+
+    data = np.array(rows, dtype=object)
+    labels = data[:, 0]
+    values = data[:, 1:].astype(float)
+    # Granice przedzialow: miejsca, w ktorych zmienia sie etykieta
+    if labels[0] is None:
+        bounds = np.array([0, len(rows)])
+    else:
+        changes = np.flatnonzero(labels[1:] != labels[:-1]) + 1
+        bounds = np.concatenate(([0], changes, [len(rows)]))
+    return [(labels[bounds[i]], values[bounds[i]:bounds[i + 1]])
+            for i in range(len(bounds) - 1)]
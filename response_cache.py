@@ -0,0 +1,101 @@
+"""
+Cache zserializowanych odpowiedzi JSON oraz obsluga ETag / If-None-Match.
+
+ETag odpowiedzi wyznaczany jest z id najnowszego pomiaru tabeli (z bufora
+LatestReadings), wiec sprawdzenie If-None-Match nie wymaga ani odczytu
+wierszy, ani serializacji JSON. Gotowe cialo odpowiedzi jest przechowywane
+do czasu zapisu nowych pomiarow do tabeli (invalidate jako sluchacz
+IngestQueue).
+"""
+import threading
+
+
+def make_etag(key, version):
+    """Zwraca ETag (w cudzyslowie) dla klucza odpowiedzi i id pomiaru."""
+    return f'"{key}-{version}"'
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Sprawdza, czy naglowek If-None-Match pasuje do ETag.
+    Obsluguje liste wartosci, slabe ETagi (W/) oraz "*".
+    """
+
+    if not if_none_match:
+        return False
+    for value in if_none_match.split(","):
+        value = value.strip()
+        if value.startswith("W/"):
+            value = value[2:]
+        if value in ("*", etag):
+            return True
+    return False
+
+
+class ResponseCache:
+    """
+    Zserializowane odpowiedzi endpointow czytajacych najnowsze pomiary.
+    Kazdy wpis: klucz -> (tabela, id najnowszego pomiaru, ETag, cialo).
+    """
+
+    def __init__(self, latest):
+        self.latest = latest
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def etag(self, key, table):
+        """Zwraca aktualny ETag odpowiedzi bez odczytu wierszy."""
+        return make_etag(key, self.latest.last_id(table))
+
+    def check(self, key, table, if_none_match):
+        """
+        Sprawdza zadanie warunkowe.
+        :return: (ETag, True gdy klient ma aktualna wersje -> 304).
+        """
+
+        etag = self.etag(key, table)
+        if etag_matches(if_none_match, etag):
+            with self._lock:
+                self.not_modified += 1
+            return etag, True
+        return etag, False
+
+    def get(self, key, table, render):
+        """
+        Zwraca (ETag, cialo) odpowiedzi; render() jest wywolywane tylko,
+        gdy w cache nie ma wersji dla najnowszego pomiaru tabeli.
+        :param render: Funkcja zwracajaca zserializowane cialo (bytes).
+        """
+
+        version = self.latest.last_id(table)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == version:
+                self.hits += 1
+                return entry[2], entry[3]
+            self.misses += 1
+
+        body = render()
+        etag = make_etag(key, version)
+        with self._lock:
+            self._entries[key] = (table, version, etag, body)
+        return etag, body
+
+    def invalidate(self, table, _rows=None):
+        """Usuwa odpowiedzi zalezne od tabeli (sluchacz IngestQueue)."""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry[0] == table]:
+                del self._entries[key]
+
+    def stats(self):
+        """Zwraca liczniki cache."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+            }
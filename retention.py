@@ -0,0 +1,268 @@
+"""
+Silnik retencji danych dla measurements.db.
+
+Surowe pomiary sa przechowywane przez okreslona liczbe dni, a agregaty
+(tabela rollups) dluzej - osobno dla kazdej rozdzielczosci. Przeterminowane
+wiersze sa usuwane malymi porcjami, kazda w osobnej krotkiej transakcji,
+wiec watek zapisujacy pomiary nigdy nie czeka dlugo na blokade bazy.
+Surowe pomiary sa usuwane tylko za dni, ktorych agregaty dzienne obejmuja
+wszystkie wartosci (liczba wartosci w rollups rowna liczbie w tabeli
+surowej). Historia sprzed wlaczenia agregatow czeka wiec w tabeli surowej,
+az zostanie przeliczona poleceniem "python rollups.py backfill"; do tego
+czasu stats() podaje w waiting_for_rollups najstarszy taki dzien.
+Po usunieciu wolne strony sa oddawane systemowi przez PRAGMA
+incremental_vacuum (init_db ustawia auto_vacuum=INCREMENTAL), dzieki czemu
+plik bazy na karcie SD faktycznie sie zmniejsza.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from database import TABLE_COLUMNS, TIMESTAMP_FORMAT, connect
+from rollups import ROLLUP_FIELDS, bucket_start
+
+# Domyslna liczba dni przechowywania: tabela -> dni, "rollups:<rozdzielczosc>"
+# -> dni; None oznacza brak usuwania. Nadpisywane przez retention.json, np.
+# {"weather_control": 60, "alerts": 90, "motion_events": 180}
+DEFAULT_POLICIES = {
+    "weather_control": 30,
+    "air_control": 30,
+    "water_control": 30,
+    "rollups:minute": 90,
+    "rollups:hour": 730,
+    "rollups:day": None,
+    "alerts": 365,
+    "anomalies": 365,
+    # Wiersze katalogu wskazuja zdjecia i klipy na dysku, ktore zostaja
+    "motion_events": None,
+}
+
+# Opcje dozwolone w pliku konfiguracji (retention.json)
+RETENTION_OPTIONS = tuple(DEFAULT_POLICIES)
+
+# Tabele zdarzen usuwane po kolumnie timestamp (bez agregatow)
+EVENT_TABLES = ("alerts", "anomalies", "motion_events")
+
+# Co ile sekund uruchamiana jest retencja i po jakim czasie od startu
+RUN_INTERVAL = 3600
+INITIAL_DELAY = 60
+
+# Liczba wierszy usuwanych w jednej transakcji i przerwa miedzy porcjami
+CHUNK_SIZE = 500
+CHUNK_PAUSE = 0.05
+
+# Liczba stron zwalnianych w jednym kroku incremental_vacuum
+VACUUM_PAGES = 256
+
+
+def cutoff(days, now=None):
+    """Zwraca znacznik czasu, przed ktorym dane sa przeterminowane."""
+    now = now or datetime.now(timezone.utc)
+    return (now - timedelta(days=days)).strftime(TIMESTAMP_FORMAT)
+
+
+def file_size(db_path):
+    """Zwraca laczny rozmiar pliku bazy i pliku WAL w bajtach."""
+    total = 0
+    for path in (db_path, db_path + "-wal"):
+        if os.path.exists(path):
+            total += os.path.getsize(path)
+    return total
+
+
+class RetentionEngine:
+    """
+    Okresowo usuwa przeterminowane dane i zmniejsza plik bazy.
+    Liczniki (stats()) zawieraja liczbe usunietych wierszy dla kazdej
+    tabeli oraz liczbe odzyskanych bajtow.
+    """
+
+    def __init__(self, db_path, policies=None, interval=RUN_INTERVAL,
+                 initial_delay=INITIAL_DELAY, chunk_size=CHUNK_SIZE,
+                 chunk_pause=CHUNK_PAUSE):
+        self.db_path = db_path
+        self.policies = dict(DEFAULT_POLICIES)
+        if policies:
+            self.policies.update(policies)
+        for target, days in self.policies.items():
+            if target not in DEFAULT_POLICIES:
+                raise ValueError(f"nieznana polityka retencji: {target}")
+            if days is not None and (isinstance(days, bool)
+                                     or not isinstance(days, (int, float)) or days <= 0):
+                raise ValueError(f"niepoprawna liczba dni retencji {target}: {days!r}")
+        self.interval = interval
+        self.initial_delay = initial_delay
+        self.chunk_size = chunk_size
+        self.chunk_pause = chunk_pause
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "runs": 0,
+            "rows_pruned": {},
+            "bytes_reclaimed": 0,
+            "waiting_for_rollups": {},
+            "last_run": None,
+            "last_duration_ms": 0.0,
+        }
+
+    def start(self):
+        """Uruchamia watek wykonujacy retencje co interval sekund."""
+        self._thread = threading.Thread(target=self._run, name="retention")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Zatrzymuje watek retencji."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def stats(self):
+        """Zwraca kopie licznikow retencji."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+            stats["rows_pruned"] = dict(stats["rows_pruned"])
+            stats["waiting_for_rollups"] = dict(stats["waiting_for_rollups"])
+        return stats
+
+    def _run(self):
+        """Petla watku retencji."""
+        if self._stop.wait(self.initial_delay):
+            return
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:  # pylint: disable=broad-except
+                print(f"Blad retencji danych: {e}")
+            if self._stop.wait(self.interval):
+                return
+
+    def run_once(self, now=None):
+        """
+        Wykonuje jeden przebieg retencji dla wszystkich polityk.
+        :return: Slownik nazwa polityki -> liczba usunietych wierszy.
+        """
+
+        start = time.perf_counter()
+        size_before = file_size(self.db_path)
+        conn = connect(self.db_path)
+        conn.isolation_level = None  # transakcje sterowane recznie
+        pruned = {}
+        waiting = {}
+        try:
+            for target, days in self.policies.items():
+                if days is None:
+                    continue
+                if target.startswith("rollups:"):
+                    resolution = target.split(":", 1)[1]
+                    pruned[target] = self._prune_rollups(conn, resolution, cutoff(days, now))
+                else:
+                    before = cutoff(days, now)
+                    covered = self._covered_before(conn, target, before)
+                    if covered < before:
+                        waiting[target] = covered[:10]
+                    pruned[target] = self._prune_table(conn, target, covered)
+            if any(pruned.values()):
+                self._vacuum(conn)
+        finally:
+            conn.close()
+        reclaimed = max(0, size_before - file_size(self.db_path))
+
+        with self._stats_lock:
+            self._stats["runs"] += 1
+            for name, count in pruned.items():
+                self._stats["rows_pruned"][name] = self._stats["rows_pruned"].get(name, 0) + count
+            self._stats["bytes_reclaimed"] += reclaimed
+            for table in set(waiting) - set(self._stats["waiting_for_rollups"]):
+                print(f"Retencja {table}: pomiary od {waiting[table]} bez agregatow nie sa "
+                      f"usuwane (python rollups.py backfill)")
+            self._stats["waiting_for_rollups"] = waiting
+            self._stats["last_run"] = datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
+            self._stats["last_duration_ms"] = (time.perf_counter() - start) * 1000
+        return pruned
+
+    def _delete_chunks(self, conn, sql, params):
+        """Powtarza DELETE z LIMIT porcjami, kazda porcja w osobnej transakcji."""
+        total = 0
+        while not self._stop.is_set():
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                deleted = conn.execute(sql, params + (self.chunk_size,)).rowcount
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            total += deleted
+            if deleted < self.chunk_size:
+                break
+            # Przerwa pozwala watkowi zapisujacemu wejsc miedzy porcje
+            time.sleep(self.chunk_pause)
+        return total
+
+    @staticmethod
+    def _covered_before(conn, table, before):
+        """
+        Zwraca granice usuwania pomiarow: before lub poczatek najstarszego dnia
+        sprzed before, ktorego wartosci nie sa w pelni w agregatach dziennych.
+        """
+
+        fields = ROLLUP_FIELDS.get(table)
+        if not fields:
+            return before
+        # Caly dzien zawierajacy before: agregat dzienny obejmuje cala dobe
+        day_end = (datetime.strptime(bucket_start(before, "day"), TIMESTAMP_FORMAT)
+                   + timedelta(days=1)).strftime(TIMESTAMP_FORMAT)
+        raw = conn.execute(f"""
+            SELECT substr(timestamp, 1, 10), {" + ".join(f"COUNT({f})" for f in fields)}
+            FROM {table} WHERE timestamp < ? GROUP BY 1 ORDER BY 1
+        """, (day_end,)).fetchall()
+        placeholders = ", ".join("?" * len(fields))
+        rolled = dict(conn.execute(f"""
+            SELECT substr(bucket, 1, 10), SUM(value_count) FROM rollups
+            WHERE source = ? AND resolution = 'day' AND bucket < ?
+              AND field IN ({placeholders})
+            GROUP BY 1
+        """, (table, day_end) + tuple(fields)).fetchall())
+        for day, count in raw:
+            if rolled.get(day, 0) < count:
+                return min(before, bucket_start(day, "day"))
+        return before
+
+    def _prune_table(self, conn, table, before):
+        """Usuwa surowe pomiary lub zdarzenia starsze niz before."""
+        if table not in TABLE_COLUMNS and table not in EVENT_TABLES:
+            raise ValueError(f"nieznana tabela: {table}")
+        return self._delete_chunks(conn, f"""
+            DELETE FROM {table} WHERE id IN (
+                SELECT id FROM {table} WHERE timestamp < ?
+                ORDER BY timestamp LIMIT ?)
+        """, (before,))
+
+    def _prune_rollups(self, conn, resolution, before):
+        """Usuwa agregaty danej rozdzielczosci starsze niz before."""
+        total = 0
+        # Osobno dla kazdej tabeli zrodlowej, zeby korzystac z klucza glownego
+        for source in TABLE_COLUMNS:
+            total += self._delete_chunks(conn, """
+                DELETE FROM rollups WHERE (source, resolution, bucket, field) IN (
+                    SELECT source, resolution, bucket, field FROM rollups
+                    WHERE source = ? AND resolution = ? AND bucket < ? LIMIT ?)
+            """, (source, resolution, before))
+        return total
+
+    def _vacuum(self, conn):
+        """Zwalnia wolne strony porcjami i skraca plik WAL."""
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        while free > 0 and not self._stop.is_set():
+            # executescript wykonuje pragme do konca (zwalnia wszystkie strony)
+            conn.executescript(f"PRAGMA incremental_vacuum({VACUUM_PAGES});")
+            remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if remaining >= free:
+                break
+            free = remaining
+            time.sleep(self.chunk_pause)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
@@ -0,0 +1,248 @@
+"""
+Agregaty pomiarow (rollupy) w rozdzielczosci minutowej, godzinowej i dziennej.
+
+Tabela rollups przechowuje dla kazdej tabeli zrodlowej, pola i przedzialu
+czasu liczbe pomiarow, ich sume oraz minimum i maksimum (srednia = suma /
+liczba). Agregaty sa aktualizowane przyrostowo: funkcja update_rollups jest
+wywolywana przez kolejke zapisu (IngestQueue.add_batch_hook) w tej samej
+transakcji co zapis partii, wiec nigdy nie rozjezdzaja sie z danymi surowymi.
+
+Dla istniejacej bazy agregaty buduje sie poleceniem:
+    python rollups.py backfill [--db measurements.db]
+"""
+import argparse
+from datetime import datetime
+import os
+import sqlite3
+import time
+
+from database import (MAX_TIMESTAMP, PAGE_LIMIT, TABLE_COLUMNS, TIMESTAMP_FORMAT,
+                      fetch_page, init_db, parse_timestamp, utc_timestamp)
+
+# Pola liczbowe agregowane dla kazdej tabeli
+ROLLUP_FIELDS = {
+    "weather_control": ("temperature", "humidity"),
+    "air_control": ("pm25", "pm10", "temperature", "humidity"),
+    "water_control": ("ph", "current_ph", "temperature"),
+}
+
+# Rozdzielczosc -> (dlugosc prefiksu znacznika czasu, dopelnienie, sekundy)
+RESOLUTIONS = {
+    "minute": (16, ":00", 60),
+    "hour": (13, ":00:00", 3600),
+    "day": (10, " 00:00:00", 86400),
+}
+
+# Zakres czasu, do ktorego tryb auto zwraca dane surowe (w sekundach)
+RAW_SPAN = 2 * 3600
+
+# Maksymalna liczba przedzialow, jaka tryb auto stara sie zwrocic
+MAX_POINTS = 1500
+
+UPSERT_SQL = """
+    INSERT INTO rollups (source, resolution, bucket, field,
+                         value_count, value_sum, value_min, value_max)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (source, resolution, bucket, field) DO UPDATE SET
+        value_count = value_count + excluded.value_count,
+        value_sum = value_sum + excluded.value_sum,
+        value_min = min(value_min, excluded.value_min),
+        value_max = max(value_max, excluded.value_max)
+"""
+
+
+def bucket_start(timestamp, resolution):
+    """Zwraca poczatek przedzialu danej rozdzielczosci, do ktorego nalezy pomiar."""
+    length, suffix, _ = RESOLUTIONS[resolution]
+    return timestamp[:length] + suffix
+
+
+def update_rollups(conn, table, rows):
+    """
+    Dolicza partie wierszy do agregatow (hak kolejki zapisu).
+    Partia jest najpierw agregowana w pamieci, wiec na kazdy przedzial
+    i pole przypada tylko jedno zapytanie UPSERT.
+    :param conn: Polaczenie z otwarta transakcja zapisu partii.
+    :param table: Nazwa tabeli zrodlowej.
+    :param rows: Wiersze w postaci (id, timestamp, ...).
+    """
+
+    fields = ROLLUP_FIELDS.get(table)
+    if not fields:
+        return
+    columns = ("id",) + TABLE_COLUMNS[table]
+    indexes = [(field, columns.index(field)) for field in fields]
+
+    totals = {}
+    for row in rows:
+        timestamp = row[1]
+        if timestamp is None:
+            continue
+        for resolution in RESOLUTIONS:
+            bucket = bucket_start(timestamp, resolution)
+            for field, index in indexes:
+                value = row[index]
+                if value is None:
+                    continue
+                entry = totals.get((resolution, bucket, field))
+                if entry is None:
+                    totals[(resolution, bucket, field)] = [1, value, value, value]
+                else:
+                    entry[0] += 1
+                    entry[1] += value
+                    if value < entry[2]:
+                        entry[2] = value
+                    if value > entry[3]:
+                        entry[3] = value
+
+    conn.executemany(UPSERT_SQL, [
+        (table, resolution, bucket, field, count, total, minimum, maximum)
+        for (resolution, bucket, field), (count, total, minimum, maximum) in totals.items()
+    ])
+
+
+def backfill(db_path, tables=None):
+    """
+    Przelicza od nowa agregaty dla istniejacych danych.
+    Surowe dane moga byc juz czesciowo usuniete przez retencje, dlatego
+    przeliczane sa tylko przedzialy nowsze niz przedzial najstarszego
+    pomiaru; starsze agregaty (i istniejacy agregat tego przedzialu) zostaja.
+    Kazda tabela przeliczana jest w osobnej transakcji, wiec polecenie mozna
+    uruchomic przy dzialajacej aplikacji - zapisy partii czekaja na jej koniec.
+    :return: Slownik tabela -> liczba utworzonych wierszy agregatow.
+    """
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    created = {}
+    try:
+        for table in tables or ROLLUP_FIELDS:
+            count = 0
+            oldest = conn.execute(f"SELECT MIN(timestamp) FROM {table}").fetchone()[0]
+            if oldest is None:
+                created[table] = count
+                continue
+            with conn:
+                for resolution, (length, suffix, _) in RESOLUTIONS.items():
+                    conn.execute("""DELETE FROM rollups
+                                 WHERE source = ? AND resolution = ? AND bucket > ?""",
+                                 (table, resolution, bucket_start(oldest, resolution)))
+                    for field in ROLLUP_FIELDS[table]:
+                        cursor = conn.execute(f"""
+                            INSERT OR IGNORE INTO rollups (source, resolution, bucket, field,
+                                                           value_count, value_sum,
+                                                           value_min, value_max)
+                            SELECT ?, ?, substr(timestamp, 1, {length}) || '{suffix}', ?,
+                                   COUNT({field}), SUM({field}), MIN({field}), MAX({field})
+                            FROM {table}
+                            WHERE timestamp IS NOT NULL AND {field} IS NOT NULL
+                            GROUP BY 3
+                        """, (table, resolution, field))
+                        count += cursor.rowcount
+            created[table] = count
+    finally:
+        conn.close()
+    return created
+
+
+def choose_resolution(start, end):
+    """
+    Dobiera rozdzielczosc do zakresu czasu: dane surowe dla krotkich zakresow,
+    a dla dluzszych najdokladniejszy poziom agregatow, ktory daje co najwyzej
+    MAX_POINTS przedzialow. Bez poczatku zakresu zwraca dane surowe.
+    """
+
+    if start is None or start == "":
+        return "raw"
+    start = datetime.strptime(parse_timestamp(start), TIMESTAMP_FORMAT)
+    end = datetime.strptime(parse_timestamp(end or utc_timestamp()), TIMESTAMP_FORMAT)
+    span = (end - start).total_seconds()
+    if span <= RAW_SPAN:
+        return "raw"
+    for resolution, (_, _, seconds) in RESOLUTIONS.items():
+        if span / seconds <= MAX_POINTS:
+            return resolution
+    return "day"
+
+
+def fetch_rollups(db, table, resolution, start=None, end=None, limit=PAGE_LIMIT):
+    """
+    Zwraca agregaty tabeli od najnowszego przedzialu.
+    :return: (lista slownikow {timestamp, pole: {count, min, max, avg}},
+             kursor nastepnej strony lub None).
+    """
+
+    fields = ROLLUP_FIELDS[table]
+    # Przedzial zawierajacy poczatek zakresu rowniez jest zwracany
+    start = "" if start is None or start == "" else bucket_start(parse_timestamp(start),
+                                                                  resolution)
+    end = MAX_TIMESTAMP if end is None or end == "" else parse_timestamp(end)
+    rows = db.query("""SELECT bucket, field, value_count, value_sum, value_min, value_max
+                    FROM rollups
+                    WHERE source = ? AND resolution = ? AND bucket >= ? AND bucket < ?
+                    ORDER BY bucket DESC LIMIT ?""",
+                    (table, resolution, start, end, limit * len(fields)))
+
+    buckets = []
+    for bucket, field, count, total, minimum, maximum in rows:
+        if not buckets or buckets[-1]["timestamp"] != bucket:
+            if len(buckets) == limit:
+                break
+            buckets.append({"timestamp": bucket})
+        buckets[-1][field] = {
+            "count": count,
+            "min": minimum,
+            "max": maximum,
+            "avg": total / count if count else None,
+        }
+
+    next_before = buckets[-1]["timestamp"] if len(buckets) == limit else None
+    return buckets, next_before
+
+
+def history(db, table, resolution="raw", before=None, start=None, end=None,
+            limit=PAGE_LIMIT):
+    """
+    Wspolna obsluga endpointow historii: dane surowe albo agregaty.
+    :param resolution: raw, minute, hour, day albo auto (dobor wg zakresu).
+    :param before: Kursor strony (id lub znacznik czasu, dla agregatow
+                   poczatek przedzialu); domyslnie koniec zakresu.
+    :return: (lista slownikow, kursor nastepnej strony lub None).
+    :raises ValueError: Przy nieznanej tabeli, rozdzielczosci lub kursorze.
+    """
+
+    if table not in TABLE_COLUMNS:
+        raise ValueError(f"nieznana tabela: {table}")
+    if resolution == "auto":
+        resolution = choose_resolution(start, end)
+
+    if resolution == "raw":
+        rows, next_before = fetch_page(db, table, before or end, limit, start)
+        columns = ("id",) + TABLE_COLUMNS[table]
+        return [dict(zip(columns, row)) for row in rows], next_before
+
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"nieznana rozdzielczosc: {resolution}")
+    if before and str(before).isdigit():
+        raise ValueError("dla agregatow kursor before musi byc znacznikiem czasu")
+    return fetch_rollups(db, table, resolution, start, before or end, limit)
+
+
+def main():
+    """Wiersz polecen: python rollups.py backfill [--db sciezka] [--table nazwa]."""
+    parser = argparse.ArgumentParser(description="Agregaty pomiarow")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--db", default=os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "measurements.db"))
+    parser.add_argument("--table", action="append", choices=list(ROLLUP_FIELDS))
+    args = parser.parse_args()
+
+    init_db(args.db)
+    start = time.perf_counter()
+    created = backfill(args.db, args.table)
+    for table, count in created.items():
+        print(f"{table}: {count} wierszy agregatow")
+    print(f"Czas: {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
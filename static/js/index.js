@@ -44,4 +44,14 @@ socket.on('motion', (data) => {
             alertActive = false; // Resetujemy flage, aby umozliwia kolejne wykrycie ruchu
         }, 10000);
     }
-});
\ No newline at end of file
+});
+
+// Nasluchiwanie na zdarzenie 'alert' (przekroczenie progu pomiaru)
+socket.on('alert', (data) => {
+    if (data.state === 'triggered') {
+        showPopup(`Alert: ${data.message}`);
+        toggleAlertMode(true);
+    } else if (data.state === 'resolved' && !alertActive) {
+        toggleAlertMode(false);
+    }
+});
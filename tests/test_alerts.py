@@ -0,0 +1,101 @@
+"""Testy jednostkowe silnika alertow progowych (modul alerts)."""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from alerts import AlertEngine, parse_alert_request
+from database import Database, init_db
+
+
+def water_rows(values, start_id=1):
+    """Tworzy wiersze water_control co 10 sekund (id, timestamp, ph, ...)."""
+    return [(start_id + i, f"2025-01-01 00:{(10 * i) // 60:02d}:{(10 * i) % 60:02d}",
+             value, "Brak", None, 24.0)
+            for i, value in enumerate(values)]
+
+
+class TestAlertEngine(unittest.TestCase):
+    """
+    Testy klasy AlertEngine.
+    Metody testowe:
+    - test_hysteresis: Wartosc drgajaca wokol progu daje jeden alert.
+    - test_min_duration: Alert dopiero po utrzymaniu warunku przez min_duration.
+    - test_events_recorded_and_emitted: Zdarzenia trafiaja do tabeli i Socket.IO.
+    - test_rules_persist: Reguly sa wczytywane z bazy i zastepowane po nazwie.
+    - test_legacy_request: Dotychczasowa tresc POST /alert tworzy reguly.
+    """
+
+    def setUp(self):
+        """Tworzy baze i silnik alertow zbierajacy emitowane zdarzenia."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, "test.db")
+        init_db(self.db_path)
+        self.db = Database(self.db_path)
+        self.emitted = []
+        self.engine = AlertEngine(self.db, emit=lambda event, data:
+                                  self.emitted.append((event, data)))
+
+    def tearDown(self):
+        """Zamyka polaczenia i usuwa tymczasowa baze danych."""
+        self.db.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def states(self):
+        """Zwraca kolejne stany wyemitowanych alertow."""
+        return [data["state"] for _, data in self.emitted]
+
+    def test_hysteresis(self):
+        """Alert powinien zgasnac dopiero ponizej threshold - hysteresis."""
+        self.engine.add_rule("water_control", "ph", 8.0, hysteresis=0.3)
+        self.engine.evaluate("water_control", water_rows([7.9, 8.1, 7.95, 8.05, 7.8, 7.6, 8.2]))
+        self.assertEqual(self.states(), ["triggered", "resolved", "triggered"])
+        self.assertEqual(self.engine.stats()["evaluated"], 7)
+
+    def test_min_duration(self):
+        """Krotkie przekroczenie nie powinno wlaczyc alertu z min_duration=30 s."""
+        self.engine.add_rule("water_control", "ph", 6.5, op="<", min_duration=30)
+        # 20 s ponizej progu, przerwa, potem 40 s ponizej progu
+        self.engine.evaluate("water_control",
+                             water_rows([6.4, 6.3, 6.4, 7.0, 6.2, 6.2, 6.1, 6.2, 6.3]))
+        self.assertEqual(self.states(), ["triggered"])
+        self.assertEqual(self.emitted[0][1]["timestamp"], "2025-01-01 00:01:10")
+
+    def test_events_recorded_and_emitted(self):
+        """Zdarzenie powinno trafic do tabeli alerts i zdarzenia alert."""
+        self.engine.add_rule("water_control", "temperature", 23.0, name="grzalka")
+        self.engine.evaluate("water_control", water_rows([7.0]))
+        self.assertEqual(self.emitted[0][0], "alert")
+        recent = self.engine.recent()
+        self.assertEqual(len(recent), 1)
+        self.assertEqual((recent[0]["field"], recent[0]["value"], recent[0]["state"]),
+                         ("temperature", 24.0, "triggered"))
+        self.assertIn("grzalka", recent[0]["message"])
+
+    def test_rules_persist(self):
+        """Regula o tej samej nazwie zastepuje poprzednia, takze po ponownym wczytaniu."""
+        self.engine.add_rule("weather_control", "temperature", 30.0, name="temperature")
+        self.engine.add_rule("weather_control", "temperature", 28.0, name="temperature")
+        self.engine.add_rule("air_control", "pm25", 50.0)
+        engine = AlertEngine(self.db)
+        engine.load()
+        thresholds = sorted(rule["threshold"] for rule in engine.rules())
+        self.assertEqual(thresholds, [28.0, 50.0])
+
+    def test_legacy_request(self):
+        """Tresc {"temperature": X, "humidity": Y} powinna dac dwie reguly."""
+        rules = parse_alert_request({"temperature": 30, "humidity": None})
+        self.assertEqual(rules, [{"name": "temperature", "table": "weather_control",
+                                  "field": "temperature", "op": ">", "threshold": 30.0,
+                                  "hysteresis": 0.0, "min_duration": 0.0}])
+        for data in (None, {"rules": {}}, {"field": "ph", "threshold": 7},
+                     {"table": "air_control", "field": "pm25", "threshold": "x"}):
+            with self.assertRaises(ValueError, msg=data):
+                parse_alert_request(data)
+
+
+if __name__ == '__main__':
+    unittest.main()
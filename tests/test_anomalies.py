@@ -0,0 +1,100 @@
+"""Testy jednostkowe wykrywania anomalii w strumieniu pomiarow (modul anomalies)."""
+import os
+import random
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from anomalies import AnomalyDetector, replay
+from database import Database, init_db
+
+
+def water_rows(values, start_id=1):
+    """Tworzy wiersze water_control co 10 sekund (id, timestamp, ph, ...)."""
+    rows = []
+    for i, value in enumerate(values):
+        second = 10 * i
+        stamp = f"2025-01-01 {second // 3600:02d}:{second // 60 % 60:02d}:{second % 60:02d}"
+        rows.append((start_id + i, stamp, value, "Brak", None, None))
+    return rows
+
+
+def detected(events):
+    """Zwraca pary (timestamp, detektor) wykrytych anomalii."""
+    return sorted((event["timestamp"], event["detector"]) for event in events)
+
+
+class TestAnomalyDetector(unittest.TestCase):
+    """
+    Testy klasy AnomalyDetector i trybu wektorowego.
+    Metody testowe:
+    - test_spike: Pojedynczy skok odstaje od okna (zscore i rate).
+    - test_flatline: Zawieszony czujnik zglaszany raz na serie.
+    - test_recorded_and_emitted: Anomalie trafiaja do tabeli i Socket.IO.
+    - test_replay_matches_stream: Tryb wektorowy daje te same anomalie co strumien.
+    """
+
+    def setUp(self):
+        """Tworzy baze i detektor zbierajacy emitowane zdarzenia."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, "test.db")
+        init_db(self.db_path)
+        self.db = Database(self.db_path)
+        self.emitted = []
+        self.detector = AnomalyDetector(self.db, emit=lambda event, data:
+                                        self.emitted.append((event, data)))
+
+    def tearDown(self):
+        """Zamyka polaczenia i usuwa tymczasowa baze danych."""
+        self.db.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_spike(self):
+        """Skok pH o 3 przy szumie 0.1 powinien zostac wykryty."""
+        values = [7.0 + 0.1 * (i % 3) for i in range(80)]
+        values[70] = 10.0
+        events = self.detector.update("water_control", water_rows(values))
+        kinds = {(event["timestamp"], event["detector"]) for event in events}
+        self.assertIn(("2025-01-01 00:11:40", "zscore"), kinds)
+        self.assertIn(("2025-01-01 00:11:40", "rate"), kinds)
+        self.assertNotIn("flatline", {event["detector"] for event in events})
+
+    def test_flatline(self):
+        """Seria 40 identycznych odczytow to jedno zgloszenie flatline."""
+        values = [7.0 + 0.1 * (i % 3) for i in range(20)] + [7.1] * 40
+        events = self.detector.update("water_control", water_rows(values))
+        flat = [event for event in events if event["detector"] == "flatline"]
+        self.assertEqual(len(flat), 1)
+        self.assertEqual(flat[0]["value"], 7.1)
+
+    def test_recorded_and_emitted(self):
+        """Anomalia powinna trafic do tabeli anomalies i zdarzenia anomaly."""
+        self.detector.update("water_control", water_rows([7.0, 12.0]))
+        self.assertEqual([event for event, _ in self.emitted], ["anomaly"])
+        recent = self.detector.recent()
+        self.assertEqual((recent[0]["field"], recent[0]["detector"], recent[0]["value"]),
+                         ("ph", "rate", 12.0))
+        self.assertEqual(self.detector.stats(), {"checked": 2, "rate": 1})
+
+    def test_replay_matches_stream(self):
+        """Test wsteczny na bazie powinien wskazac te same anomalie co strumien."""
+        random.seed(7)
+        values = [round(random.gauss(7.0, 0.2), 2) for _ in range(500)]
+        values[100:140] = [6.8] * 40
+        values[300] = 4.0
+        values[420] = None
+        rows = water_rows(values)
+        self.db.executemany("""INSERT INTO water_control (id, timestamp, ph, adjustment,
+                            current_ph, temperature) VALUES (?, ?, ?, ?, ?, ?)""", rows)
+        streamed = AnomalyDetector().update("water_control", rows)
+        replayed = replay(self.db, ["water_control"])
+        self.assertEqual(detected(replayed), detected(streamed))
+        self.assertIn(("2025-01-01 00:50:00", "zscore"), detected(replayed))
+        self.assertIn("flatline", {event["detector"] for event in replayed})
+
+
+if __name__ == '__main__':
+    unittest.main()
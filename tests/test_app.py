@@ -13,6 +13,7 @@ class FlaskRoutesTestCase(unittest.TestCase):
     - test_aquarium_page(): Testuje strone z Akwarium.
     - test_air_quality_page(): Testuje strone dotyczaca jakosci powietrza.
     - test_camera_page(): Testuje strone z kamera.
+    - test_events_page(): Testuje galerie zdarzen ruchu.
     Wszystkie metody testowe wykonuja zapytania HTTP na odpowiednie adresy URL serwera
     i sprawdzaja status odpowiedzi. Jesli status jest inny niz 200, test konczy sie niepowodzeniem.
     W przypadku bledu polaczenia z serwerem, test rowniez konczy sie niepowodzeniem.
@@ -21,6 +22,8 @@ class FlaskRoutesTestCase(unittest.TestCase):
     :param unittest.TestCase: Klasa bazowa dla testow jednostkowych"""
 
     BASE_URL = "http://127.0.0.1:5000"
+    # Limit czasu odpowiedzi (s); zawieszony serwer nie wstrzymuje testow
+    TIMEOUT = 10
 
     def test_check_server(self):
         """
@@ -141,6 +144,30 @@ class FlaskRoutesTestCase(unittest.TestCase):
         except requests.exceptions.ConnectionError:
             self.fail("Nie mozna polaczyc sie z serwerem: Kamera")
 
+    def test_events_page(self):
+        """
+        Testuje galerie zdarzen ruchu.
+        Sprawdza, czy strona i lista zdarzen w JSON (z filtrem
+        zakresu czasu) zwracaja kod 200, a niepoprawny kursor kod 400.
+        Jesli nie mozna polaczyc sie z serwerem,
+        test konczy sie niepowodzeniem.
+        """
+
+        try:
+            response = requests.get(f"{self.BASE_URL}/events_page", timeout=self.TIMEOUT)
+            self.assertEqual(response.status_code, 200)
+            response = requests.get(f"{self.BASE_URL}/events",
+                                    params={"from": "2025-01-01", "limit": 5},
+                                    timeout=self.TIMEOUT)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn("events", response.json())
+            response = requests.get(f"{self.BASE_URL}/events", params={"before": "x"},
+                                    timeout=self.TIMEOUT)
+            self.assertEqual(response.status_code, 400)
+            print("Test response: dla galerii zdarzen ruchu - OK")
+        except requests.exceptions.ConnectionError:
+            self.fail("Nie mozna polaczyc sie z serwerem: Zdarzenia ruchu")
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,330 @@
+"""Testy jednostkowe wspolnych elementow obslugi kamery (modul camera)."""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from camera import (ACTIVE, COOLDOWN, DROP_OLDEST, IDLE, FrameBus, FrameRing, JpegCache,
+                    MotionDetector, MotionEvents, capture_loop, load_motion_config,
+                    mjpeg_part)
+
+
+def make_frame(value):
+    """Tworzy klatke 120x160 BGR wypelniona jedna wartoscia."""
+    return np.full((120, 160, 3), value, dtype=np.uint8)
+
+
+class TestFrameBus(unittest.TestCase):
+    """
+    Testy klasy FrameBus.
+    Metody testowe:
+    - test_latest_only: Odbiorca LATEST_ONLY dostaje tylko najnowsza klatke.
+    - test_drop_oldest: Przepelniona kolejka DROP_OLDEST traci najstarsze klatki.
+    - test_wait_for_frame: Odbiorca spi do publikacji i nie dostaje klatki dwa razy.
+    """
+
+    def setUp(self):
+        """Tworzy pusta szyne klatek."""
+        self.bus = FrameBus()
+
+    def test_latest_only(self):
+        """Zalegle klatki powinny byc pominiete."""
+        frames = self.bus.subscribe()
+        for value in range(5):
+            self.bus.publish(make_frame(value))
+        seq, frame = frames.get()
+        self.assertEqual((seq, frame.array[0, 0, 0]), (5, 4))
+        self.assertIsNone(frames.get(timeout=0.01))
+        self.assertEqual(frames.dropped, 4)
+
+    def test_drop_oldest(self):
+        """Kolejka o dlugosci 3 powinna zachowac trzy najnowsze klatki."""
+        frames = self.bus.subscribe(DROP_OLDEST, size=3)
+        for value in range(5):
+            self.bus.publish(make_frame(value))
+        self.assertEqual([frames.get()[0] for _ in range(3)], [3, 4, 5])
+        frames.close()
+        self.assertIsNone(frames.get())
+        self.assertEqual(self.bus.stats()["subscribers"], [])
+
+    def test_wait_for_frame(self):
+        """Czekajacy odbiorca powinien obudzic sie po publikacji."""
+        frames = self.bus.subscribe()
+        received = []
+        thread = threading.Thread(target=lambda: received.append(frames.get(timeout=5)))
+        thread.start()
+        self.bus.publish(make_frame(1))
+        thread.join()
+        self.assertEqual(received[0][0], 1)
+        self.assertIsNone(frames.get(timeout=0.01))
+
+
+class TestFrameRing(unittest.TestCase):
+    """
+    Testy klasy FrameRing i funkcji capture_loop.
+    Metody testowe:
+    - test_claim_skips_used_slots: Zajete sloty nie sa przydzielane do zapisu.
+    - test_capture_in_place: Klatki trafiaja do bufora, a trzymana klatka sie nie zmienia.
+    """
+
+    def test_claim_skips_used_slots(self):
+        """Slot z odwolaniem nie moze byc ponownie zarezerwowany."""
+        ring = FrameRing((4, 4, 3), slots=2)
+        first = ring.commit(ring.claim()[0])
+        second = ring.commit(ring.claim()[0])
+        self.assertIsNone(ring.claim())
+        second.release()
+        self.assertEqual(ring.claim()[0], second.slot)
+        self.assertFalse(first.array.flags.writeable)
+        first.release()
+        with self.assertRaises(RuntimeError):
+            first.release()
+
+    def test_capture_in_place(self):
+        """capture_loop powinien czytac do slotow i nie nadpisywac uzywanej klatki."""
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, "clip.avi")
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 20, (64, 48))
+            for value in range(0, 250, 10):
+                writer.write(make_frame(value)[:48, :64])
+            writer.release()
+
+            bus = FrameBus()
+            frames = bus.subscribe()
+            camera = cv2.VideoCapture(path)
+            result = {}
+            thread = threading.Thread(target=lambda: result.setdefault(
+                "ring", capture_loop(camera, bus, slots=4, delay=0)))
+            thread.start()
+            held = frames.get(timeout=5)[1]
+            snapshot = held.array.copy()
+            thread.join()
+            camera.release()
+
+            ring = result["ring"]
+            self.assertTrue(np.shares_memory(held.array, ring.frames))
+            self.assertGreater(ring.stats()["claimed"], 4)
+            np.testing.assert_array_equal(held.array, snapshot)
+            held.release()
+            frames.close()
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+def write_clip(path):
+    """
+    Nagrywa klip testowy 640x480 (MJPG, 60 klatek): tlo z szumem, jasny
+    obiekt 240x240 przeskakujacy miedzy dwoma pozycjami w klatkach 10-30
+    i migajacy obszar w prawym gornym rogu w klatkach 40-50.
+    """
+
+    rng = np.random.default_rng(1)
+    background = rng.integers(0, 60, (480, 640, 3), dtype=np.uint8)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 20, (640, 480))
+    for i in range(60):
+        frame = background.copy()
+        if 10 <= i <= 30:
+            x = 100 if i % 2 else 300
+            frame[220:460, x:x + 240] = 220
+        if 40 <= i <= 50:
+            frame[0:200, 440:640] = 200 if i % 2 else 40
+        writer.write(frame)
+    writer.release()
+
+
+def run_clip(path, detector):
+    """Zwraca wyniki detect dla kolejnych klatek klipu."""
+    camera = cv2.VideoCapture(path)
+    results = []
+    while True:
+        success, frame = camera.read()
+        if not success:
+            break
+        results.append(detector.detect(frame))
+    camera.release()
+    return results
+
+
+class TestMotionDetector(unittest.TestCase):
+    """
+    Testy klasy MotionDetector na nagranym klipie testowym.
+    Metody testowe:
+    - test_downscaled_matches_full_resolution: Analiza 320 px daje te same klatki z ruchem.
+    - test_boxes_scaled_back: Prostokaty sa we wspolrzednych pelnej klatki.
+    - test_exclusion_mask: Ruch w obszarze wykluczonym jest ignorowany.
+    - test_skip_frames: Pomijane klatki nie sa analizowane.
+    - test_load_config: Opcje wczytywane z motion.json.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Nagrywa klip testowy raz dla wszystkich testow."""
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.clip = os.path.join(cls.tmp_dir, "motion.avi")
+        write_clip(cls.clip)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Usuwa klip testowy."""
+        shutil.rmtree(cls.tmp_dir)
+
+    def test_downscaled_matches_full_resolution(self):
+        """Klatki z ruchem powinny byc takie same przy pelnej i zmniejszonej rozdzielczosci."""
+        full = [bool(boxes) for boxes in run_clip(self.clip, MotionDetector(width=None))]
+        small = [bool(boxes) for boxes in run_clip(self.clip, MotionDetector())]
+        self.assertEqual(full[11:31], [True] * 20)
+        self.assertTrue(all(full[41:51]))
+        agreement = sum(a == b for a, b in zip(full, small)) / len(full)
+        self.assertGreaterEqual(agreement, 0.95)
+        self.assertFalse(any(small[:10]) or any(small[32:40]) or any(small[52:]))
+
+    def test_boxes_scaled_back(self):
+        """Prostokaty z analizy 160 px powinny pokrywac sie z analiza pelnej klatki."""
+        full = run_clip(self.clip, MotionDetector(width=None))[20]
+        small = run_clip(self.clip, MotionDetector(width=160))[20]
+        self.assertEqual(len(small), len(full))
+        for expected, box in zip(sorted(full), sorted(small)):
+            for a, b in zip(expected, box):
+                self.assertLessEqual(abs(a - b), 8, (expected, box))
+
+    def test_exclusion_mask(self):
+        """Migajacy obszar wykluczony maska nie powinien wlaczac ruchu."""
+        corner = [(0.6, 0.0), (1.0, 0.0), (1.0, 0.5), (0.6, 0.5)]
+        flagged = [bool(boxes) for boxes in
+                   run_clip(self.clip, MotionDetector(exclude=[corner]))]
+        self.assertFalse(any(flagged[40:52]))
+        self.assertTrue(all(flagged[11:31]))
+
+        bottom = [(0.0, 0.5), (1.0, 0.5), (1.0, 1.0), (0.0, 1.0)]
+        flagged = [bool(boxes) for boxes in run_clip(self.clip, MotionDetector(roi=[bottom]))]
+        self.assertFalse(any(flagged[40:52]))
+        self.assertTrue(all(flagged[11:31]))
+
+    def test_skip_frames(self):
+        """Przy skip=3 analizowana powinna byc tylko co trzecia klatka."""
+        results = run_clip(self.clip, MotionDetector(skip=3))
+        self.assertTrue(all(result is None for result in results[1::3] + results[2::3]))
+        self.assertTrue(all(results[12:31:3]))
+        with self.assertRaises(ValueError):
+            MotionDetector(min_area=25000)
+
+    def test_load_config(self):
+        """Plik motion.json powinien dawac opcje MotionDetector."""
+        path = os.path.join(self.tmp_dir, "motion.json")
+        self.assertEqual(load_motion_config(path), {})
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('{"width": 160, "skip": 2}')
+        self.assertEqual(MotionDetector(**load_motion_config(path)).width, 160)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('{"area": 1}')
+        with self.assertRaises(ValueError):
+            load_motion_config(path)
+
+
+class TestMotionEvents(unittest.TestCase):
+    """
+    Testy klasy MotionEvents.
+    Metody testowe:
+    - test_event_lifecycle: idle -> active -> cooldown -> active -> idle, jedno zdarzenie.
+    - test_notify_interval: Trwajacy ruch zglaszany co notify_interval.
+    """
+
+    def test_event_lifecycle(self):
+        """Krotka przerwa w ruchu nie powinna konczyc zdarzenia."""
+        events = MotionEvents(cooldown=3, notify_interval=10)
+        box = [(10, 10, 50, 50)]
+        kinds = []
+        states = []
+        ended = None
+        # Ruch w sekundach 0-2, przerwa 2 s, ruch 5-6, potem cisza
+        timeline = [box, box, box, [], [], box, box, [], [], [], [], []]
+        for second, boxes in enumerate(timeline):
+            area = 0.1 * second if boxes else 0.0
+            notices = events.update(boxes, area, now=1000 + second)
+            kinds.extend(kind for kind, _ in notices)
+            states.append(events.state)
+            if notices and notices[-1][0] == "end":
+                ended = notices[-1][1]
+        self.assertEqual(kinds, ["start", "end"])
+        self.assertEqual(states[2:4] + states[5:6] + states[-1:], [ACTIVE, COOLDOWN, ACTIVE, IDLE])
+        self.assertIsNotNone(ended)
+        self.assertEqual((ended["start"], ended["end"]),
+                         ("1970-01-01 00:16:40", "1970-01-01 00:16:46"))
+        self.assertEqual(ended["frames"], 5)
+        self.assertAlmostEqual(ended["peak_area"], 0.6)
+        self.assertEqual(events.update(None, 0.0, now=2000), [])
+
+    def test_notify_interval(self):
+        """Ruch przez 25 s przy odstepie 10 s daje start i dwie aktualizacje."""
+        events = MotionEvents(cooldown=3, notify_interval=10)
+        kinds = []
+        for second in range(25):
+            kinds.extend(kind for kind, _ in
+                         events.update([(0, 0, 5, 5)], 0.2, now=float(second)))
+        self.assertEqual(kinds, ["start", "update", "update"])
+
+
+class TestJpegCache(unittest.TestCase):
+    """
+    Testy klasy JpegCache.
+    Metody testowe:
+    - test_no_frame: Bez klatki get zwraca (0, None).
+    - test_encode_once: Wielokrotny odczyt tej samej klatki koduje ja raz.
+    - test_concurrent_clients: Wielu klientow naraz - jedno kodowanie na klatke.
+    """
+
+    def setUp(self):
+        """Tworzy pusty cache JPEG."""
+        self.bus = FrameBus()
+        self.cache = JpegCache(self.bus)
+
+    def test_no_frame(self):
+        """Przed pierwsza klatka nie ma czego wysylac."""
+        self.assertEqual(self.cache.get(), (0, None))
+
+    def test_encode_once(self):
+        """Nowa klatka powinna byc kodowana przy pierwszym odczycie i tylko raz."""
+        self.bus.publish(make_frame(10))
+        seq, jpeg = self.cache.get()
+        self.assertEqual(self.cache.get(), (seq, jpeg))
+        self.assertEqual(self.cache.stats()["encoded"], 1)
+        decoded = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+        self.assertEqual(decoded.shape, (120, 160, 3))
+
+        self.bus.publish(make_frame(200))
+        self.bus.publish(make_frame(100))
+        new_seq, new_jpeg = self.cache.get()
+        self.assertEqual(new_seq, seq + 2)
+        self.assertNotEqual(new_jpeg, jpeg)
+        self.assertEqual(self.cache.stats()["encoded"], 2)
+        self.assertTrue(mjpeg_part(new_jpeg).startswith(b'--frame\r\n'))
+
+    def test_concurrent_clients(self):
+        """Rownolegli klienci powinni dostac te same bajty jednego kodowania."""
+        self.bus.publish(make_frame(50))
+        results = []
+        barrier = threading.Barrier(8)
+
+        def client():
+            barrier.wait()
+            results.append(self.cache.get())
+
+        threads = [threading.Thread(target=client) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(self.cache.stats()["encoded"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+"""Testy jednostkowe rejestru kamer (modul cameras)."""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from cameras import (FAILED, STOPPED, Camera, CameraRegistry, load_camera_config,
+                     parse_source)
+
+
+def write_video(path, frames=10, size=(160, 120)):
+    """Zapisuje krotki plik wideo MJPG z rosnaca jasnoscia klatek."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, size)
+    for i in range(frames):
+        writer.write(np.full((size[1], size[0], 3), i * 20, np.uint8))
+    writer.release()
+
+
+class TestCameras(unittest.TestCase):
+    """
+    Testy konfiguracji kamer oraz klas Camera i CameraRegistry.
+    Metody testowe:
+    - test_config: Domyslna kamera, zrodla i odrzucanie niepoprawnej konfiguracji.
+    - test_file_camera: Plik wideo jest odtwarzany w petli, a stop konczy odbiorcow.
+    - test_failed_camera: Niedostepne zrodlo nie wstrzymuje pozostalych kamer.
+    - test_stats_window: Kolejne wywolania stats() nie zeruja sobie fps i udzialu CPU.
+    """
+
+    def setUp(self):
+        """Tworzy katalog tymczasowy z plikiem wideo."""
+        self.tmp_dir = tempfile.mkdtemp(prefix="test_cameras_")
+        self.video = os.path.join(self.tmp_dir, "nagranie.avi")
+        write_video(self.video)
+
+    def tearDown(self):
+        """Usuwa pliki tymczasowe."""
+        shutil.rmtree(self.tmp_dir)
+
+    def write_config(self, config):
+        """Zapisuje cameras.json i zwraca jego sciezke."""
+        path = os.path.join(self.tmp_dir, "cameras.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(config, f)
+        return path
+
+    def test_config(self):
+        """Bez pliku jest kamera USB 0; opcje ruchu kamery nadpisuja wspolne."""
+        self.assertEqual(load_camera_config(os.path.join(self.tmp_dir, "brak.json")),
+                         [{"id": "0", "source": 0}])
+        self.assertEqual([parse_source(s) for s in (0, "1", "rtsp://kamera/1", self.video)],
+                         [0, 1, "rtsp://kamera/1", self.video])
+
+        path = self.write_config([{"id": "drzwi", "source": "0"},
+                                  {"id": "ogrod", "source": self.video,
+                                   "motion": {"min_area": 0.02}}])
+        registry = CameraRegistry(load_camera_config(path), {"width": 160, "min_area": 0.1})
+        self.assertEqual([camera.id for camera in registry], ["drzwi", "ogrod"])
+        self.assertIs(registry.primary, registry.get("drzwi"))
+        self.assertIsNone(registry.get("garaz"))
+        self.assertEqual(registry.get("drzwi").source, 0)
+        self.assertEqual(registry.get("ogrod").motion, {"width": 160, "min_area": 0.02})
+
+        for config in ([{"id": "a/b", "source": 0}], [{"id": "a", "source": 0}] * 2,
+                       [{"id": "a", "source": 0, "fps": 5}],
+                       [{"id": "a", "source": 0, "motion": {"szybko": True}}], []):
+            with self.assertRaises(ValueError):
+                load_camera_config(self.write_config(config))
+        with self.assertRaises(ValueError):
+            parse_source(None)
+
+    def test_file_camera(self):
+        """10 klatek z pliku odtwarzanego w petli; stop zamyka subskrypcje."""
+        camera = Camera("plik", self.video, delay=0.001)
+        frames = camera.bus.subscribe(policy="drop_oldest", size=64)
+        camera.start()
+        seen = []
+        while len(seen) < 25:
+            item = frames.get(timeout=5)
+            self.assertIsNotNone(item)
+            with item[1] as frame:
+                seen.append(int(frame[60, 80, 0]))
+        camera.stop(timeout=5)
+
+        self.assertIsNone(frames.get(timeout=1))
+        self.assertEqual(camera.state, STOPPED)
+        stats = camera.stats()
+        self.assertGreaterEqual(stats["opened"], 3)
+        self.assertGreaterEqual(stats["frames"], 25)
+        self.assertIn("capture", stats["cpu_s"])
+        # Po ostatniej klatce pliku odtwarzanie zaczyna sie od poczatku
+        self.assertLess(seen[10], seen[9])
+
+    def test_failed_camera(self):
+        """Kamera z brakujacym plikiem przechodzi w stan failed, druga dziala dalej."""
+        registry = CameraRegistry([{"id": "zepsuta", "source": "brak.avi", "retry": 0.05},
+                                   {"id": "dobra", "source": self.video, "delay": 0.001}])
+        frames = registry.get("dobra").bus.subscribe()
+        registry.get("dobra").spawn("odbiorca", time.sleep, 0.2)
+        registry.start()
+        self.assertIsNotNone(frames.get(timeout=5))
+        deadline = time.monotonic() + 5
+        while registry.get("zepsuta").state != FAILED and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stats = registry.stats()
+        registry.stop(timeout=5)
+
+        self.assertEqual(stats["zepsuta"]["state"], FAILED)
+        self.assertGreaterEqual(stats["zepsuta"]["failed"], 1)
+        self.assertEqual(stats["zepsuta"]["frames"], 0)
+        self.assertGreater(stats["dobra"]["frames"], 0)
+        self.assertEqual(set(stats["dobra"]["cpu_s"]), {"capture", "odbiorca", "jpeg"})
+
+    def test_stats_window(self):
+        """Dwa wywolania stats() zaraz po sobie daja te same fps (okno probek, nie wywolan)."""
+        camera = Camera("plik", self.video, delay=0.005)
+        camera.start()
+        try:
+            deadline = time.monotonic() + 5
+            while camera.bus.stats()["seq"] < 20 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            first, second = camera.stats(), camera.stats()
+        finally:
+            camera.stop(timeout=5)
+
+        self.assertGreater(first["fps"], 10)
+        self.assertGreater(second["fps"], first["fps"] / 2)
+        self.assertGreater(second["cpu_percent"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""Testy jednostkowe nagrywania klipow zdarzen ruchu (modul clips)."""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from clips import ClipRecorder
+
+
+def make_jpeg(value):
+    """Tworzy klatke JPEG 120x160 wypelniona jedna wartoscia."""
+    frame = np.full((120, 160, 3), value, dtype=np.uint8)
+    return cv2.imencode(".jpg", frame)[1].tobytes()
+
+
+def count_frames(path):
+    """Zwraca liczbe klatek zapisanego klipu."""
+    video = cv2.VideoCapture(path)
+    count = 0
+    while video.read()[0]:
+        count += 1
+    video.release()
+    return count
+
+
+class TestClipRecorder(unittest.TestCase):
+    """
+    Testy klasy ClipRecorder.
+    Metody testowe:
+    - test_pre_and_post_roll: Klip obejmuje klatki sprzed zdarzenia, zdarzenie i post_roll.
+    - test_buffer_limits: Bufor jest ograniczony czasem pre_roll i liczba bajtow.
+    - test_extend_and_cut: Ruch w post_roll przedluza klip, a limit dlugosci go zamyka.
+    - test_drop_when_full: Przy pelnej kolejce zapisu klip jest odrzucany.
+    """
+
+    def setUp(self):
+        """Tworzy tymczasowy katalog klipow."""
+        self.clip_dir = tempfile.mkdtemp(prefix="test_clips_")
+        self.jpeg = make_jpeg(128)
+
+    def tearDown(self):
+        """Usuwa tymczasowy katalog klipow."""
+        shutil.rmtree(self.clip_dir)
+
+    def feed(self, recorder, start, stop, fps=10):
+        """Dodaje klatki z chwil start..stop (s) z podana czestotliwoscia."""
+        for i in range(round(start * fps), round(stop * fps)):
+            recorder.add(self.jpeg, now=i / fps)
+
+    def test_pre_and_post_roll(self):
+        """2 s przed, 3 s zdarzenia i 1 s po zdarzeniu przy 10 kl./s."""
+        recorder = ClipRecorder(pre_roll=2, post_roll=1)
+        written = []
+        recorder.add_listener(lambda path, frames: written.append((path, frames)))
+        recorder.start()
+        path = os.path.join(self.clip_dir, "clip.avi")
+        self.feed(recorder, 0, 5)
+        self.assertTrue(recorder.trigger(path))
+        self.feed(recorder, 5, 8)
+        recorder.finish(now=7.95)
+        self.feed(recorder, 8, 12)
+        self.assertFalse(recorder.stats()["recording"])
+        recorder.stop()
+
+        # Klatki 3.0-4.9 (pre_roll), 5.0-7.9 (zdarzenie), 8.0-8.9 (post_roll)
+        self.assertEqual(written, [(path, 60)])
+        self.assertEqual(count_frames(path), 60)
+        self.assertEqual(os.listdir(self.clip_dir), ["clip.avi"])
+        self.assertEqual(recorder.stats()["written"], 1)
+
+    def test_buffer_limits(self):
+        """Bufor powinien trzymac tylko pre_roll sekund i nie wiecej niz buffer_bytes."""
+        recorder = ClipRecorder(pre_roll=2)
+        self.feed(recorder, 0, 10)
+        self.assertEqual(recorder.stats()["buffered_frames"], 21)
+
+        recorder = ClipRecorder(pre_roll=2, buffer_bytes=5 * len(self.jpeg))
+        self.feed(recorder, 0, 10)
+        stats = recorder.stats()
+        self.assertEqual((stats["buffered_frames"], stats["buffered_bytes"]),
+                         (5, 5 * len(self.jpeg)))
+
+    def test_extend_and_cut(self):
+        """Trigger w post_roll przedluza klip; klip dluzszy niz max_seconds jest zamykany."""
+        recorder = ClipRecorder(pre_roll=1, post_roll=1, max_seconds=5)
+        self.assertTrue(recorder.trigger(os.path.join(self.clip_dir, "a.avi")))
+        self.feed(recorder, 0, 2)
+        recorder.finish(now=2)
+        self.feed(recorder, 2, 2.5)
+        self.assertFalse(recorder.trigger(os.path.join(self.clip_dir, "b.avi")))
+        self.feed(recorder, 2.5, 4)
+        self.assertTrue(recorder.stats()["recording"])
+        self.feed(recorder, 4, 6)
+        stats = recorder.stats()
+        self.assertEqual((stats["recording"], stats["cut"], stats["depth"]), (False, 1, 1))
+        recorder.stop()
+        # Klatki 0.0-5.0: klip zamkniety po klatce, na ktorej osiagnal 5 s
+        self.assertEqual(os.listdir(self.clip_dir), ["a.avi"])
+        self.assertEqual(count_frames(os.path.join(self.clip_dir, "a.avi")), 51)
+
+    def test_drop_when_full(self):
+        """Kolejka na jeden klip bez watku powinna odrzucic drugi klip."""
+        recorder = ClipRecorder(pre_roll=1, post_roll=0, queue_size=1)
+        for i in range(2):
+            recorder.trigger(os.path.join(self.clip_dir, f"{i}.avi"))
+            self.feed(recorder, i * 10, i * 10 + 1)
+            recorder.finish(now=i * 10 + 1)
+            recorder.add(self.jpeg, now=i * 10 + 2)
+        stats = recorder.stats()
+        self.assertEqual((stats["clips"], stats["dropped"], stats["depth"]), (2, 1, 1))
+        recorder.stop()
+        self.assertEqual(os.listdir(self.clip_dir), ["0.avi"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+"""Testy jednostkowe wczytywania opcji podsystemow (modul config)."""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import load_options
+
+
+class TestLoadOptions(unittest.TestCase):
+    """
+    Testy funkcji load_options.
+    Metody testowe:
+    - test_missing_file: Brak pliku oznacza pusty slownik opcji.
+    - test_known_options: Opcje z listy sa zwracane bez zmian.
+    - test_unknown_options: Nieznane opcje zglaszaja ValueError z nazwa pliku.
+    """
+
+    def setUp(self):
+        """Tworzy katalog tymczasowy na pliki konfiguracji."""
+        self.tmp_dir = tempfile.mkdtemp(prefix="test_config_")
+        self.path = os.path.join(self.tmp_dir, "retention.json")
+
+    def tearDown(self):
+        """Usuwa katalog tymczasowy."""
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, text):
+        """Zapisuje plik konfiguracji."""
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_missing_file(self):
+        """Bez pliku podsystem korzysta z ustawien domyslnych."""
+        self.assertEqual(load_options(self.path, ("alerts",)), {})
+
+    def test_known_options(self):
+        """Plik z dozwolonymi kluczami powinien zostac wczytany w calosci."""
+        self.write('{"alerts": 30, "rollups:day": null}')
+        self.assertEqual(load_options(self.path, ("alerts", "rollups:day", "anomalies")),
+                         {"alerts": 30, "rollups:day": None})
+
+    def test_unknown_options(self):
+        """Nieznany klucz powinien zglosic blad z nazwa pliku i klucza."""
+        self.write('{"alerts": 30, "alarms": 7}')
+        with self.assertRaisesRegex(ValueError, "retention.json: alarms"):
+            load_options(self.path, ("alerts",))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+"""Testy jednostkowe wspolnej warstwy dostepu do bazy danych (modul database)."""
+import asyncio
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import Database, DbExecutor, fetch_page, init_db, parse_limit
+
+
+class TestDatabasePool(unittest.TestCase):
+    """
+    Testy puli polaczen Database.
+    Metody testowe:
+    - test_wal_mode: Sprawdza, czy polaczenia pracuja w trybie WAL.
+    - test_execute_and_query: Sprawdza zapis i odczyt przez pule.
+    - test_connections_are_reused: Sprawdza, czy polaczenia sa ponownie uzywane.
+    - test_rollback_on_error: Sprawdza wycofanie niezatwierdzonej transakcji.
+    """
+
+    def setUp(self):
+        """Tworzy tymczasowa baze danych z tabelami aplikacji."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, "test.db")
+        init_db(self.db_path)
+        self.db = Database(self.db_path, pool_size=2)
+
+    def tearDown(self):
+        """Zamyka polaczenia i usuwa tymczasowa baze danych."""
+        self.db.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_wal_mode(self):
+        """Tryb dziennika powinien byc ustawiony na WAL."""
+        self.assertEqual(self.db.query_one("PRAGMA journal_mode")[0], "wal")
+
+    def test_execute_and_query(self):
+        """Wstawiony wiersz powinien byc widoczny w kolejnym zapytaniu."""
+        row_id = self.db.execute("""INSERT INTO weather_control
+                                 (temperature, humidity)
+                                 VALUES (?, ?)""", (22.5, 45.0))
+        row = self.db.query_one("SELECT * FROM weather_control WHERE id=?", (row_id,))
+        self.assertEqual(row[2:], (22.5, 45.0))
+
+    def test_connections_are_reused(self):
+        """Wiele watkow nie powinno tworzyc wiecej polaczen niz rozmiar puli."""
+        def worker():
+            for _ in range(50):
+                self.db.query("SELECT COUNT(*) FROM weather_control")
+
+        threads = [threading.Thread(target=worker) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertLessEqual(self.db._created, 2)  # pylint: disable=protected-access
+
+    def test_rollback_on_error(self):
+        """Transakcja przerwana wyjatkiem nie powinna zostac zatwierdzona."""
+        with self.assertRaises(RuntimeError):
+            with self.db.connection() as conn:
+                conn.execute("""INSERT INTO weather_control
+                             (temperature, humidity) VALUES (1.0, 1.0)""")
+                raise RuntimeError("przerwanie")
+        count = self.db.query_one("SELECT COUNT(*) FROM weather_control")[0]
+        self.assertEqual(count, 0)
+
+
+class TestKeysetPagination(unittest.TestCase):
+    """
+    Testy stronicowania kluczem (fetch_page).
+    Metody testowe:
+    - test_timestamp_index: Sprawdza, czy init_db tworzy indeksy timestamp.
+    - test_pages_by_id: Sprawdza kolejne strony wyznaczane kursorem id.
+    - test_page_by_timestamp: Sprawdza kursor w postaci znacznika czasu.
+    - test_invalid_parameters: Sprawdza odrzucanie niepoprawnych parametrow.
+    """
+
+    def setUp(self):
+        """Tworzy baze z 25 pomiarami pogody, po jednym na minute."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, "test.db")
+        init_db(self.db_path)
+        self.db = Database(self.db_path)
+        self.db.executemany("""INSERT INTO weather_control
+                            (timestamp, temperature, humidity) VALUES (?, ?, ?)""",
+                            [(f"2025-01-01 00:{i:02d}:00", float(i), 50.0)
+                             for i in range(25)])
+
+    def tearDown(self):
+        """Zamyka polaczenia i usuwa tymczasowa baze danych."""
+        self.db.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_timestamp_index(self):
+        """Kazda tabela pomiarowa powinna miec indeks po timestamp."""
+        names = {row[0] for row in self.db.query(
+            "SELECT name FROM sqlite_master WHERE type='index'")}
+        for table in ("weather_control", "air_control", "water_control"):
+            self.assertIn(f"idx_{table}_timestamp", names)
+
+    def test_pages_by_id(self):
+        """Kolejne strony powinny pokryc cala tabele bez powtorzen."""
+        seen = []
+        before = None
+        while True:
+            rows, before = fetch_page(self.db, "weather_control", before, 10)
+            seen.extend(row[0] for row in rows)
+            if before is None:
+                break
+        self.assertEqual(seen, list(range(25, 0, -1)))
+
+    def test_page_by_timestamp(self):
+        """Kursor czasowy powinien zwrocic wiersze sprzed podanej chwili."""
+        rows, _ = fetch_page(self.db, "weather_control", "2025-01-01T00:05:00", 100)
+        self.assertEqual([row[2] for row in rows], [4.0, 3.0, 2.0, 1.0, 0.0])
+
+    def test_invalid_parameters(self):
+        """Niepoprawna tabela, kursor lub limit powinny zglosic ValueError."""
+        with self.assertRaises(ValueError):
+            fetch_page(self.db, "sqlite_master")
+        with self.assertRaises(ValueError):
+            fetch_page(self.db, "weather_control", "wczoraj")
+        with self.assertRaises(ValueError):
+            parse_limit("0")
+        self.assertEqual(parse_limit("100000"), 1000)
+
+
+class TestDbExecutor(unittest.TestCase):
+    """
+    Testy klasy DbExecutor.
+    Metody testowe:
+    - test_runs_off_event_loop: Operacje wykonywane sa w watkach puli.
+    - test_bounded_concurrency: Jednoczesnie dziala najwyzej workers operacji.
+    """
+
+    def setUp(self):
+        """Tworzy wykonawce z dwoma watkami."""
+        self.db_executor = DbExecutor(workers=2, max_pending=4)
+
+    def tearDown(self):
+        """Zamyka watki wykonawcy."""
+        self.db_executor.shutdown()
+
+    def test_runs_off_event_loop(self):
+        """Funkcja powinna wykonac sie w watku innym niz petla zdarzen."""
+        async def main():
+            return await self.db_executor.run(lambda: threading.current_thread().name)
+        self.assertTrue(asyncio.run(main()).startswith("db"))
+
+    def test_bounded_concurrency(self):
+        """Przy 10 zleceniach naraz rownolegle powinny dzialac najwyzej 2."""
+        barrier = threading.Event()
+
+        async def main():
+            tasks = [self.db_executor.run(barrier.wait, 0.05) for _ in range(10)]
+            return await asyncio.gather(*tasks)
+
+        asyncio.run(main())
+        stats = self.db_executor.stats()
+        self.assertEqual(stats["calls"], 10)
+        self.assertEqual(stats["max_running"], 2)
+        self.assertEqual(stats["running"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""Testy jednostkowe strumieniowego eksportu pomiarow (modul export)."""
+import csv
+import io
+import json
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import Database, init_db
+from export import open_export
+
+
+class TestExport(unittest.TestCase):
+    """
+    Testy funkcji open_export.
+    Metody testowe:
+    - test_ndjson_in_chunks: NDJSON wysylany jest porcjami po fetch_size.
+    - test_csv_with_range: CSV z naglowkiem i filtrem zakresu czasu.
+    - test_invalid_parameters: Niepoprawne parametry zglaszaja ValueError.
+    """
+
+    def setUp(self):
+        """Tworzy baze z 25 pomiarami jakosci powietrza."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, "test.db")
+        init_db(self.db_path)
+        db = Database(self.db_path)
+        db.executemany("""INSERT INTO air_control
+                       (timestamp, pm25, pm10, temperature, humidity, air_quality)
+                       VALUES (?, ?, ?, ?, ?, ?)""",
+                       [(f"2025-01-01 00:00:{i:02d}", float(i), 1.0, 20.0, 50.0, "Dobra")
+                        for i in range(25)])
+        db.close()
+
+    def tearDown(self):
+        """Usuwa tymczasowa baze danych."""
+        shutil.rmtree(self.tmp_dir)
+
+    def test_ndjson_in_chunks(self):
+        """Kazda porcja powinna zawierac co najwyzej fetch_size wierszy."""
+        chunks = list(open_export(self.db_path, "air_control", "ndjson", fetch_size=10))
+        self.assertEqual(len(chunks), 3)
+        rows = [json.loads(line) for chunk in chunks for line in chunk.decode().splitlines()]
+        self.assertEqual([row["pm25"] for row in rows], [float(i) for i in range(25)])
+        self.assertEqual(rows[0]["air_quality"], "Dobra")
+
+    def test_csv_with_range(self):
+        """CSV powinien miec naglowek i tylko wiersze z zakresu [from, to)."""
+        data = b"".join(open_export(self.db_path, "air_control", "csv",
+                                    "2025-01-01 00:00:05", "2025-01-01T00:00:08"))
+        rows = list(csv.reader(io.StringIO(data.decode())))
+        self.assertEqual(rows[0], ["id", "timestamp", "pm25", "pm10",
+                                   "temperature", "humidity", "air_quality"])
+        self.assertEqual([row[2] for row in rows[1:]], ["5.0", "6.0", "7.0"])
+
+    def test_invalid_parameters(self):
+        """Nieznana tabela, format lub zly znacznik czasu powinny zglosic blad."""
+        with self.assertRaises(ValueError):
+            open_export(self.db_path, "rollups")
+        with self.assertRaises(ValueError):
+            open_export(self.db_path, "air_control", "xml")
+        with self.assertRaises(ValueError):
+            open_export(self.db_path, "air_control", "csv", "wczoraj")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,200 @@
+"""Testy jednostkowe kolejki zapisu pomiarow partiami (modul ingest)."""
+import json
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import time
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import init_db
+from ingest import IngestQueue, parse_batch
+
+
+class TestIngestQueue(unittest.TestCase):
+    """
+    Testy klasy IngestQueue.
+    Metody testowe:
+    - test_flush_on_batch_size: Partia jest zapisywana po osiagnieciu rozmiaru.
+    - test_flush_on_interval: Niepelna partia jest zapisywana po czasie.
+    - test_stop_flushes_queue: Zatrzymanie zapisuje pozostale odczyty.
+    - test_backpressure_drops: Pelna kolejka odrzuca i zlicza odczyty.
+    - test_listener_receives_rows: Sluchacz dostaje wiersze z identyfikatorami.
+    - test_write_batch_acknowledges: Partia z write_batch() zwraca zakres id.
+    - test_write_batch_without_thread: Zapis partii bez uruchomionego watku.
+    - test_locked_database_retried: Zablokowana baza opoznia partie, nie gubi jej.
+    """
+
+    def setUp(self):
+        """Tworzy tymczasowa baze danych z tabelami aplikacji."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, "test.db")
+        init_db(self.db_path)
+
+    def tearDown(self):
+        """Usuwa tymczasowa baze danych."""
+        shutil.rmtree(self.tmp_dir)
+
+    def count(self, table):
+        """Zwraca liczbe wierszy w tabeli."""
+        conn = sqlite3.connect(self.db_path)
+        result = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        conn.close()
+        return result
+
+    def test_flush_on_batch_size(self):
+        """Pelna partia powinna zostac zapisana w jednej transakcji."""
+        ingest = IngestQueue(self.db_path, batch_size=10, flush_interval=60)
+        ingest.start()
+        for i in range(10):
+            ingest.put("weather_control", {"temperature": i, "humidity": 50.0})
+        time.sleep(0.3)
+        self.assertEqual(self.count("weather_control"), 10)
+        self.assertEqual(ingest.stats()["batches"], 1)
+        ingest.stop()
+
+    def test_flush_on_interval(self):
+        """Niepelna partia powinna zostac zapisana po flush_interval."""
+        ingest = IngestQueue(self.db_path, batch_size=100, flush_interval=0.1)
+        ingest.start()
+        ingest.put("air_control", {"pm25": 10.0, "pm10": 20.0, "air_quality": "Dobra"})
+        time.sleep(0.5)
+        self.assertEqual(self.count("air_control"), 1)
+        ingest.stop()
+
+    def test_stop_flushes_queue(self):
+        """Po stop() wszystkie przyjete odczyty powinny byc w bazie."""
+        ingest = IngestQueue(self.db_path, batch_size=1000, flush_interval=60)
+        ingest.start()
+        for i in range(250):
+            ingest.put("water_control", {"ph": 7.0, "temperature": i})
+        ingest.stop()
+        self.assertEqual(self.count("water_control"), 250)
+        self.assertFalse(ingest.put("water_control", {"ph": 7.0}))
+
+    def test_backpressure_drops(self):
+        """Odczyty, ktore nie mieszcza sie w kolejce, powinny byc zliczone."""
+        ingest = IngestQueue(self.db_path, maxsize=5, put_timeout=0.01)
+        for _ in range(8):
+            ingest.put("weather_control", {"temperature": 1.0})
+        stats = ingest.stats()
+        self.assertEqual(stats["enqueued"], 5)
+        self.assertEqual(stats["blocked"], 3)
+        self.assertEqual(stats["dropped"], 3)
+
+    def test_listener_receives_rows(self):
+        """Sluchacz powinien dostac wiersze w ksztalcie SELECT * z tabeli."""
+        received = []
+        ingest = IngestQueue(self.db_path, batch_size=3, flush_interval=60)
+        ingest.add_listener(lambda table, rows: received.append((table, rows)))
+        ingest.start()
+        for i in range(3):
+            ingest.put("weather_control", {"timestamp": f"2025-01-01 00:00:0{i}",
+                                           "temperature": float(i), "humidity": 40.0})
+        ingest.stop()
+
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute("SELECT * FROM weather_control ORDER BY id").fetchall()
+        conn.close()
+        self.assertEqual(received, [("weather_control", rows)])
+
+    def test_write_batch_acknowledges(self):
+        """Partia powinna zostac zapisana po odczytach z put() i potwierdzona."""
+        ingest = IngestQueue(self.db_path, batch_size=1000, flush_interval=60)
+        ingest.start()
+        ingest.put("weather_control", {"temperature": 1.0})
+        rows = parse_batch("weather_control", '[{"temperature": 2.0}, {"temperature": 3}]')
+        self.assertEqual(ingest.write_batch("weather_control", rows), (2, 3))
+        self.assertEqual(self.count("weather_control"), 3)
+        self.assertEqual(ingest.stats()["bulk_batches"], 1)
+        ingest.stop()
+        with self.assertRaises(RuntimeError):
+            ingest.write_batch("weather_control", rows)
+
+    def test_write_batch_without_thread(self):
+        """Bez watku zapisujacego partia powinna zostac zapisana bezposrednio."""
+        ingest = IngestQueue(self.db_path)
+        rows = parse_batch("water_control", b'{"ph": 7.1}\n{"ph": 6.9, "adjustment": "Brak"}\n')
+        self.assertEqual(ingest.write_batch("water_control", rows), (1, 2))
+        self.assertEqual(self.count("water_control"), 2)
+
+    def test_locked_database_retried(self):
+        """Partia jest ponawiana przy "database is locked", a odrzucana przy innym bledzie."""
+        errors = [sqlite3.OperationalError("database is locked")] * 2
+
+        def hook(_conn, _table, rows):
+            if errors:
+                raise errors.pop(0)
+            if rows[0][2] == -1.0:
+                raise sqlite3.OperationalError("no such column: humidity")
+
+        ingest = IngestQueue(self.db_path, batch_size=3, flush_interval=60, retry_delay=0.01)
+        ingest.add_batch_hook(hook)
+        ingest.start()
+        for i in range(3):
+            ingest.put("weather_control", {"temperature": i})
+        rows = parse_batch("weather_control", '[{"temperature": 5.0}]')
+        self.assertEqual(ingest.write_batch("weather_control", rows), (4, 4))
+        with self.assertRaises(sqlite3.OperationalError):
+            ingest.write_batch("weather_control", [("2025-01-01 00:00:00", -1.0, None)])
+        ingest.stop()
+
+        stats = ingest.stats()
+        self.assertEqual(self.count("weather_control"), 4)
+        self.assertEqual((stats["retries"], stats["written"], stats["failed"]), (2, 4, 1))
+
+
+class TestParseBatch(unittest.TestCase):
+    """
+    Testy funkcji parse_batch.
+    Metody testowe:
+    - test_json_and_ndjson: Oba formaty daja te same krotki.
+    - test_invalid_rows: Niepoprawne pomiary sa odrzucane z numerem wiersza.
+    - test_invalid_dates: Nieistniejaca data o poprawnym ksztalcie jest odrzucana.
+    """
+
+    def test_json_and_ndjson(self):
+        """Tablica JSON i NDJSON powinny dac wiersze w kolejnosci kolumn."""
+        records = [{"timestamp": "2025-01-01T10:00:00", "pm25": 5, "air_quality": "Dobra"},
+                   {"timestamp": "2025-01-01 10:00:10", "pm10": 7.5}]
+        expected = [("2025-01-01 10:00:00", 5, None, None, None, "Dobra"),
+                    ("2025-01-01 10:00:10", None, 7.5, None, None, None)]
+        self.assertEqual(parse_batch("air_control", json.dumps(records)), expected)
+        ndjson = "\n".join(json.dumps(record) for record in records)
+        self.assertEqual(parse_batch("air_control", ndjson), expected)
+
+    def test_invalid_rows(self):
+        """Bledna tabela, kolumna, typ lub znacznik czasu powinny zglosic blad."""
+        invalid = [("rollups", '[{"x": 1}]'),
+                   ("weather_control", ""),
+                   ("weather_control", "[1, 2]"),
+                   ("weather_control", '{"temperature": 1}\n{"temp": 2}'),
+                   ("weather_control", '[{"temperature": "21"}]'),
+                   ("weather_control", '[{"temperature": true}]'),
+                   ("weather_control", '[{"timestamp": "wczoraj"}]'),
+                   ("water_control", '[{"adjustment": 1}]'),
+                   ("weather_control", "{niepoprawny")]
+        for table, body in invalid:
+            with self.assertRaises(ValueError, msg=body):
+                parse_batch(table, body)
+        with self.assertRaisesRegex(ValueError, "wiersz 1"):
+            parse_batch("weather_control", '{"temperature": 1}\n{"temp": 2}')
+        with self.assertRaises(ValueError):
+            parse_batch("weather_control", '[{}, {}, {}]', max_rows=2)
+
+    def test_invalid_dates(self):
+        """Miesiac, dzien lub godzina poza zakresem powinny zglosic blad z numerem wiersza."""
+        for stamp in ("2025-13-01 10:00:00", "2025-02-30 10:00:00", "2025-01-01T24:00:00",
+                      "2025-13-45 99:99:99"):
+            body = json.dumps([{"temperature": 1}, {"timestamp": stamp, "temperature": 2}])
+            with self.assertRaisesRegex(ValueError, "wiersz 1", msg=stamp):
+                parse_batch("weather_control", body)
+        rows = parse_batch("weather_control", '[{"timestamp": "2024-02-29T23:59:59"}]')
+        self.assertEqual(rows, [("2024-02-29 23:59:59", None, None)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+"""Testy jednostkowe bufora najnowszych pomiarow (modul latest)."""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import Database, init_db
+from latest import LatestReadings
+
+
+class TestLatestReadings(unittest.TestCase):
+    """
+    Testy klasy LatestReadings.
+    Metody testowe:
+    - test_warm_from_database: Bufor laduje ostatnie wiersze z bazy.
+    - test_ring_overwrites_oldest: Po zapelnieniu nadpisywane sa najstarsze wiersze.
+    - test_skips_known_rows: Wiersze juz obecne w buforze nie sa dublowane.
+    - test_columns_projection: Zwraca wybrane kolumny w podanej kolejnosci.
+    - test_back_dated_rows: Wiersze z wczesniejszym znacznikiem czasu trafiaja na swoje miejsce.
+    """
+
+    def setUp(self):
+        """Tworzy baze z 8 pomiarami jakosci wody."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, "test.db")
+        init_db(self.db_path)
+        self.db = Database(self.db_path)
+        self.db.executemany("""INSERT INTO water_control
+                            (timestamp, ph, adjustment, current_ph, temperature)
+                            VALUES (?, ?, 'Brak', ?, 24.0)""",
+                            [(f"2025-01-01 00:00:{i:02d}", 7.0 + i / 10, 7.0)
+                             for i in range(8)])
+        self.latest = LatestReadings(self.db, capacity=5)
+
+    def tearDown(self):
+        """Zamyka polaczenia i usuwa tymczasowa baze danych."""
+        self.db.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_warm_from_database(self):
+        """Pierwszy odczyt powinien zwrocic najnowsze wiersze z bazy."""
+        rows = self.latest.latest("water_control", 3)
+        self.assertEqual([row[0] for row in rows], [8, 7, 6])
+        self.assertEqual(len(self.latest.latest("water_control", 50)), 5)
+        self.assertEqual(self.latest.latest("air_control"), [])
+
+    def test_ring_overwrites_oldest(self):
+        """Nowe wiersze powinny wypierac najstarsze po zapelnieniu bufora."""
+        self.latest.warm()
+        new_rows = [(i, f"2025-01-01 00:01:{i:02d}", 7.5, "Brak", 7.5, 24.0)
+                    for i in range(9, 13)]
+        self.latest.extend("water_control", new_rows)
+        rows = self.latest.latest("water_control", 5)
+        self.assertEqual([row[0] for row in rows], [12, 11, 10, 9, 8])
+        self.assertEqual(self.latest.last_id("water_control"), 12)
+
+    def test_skips_known_rows(self):
+        """Wiersze zapisane przed warm() nie powinny pojawic sie dwa razy."""
+        self.latest.warm()
+        known = self.db.query("SELECT * FROM water_control WHERE id >= 7")
+        self.latest.extend("water_control", known)
+        rows = self.latest.latest("water_control", 5)
+        self.assertEqual([row[0] for row in rows], [8, 7, 6, 5, 4])
+
+    def test_columns_projection(self):
+        """Parametr columns powinien zwracac kolumny jak w zapytaniu SELECT."""
+        rows = self.latest.latest("water_control", 1,
+                                  ("id", "timestamp", "temperature", "ph", "adjustment"))
+        self.assertEqual(rows, [(8, "2025-01-01 00:00:07", 24.0, 7.7, "Brak")])
+
+    def test_back_dated_rows(self):
+        """Kolejnosc bufora powinna byc taka jak ORDER BY timestamp DESC, id DESC."""
+        self.latest.warm()
+        rows = [(9, "2025-01-01 00:00:05", 7.9, None, None, 24.0),
+                (10, "2025-01-01 00:00:08", 8.0, "Brak", 7.0, 24.5),
+                (11, "2024-12-31 23:59:59", 6.5, "Brak", 7.0, 24.0),
+                (12, "2025-01-01 00:00:10", 8.1, "Brak", 7.0, 25.0)]
+        self.db.executemany("""INSERT INTO water_control
+                            (id, timestamp, ph, adjustment, current_ph, temperature)
+                            VALUES (?, ?, ?, ?, ?, ?)""", rows)
+        self.latest.extend("water_control", rows)
+
+        expected = self.db.query("""SELECT * FROM water_control
+                                 ORDER BY timestamp DESC, id DESC LIMIT 5""")
+        self.assertEqual(self.latest.latest("water_control", 5), expected)
+        self.assertEqual([row[0] for row in expected], [12, 10, 8, 7, 9])
+        self.assertEqual(expected[4][3:5], (None, None))
+        self.assertEqual(self.latest.last_id("water_control"), 12)
+
+
+if __name__ == '__main__':
+    unittest.main()
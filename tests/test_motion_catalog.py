@@ -0,0 +1,133 @@
+"""Testy jednostkowe katalogu zdarzen ruchu (modul motion_catalog)."""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from camera import MotionEvents
+from database import Database, init_db
+from motion_catalog import MotionCatalog, event_file, file_time, import_directories
+
+
+class TestMotionCatalog(unittest.TestCase):
+    """
+    Testy klasy MotionCatalog i importu katalogow fotopulapki.
+    Metody testowe:
+    - test_event_lifecycle: Zdarzenie zapisane przy poczatku jest uzupelniane do konca.
+    - test_unnotified_event: Zdarzenie bez powiadomienia zapisywane jest na koncu.
+    - test_cameras: Zdarzenia kamer z ta sama numeracja sa osobnymi wierszami.
+    - test_page: Stronicowanie kluczem i filtr zakresu czasu.
+    - test_import: Import plikow fotopulapki bez powtorzen, z id kamery z podkatalogu.
+    """
+
+    def setUp(self):
+        """Tworzy baze i katalog zdarzen."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, "test.db")
+        init_db(self.db_path)
+        self.db = Database(self.db_path)
+        self.catalog = MotionCatalog(self.db)
+
+    def tearDown(self):
+        """Zamyka baze i usuwa pliki tymczasowe."""
+        self.db.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def run_events(self, motion, events, start=0, photo="p.jpg", camera=None):
+        """Przepuszcza ruch (lista pol ruchu co 1 s od start) przez MotionEvents i katalog."""
+        for second, area in enumerate(motion, start):
+            boxes = [(0, 0, 10, 10)] if area else []
+            for kind, event in events.update(boxes, area, now=1735689600 + second):
+                self.catalog.record(kind, event, photo=None if kind == "end" else photo,
+                                    clip="c.avi", camera=camera)
+
+    def test_event_lifecycle(self):
+        """Poczatek, powiadomienie po 10 s i koniec to jeden wiersz z dwoma zdjeciami."""
+        events = MotionEvents(cooldown=3, notify_interval=10)
+        self.run_events([0.1] * 12, events)
+        ongoing, _ = self.catalog.page()
+        self.assertEqual(len(ongoing), 1)
+        self.assertIsNone(ongoing[0]["end"])
+
+        self.run_events([0.3] + [0] * 4, events, start=12)
+        event = self.catalog.get(ongoing[0]["id"])
+        self.assertEqual((event["start"], event["end"]), ("2025-01-01 00:00:00",
+                                                          "2025-01-01 00:00:12"))
+        self.assertEqual(event["frames"], 13)
+        self.assertEqual(event["peak_area"], 0.3)
+        self.assertEqual(event["photos"], ["p.jpg", "p.jpg"])
+        self.assertEqual((event["clip"], event["source"]), ("c.avi", "live"))
+        self.assertEqual(event_file(event, "photo"), "p.jpg")
+        self.assertIsNone(event_file(event, "thumb"))
+
+    def test_unnotified_event(self):
+        """Drugie zdarzenie w ciagu 10 s od powiadomienia powinno trafic do katalogu."""
+        events = MotionEvents(cooldown=1, notify_interval=10)
+        self.run_events([0.1, 0, 0, 0.2, 0, 0], events)
+        page, _ = self.catalog.page()
+        self.assertEqual([(e["frames"], e["photos"]) for e in page],
+                         [(1, []), (1, ["p.jpg"])])
+
+    def test_cameras(self):
+        """Przeplatane zdarzenia dwoch kamer (oba z id 1) powinny dac dwa wiersze."""
+        events = {"drzwi": MotionEvents(cooldown=1), "ogrod": MotionEvents(cooldown=1)}
+        self.run_events([0.1], events["drzwi"], camera="drzwi")
+        self.run_events([0.2, 0.2], events["ogrod"], start=1, photo="o.jpg", camera="ogrod")
+        self.run_events([0, 0, 0], events["drzwi"], start=1, camera="drzwi")
+        self.run_events([0, 0], events["ogrod"], start=3, camera="ogrod")
+        page, _ = self.catalog.page()
+        self.assertEqual([(e["camera"], e["frames"], e["photos"], e["end"] is not None)
+                          for e in page],
+                         [("ogrod", 2, ["o.jpg"], True), ("drzwi", 1, ["p.jpg"], True)])
+
+    def test_page(self):
+        """Strony po 2 zdarzenia powinny obejmowac wszystkie zdarzenia z zakresu."""
+        for hour in range(5):
+            self.db.execute("""INSERT INTO motion_events (timestamp, source)
+                            VALUES (?, 'live')""", (f"2025-01-01 {hour:02d}:00:00",))
+
+        seen = []
+        before = None
+        while True:
+            page, before = self.catalog.page(before, 2, "2025-01-01 01:00:00",
+                                             "2025-01-01T04:00:00")
+            seen.extend(event["start"][11:13] for event in page)
+            if before is None:
+                break
+        self.assertEqual(seen, ["03", "02", "01"])
+        with self.assertRaises(ValueError):
+            self.catalog.page("wczoraj")
+        with self.assertRaises(ValueError):
+            self.catalog.page(start="01-01-2025")
+
+    def test_import(self):
+        """Zdjecia i klipy powinny stac sie zdarzeniami; ponowny import nic nie dodaje."""
+        photo_dir = os.path.join(self.tmp_dir, "phototrap")
+        os.makedirs(os.path.join(photo_dir, "fast_api", "thumbs"))
+        os.makedirs(os.path.join(photo_dir, "thumbs"))
+        names = ["picture_01-01-2025_12:00:00.jpg", "clip_01-01-2025_12:00:00.avi",
+                 "picture_01-01-2025_12:00:10.jpg", "fast_api/clip_02-01-2025_08:30:00.avi",
+                 "thumbs/picture_01-01-2025_12:00:00.jpg",
+                 "fast_api/thumbs/picture_02-01-2025_08:30:00.jpg", "notatki.txt"]
+        for name in names:
+            with open(os.path.join(photo_dir, name), "wb"):
+                pass
+
+        self.assertEqual(import_directories(self.db, [photo_dir], "drzwi"), 3)
+        self.assertEqual(import_directories(self.db, [photo_dir], "drzwi"), 0)
+        page, _ = self.catalog.page()
+        self.assertEqual([(bool(e["photos"]), bool(e["clip"]), e["source"], e["camera"])
+                          for e in page],
+                         [(False, True, "import", "fast_api"), (True, False, "import", "drzwi"),
+                          (True, True, "import", "drzwi")])
+        self.assertEqual(page[2]["start"], file_time(names[0])[1])
+        rows = self.db.query("SELECT photos FROM motion_events WHERE photos IS NOT NULL")
+        self.assertTrue(all(os.path.isfile(json.loads(row[0])[0]) for row in rows))
+
+
+if __name__ == '__main__':
+    unittest.main()
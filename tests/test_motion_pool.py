@@ -0,0 +1,213 @@
+"""Testy jednostkowe analizy ruchu w procesach roboczych (modul motion_pool)."""
+from multiprocessing import shared_memory
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+import cv2
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+from camera import MotionDetector
+from motion_pool import MotionPool
+
+
+def moving_frames(count=30, size=(320, 240)):
+    """Klatki z prostokatem przesuwajacym sie po klatce (z przerwami w ruchu)."""
+    frames = []
+    for i in range(count):
+        frame = np.zeros((size[1], size[0], 3), np.uint8)
+        if i % 10 < 6:
+            x = i * 7 % (size[0] - 60)
+            cv2.rectangle(frame, (x, 60), (x + 60, 180), (255, 255, 255), -1)
+        frames.append(frame)
+    return frames
+
+
+def blocking_callback(delivered=None):
+    """
+    Funkcja wyniku, ktora czeka na zwolnienie (wstrzymana obsluga zajmuje sloty).
+    :param delivered: Opcjonalna lista na znaczniki klatek (piksel [0, 0, 0]).
+    :return: (funkcja, zdarzenie wejscia do funkcji, zdarzenie zwolnienia).
+    """
+
+    entered, release = threading.Event(), threading.Event()
+
+    def callback(_boxes, _area, frame):
+        entered.set()
+        release.wait(20)
+        if delivered is not None:
+            delivered.append(int(frame[0, 0, 0]))
+
+    return callback, entered, release
+
+
+def wait_analysed(pool, stream, count, timeout=20):
+    """Czeka, az pula przekaze wyniki count klatek strumienia."""
+    deadline = time.monotonic() + timeout
+    while pool.stats()["streams"][stream]["analysed"] < count:
+        if time.monotonic() > deadline:
+            raise AssertionError(f"brak wynikow: {pool.stats()['streams'][stream]}")
+        time.sleep(0.01)
+
+
+class TestMotionPool(unittest.TestCase):
+    """
+    Testy klasy MotionPool.
+    Metody testowe:
+    - test_same_as_detector: Pula daje te same prostokaty i pola co MotionDetector.
+    - test_order: Wyniki kilku procesow sa przekazywane w kolejnosci klatek.
+    - test_drop_when_full: Bez wolnego slotu klatka jest pomijana, nie czeka.
+    - test_stop: stop konczy procesy i zwalnia pamiec wspoldzielona.
+    - test_streams_independent: Wstrzymana obsluga wyniku jednej kamery nie blokuje innej.
+    - test_workers_skip_main: Procesy robocze nie importuja uruchomionego skryptu.
+    """
+
+    def setUp(self):
+        """Tworzy pule dwoch procesow."""
+        self.pool = MotionPool(workers=2, slots=4)
+        self.pool.start()
+
+    def tearDown(self):
+        """Zatrzymuje pule."""
+        self.pool.stop()
+
+    def test_same_as_detector(self):
+        """Wyniki z procesow roboczych sa identyczne z analiza w watku (takze przy skip)."""
+        frames = moving_frames()
+        # Pierscien na wszystkie klatki: zadna nie jest pomijana z braku slotu
+        pool = MotionPool(workers=3, slots=len(frames) + 2)
+        pool.start()
+        try:
+            for stream, options in (("a", {"width": 160}),
+                                    ("b", {"width": 160, "skip": 2, "min_area": 0.01})):
+                detector = MotionDetector(**options)
+                expected = []
+                for frame in frames:
+                    boxes = detector.detect(frame)
+                    if boxes is not None:
+                        expected.append((boxes, detector.motion_area))
+                results = []
+                pool.open(stream, lambda boxes, area, frame, results=results:
+                          results.append((boxes, area)), options)
+                submitted = [pool.submit(stream, frame) for frame in frames]
+                wait_analysed(pool, stream, len(expected))
+
+                self.assertEqual(sum(submitted), len(expected))
+                self.assertEqual(results, expected)
+                self.assertTrue(any(boxes for boxes, _ in expected))
+        finally:
+            pool.stop()
+
+    def test_order(self):
+        """Klatka przekazana z wynikiem to ta sama klatka (tylko do odczytu), w kolejnosci."""
+        results = []
+        self.pool.open("kamera", lambda boxes, area, frame: results.append(
+            (int(frame[0, 0, 0]), frame.flags.writeable)))
+        submitted = []
+        for i in range(40):
+            if self.pool.submit("kamera", np.full((120, 160, 3), i, np.uint8)):
+                submitted.append(i)
+        wait_analysed(self.pool, "kamera", len(submitted))
+
+        self.assertEqual([marker for marker, _ in results], submitted)
+        self.assertFalse(any(writeable for _, writeable in results))
+        stats = self.pool.stats()["streams"]["kamera"]
+        self.assertEqual(stats["submitted"] + stats["dropped"], 40)
+
+    def test_drop_when_full(self):
+        """Wstrzymana obsluga wyniku zajmuje sloty; kolejne klatki sa pomijane."""
+        delivered = []
+        slow, entered, release = blocking_callback(delivered)
+        self.pool.open("kamera", slow)
+        frames = [np.full((120, 160, 3), i, np.uint8) for i in range(10)]
+        self.assertEqual([self.pool.submit("kamera", frame) for frame in frames[:4]],
+                         [True, True, True, True])
+        self.assertTrue(entered.wait(20))
+        self.assertEqual([self.pool.submit("kamera", frame) for frame in frames[4:8]],
+                         [False] * 4)
+        # Klatka o innym rozmiarze niz pierwsza jest pomijana
+        self.assertFalse(self.pool.submit("kamera", np.zeros((60, 80, 3), np.uint8)))
+        stats = self.pool.stats()["streams"]["kamera"]
+        self.assertEqual((stats["dropped"], stats["mismatched"]), (4, 1))
+
+        release.set()
+        wait_analysed(self.pool, "kamera", 4)
+        self.assertEqual(delivered, [0, 1, 2, 3])
+        self.assertTrue(self.pool.submit("kamera", frames[8]))
+
+    def test_stop(self):
+        """Po stop procesy nie dzialaja, a pamiec wspoldzielona strumienia nie istnieje."""
+        self.pool.open("kamera", lambda boxes, area, frame: None)
+        for frame in moving_frames(3, (160, 120)):
+            self.assertTrue(self.pool.submit("kamera", frame))
+        wait_analysed(self.pool, "kamera", 3)
+        name = self.pool._streams["kamera"].memory.name  # pylint: disable=protected-access
+        self.pool.stop()
+
+        self.assertEqual(self.pool.stats()["alive"], 0)
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+        with self.assertRaises(ValueError):
+            MotionPool(workers=0)
+
+    def test_streams_independent(self):
+        """Wyniki strumienia b sa przekazywane, gdy obsluga strumienia a czeka."""
+        slow, entered, release = blocking_callback()
+        delivered = []
+        self.pool.open("a", slow)
+        self.pool.open("b", lambda boxes, area, frame: delivered.append(int(frame[0, 0, 0])))
+        self.assertTrue(self.pool.submit("a", np.zeros((120, 160, 3), np.uint8)))
+        self.assertTrue(entered.wait(20))
+        for i in range(3):
+            self.assertTrue(self.pool.submit("b", np.full((120, 160, 3), i, np.uint8)))
+        try:
+            wait_analysed(self.pool, "b", 3, timeout=5)
+        finally:
+            release.set()
+        self.assertEqual(delivered, [0, 1, 2])
+        wait_analysed(self.pool, "a", 1)
+
+    def test_workers_skip_main(self):
+        """Skrypt z pula jest importowany tylko w procesie glownym."""
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        script = os.path.join(tmp_dir, "main.py")
+        imports = os.path.join(tmp_dir, "imports.txt")
+        with open(script, "w", encoding="utf-8") as file:
+            file.write(f"""import os, sys, time
+with open({imports!r}, "a", encoding="utf-8") as file:
+    file.write(__name__ + "\\n")
+sys.path.append({ROOT!r})
+import numpy as np
+from motion_pool import MotionPool
+
+if __name__ == "__main__":
+    pool = MotionPool(workers=2)
+    pool.start()
+    pool.open("kamera", lambda boxes, area, frame: None)
+    for i in range(3):
+        pool.submit("kamera", np.full((120, 160, 3), i, np.uint8))
+    deadline = time.monotonic() + 20
+    while (pool.stats()["streams"]["kamera"]["analysed"] < 3
+           and time.monotonic() < deadline):
+        time.sleep(0.01)
+    print(pool.stats()["streams"]["kamera"]["analysed"])
+    pool.stop()
+""")
+        result = subprocess.run([sys.executable, script], capture_output=True, text=True,
+                                timeout=60, check=True)
+        self.assertEqual(result.stdout.split(), ["3"])
+        with open(imports, encoding="utf-8") as file:
+            self.assertEqual(file.read().split(), ["__main__"])
+
+
+if __name__ == '__main__':
+    unittest.main()
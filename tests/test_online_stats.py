@@ -0,0 +1,110 @@
+"""Testy jednostkowe statystyk liczonych na biezaco (modul online_stats)."""
+import os
+import random
+import statistics
+import sys
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import epoch_seconds
+from online_stats import OnlineStats
+
+
+def weather_rows(values, start_minute=0, step_minutes=1):
+    """Tworzy wiersze weather_control (id, timestamp, temperature, humidity)."""
+    rows = []
+    for i, value in enumerate(values):
+        minute = start_minute + i * step_minutes
+        stamp = f"2025-01-01 {minute // 60:02d}:{minute % 60:02d}:00"
+        rows.append((i + 1, stamp, value, None))
+    return rows
+
+
+class TestOnlineStats(unittest.TestCase):
+    """
+    Testy klasy OnlineStats.
+    Metody testowe:
+    - test_welford_matches_statistics: Srednia i wariancja zgodne z modulem statistics.
+    - test_ewma: Srednia wykladnicza z waga alpha.
+    - test_sliding_windows: Min/max z ostatniej godziny i doby.
+    - test_unknown_table: Nieznana tabela w snapshot zglasza ValueError.
+    - test_out_of_order_rows: Spoznione pomiary nie psuja min/max, EWMA ani last.
+    """
+
+    def setUp(self):
+        """Tworzy puste statystyki z alpha = 0.5."""
+        self.stats = OnlineStats(alpha=0.5)
+
+    def test_welford_matches_statistics(self):
+        """Wynik przyrostowy powinien byc rowny obliczeniu na calej probie."""
+        values = [random.uniform(-5, 35) for _ in range(500)]
+        for i in range(0, 500, 50):
+            self.stats.update("weather_control", weather_rows(values[i:i + 50]))
+        result = self.stats.snapshot("weather_control")["weather_control"]
+        self.assertEqual(result["temperature"]["count"], 500)
+        self.assertAlmostEqual(result["temperature"]["mean"], statistics.mean(values))
+        self.assertAlmostEqual(result["temperature"]["variance"], statistics.variance(values))
+        self.assertEqual(result["humidity"]["count"], 0)
+        self.assertIsNone(result["humidity"]["mean"])
+
+    def test_ewma(self):
+        """EWMA powinna ciagnac sie w strone nowych pomiarow."""
+        self.stats.update("weather_control", weather_rows([10.0, 20.0, 20.0]))
+        result = self.stats.snapshot("weather_control")["weather_control"]["temperature"]
+        self.assertEqual(result["ewma"], 17.5)
+        self.assertEqual(result["last"], 20.0)
+
+    def test_sliding_windows(self):
+        """Stare ekstrema powinny wypadac z okna 1 h, ale zostac w oknie 24 h."""
+        values = [50.0, -3.0] + [20.0 + i % 5 for i in range(180)]
+        rows = weather_rows(values)
+        self.stats.update("weather_control", rows)
+        now = epoch_seconds(rows[-1][1])
+        result = self.stats.snapshot("weather_control", now=now)["weather_control"]
+        temperature = result["temperature"]
+        self.assertEqual((temperature["min_1h"], temperature["max_1h"]), (20.0, 24.0))
+        self.assertEqual((temperature["min_24h"], temperature["max_24h"]), (-3.0, 50.0))
+
+        later = self.stats.snapshot("weather_control", now=now + 2 * 86400)
+        self.assertIsNone(later["weather_control"]["temperature"]["max_24h"])
+
+    def test_unknown_table(self):
+        """Snapshot nieznanej tabeli powinien zglosic blad."""
+        with self.assertRaises(ValueError):
+            self.stats.snapshot("rollups")
+
+    def test_out_of_order_rows(self):
+        """Okna po spoznionych pomiarach sa takie same jak przy pomiarach w kolejnosci."""
+        values = [20.0 + i % 7 for i in range(120)]
+        rows = weather_rows(values)
+        # Spoznione wzgledem 100 zapisanych pomiarow: skrajne i zwykla wartosc
+        # w oknie 1 h, sprzed 2 h (tylko w oknie 24 h) i sprzed 2 dni (poza oknami)
+        late = [(200, rows[89][1], 40.0, None), (201, rows[90][1], 5.0, None),
+                (202, rows[95][1], 21.0, None), (203, "2025-01-01 00:00:00", 60.0, None),
+                (204, "2024-12-30 00:00:00", -40.0, None)]
+        self.stats.update("weather_control", rows[:100])
+        self.stats.update("weather_control", late)
+        self.stats.update("weather_control", rows[100:])
+        ordered = OnlineStats(alpha=0.5)
+        ordered.update("weather_control", sorted(rows + late[:4], key=lambda row: row[1]))
+
+        now = epoch_seconds(rows[-1][1])
+        result = self.stats.snapshot("weather_control", now=now)["weather_control"]
+        expected = ordered.snapshot("weather_control", now=now)["weather_control"]
+        temperature = result["temperature"]
+        for name in ("min_1h", "max_1h", "min_24h", "max_24h"):
+            self.assertEqual(temperature[name], expected["temperature"][name], name)
+        self.assertEqual((temperature["min_1h"], temperature["max_1h"]), (5.0, 40.0))
+        self.assertEqual(temperature["max_24h"], 60.0)
+        self.assertEqual((temperature["last"], temperature["last_timestamp"]),
+                         (values[-1], rows[-1][1]))
+        self.assertEqual((temperature["count"], temperature["late"]), (125, 5))
+
+        # Po godzinie bez nowych pomiarow spoznione wypadaja z okna 1 h razem z innymi
+        later = self.stats.snapshot("weather_control", now=now + 1800)["weather_control"]
+        self.assertEqual(later["temperature"]["max_1h"], 26.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""Testy jednostkowe puli zapisu zdjec z fotopulapki (modul photos)."""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from photos import PhotoWriter
+
+
+def make_frame(value):
+    """Tworzy klatke 120x160 BGR wypelniona jedna wartoscia."""
+    return np.full((120, 160, 3), value, dtype=np.uint8)
+
+
+class TestPhotoWriter(unittest.TestCase):
+    """
+    Testy klasy PhotoWriter.
+    Metody testowe:
+    - test_write_photos: Zdjecia sa zapisywane w tle jako poprawne pliki JPEG.
+    - test_drop_when_full: Przy pelnej kolejce nowe zdjecia sa odrzucane bez czekania.
+    - test_batched_sync: fsync jest wykonywany partiami, a stop() synchronizuje reszte.
+    - test_same_name: Zdjecia o tej samej nazwie zapisywane rownolegle nie koliduja.
+    """
+
+    def setUp(self):
+        """Tworzy tymczasowy katalog zdjec."""
+        self.photo_dir = tempfile.mkdtemp(prefix="test_photos_")
+
+    def tearDown(self):
+        """Usuwa tymczasowy katalog zdjec."""
+        shutil.rmtree(self.photo_dir)
+
+    def path(self, i):
+        """Zwraca sciezke i-tego zdjecia w katalogu testowym."""
+        return os.path.join(self.photo_dir, f"picture_{i}.jpg")
+
+    def test_write_photos(self):
+        """Wszystkie zdjecia powinny zostac zapisane, a sluchacz powiadomiony."""
+        writer = PhotoWriter(workers=2)
+        saved = []
+        writer.add_listener(saved.append)
+        writer.start()
+        for i in range(5):
+            self.assertTrue(writer.put(self.path(i), make_frame(i * 40)))
+        writer.stop()
+
+        self.assertEqual(sorted(os.listdir(self.photo_dir)),
+                         [f"picture_{i}.jpg" for i in range(5)])
+        self.assertEqual(sorted(saved), [self.path(i) for i in range(5)])
+        image = cv2.imread(self.path(3))
+        self.assertEqual(image.shape, (120, 160, 3))
+        self.assertAlmostEqual(int(image[60, 80, 0]), 120, delta=2)
+        stats = writer.stats()
+        self.assertEqual((stats["written"], stats["dropped"], stats["depth"]), (5, 0, 0))
+        self.assertGreater(stats["avg_latency_ms"], 0)
+        self.assertFalse(writer.put(self.path(9), make_frame(0)))
+
+    def test_drop_when_full(self):
+        """Kolejka na 2 zdjecia bez watkow powinna odrzucic trzecie zdjecie."""
+        writer = PhotoWriter(workers=0, maxsize=2)
+        results = [writer.put(self.path(i), make_frame(i)) for i in range(3)]
+        self.assertEqual(results, [True, True, False])
+        self.assertEqual(writer.stats()["depth"], 2)
+        writer.stop()
+
+        self.assertEqual(sorted(os.listdir(self.photo_dir)), ["picture_0.jpg", "picture_1.jpg"])
+        stats = writer.stats()
+        self.assertEqual((stats["enqueued"], stats["written"], stats["dropped"]), (2, 2, 1))
+
+    def test_batched_sync(self):
+        """Siedem zdjec przy sync_every=3 to dwie pelne partie i reszta przy stop()."""
+        writer = PhotoWriter(workers=0, maxsize=10, sync_every=3, sync_interval=60)
+        for i in range(7):
+            writer.put(self.path(i), make_frame(i))
+        writer.stop()
+
+        stats = writer.stats()
+        self.assertEqual((stats["written"], stats["syncs"], stats["unsynced"]), (7, 3, 0))
+
+    def test_same_name(self):
+        """Kazdy zapis ma wlasny plik tymczasowy; zostaje tylko gotowe zdjecie."""
+        writer = PhotoWriter(workers=4, maxsize=40)
+        writer.start()
+        for i in range(40):
+            self.assertTrue(writer.put(self.path(0), make_frame(i)))
+        writer.stop()
+
+        stats = writer.stats()
+        self.assertEqual((stats["written"], stats["failed"]), (40, 0))
+        self.assertEqual(os.listdir(self.photo_dir), ["picture_0.jpg"])
+
+
+if __name__ == '__main__':
+    unittest.main()
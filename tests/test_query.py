@@ -0,0 +1,104 @@
+"""Testy jednostkowe zapytan agregujacych (modul query)."""
+import os
+import statistics
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import Database, init_db
+from query import parse_aggregates, run_query
+
+
+class TestRunQuery(unittest.TestCase):
+    """
+    Testy funkcji run_query.
+    Metody testowe:
+    - test_hourly_sql_aggregates: Agregaty SQL w przedzialach godzinowych.
+    - test_percentiles: Percentyle NumPy zgodne z modulem statistics.
+    - test_null_values: Wartosci NULL sa pomijane.
+    - test_stddev_large_mean: Odchylenie przy duzej sredniej i malym rozrzucie.
+    - test_invalid_parameters: Niepoprawne parametry zglaszaja ValueError.
+    """
+
+    def setUp(self):
+        """Tworzy baze z 2 godzinami pomiarow powietrza (co minute)."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, "test.db")
+        init_db(self.db_path)
+        self.db = Database(self.db_path)
+        self.values = [float((i * 37) % 101) for i in range(120)]
+        self.db.executemany("""INSERT INTO air_control
+                            (timestamp, pm25, pm10, temperature, humidity, air_quality)
+                            VALUES (?, ?, NULL, 20.0, 50.0, 'Dobra')""",
+                            [(f"2025-01-01 {10 + i // 60:02d}:{i % 60:02d}:00", value)
+                             for i, value in enumerate(self.values)])
+
+    def tearDown(self):
+        """Zamyka polaczenia i usuwa tymczasowa baze danych."""
+        self.db.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_hourly_sql_aggregates(self):
+        """Kazda godzina powinna miec wlasne count/min/max/avg/stddev."""
+        results = run_query(self.db, "air_control", ["pm25"], bucket="hour",
+                            aggregates=["count", "min", "max", "avg", "stddev"])
+        self.assertEqual([entry["bucket"] for entry in results],
+                         ["2025-01-01 10:00:00", "2025-01-01 11:00:00"])
+        first = self.values[:60]
+        stats = results[0]["pm25"]
+        self.assertEqual(stats["count"], 60)
+        self.assertEqual((stats["min"], stats["max"]), (min(first), max(first)))
+        self.assertAlmostEqual(stats["avg"], statistics.mean(first))
+        self.assertAlmostEqual(stats["stddev"], statistics.stdev(first))
+
+    def test_percentiles(self):
+        """Percentyle w zakresie czasu powinny odpowiadac interpolacji liniowej."""
+        results = run_query(self.db, "air_control", ["pm25"],
+                            "2025-01-01 10:30:00", "2025-01-01T11:30:00",
+                            aggregates=["median", "p90"])
+        window = self.values[30:90]
+        self.assertEqual(len(results), 1)
+        self.assertIsNone(results[0]["bucket"])
+        self.assertAlmostEqual(results[0]["pm25"]["median"], statistics.median(window))
+        self.assertAlmostEqual(results[0]["pm25"]["p90"],
+                               statistics.quantiles(window, n=10, method="inclusive")[8])
+
+    def test_null_values(self):
+        """Pole bez wartosci powinno dac count 0 i puste agregaty."""
+        results = run_query(self.db, "air_control", ["pm10"],
+                            aggregates=["count", "avg", "p50"])
+        self.assertEqual(results[0]["pm10"], {"count": 0, "avg": None, "p50": None})
+
+    def test_stddev_large_mean(self):
+        """Wartosci 1e9 + 0, 1, 2 powinny dac odchylenie 1 w kazdym przedziale."""
+        self.db.executemany("""INSERT INTO air_control (timestamp, pm10) VALUES (?, ?)""",
+                            [(f"2025-01-02 {hour:02d}:0{i}:00", 1e9 * (hour + 1) + i)
+                             for hour in range(2) for i in range(3)])
+        results = run_query(self.db, "air_control", ["pm10"], "2025-01-02",
+                            bucket="hour", aggregates=["count", "stddev"])
+        self.assertEqual([entry["pm10"]["count"] for entry in results], [3, 3])
+        for entry in results:
+            self.assertAlmostEqual(entry["pm10"]["stddev"], 1.0, places=9)
+        single = run_query(self.db, "air_control", ["pm10"], "2025-01-02T01:00:00",
+                           aggregates=["stddev"])
+        self.assertAlmostEqual(single[0]["pm10"]["stddev"], 1.0, places=9)
+
+    def test_invalid_parameters(self):
+        """Nieznana tabela, pole, przedzial lub agregat powinny zglosic blad."""
+        for kwargs in ({"table": "rollups"},
+                       {"table": "air_control", "fields": ["air_quality"]},
+                       {"table": "air_control", "bucket": "week"},
+                       {"table": "air_control", "aggregates": ["mode"]},
+                       {"table": "air_control", "start": "wczoraj"}):
+            with self.assertRaises(ValueError, msg=kwargs):
+                run_query(self.db, **kwargs)
+        with self.assertRaises(ValueError):
+            run_query(self.db, "air_control", aggregates=["p50"], max_rows=10)
+        self.assertEqual(parse_aggregates(["avg", "p99.9"]), (["avg"], {"p99.9": 99.9}))
+
+
+if __name__ == '__main__':
+    unittest.main()
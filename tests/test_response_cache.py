@@ -0,0 +1,85 @@
+"""Testy jednostkowe cache odpowiedzi i ETag (modul response_cache)."""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import Database, init_db
+from latest import LatestReadings
+from response_cache import ResponseCache, etag_matches
+
+
+class TestResponseCache(unittest.TestCase):
+    """
+    Testy klasy ResponseCache.
+    Metody testowe:
+    - test_render_once_per_version: Cialo serializowane jest raz na wersje.
+    - test_not_modified: If-None-Match z aktualnym ETag daje 304.
+    - test_insert_changes_etag: Nowy pomiar zmienia ETag i uniewaznia cache.
+    - test_etag_matches: Parsowanie naglowka If-None-Match.
+    """
+
+    def setUp(self):
+        """Tworzy baze z 3 pomiarami pogody."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, "test.db")
+        init_db(self.db_path)
+        self.db = Database(self.db_path)
+        self.db.executemany("""INSERT INTO weather_control (timestamp, temperature, humidity)
+                            VALUES (?, 20.0, 50.0)""",
+                            [(f"2025-01-01 00:00:0{i}",) for i in range(3)])
+        self.latest = LatestReadings(self.db)
+        self.cache = ResponseCache(self.latest)
+        self.renders = 0
+
+    def tearDown(self):
+        """Zamyka polaczenia i usuwa tymczasowa baze danych."""
+        self.db.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def render(self):
+        """Serializuje najnowsze pomiary i liczy wywolania."""
+        self.renders += 1
+        return repr(self.latest.latest("weather_control")).encode()
+
+    def test_render_once_per_version(self):
+        """Kolejne zadania bez nowych pomiarow powinny korzystac z cache."""
+        first = self.cache.get("weather", "weather_control", self.render)
+        second = self.cache.get("weather", "weather_control", self.render)
+        self.assertEqual(first, second)
+        self.assertEqual(first[0], '"weather-3"')
+        self.assertEqual(self.renders, 1)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_not_modified(self):
+        """Aktualny ETag w If-None-Match powinien oznaczac brak zmian."""
+        etag, _ = self.cache.get("weather", "weather_control", self.render)
+        self.assertEqual(self.cache.check("weather", "weather_control", etag), (etag, True))
+        self.assertFalse(self.cache.check("weather", "weather_control", '"weather-2"')[1])
+        self.assertFalse(self.cache.check("weather", "weather_control", None)[1])
+
+    def test_insert_changes_etag(self):
+        """Zapis nowego pomiaru powinien zmienic ETag i wymusic serializacje."""
+        old_etag, _ = self.cache.get("weather", "weather_control", self.render)
+        rows = [(4, "2025-01-01 00:00:09", 21.0, 51.0)]
+        self.latest.extend("weather_control", rows)
+        self.cache.invalidate("weather_control", rows)
+        self.assertEqual(self.cache.stats()["entries"], 0)
+        etag, body = self.cache.get("weather", "weather_control", self.render)
+        self.assertNotEqual(etag, old_etag)
+        self.assertIn(b"00:00:09", body)
+        self.assertEqual(self.renders, 2)
+
+    def test_etag_matches(self):
+        """Lista wartosci, slaby ETag i * powinny byc rozpoznawane."""
+        self.assertTrue(etag_matches('"a-1", W/"weather-3"', '"weather-3"'))
+        self.assertTrue(etag_matches("*", '"weather-3"'))
+        self.assertFalse(etag_matches('"weather-30"', '"weather-3"'))
+        self.assertFalse(etag_matches("", '"weather-3"'))
+
+
+if __name__ == '__main__':
+    unittest.main()
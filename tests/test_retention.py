@@ -0,0 +1,124 @@
+"""Testy jednostkowe silnika retencji danych (modul retention)."""
+import json
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timezone
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import load_options
+from database import Database, init_db
+from retention import RETENTION_OPTIONS, RetentionEngine, file_size
+from rollups import backfill
+
+
+class TestRetentionEngine(unittest.TestCase):
+    """
+    Testy klasy RetentionEngine.
+    Metody testowe:
+    - test_prunes_raw_rows_in_chunks: Usuwa stare pomiary porcjami.
+    - test_rollups_kept_longer: Agregaty przezywaja usuniete dane surowe.
+    - test_file_shrinks: Plik bazy zmniejsza sie po retencji.
+    - test_waits_for_rollups: Pomiary bez agregatow nie sa usuwane przed backfill.
+    - test_policies_from_config: Polityki z retention.json, takze dla tabel zdarzen.
+    """
+
+    NOW = datetime(2025, 3, 1, tzinfo=timezone.utc)
+
+    def setUp(self):
+        """Tworzy baze z 60 dniami pomiarow pogody (100 dziennie)."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, "test.db")
+        init_db(self.db_path)
+        self.db = Database(self.db_path)
+        rows = []
+        for day in range(60):
+            date = datetime(2025, 1, 1).toordinal() + day
+            stamp = datetime.fromordinal(date).strftime("%Y-%m-%d")
+            for i in range(100):
+                rows.append((f"{stamp} {i // 60:02d}:{i % 60:02d}:00", 20.0, "x" * 200))
+        self.db.executemany("""INSERT INTO weather_control (timestamp, temperature, humidity)
+                            VALUES (?, ?, ?)""", rows)
+        backfill(self.db_path)
+        self.engine = RetentionEngine(self.db_path, chunk_size=250, chunk_pause=0)
+
+    def tearDown(self):
+        """Zamyka polaczenia i usuwa tymczasowa baze danych."""
+        self.db.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_prunes_raw_rows_in_chunks(self):
+        """Pomiary starsze niz 30 dni powinny zostac usuniete."""
+        pruned = self.engine.run_once(now=self.NOW)
+        oldest = self.db.query_one("SELECT MIN(timestamp) FROM weather_control")[0]
+        self.assertGreaterEqual(oldest, "2025-01-30")
+        self.assertEqual(pruned["weather_control"], 29 * 100)
+        self.assertEqual(self.engine.stats()["rows_pruned"]["weather_control"], 2900)
+
+    def test_rollups_kept_longer(self):
+        """Agregaty dzienne powinny zostac dla dni bez danych surowych."""
+        self.engine.run_once(now=self.NOW)
+        days = self.db.query_one("""SELECT COUNT(DISTINCT bucket) FROM rollups
+                                 WHERE source='weather_control' AND resolution='day'""")[0]
+        self.assertEqual(days, 60)
+
+    def test_file_shrinks(self):
+        """Po retencji plik bazy powinien byc mniejszy."""
+        self.db.close()
+        size_before = file_size(self.db_path)
+        self.engine.run_once(now=self.NOW)
+        self.assertLess(file_size(self.db_path), size_before)
+        self.assertGreater(self.engine.stats()["bytes_reclaimed"], 0)
+
+    def test_waits_for_rollups(self):
+        """Dni bez pelnych agregatow dziennych zostaja do czasu backfill."""
+        # Historia sprzed agregatow: brak agregatu 10 stycznia, niepelny 20 stycznia
+        self.db.execute("""DELETE FROM rollups WHERE source='weather_control'
+                        AND bucket LIKE '2025-01-10%'""")
+        self.db.execute("""UPDATE rollups SET value_count = value_count - 1
+                        WHERE source='weather_control' AND resolution='day'
+                        AND bucket LIKE '2025-01-20%'""")
+        pruned = self.engine.run_once(now=self.NOW)
+        oldest = self.db.query_one("SELECT MIN(timestamp) FROM weather_control")[0]
+        self.assertEqual(pruned["weather_control"], 9 * 100)
+        self.assertEqual(oldest, "2025-01-10 00:00:00")
+        self.assertEqual(self.engine.stats()["waiting_for_rollups"],
+                         {"weather_control": "2025-01-10"})
+
+        backfill(self.db_path)
+        pruned = self.engine.run_once(now=self.NOW)
+        self.assertEqual(pruned["weather_control"], 20 * 100)
+        self.assertEqual(self.engine.stats()["waiting_for_rollups"], {})
+
+    def test_policies_from_config(self):
+        """Dni z retention.json; alerty usuwane, katalog ruchu domyslnie zachowany."""
+        for table in ("alerts", "motion_events"):
+            columns = ("timestamp, source, field, state" if table == "alerts"
+                       else "timestamp, source")
+            values = ("?, 'weather_control', 'temperature', 'triggered'" if table == "alerts"
+                      else "?, 'camera'")
+            self.db.executemany(f"INSERT INTO {table} ({columns}) VALUES ({values})",
+                                [("2024-06-01 12:00:00",), ("2025-02-20 12:00:00",)])
+        path = os.path.join(self.tmp_dir, "retention.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"weather_control": None, "alerts": 30}, f)
+        engine = RetentionEngine(self.db_path, load_options(path, RETENTION_OPTIONS),
+                                 chunk_pause=0)
+        pruned = engine.run_once(now=self.NOW)
+
+        self.assertEqual((pruned["alerts"], pruned["anomalies"]), (1, 0))
+        self.assertNotIn("weather_control", pruned)
+        self.assertNotIn("motion_events", pruned)
+        for table, count in (("alerts", 1), ("motion_events", 2), ("weather_control", 6000)):
+            self.assertEqual(self.db.query_one(f"SELECT COUNT(*) FROM {table}")[0], count)
+
+        for policies in ({"measurements": 30}, {"alerts": 0}, {"alerts": "30"}):
+            with self.assertRaises(ValueError):
+                RetentionEngine(self.db_path, policies)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""Testy jednostkowe agregatow pomiarow (modul rollups)."""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import Database, init_db
+from ingest import IngestQueue
+from rollups import backfill, choose_resolution, history, update_rollups
+
+
+class TestRollups(unittest.TestCase):
+    """
+    Testy agregatow minutowych, godzinowych i dziennych.
+    Metody testowe:
+    - test_incremental_matches_backfill: Agregaty przyrostowe = przeliczone.
+    - test_history_resolution: Historia zwraca agregaty wybranej rozdzielczosci.
+    - test_choose_resolution: Dobor rozdzielczosci do zakresu czasu.
+    """
+
+    def setUp(self):
+        """Zapisuje przez kolejke 3 godziny pomiarow pogody (co 20 sekund)."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, "test.db")
+        init_db(self.db_path)
+        self.db = Database(self.db_path)
+
+        ingest = IngestQueue(self.db_path, batch_size=97, flush_interval=60)
+        ingest.add_batch_hook(update_rollups)
+        ingest.start()
+        for i in range(540):
+            hour, rest = divmod(i * 20, 3600)
+            minute, second = divmod(rest, 60)
+            ingest.put("weather_control", {
+                "timestamp": f"2025-01-01 {hour:02d}:{minute:02d}:{second:02d}",
+                "temperature": float(i % 7),
+                "humidity": 50.0,
+            })
+        ingest.stop()
+
+    def tearDown(self):
+        """Zamyka polaczenia i usuwa tymczasowa baze danych."""
+        self.db.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def rollup_rows(self):
+        """Zwraca posortowana zawartosc tabeli rollups."""
+        return self.db.query("SELECT * FROM rollups ORDER BY 1, 2, 3, 4")
+
+    def test_incremental_matches_backfill(self):
+        """Agregaty z kolejnych partii powinny byc rowne przeliczonym od nowa."""
+        incremental = self.rollup_rows()
+        backfill(self.db_path)
+        rebuilt = self.rollup_rows()
+        self.assertEqual(len(incremental), len(rebuilt))
+        for inc, full in zip(incremental, rebuilt):
+            self.assertEqual(inc[:5], full[:5])
+            self.assertAlmostEqual(inc[5], full[5])
+            self.assertEqual(inc[6:], full[6:])
+
+    def test_history_resolution(self):
+        """Agregaty godzinowe powinny obejmowac wszystkie pomiary z godziny."""
+        buckets, next_before = history(self.db, "weather_control", "hour")
+        self.assertIsNone(next_before)
+        self.assertEqual([b["timestamp"] for b in buckets],
+                         ["2025-01-01 02:00:00", "2025-01-01 01:00:00",
+                          "2025-01-01 00:00:00"])
+        self.assertEqual(buckets[0]["temperature"]["count"], 180)
+        self.assertEqual(buckets[0]["temperature"]["min"], 0.0)
+        self.assertEqual(buckets[0]["temperature"]["max"], 6.0)
+        self.assertEqual(buckets[0]["humidity"]["avg"], 50.0)
+
+    def test_choose_resolution(self):
+        """Dluzsze zakresy powinny dawac grubsze rozdzielczosci."""
+        self.assertEqual(choose_resolution(None, None), "raw")
+        self.assertEqual(choose_resolution("2025-01-01 00:00:00", "2025-01-01 01:00:00"), "raw")
+        self.assertEqual(choose_resolution("2025-01-01", "2025-01-02"), "minute")
+        self.assertEqual(choose_resolution("2025-01-01", "2025-02-01"), "hour")
+        self.assertEqual(choose_resolution("2024-01-01", "2025-01-01"), "day")
+
+
+if __name__ == '__main__':
+    unittest.main()
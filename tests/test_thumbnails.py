@@ -0,0 +1,147 @@
+"""Testy jednostkowe miniatur i mozaik zdjec z fotopulapki (modul thumbnails)."""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from photos import PhotoWriter
+from thumbnails import ThumbnailPool, file_etag, make_thumbnail, read_reduced, thumb_path
+
+
+def make_frame(value, width=1280, height=960):
+    """Tworzy klatke BGR wypelniona jedna wartoscia."""
+    return np.full((height, width, 3), value, dtype=np.uint8)
+
+
+class TestThumbnails(unittest.TestCase):
+    """
+    Testy funkcji miniatur i klasy ThumbnailPool.
+    Metody testowe:
+    - test_make_thumbnail: Miniatura ma zadana szerokosc i proporcje zdjecia.
+    - test_lazy_regeneration: Brakujaca lub starsza od zdjecia miniatura jest tworzona przy get.
+    - test_pool_listener: Miniatury powstaja w tle po zapisie zdjec przez PhotoWriter.
+    - test_mosaic: Mozaika ma staly rozmiar i jest odtwarzana tylko po zmianie zdjec.
+    - test_concurrent_writes: Rownoczesne tworzenie tej samej miniatury nie zglasza bledu.
+    """
+
+    def setUp(self):
+        """Tworzy tymczasowy katalog zdjec."""
+        self.photo_dir = tempfile.mkdtemp(prefix="test_thumbnails_")
+
+    def tearDown(self):
+        """Usuwa tymczasowy katalog zdjec."""
+        shutil.rmtree(self.photo_dir)
+
+    def photo(self, i, value=100, **size):
+        """Zapisuje i-te zdjecie w katalogu testowym i zwraca jego sciezke."""
+        path = os.path.join(self.photo_dir, f"picture_{i}.jpg")
+        cv2.imwrite(path, make_frame(value, **size))
+        return path
+
+    def test_make_thumbnail(self):
+        """Zdjecie 1280x960 powinno byc dekodowane w skali 1/4, a miniatura miec 320x240."""
+        photo = self.photo(0)
+        self.assertEqual(read_reduced(photo, 320).shape, (240, 320, 3))
+        self.assertEqual(read_reduced(photo, 400).shape, (480, 640, 3))
+        self.assertEqual(read_reduced(photo, 100).shape, (120, 160, 3))
+
+        path = make_thumbnail(photo, width=320)
+        self.assertEqual(path, os.path.join(self.photo_dir, "thumbs", "picture_0.jpg"))
+        image = cv2.imread(path)
+        self.assertEqual(image.shape, (240, 320, 3))
+        self.assertAlmostEqual(int(image[120, 160, 0]), 100, delta=3)
+
+        small = self.photo(1, width=200, height=100)
+        self.assertEqual(cv2.imread(make_thumbnail(small, width=320)).shape, (100, 200, 3))
+        with self.assertRaises(FileNotFoundError):
+            ThumbnailPool().get(os.path.join(self.photo_dir, "brak.jpg"))
+
+    def test_lazy_regeneration(self):
+        """Miniatura powinna powstac przy pierwszym get i ponownie po zmianie zdjecia."""
+        pool = ThumbnailPool()
+        photo = self.photo(0, value=50)
+        path = pool.get(photo)
+        etag = file_etag(path)
+        self.assertEqual(pool.get(photo), path)
+        self.assertEqual(pool.stats()["lazy"], 1)
+        self.assertEqual(file_etag(path), etag)
+
+        self.photo(0, value=200)
+        later = time.time() + 10
+        os.utime(photo, (later, later))
+        pool.get(photo)
+        self.assertEqual(pool.stats()["lazy"], 2)
+        self.assertNotEqual(file_etag(path), etag)
+        self.assertAlmostEqual(int(cv2.imread(path)[10, 10, 0]), 200, delta=3)
+
+    def test_pool_listener(self):
+        """Kazde zdjecie zapisane przez PhotoWriter powinno dostac miniature w tle."""
+        pool = ThumbnailPool(workers=1, nice=0)
+        writer = PhotoWriter(workers=1)
+        writer.add_listener(pool.submit)
+        pool.start()
+        writer.start()
+        paths = [os.path.join(self.photo_dir, f"picture_{i}.jpg") for i in range(4)]
+        for i, path in enumerate(paths):
+            self.assertTrue(writer.put(path, make_frame(i * 50, 640, 480)))
+        writer.stop()
+        pool.stop()
+
+        self.assertTrue(all(os.path.isfile(thumb_path(path)) for path in paths))
+        stats = pool.stats()
+        self.assertEqual((stats["generated"], stats["lazy"], stats["dropped"], stats["depth"]),
+                         (4, 0, 0, 0))
+
+    def test_mosaic(self):
+        """30 zdjec w siatce 3x2 to mozaika 3x2 kafelkow; bez zmian plik nie jest odtwarzany."""
+        pool = ThumbnailPool()
+        photos = [self.photo(i, value=i * 8, width=320, height=240) for i in range(30)]
+        path = os.path.join(self.photo_dir, "thumbs", "mosaic.jpg")
+        self.assertEqual(pool.mosaic(photos, path, grid=(3, 2), tile=(40, 30)), path)
+        self.assertEqual(cv2.imread(path).shape, (60, 120, 3))
+        # Wybrane zostaja zdjecia rowno rozlozone w czasie: 0, 5, 10, ...
+        self.assertEqual(pool.stats()["lazy"], 6)
+        self.assertAlmostEqual(int(cv2.imread(path)[45, 100, 0]), 25 * 8, delta=4)
+
+        etag = file_etag(path)
+        pool.mosaic(photos, path, grid=(3, 2), tile=(40, 30))
+        self.assertEqual((pool.stats()["mosaics"], file_etag(path)), (1, etag))
+
+        photos.append(self.photo(30, width=320, height=240))
+        later = time.time() + 10
+        os.utime(photos[-1], (later, later))
+        pool.mosaic(photos, path, grid=(3, 2), tile=(40, 30))
+        self.assertEqual(pool.stats()["mosaics"], 2)
+        self.assertEqual(cv2.imread(path).shape, (60, 120, 3))
+
+    def test_concurrent_writes(self):
+        """Kazdy zapis ma wlasny plik tymczasowy; po zapisach zostaje tylko miniatura."""
+        photo = self.photo(0)
+        errors = []
+
+        def write():
+            for _ in range(20):
+                try:
+                    make_thumbnail(photo, width=320)
+                except OSError as e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=write) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(os.listdir(os.path.join(self.photo_dir, "thumbs")), ["picture_0.jpg"])
+
+
+if __name__ == '__main__':
+    unittest.main()
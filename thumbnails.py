@@ -0,0 +1,304 @@
+"""
+Miniatury zdjec z fotopulapki i dzienne mozaiki dla galerii zdarzen.
+
+Miniatura (THUMB_WIDTH px szerokosci) zapisywana jest w podkatalogu
+thumbs obok zdjecia pod ta sama nazwa. Zdjecie jest dekodowane od razu
+w zmniejszonej skali (cv2.IMREAD_REDUCED_COLOR_2/4/8 - dekoder JPEG
+pomija wiekszosc obliczen), dobranej do szerokosci odczytanej z naglowka
+JPEG, a potem zmniejszane do docelowej szerokosci.
+
+ThumbnailPool tworzy miniatury w tle: jest sluchaczem PhotoWriter, wiec
+miniatura powstaje zaraz po zapisie zdjecia, w osobnych watkach
+z obnizonym priorytetem (nice), ktore nie korzystaja z zadnej blokady
+wykrywania ruchu. Przy pelnej kolejce zadanie jest pomijane - brakujaca
+lub starsza od zdjecia miniatura jest tworzona leniwie przy pierwszym
+zadaniu (get), co obejmuje tez zdjecia sprzed wprowadzenia miniatur.
+
+Mozaika dnia to obraz o stalym rozmiarze (MOSAIC_GRID kafelkow
+MOSAIC_TILE) z miniatur zdjec zdarzen tego dnia, odtwarzany, gdy
+pojawi sie nowsze zdjecie. Oba sa serwowane z ETag (rozmiar i czas
+modyfikacji pliku); miniatura nie zmienia sie dla danej nazwy zdjecia,
+wiec ma tez dlugi Cache-Control, a mozaika jest sprawdzana przy kazdym
+uzyciu (no-cache, odpowiedz 304 bez tresci).
+"""
+import os
+import queue
+import tempfile
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from response_cache import make_etag
+
+# Szerokosc i jakosc JPEG miniatur
+THUMB_WIDTH = 320
+THUMB_QUALITY = 70
+
+# Podkatalog miniatur obok zdjec
+THUMB_DIR = "thumbs"
+
+# Rozmiar kafelka i siatka (kolumny, wiersze) mozaiki dnia: 960x480 px
+MOSAIC_TILE = (160, 120)
+MOSAIC_GRID = (6, 4)
+
+# Liczba watkow, dlugosc kolejki i obnizenie priorytetu watkow miniatur
+THUMB_WORKERS = 1
+THUMB_QUEUE_SIZE = 64
+THUMB_NICE = 10
+
+# Naglowki Cache-Control: miniatura nie zmienia sie dla danej nazwy zdjecia,
+# a mozaika dnia rosnie wraz z nowymi zdarzeniami (sprawdzenie ETag)
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+MOSAIC_CACHE_CONTROL = "no-cache"
+
+# Flagi odczytu JPEG w zmniejszonej skali
+_REDUCED = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+            (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+# Znacznik konca pracy watku
+_STOP = object()
+
+
+def thumb_path(photo):
+    """Zwraca sciezke miniatury zdjecia (podkatalog thumbs obok zdjecia)."""
+    directory, name = os.path.split(photo)
+    return os.path.join(directory, THUMB_DIR, name)
+
+
+def file_etag(path):
+    """Zwraca ETag pliku z jego rozmiaru i czasu modyfikacji."""
+    stat = os.stat(path)
+    return make_etag(f"{stat.st_size:x}", f"{stat.st_mtime_ns:x}")
+
+
+def _is_fresh(path, source):
+    """Sprawdza, czy plik path istnieje i nie jest starszy niz source."""
+    try:
+        return os.stat(path).st_mtime_ns >= os.stat(source).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def _write_jpeg(path, image, quality):
+    """Zapisuje obraz JPEG przez plik tymczasowy (czytelnicy nie widza polowy pliku)."""
+    success, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not success:
+        raise ValueError(f"nie udalo sie zakodowac {path}")
+    directory, name = os.path.split(path)
+    os.makedirs(directory, exist_ok=True)
+    # Wlasny plik tymczasowy dla kazdego zapisu: te sama miniature moze w tym
+    # samym czasie tworzyc watek puli i watek obslugujacy zadanie
+    descriptor, temporary = tempfile.mkstemp(suffix=".tmp", prefix=name, dir=directory)
+    try:
+        with os.fdopen(descriptor, "wb") as f:
+            f.write(buffer)
+        os.replace(temporary, path)
+    except OSError:
+        os.unlink(temporary)
+        raise
+
+
+def jpeg_width(data):
+    """
+    Odczytuje szerokosc obrazu z naglowka SOF pliku JPEG bez dekodowania.
+    :return: Szerokosc w pikselach lub None, gdy naglowka nie znaleziono.
+    """
+
+    i = 2
+    while i + 9 <= len(data) and data[i] == 0xFF:
+        marker = data[i + 1]
+        # Znaczniki SOF0-SOF15 poza DHT (C4), JPG (C8) i DAC (CC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            return (int(data[i + 7]) << 8) | int(data[i + 8])
+        i += 2 + ((int(data[i + 2]) << 8) | int(data[i + 3]))
+    return None
+
+
+def read_reduced(photo, width):
+    """
+    Odczytuje zdjecie JPEG w najmniejszej skali (1/2, 1/4, 1/8), ktora ma
+    co najmniej width px szerokosci.
+    :return: Obraz BGR.
+    :raises ValueError: Gdy pliku nie da sie odczytac.
+    """
+
+    with open(photo, "rb") as f:
+        data = np.frombuffer(f.read(), np.uint8)
+    flags = cv2.IMREAD_COLOR
+    full_width = jpeg_width(data) if data[:2].tobytes() == b"\xff\xd8" else None
+    if full_width is not None:
+        for factor, reduced in _REDUCED:
+            if full_width // factor >= width:
+                flags = reduced
+                break
+    image = cv2.imdecode(data, flags)
+    if image is None:
+        raise ValueError(f"nie mozna odczytac zdjecia {photo}")
+    return image
+
+
+def make_thumbnail(photo, width=THUMB_WIDTH, quality=THUMB_QUALITY):
+    """Tworzy miniature zdjecia. :return: Sciezka miniatury."""
+    image = read_reduced(photo, width)
+    if image.shape[1] > width:
+        height = max(1, round(image.shape[0] * width / image.shape[1]))
+        image = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+    path = thumb_path(photo)
+    _write_jpeg(path, image, quality)
+    return path
+
+
+class ThumbnailPool:
+    """
+    Watki tworzace miniatury w tle i leniwe tworzenie brakujacych miniatur.
+    :param workers: Liczba watkow.
+    :param maxsize: Maksymalna liczba zdjec czekajacych na miniature.
+    :param width: Szerokosc miniatury w pikselach.
+    :param quality: Jakosc JPEG miniatury.
+    :param nice: Obnizenie priorytetu watkow (0 - bez zmiany).
+    """
+
+    def __init__(self, workers=THUMB_WORKERS, maxsize=THUMB_QUEUE_SIZE, width=THUMB_WIDTH,
+                 quality=THUMB_QUALITY, nice=THUMB_NICE):
+        self.workers = workers
+        self.width = width
+        self.quality = quality
+        self.nice = nice
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._stats = {"generated": 0, "lazy": 0, "mosaics": 0, "dropped": 0, "failed": 0,
+                       "last_ms": 0.0}
+
+    def start(self):
+        """Uruchamia watki tworzace miniatury."""
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"thumbnails-{i}")
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, photo):
+        """
+        Zleca utworzenie miniatury bez czekania (sluchacz PhotoWriter).
+        :return: True, jesli zdjecie trafilo do kolejki, False jesli pominieto.
+        """
+
+        try:
+            self._queue.put_nowait(photo)
+            return True
+        except queue.Full:
+            self._count("dropped")
+            return False
+
+    def get(self, photo):
+        """
+        Zwraca sciezke aktualnej miniatury zdjecia, tworzac ja, gdy nie istnieje
+        lub jest starsza od zdjecia.
+        :raises FileNotFoundError: Gdy zdjecie nie istnieje.
+        :raises ValueError: Gdy zdjecia nie da sie odczytac.
+        """
+
+        path = thumb_path(photo)
+        if _is_fresh(path, photo):
+            return path
+        if not os.path.isfile(photo):
+            raise FileNotFoundError(photo)
+        self._generate(photo)
+        self._count("lazy")
+        return path
+
+    def mosaic(self, photos, path, grid=MOSAIC_GRID, tile=MOSAIC_TILE):
+        """
+        Zwraca sciezke mozaiki o stalym rozmiarze z miniatur zdjec, tworzac ja,
+        gdy nie istnieje lub ktores zdjecie jest nowsze. Przy wiekszej liczbie
+        zdjec niz kafelkow wybierane sa zdjecia rowno rozlozone w czasie.
+        :param photos: Sciezki zdjec w kolejnosci czasu.
+        :param path: Sciezka pliku mozaiki.
+        """
+
+        photos = [photo for photo in photos if os.path.isfile(photo)]
+        if os.path.exists(path) and all(_is_fresh(path, photo) for photo in photos):
+            return path
+
+        columns, rows = grid
+        cells = columns * rows
+        if len(photos) > cells:
+            photos = [photos[i * len(photos) // cells] for i in range(cells)]
+        thumbs = []
+        for photo in photos:
+            try:
+                thumbs.append(self.get(photo))
+            except (OSError, ValueError, cv2.error):
+                continue
+
+        start = time.perf_counter()
+        width, height = tile
+        image = np.zeros((rows * height, columns * width, 3), np.uint8)
+        for i, thumb in enumerate(thumbs):
+            picture = cv2.imread(thumb)
+            if picture is None:
+                continue
+            # Kafelek wypelniony obrazem z zachowaniem proporcji (przyciecie srodka)
+            scale = max(width / picture.shape[1], height / picture.shape[0])
+            resized = cv2.resize(picture, (max(width, round(picture.shape[1] * scale)),
+                                           max(height, round(picture.shape[0] * scale))),
+                                 interpolation=cv2.INTER_AREA)
+            top = (resized.shape[0] - height) // 2
+            left = (resized.shape[1] - width) // 2
+            y, x = i // columns * height, i % columns * width
+            image[y:y + height, x:x + width] = resized[top:top + height, left:left + width]
+        _write_jpeg(path, image, self.quality)
+        with self._lock:
+            self._stats["mosaics"] += 1
+            self._stats["last_ms"] = (time.perf_counter() - start) * 1000
+        return path
+
+    def stop(self, timeout=None):
+        """Konczy prace watkow po utworzeniu miniatur z kolejki."""
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def stats(self):
+        """Zwraca kopie licznikow wraz z aktualna glebokoscia kolejki."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["depth"] = self._queue.qsize()
+        return stats
+
+    def _count(self, name, value=1):
+        """Zwieksza licznik o podana wartosc."""
+        with self._lock:
+            self._stats[name] += value
+
+    def _generate(self, photo):
+        """Tworzy miniature i aktualizuje liczniki."""
+        start = time.perf_counter()
+        make_thumbnail(photo, self.width, self.quality)
+        with self._lock:
+            self._stats["generated"] += 1
+            self._stats["last_ms"] = (time.perf_counter() - start) * 1000
+
+    def _run(self):
+        """Petla watku: miniatury zlecone przez submit z obnizonym priorytetem."""
+        if self.nice:
+            try:
+                # W Linuksie priorytet (nice) mozna ustawic dla pojedynczego watku
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.nice)
+            except (AttributeError, OSError):
+                pass
+        while True:
+            photo = self._queue.get()
+            if photo is _STOP:
+                break
+            try:
+                if not _is_fresh(thumb_path(photo), photo):
+                    self._generate(photo)
+            except (OSError, ValueError, cv2.error) as e:
+                print(f"Blad tworzenia miniatury {photo}: {e}")
+                self._count("failed")